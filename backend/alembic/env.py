@@ -17,6 +17,10 @@ from app.models import (
     Reconciliation,
     Reminder,
     AuditLog,
+    CategoryMemo,
+    BankSyncCursor,
+    OutboxEvent,
+    ReminderTemplate,
 )
 
 # this is the Alembic Config object
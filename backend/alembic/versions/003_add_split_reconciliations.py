@@ -0,0 +1,40 @@
+"""Allow split and partial payment reconciliations
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '003'
+down_revision = '002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # A transaction may now pay several invoices (and an invoice be paid by several transactions)
+    op.drop_constraint('reconciliations_transaction_id_key', 'reconciliations', type_='unique')
+    op.drop_index(op.f('ix_reconciliations_transaction_id'), table_name='reconciliations')
+    op.create_index(op.f('ix_reconciliations_transaction_id'), 'reconciliations', ['transaction_id'], unique=False)
+
+    # Grouping and allocation of split/partial payments
+    op.add_column('reconciliations', sa.Column('group_id', postgresql.UUID(as_uuid=True), nullable=True))
+    op.add_column('reconciliations', sa.Column('allocated_amount', sa.Numeric(precision=15, scale=2), nullable=True))
+    op.create_index(op.f('ix_reconciliations_group_id'), 'reconciliations', ['group_id'], unique=False)
+
+
+def downgrade() -> None:
+    # Drop grouping columns
+    op.drop_index(op.f('ix_reconciliations_group_id'), table_name='reconciliations')
+    op.drop_column('reconciliations', 'allocated_amount')
+    op.drop_column('reconciliations', 'group_id')
+
+    # Restore one reconciliation per transaction
+    op.drop_index(op.f('ix_reconciliations_transaction_id'), table_name='reconciliations')
+    op.create_index(op.f('ix_reconciliations_transaction_id'), 'reconciliations', ['transaction_id'], unique=True)
+    op.create_unique_constraint('reconciliations_transaction_id_key', 'reconciliations', ['transaction_id'])
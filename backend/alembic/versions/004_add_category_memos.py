@@ -0,0 +1,44 @@
+"""Add category_memos table
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '004'
+down_revision = '003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Remembered category per user and normalized description
+    op.create_table(
+        'category_memos',
+        sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('user_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('fingerprint', sa.String(length=255), nullable=False),
+        sa.Column('category', sa.String(length=100), nullable=False),
+        sa.Column('confidence', sa.Numeric(precision=3, scale=2), nullable=False),
+        sa.Column('source', sa.String(length=20), nullable=False),
+        sa.Column('hit_count', sa.Integer(), nullable=False),
+        sa.Column('last_used_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'fingerprint', name='uq_category_memos_user_fingerprint')
+    )
+    op.create_index(op.f('ix_category_memos_user_id'), 'category_memos', ['user_id'], unique=False)
+    op.create_index(op.f('ix_category_memos_last_used_at'), 'category_memos', ['last_used_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_category_memos_last_used_at'), table_name='category_memos')
+    op.drop_index(op.f('ix_category_memos_user_id'), table_name='category_memos')
+    op.drop_table('category_memos')
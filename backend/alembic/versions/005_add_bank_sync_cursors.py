@@ -0,0 +1,40 @@
+"""Add bank_sync_cursors table
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Incremental Bridge sync watermark per bank account
+    op.create_table(
+        'bank_sync_cursors',
+        sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('bank_account_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('last_transaction_id', sa.String(length=255), nullable=True),
+        sa.Column('last_transaction_date', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('etag', sa.String(length=255), nullable=True),
+        sa.Column('resume_uri', sa.Text(), nullable=True),
+        sa.Column('last_synced_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(['bank_account_id'], ['bank_accounts.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_bank_sync_cursors_bank_account_id'), 'bank_sync_cursors', ['bank_account_id'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_bank_sync_cursors_bank_account_id'), table_name='bank_sync_cursors')
+    op.drop_table('bank_sync_cursors')
@@ -0,0 +1,24 @@
+"""Add sync_requested_at to bank_accounts
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Set while a webhook-triggered sync is queued (coalesces event bursts)
+    op.add_column('bank_accounts', sa.Column('sync_requested_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('bank_accounts', 'sync_requested_at')
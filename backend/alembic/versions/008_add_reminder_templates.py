@@ -0,0 +1,42 @@
+"""Add reminder_templates table
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-18 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '008'
+down_revision = '007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Reminder email templates per user, language and reminder type
+    op.create_table(
+        'reminder_templates',
+        sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('user_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('language', sa.String(length=10), nullable=False),
+        sa.Column('reminder_type', sa.String(length=50), nullable=False),
+        sa.Column('subject_template', sa.Text(), nullable=False),
+        sa.Column('body_template', sa.Text(), nullable=False),
+        sa.Column('source', sa.String(length=20), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'language', 'reminder_type', name='uq_reminder_templates_user_language_type')
+    )
+    op.create_index(op.f('ix_reminder_templates_user_id'), 'reminder_templates', ['user_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_reminder_templates_user_id'), table_name='reminder_templates')
+    op.drop_table('reminder_templates')
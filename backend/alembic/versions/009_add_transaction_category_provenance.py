@@ -0,0 +1,27 @@
+"""Add category_confidence and category_source to transactions
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-18 21:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '009'
+down_revision = '008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Where a category comes from (ai, manual, memo, model): the local
+    # categorization model only trains on confirmed labels
+    op.add_column('transactions', sa.Column('category_confidence', sa.Numeric(3, 2), nullable=True))
+    op.add_column('transactions', sa.Column('category_source', sa.String(20), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('transactions', 'category_source')
+    op.drop_column('transactions', 'category_confidence')
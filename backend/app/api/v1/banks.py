@@ -5,12 +5,15 @@ from typing import List, Dict
 from pydantic import BaseModel
 
 from app.core.database import get_db
-from app.api.deps import get_current_user
+from app.api.deps import get_current_superuser, get_current_user
 from app.models.user import User
 from app.models.bank_account import BankAccount
 from app.schemas.bank import BankAccountCreate, BankAccountUpdate, BankAccountRead, BankAccountList
-from app.services.bank_service import BankService
+from app.services.bank_service import BankService, SYNC_LOCK
+from app.core.locks import LockBusy, entity_locks
 from app.integrations.bridge_client import BridgeClient, BridgeAPIError
+from app.workers.queues import PRIORITY_URGENT
+from app.workers.tasks import enqueue_outbox_relay, sync_bank_account_group_task
 
 router = APIRouter(prefix="/banks", tags=["banks"])
 
@@ -78,6 +81,24 @@ async def list_bank_accounts(
     )
 
 
+@router.get(
+    "/locks/stats",
+    summary="Background job lock statistics"
+)
+async def get_lock_stats(
+    current_user: User = Depends(get_current_superuser),
+) -> Dict:
+    """
+    Contention of the per-entity job locks (bank syncs, reconciliations).
+    
+    Operator telemetry across every tenant: superusers only.
+    
+    - **process**: counters of this API process
+    - **shared**: counters of every process (API and workers), from Redis
+    """
+    return await entity_locks.get_stats()
+
+
 @router.get(
     "/{account_id}",
     response_model=BankAccountRead,
@@ -241,7 +262,8 @@ async def handle_bridge_callback(
     """
     Handle callback after successful Bridge connection.
     
-    Fetches accounts from Bridge and creates them in our database.
+    Fetches accounts from Bridge and creates them in our database; their
+    initial sync is queued.
     """
     try:
         bridge_client = BridgeClient()
@@ -266,6 +288,14 @@ async def handle_bridge_callback(
         await db.commit()
         await bridge_client.close()
         
+        # Initial sync of the item's accounts in a worker: it can take long
+        # enough to time out the redirect if run in the request
+        if created_accounts:
+            sync_bank_account_group_task.apply_async(
+                args=[[str(account.id) for account in created_accounts]],
+                priority=PRIORITY_URGENT
+            )
+        
         logger.info(
             f"Created {len(created_accounts)} accounts from Bridge "
             f"for user {current_user.id}"
@@ -328,21 +358,33 @@ async def sync_transactions(
             detail="Account is not connected to Bridge API"
         )
     
-    # Sync transactions
+    # Sync transactions (not while a background sync of the account runs)
     try:
         bridge_client = BridgeClient()
         
-        sync_result = await BankService.sync_transactions(
-            db=db,
-            account=account,
-            bridge_client=bridge_client
-        )
-        
-        await db.commit()
+        async with entity_locks.hold(SYNC_LOCK, account.id):
+            sync_result = await BankService.sync_transactions(
+                db=db,
+                account=account,
+                bridge_client=bridge_client
+            )
+            await db.commit()
         await bridge_client.close()
         
+        # Categorize and reconcile the new rows now rather than at the next relay run
+        if sync_result["new_ids"]:
+            await enqueue_outbox_relay()
+        
+        # The Bridge pagination cursor stays internal (Celery syncs resume it)
+        sync_result.pop("resume_uri", None)
         return sync_result
         
+    except LockBusy:
+        await bridge_client.close()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A sync of this account is already running"
+        )
     except BridgeAPIError as e:
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
@@ -7,6 +7,7 @@ from app.api.deps import get_current_user
 from app.models.user import User
 from app.schemas.transaction import TransactionRead
 from app.services.categorization_service import CategorizationService
+from app.services.category_memo_service import CategoryMemoService
 from app.services.transaction_service import TransactionService
 from app.integrations.claude_client import ClaudeClient
 
@@ -56,7 +57,8 @@ async def categorize_transaction(
     transaction = await CategorizationService.categorize_transaction(
         db,
         transaction,
-        ai_client
+        ai_client,
+        user_id=current_user.id
     )
     
     await db.commit()
@@ -110,3 +112,31 @@ async def get_category_breakdown(
     return breakdown
 
 
+@router.get(
+    "/memo-stats",
+    summary="Get category memo statistics"
+)
+async def get_memo_stats(
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Get hit ratio of the merchant → category memo (current process).
+    
+    Returns lookup/hit/miss counters and the hit ratio.
+    """
+    return CategoryMemoService.get_stats()
+
+
+@router.get(
+    "/local-model-stats",
+    summary="Get local model statistics"
+)
+async def get_local_model_stats(
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Get share of transactions categorized by the local model (current process).
+    
+    Returns prediction/acceptance counters and the acceptance ratio.
+    """
+    return CategorizationService.get_local_stats()
@@ -1,11 +1,12 @@
 """Invoice API endpoints"""
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from fastapi.responses import Response
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 from datetime import date
 from pydantic import BaseModel, EmailStr
 
+from app.config import settings
 from app.core.database import get_db
 from app.api.deps import get_current_user
 from app.models.user import User
@@ -18,7 +19,9 @@ from app.schemas.invoice import (
     InvoiceList
 )
 from app.services.invoice_service import InvoiceService
+from app.services.invoice_export_service import InvoiceExportService
 from app.services.pdf_service import PDFService
+from app.services.pdf_render_pool import PDFPoolBusy
 from app.integrations.sendgrid_client import SendGridClient
 
 router = APIRouter(prefix="/invoices", tags=["invoices"])
@@ -61,6 +64,29 @@ async def create_invoice(
         )
 
 
+def _invoice_filter(
+    invoice_status: Optional[str],
+    is_reconciled: Optional[bool],
+    start_date: Optional[date],
+    end_date: Optional[date],
+    client_name: Optional[str],
+    min_amount: Optional[float],
+    max_amount: Optional[float]
+) -> InvoiceFilter:
+    """InvoiceFilter of the list/export query parameters"""
+    from decimal import Decimal
+    
+    return InvoiceFilter(
+        status=invoice_status,
+        is_reconciled=is_reconciled,
+        start_date=start_date,
+        end_date=end_date,
+        client_name=client_name,
+        min_amount=Decimal(str(min_amount)) if min_amount is not None else None,
+        max_amount=Decimal(str(max_amount)) if max_amount is not None else None
+    )
+
+
 @router.get(
     "/",
     response_model=InvoiceList,
@@ -88,16 +114,8 @@ async def list_invoices(
     - **client_name**: Search by client name
     - **min_amount / max_amount**: Filter by amount range
     """
-    from decimal import Decimal
-    
-    filters = InvoiceFilter(
-        status=status,
-        is_reconciled=is_reconciled,
-        start_date=start_date,
-        end_date=end_date,
-        client_name=client_name,
-        min_amount=Decimal(str(min_amount)) if min_amount is not None else None,
-        max_amount=Decimal(str(max_amount)) if max_amount is not None else None
+    filters = _invoice_filter(
+        status, is_reconciled, start_date, end_date, client_name, min_amount, max_amount
     )
     
     invoices, total = await InvoiceService.get_invoices(
@@ -119,6 +137,155 @@ async def list_invoices(
     )
 
 
+@router.get(
+    "/export",
+    summary="Download invoice PDFs as a ZIP archive"
+)
+async def export_invoices(
+    invoice_status: Optional[str] = Query(None, alias="status"),
+    is_reconciled: Optional[bool] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    client_name: Optional[str] = None,
+    min_amount: Optional[float] = None,
+    max_amount: Optional[float] = None,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+) -> StreamingResponse:
+    """
+    Stream a ZIP of the PDFs of every invoice matching the filters.
+    
+    Same filters as the invoice list. PDFs are rendered in parallel and the
+    archive is streamed as it is built; the **X-Export-Total** header gives
+    the number of invoices. Larger selections (over
+    INVOICE_EXPORT_STREAM_MAX_INVOICES) use POST /invoices/exports.
+    """
+    filters = _invoice_filter(
+        invoice_status, is_reconciled, start_date, end_date, client_name, min_amount, max_amount
+    )
+    try:
+        entries = await InvoiceExportService.load_entries(
+            db,
+            current_user,
+            filters,
+            settings.INVOICE_EXPORT_STREAM_MAX_INVOICES
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    filename = f"Factures_{date.today().isoformat()}.zip"
+    return StreamingResponse(
+        InvoiceExportService.iter_zip(entries),
+        media_type="application/zip",
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "X-Export-Total": str(len(entries))
+        }
+    )
+
+
+@router.post(
+    "/exports",
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Start a background invoice PDF export"
+)
+async def start_invoice_export(
+    filters: InvoiceFilter,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Build the ZIP of the matching invoices' PDFs in the background.
+    
+    Poll GET /invoices/exports/{export_id} for progress, then download the
+    archive (kept INVOICE_EXPORT_RETENTION_HOURS).
+    """
+    from uuid import uuid4
+    from app.workers.tasks import export_invoices_pdf_task
+    
+    export_id = str(uuid4())
+    await InvoiceExportService.record_owner(export_id, current_user.id)
+    export_invoices_pdf_task.apply_async(
+        args=(str(current_user.id), filters.model_dump(mode="json")),
+        task_id=export_id
+    )
+    return {"export_id": export_id, "state": "PENDING"}
+
+
+@router.get(
+    "/exports/{export_id}",
+    summary="Get background invoice export progress"
+)
+async def get_invoice_export(
+    export_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Progress of a background export.
+    
+    - **state**: PENDING, PROGRESS, SUCCESS or FAILURE
+    - **total / done / failed**: invoices selected, PDFs archived, PDFs that failed
+    - **download_url**: once the archive is ready
+    """
+    from celery.result import AsyncResult
+    from app.workers.celery_app import celery_app
+    
+    if not await InvoiceExportService.is_owner(export_id, current_user.id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Export not found"
+        )
+    
+    result = AsyncResult(export_id, app=celery_app)
+    info = result.info if isinstance(result.info, dict) else {}
+    response = {
+        "export_id": export_id,
+        "state": result.state,
+        **{key: info[key] for key in ("total", "done", "failed", "error") if key in info},
+    }
+    if result.state == "FAILURE":
+        # The exception text is for the logs, not the client
+        response["error"] = "Export failed"
+    if result.state == "SUCCESS" and "error" not in info:
+        response["download_url"] = f"{settings.API_V1_STR}/invoices/exports/{export_id}/download"
+    return response
+
+
+@router.get(
+    "/exports/{export_id}/download",
+    summary="Download a background invoice export"
+)
+async def download_invoice_export(
+    export_id: str,
+    current_user: User = Depends(get_current_user)
+) -> FileResponse:
+    """Download the ZIP archive of a finished background export."""
+    from uuid import UUID
+    
+    try:
+        export_uuid = UUID(export_id)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid export ID format"
+        )
+    
+    path = InvoiceExportService.export_path(current_user.id, str(export_uuid))
+    if not path.is_file() or not await InvoiceExportService.is_owner(str(export_uuid), current_user.id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Export not found"
+        )
+    
+    return FileResponse(
+        path,
+        media_type="application/zip",
+        filename=f"Factures_{export_uuid}.zip"
+    )
+
+
 @router.get(
     "/{invoice_id}",
     response_model=InvoiceRead,
@@ -234,6 +401,22 @@ async def delete_invoice(
     await InvoiceService.delete_invoice(db, invoice)
 
 
+@router.get(
+    "/pdf/stats",
+    summary="PDF rendering statistics"
+)
+async def get_pdf_stats(
+    current_user: User = Depends(get_current_user)
+):
+    """
+    PDF render pool and cache of the current process.
+    
+    - **pool**: workers, pending renders, counters and render/latency percentiles (ms)
+    - **cache**: hit/miss/eviction counters and the hit ratio
+    """
+    return PDFService.get_stats()
+
+
 @router.get(
     "/{invoice_id}/pdf",
     summary="Download invoice PDF"
@@ -271,9 +454,9 @@ async def download_invoice_pdf(
             detail="Invoice not found"
         )
     
-    # Generate PDF
+    # Generate PDF (cached, or rendered in the PDF worker pool)
     try:
-        pdf_bytes = PDFService.generate_invoice_pdf(invoice, current_user)
+        pdf_bytes = await PDFService.get_invoice_pdf(invoice, current_user)
         filename = PDFService.get_invoice_filename(invoice)
         
         return Response(
@@ -283,6 +466,12 @@ async def download_invoice_pdf(
                 "Content-Disposition": f'attachment; filename="{filename}"'
             }
         )
+    except PDFPoolBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many PDFs being generated, retry shortly",
+            headers={"Retry-After": "2"}
+        )
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -332,7 +521,7 @@ async def send_invoice_email(
     
     # Generate PDF
     try:
-        pdf_bytes = PDFService.generate_invoice_pdf(invoice, current_user)
+        pdf_bytes = await PDFService.get_invoice_pdf(invoice, current_user)
         filename = PDFService.get_invoice_filename(invoice)
         
         # Prepare email
@@ -366,6 +555,12 @@ Cordialement,
             "invoice_number": invoice.invoice_number
         }
         
+    except PDFPoolBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many PDFs being generated, retry shortly",
+            headers={"Retry-After": "2"}
+        )
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
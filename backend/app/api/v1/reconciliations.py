@@ -9,7 +9,11 @@ from app.models.user import User
 from app.schemas.reconciliation import (
     ReconciliationCreate,
     ReconciliationRead,
-    ReconciliationSuggestion
+    ReconciliationSuggestion,
+    ReconciliationBatchRequest,
+    ReconciliationBatchResult,
+    ReconciliationGroupCreate,
+    ReconciliationGroupResult
 )
 from app.services.reconciliation_service import ReconciliationService
 from app.integrations.claude_client import ClaudeClient
@@ -48,6 +52,40 @@ async def create_reconciliation(
         )
 
 
+@router.post(
+    "/group",
+    response_model=ReconciliationGroupResult,
+    status_code=status.HTTP_201_CREATED,
+    summary="Create split or partial payment reconciliation"
+)
+async def create_group_reconciliation(
+    group_data: ReconciliationGroupCreate,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Reconcile a split payment or an installment plan.
+    
+    - One transaction paying several invoices (match_method='split')
+    - Several transactions paying one invoice (match_method='partial')
+    
+    Amounts on both sides must add up to the cent.
+    """
+    try:
+        result = await ReconciliationService.create_group_reconciliation(
+            db,
+            current_user.id,
+            group_data
+        )
+        await db.commit()
+        return result
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+
 @router.get(
     "/suggestions/{transaction_id}",
     response_model=List[ReconciliationSuggestion],
@@ -139,6 +177,61 @@ async def auto_reconcile_transaction(
         )
 
 
+@router.post(
+    "/batch",
+    response_model=ReconciliationBatchResult,
+    summary="Auto-reconcile a batch of transactions"
+)
+async def reconcile_batch(
+    batch_request: ReconciliationBatchRequest,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Auto-reconcile many transactions against all open invoices in one pass.
+    
+    - **transaction_ids**: Transactions to reconcile (optional)
+    - **since**: Only transactions dated on/after this date (optional)
+    - **limit**: Transactions per page (at most RECONCILIATION_BATCH_MAX_TRANSACTIONS)
+    - **cursor**: `next_cursor` of the previous page
+    
+    Unreconciled transactions are taken oldest first, one page per call;
+    `next_cursor` is set while more remain.
+    """
+    try:
+        stats = await ReconciliationService.reconcile_batch(
+            db,
+            current_user.id,
+            transaction_ids=batch_request.transaction_ids,
+            since=batch_request.since,
+            limit=batch_request.limit,
+            cursor=batch_request.cursor
+        )
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+    await db.commit()
+    return stats
+
+
+@router.get(
+    "/matching-stats",
+    summary="Get matching stage hit rates"
+)
+async def get_matching_stats(
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Get hit rates of each suggestion stage (exact, split, fuzzy, AI).
+    
+    Counters are kept per API process since its start; `ai_call_rate` is the
+    share of suggestion requests that reached Claude.
+    """
+    return ReconciliationService.get_matching_stats()
+
+
 @router.get(
     "/stats",
     summary="Get reconciliation stats"
@@ -1,12 +1,14 @@
 """Reminder API endpoints"""
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from typing import List
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.database import get_db
 from app.api.deps import get_current_user
-from app.models.user import User
-from app.schemas.reminder import ReminderRead
+from app.models.user import LanguageEnum, User
+from app.schemas.reminder import ReminderRead, ReminderTemplateRead, ReminderTemplateUpdate
 from app.services.reminder_service import ReminderService
+from app.services.reminder_template_service import REMINDER_TYPES, ReminderTemplateService
 from app.services.invoice_service import InvoiceService
 from app.integrations.claude_client import ClaudeClient
 from app.integrations.sendgrid_client import SendGridClient
@@ -129,3 +131,94 @@ async def get_reminder_stats(
     return stats
 
 
+
+
+@router.get(
+    "/templates",
+    response_model=List[ReminderTemplateRead],
+    summary="List reminder templates"
+)
+async def list_reminder_templates(
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    List the reminder templates of the current user.
+    
+    Templates are written by AI the first time a reminder of a type is sent
+    in a language, unless the user saved their own.
+    """
+    return await ReminderTemplateService.list_templates(db, current_user.id)
+
+
+@router.put(
+    "/templates/{language}/{reminder_type}",
+    response_model=ReminderTemplateRead,
+    summary="Save a reminder template"
+)
+async def save_reminder_template(
+    language: LanguageEnum,
+    reminder_type: str,
+    template_data: ReminderTemplateUpdate,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Replace a reminder template with the user's own.
+    
+    - **subject**, **body**: Jinja templates using invoice_number,
+      client_name, total_amount, currency, due_date and days_overdue
+    """
+    if reminder_type not in REMINDER_TYPES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="reminder_type must be 'first', 'second', or 'final'"
+        )
+    
+    try:
+        template = await ReminderTemplateService.save_template(
+            db,
+            current_user.id,
+            language.value,
+            reminder_type,
+            template_data.subject,
+            template_data.body
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    await db.commit()
+    return template
+
+
+@router.delete(
+    "/templates/{language}/{reminder_type}",
+    status_code=status.HTTP_204_NO_CONTENT,
+    summary="Reset a reminder template"
+)
+async def reset_reminder_template(
+    language: LanguageEnum,
+    reminder_type: str,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Delete a reminder template; the next reminder gets a new AI template.
+    """
+    deleted = await ReminderTemplateService.reset_template(
+        db,
+        current_user.id,
+        language.value,
+        reminder_type
+    )
+    if not deleted:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Reminder template not found"
+        )
+    
+    await db.commit()
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
@@ -3,6 +3,7 @@ from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 from datetime import datetime
+from decimal import Decimal
 
 from app.core.database import get_db
 from app.api.deps import get_current_user
@@ -14,6 +15,7 @@ from app.schemas.transaction import (
     TransactionFilter,
     TransactionList
 )
+from app.services.categorization_service import CategorizationService
 from app.services.transaction_service import TransactionService
 
 router = APIRouter(prefix="/transactions", tags=["transactions"])
@@ -159,6 +161,21 @@ async def update_transaction(
             detail="Transaction not found"
         )
     
+    # Category corrections go through the categorization service so the
+    # merchant is remembered for future transactions
+    if update_data.category is not None:
+        transaction = await CategorizationService.recategorize_transaction(
+            db,
+            transaction,
+            update_data.category,
+            confidence=update_data.category_confidence or Decimal("1.0"),
+            user_id=current_user.id
+        )
+        update_data = TransactionUpdate(**update_data.model_dump(
+            exclude_unset=True,
+            exclude={"category", "category_confidence"}
+        ))
+    
     transaction = await TransactionService.update_transaction(
         db,
         transaction,
@@ -0,0 +1,73 @@
+"""Webhook receivers for external providers"""
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, Optional
+import json
+import logging
+
+from app.config import settings
+from app.core.database import get_db
+from app.services.bank_webhook_service import (
+    BankWebhookService,
+    BridgeWebhookEvent,
+    verify_signature,
+    webhook_counters,
+)
+from app.workers.queues import PRIORITY_URGENT
+from app.workers.tasks import sync_bank_account_group_task
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/webhooks", tags=["webhooks"])
+
+
+@router.post(
+    "/bridge",
+    summary="Receive Bridge webhook events"
+)
+async def receive_bridge_webhook(
+    request: Request,
+    bridgeapi_signature: Optional[str] = Header(None, alias="BridgeApi-Signature"),
+    db: AsyncSession = Depends(get_db)
+) -> Dict:
+    """
+    Receive a Bridge event and queue a sync of the affected accounts only.
+
+    The signature is checked against the raw body. Accounts already waiting
+    for a webhook sync are not queued again: a burst of events for an item
+    ends in one sync per account, BRIDGE_WEBHOOK_COALESCE_SECONDS after the
+    first event.
+    """
+    if not settings.BRIDGE_WEBHOOK_SECRET:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Bridge webhooks are not configured"
+        )
+
+    body = await request.body()
+    if not verify_signature(body, bridgeapi_signature, settings.BRIDGE_WEBHOOK_SECRET):
+        webhook_counters.increment("rejected")
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid webhook signature"
+        )
+
+    try:
+        event = BridgeWebhookEvent.from_payload(json.loads(body))
+    except (ValueError, AttributeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid webhook payload"
+        )
+
+    account_ids = await BankWebhookService.request_syncs(db, [event])
+    await db.commit()
+
+    if account_ids:
+        sync_bank_account_group_task.apply_async(
+            args=[[str(account_id) for account_id in account_ids]],
+            countdown=settings.BRIDGE_WEBHOOK_COALESCE_SECONDS,
+            priority=PRIORITY_URGENT
+        )
+
+    return {"event": event.type, "queued": len(account_ids)}
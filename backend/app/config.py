@@ -61,6 +61,15 @@ class Settings(BaseSettings):
     # Celery
     CELERY_BROKER_URL: str = "redis://localhost:6379/0"
     CELERY_RESULT_BACKEND: str = "redis://localhost:6379/0"
+    # Per-queue worker settings (see app.workers.queues)
+    CELERY_INTERACTIVE_CONCURRENCY: int = 4
+    CELERY_INTERACTIVE_PREFETCH: int = 1
+    CELERY_SYNC_CONCURRENCY: int = 4
+    CELERY_SYNC_PREFETCH: int = 1
+    CELERY_BULK_AI_CONCURRENCY: int = 2
+    CELERY_BULK_AI_PREFETCH: int = 1
+    CELERY_EMAIL_CONCURRENCY: int = 2
+    CELERY_EMAIL_PREFETCH: int = 4
     
     # CORS
     CORS_ORIGINS: str = "http://localhost:3000,http://localhost:3001"
@@ -103,7 +112,110 @@ class Settings(BaseSettings):
     STRIPE_PUBLIC_KEY: Optional[str] = None
     STRIPE_SECRET_KEY: Optional[str] = None
     STRIPE_WEBHOOK_SECRET: Optional[str] = None
-    
+
+    # Claude
+    CLAUDE_CATEGORIZATION_BATCH_SIZE: int = 25
+    CLAUDE_MAX_CONCURRENCY: int = 5
+    CLAUDE_MAX_CONCURRENCY_PER_TENANT: int = 2
+    CLAUDE_REQUESTS_PER_MINUTE: int = 50
+    CLAUDE_MAX_CONNECTIONS: int = 10
+    CLAUDE_TIMEOUT_SECONDS: float = 60.0
+
+    # SendGrid
+    SENDGRID_BASE_URL: str = "https://api.sendgrid.com/v3"
+    SENDGRID_MAX_PERSONALIZATIONS: int = 1000
+    SENDGRID_MAX_CONCURRENCY: int = 4
+    SENDGRID_REQUESTS_PER_SECOND: float = 10.0
+    SENDGRID_MAX_RETRIES: int = 5
+    SENDGRID_BACKOFF_SECONDS: float = 1.0
+    SENDGRID_MAX_BACKOFF_SECONDS: float = 60.0
+
+    # Categorization memo cache
+    CATEGORY_MEMO_TTL_DAYS: int = 90
+    CATEGORY_MEMO_MAX_PER_USER: int = 5000
+    CATEGORY_MEMO_MIN_CONFIDENCE: float = 0.7
+
+    # Local categorization model
+    CATEGORY_MODEL_DIR: str = "var/models/categorization"
+    CATEGORY_MODEL_KEEP_VERSIONS: int = 3
+    CATEGORY_MODEL_RELOAD_SECONDS: int = 300
+    CATEGORY_MODEL_HASH_DIM: int = 262144
+    CATEGORY_MODEL_MIN_CONFIDENCE: float = 0.8
+    CATEGORY_MODEL_MIN_SAMPLES: int = 50
+    CATEGORY_MODEL_MAX_SAMPLES: int = 50000
+    CATEGORY_MODEL_MIN_LABEL_CONFIDENCE: float = 0.9
+
+    # Invoice PDFs
+    PDF_CACHE_ENABLED: bool = True
+    PDF_CACHE_DIR: str = "var/cache/pdf"
+    PDF_CACHE_MAX_BYTES: int = 512 * 1024 * 1024
+    PDF_POOL_WORKERS: int = 2
+    PDF_POOL_MAX_PENDING: int = 16
+    PDF_POOL_START_METHOD: str = "spawn"
+    PDF_POOL_WARM_ON_STARTUP: bool = True
+    PDF_RENDER_TIMEOUT_SECONDS: float = 60.0
+
+    # Bulk invoice PDF export
+    INVOICE_EXPORT_CONCURRENCY: int = 4
+    INVOICE_EXPORT_STREAM_MAX_INVOICES: int = 1000
+    INVOICE_EXPORT_MAX_INVOICES: int = 20000
+    INVOICE_EXPORT_DIR: str = "var/exports"
+    INVOICE_EXPORT_RETENTION_HOURS: int = 24
+    INVOICE_EXPORT_PROGRESS_SECONDS: float = 1.0
+    INVOICE_EXPORT_BUSY_RETRIES: int = 120
+    INVOICE_EXPORT_BUSY_RETRY_SECONDS: float = 0.5
+
+    # Bank sync
+    SYNC_UPSERT_CHUNK_SIZE: int = 500
+    BRIDGE_PAGE_SIZE: int = 500
+    BRIDGE_MAX_CONNECTIONS: int = 10
+    BRIDGE_SYNC_CONCURRENCY: int = 4
+    BRIDGE_SYNC_OVERLAP_DAYS: int = 2
+    BRIDGE_INITIAL_SYNC_DAYS: int = 90
+    BRIDGE_WEBHOOK_SECRET: Optional[str] = None
+    BRIDGE_WEBHOOK_COALESCE_SECONDS: int = 30
+    BRIDGE_WEBHOOK_PENDING_TTL_SECONDS: int = 900
+    BRIDGE_POLL_INTERVAL_SECONDS: int = 86400
+    BRIDGE_POLL_STALE_HOURS: int = 12
+
+    # Background job locks and enqueue deduplication
+    TASK_LOCK_TTL_SECONDS: int = 1800
+    TASK_DEDUP_TTL_SECONDS: int = 900
+    TASK_LOCK_RETRY_SECONDS: int = 30
+
+    # Overdue invoice reminders
+    REMINDER_GENERATION_CONCURRENCY: int = 4
+    REMINDER_TEMPLATE_CACHE_SIZE: int = 2048
+
+    # Transactional outbox (post-commit task dispatch)
+    OUTBOX_RELAY_INTERVAL_SECONDS: int = 15
+    OUTBOX_RELAY_BATCH_SIZE: int = 500
+    OUTBOX_RELAY_MAX_BATCHES: int = 20
+    OUTBOX_MAX_ATTEMPTS: int = 10
+    OUTBOX_MAX_IDS_PER_TASK: int = 200
+    OUTBOX_RETENTION_HOURS: int = 24
+
+    # Tenant fan-out (periodic jobs over every user)
+    TENANT_FANOUT_PAGE_SIZE: int = 500
+    TENANT_FANOUT_CHUNK_SIZE: int = 25
+    TENANT_FANOUT_CHUNK_CONCURRENCY: int = 5
+    TENANT_CATEGORIZE_LIMIT: int = 200
+
+    # Reconciliation
+    RECONCILIATION_INDEX_TTL_SECONDS: int = 300
+    RECONCILIATION_BATCH_MAX_TRANSACTIONS: int = 1000
+    RECONCILIATION_INDEX_MAX_TOKEN_SHARE: float = 0.25
+    RECONCILIATION_AMOUNT_TOLERANCE: float = 0.05
+    RECONCILIATION_AI_MAX_CANDIDATES: int = 100
+    RECONCILIATION_SPLIT_MAX_ITEMS: int = 5
+    RECONCILIATION_SPLIT_MAX_CANDIDATES: int = 40
+    RECONCILIATION_SPLIT_MAX_TRANSACTIONS: int = 400
+    RECONCILIATION_SPLIT_MAX_STATES: int = 50000
+    RECONCILIATION_SPLIT_WINDOW_DAYS: int = 90
+    RECONCILIATION_FUZZY_ACCEPT_SCORE: float = 0.75
+    RECONCILIATION_FUZZY_MIN_SCORE: float = 0.5
+    RECONCILIATION_FUZZY_DATE_WINDOW_DAYS: int = 60
+
     class Config:
         env_file = ".env"
         case_sensitive = True
@@ -0,0 +1,200 @@
+"""
+Per-entity locks and enqueue deduplication for background jobs (Redis).
+
+- `hold(kind, entity)`: only one holder per entity at a time (SET NX with a
+  TTL, so a crashed worker cannot keep a lock forever); the token check on
+  release keeps a holder whose lock expired from releasing someone else's.
+- `claim_enqueue(kind, entity)`: only the first enqueue of a job for an
+  entity is kept while it waits in the queue; the job clears its marker
+  when it starts, so later changes enqueue it again.
+
+Contention is counted in-process (`lock_counters`) and in a Redis hash shared
+by every process. If Redis is unreachable, locks fail open: jobs run as they
+did before locking existed rather than stopping altogether.
+"""
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional
+from uuid import uuid4
+import asyncio
+import logging
+import weakref
+
+import redis.asyncio as redis
+from redis.exceptions import RedisError
+
+from app.config import settings
+from app.core.metrics import get_counters
+
+logger = logging.getLogger(__name__)
+
+lock_counters = get_counters("task.locks")
+
+# Delete the key only if it still holds our token
+RELEASE_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+STATS_KEY = "financeai:locks:stats"
+
+# Token returned when Redis is unreachable and the lock failed open
+UNLOCKED = "unlocked"
+
+
+class LockBusy(Exception):
+    """Another worker holds the lock of this entity"""
+
+    def __init__(self, kind: str, entity):
+        super().__init__(f"{kind} {entity} is locked by another job")
+        self.kind = kind
+        self.entity = entity
+
+
+# Redis connections are bound to the loop that first uses them: one per loop
+_loop_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, redis.Redis]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_redis() -> redis.Redis:
+    """Redis client of the running event loop (created on first use)."""
+    loop = asyncio.get_running_loop()
+    client = _loop_clients.get(loop)
+    if client is None:
+        client = _loop_clients[loop] = redis.from_url(
+            settings.REDIS_URL,
+            socket_connect_timeout=1,
+            socket_timeout=2,
+        )
+    return client
+
+
+async def close_shared_clients() -> None:
+    """Close the Redis client of the running event loop (shutdown hook)."""
+    client = _loop_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+class EntityLocks:
+    """Locks and pending-enqueue markers keyed by (kind, entity id)"""
+
+    def __init__(self, client_factory=get_redis, prefix: str = "financeai"):
+        self.client_factory = client_factory
+        self.prefix = prefix
+
+    def _key(self, namespace: str, kind: str, entity) -> str:
+        return f"{self.prefix}:{namespace}:{kind}:{entity}"
+
+    async def _count(self, event: str, kind: str) -> None:
+        lock_counters.increment(event)
+        lock_counters.increment(f"{kind}.{event}")
+        try:
+            await self.client_factory().hincrby(STATS_KEY, f"{kind}.{event}", 1)
+        except RedisError:
+            pass
+
+    async def acquire(self, kind: str, entity, ttl: Optional[int] = None) -> Optional[str]:
+        """
+        Try to take the lock of an entity.
+
+        Returns:
+            Token to release it with, or None if another job holds it
+        """
+        token = uuid4().hex
+        lock_counters.increment("attempts")
+        try:
+            acquired = await self.client_factory().set(
+                self._key("lock", kind, entity),
+                token,
+                nx=True,
+                ex=ttl or settings.TASK_LOCK_TTL_SECONDS
+            )
+        except RedisError as e:
+            logger.warning(f"Lock {kind} {entity} not taken, Redis unavailable: {e}")
+            lock_counters.increment("unavailable")
+            return UNLOCKED
+
+        if not acquired:
+            await self._count("contended", kind)
+            return None
+        await self._count("acquired", kind)
+        return token
+
+    async def release(self, kind: str, entity, token: str) -> None:
+        """Release a lock taken with `acquire` (no-op if it expired meanwhile)."""
+        if token == UNLOCKED:
+            return
+        try:
+            await self.client_factory().eval(
+                RELEASE_SCRIPT, 1, self._key("lock", kind, entity), token
+            )
+        except RedisError as e:
+            logger.warning(f"Lock {kind} {entity} not released (expires with its TTL): {e}")
+
+    @asynccontextmanager
+    async def hold(self, kind: str, entity, ttl: Optional[int] = None) -> AsyncIterator[None]:
+        """
+        Hold the lock of an entity for the duration of the block.
+
+        Raises:
+            LockBusy: another job holds the lock
+        """
+        token = await self.acquire(kind, entity, ttl)
+        if token is None:
+            raise LockBusy(kind, entity)
+        try:
+            yield
+        finally:
+            await self.release(kind, entity, token)
+
+    async def claim_enqueue(self, kind: str, entity, ttl: Optional[int] = None) -> bool:
+        """
+        Mark a job for an entity as queued.
+
+        Returns:
+            True if the caller should enqueue it, False if one is already
+            waiting (the duplicate is dropped)
+        """
+        try:
+            claimed = await self.client_factory().set(
+                self._key("queued", kind, entity),
+                1,
+                nx=True,
+                ex=ttl or settings.TASK_DEDUP_TTL_SECONDS
+            )
+        except RedisError as e:
+            logger.warning(f"Enqueue of {kind} {entity} not deduplicated, Redis unavailable: {e}")
+            lock_counters.increment("unavailable")
+            return True
+
+        await self._count("enqueued" if claimed else "deduplicated", kind)
+        return bool(claimed)
+
+    async def clear_enqueue(self, kind: str, entity) -> None:
+        """Forget the queued marker of an entity (called when its job starts)."""
+        try:
+            await self.client_factory().delete(self._key("queued", kind, entity))
+        except RedisError:
+            pass
+
+    async def get_stats(self) -> Dict:
+        """Contention counters of this process and of every process."""
+        try:
+            shared = await self.client_factory().hgetall(STATS_KEY)
+            shared = {
+                (key.decode() if isinstance(key, bytes) else key): int(value)
+                for key, value in shared.items()
+            }
+        except RedisError:
+            shared = None
+        return {
+            "process": lock_counters.snapshot(),
+            "shared": shared,
+            "contention_ratio": round(lock_counters.ratio("contended", "attempts"), 4),
+        }
+
+
+entity_locks = EntityLocks()
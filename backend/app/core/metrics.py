@@ -0,0 +1,73 @@
+"""
+In-process counters for hit rates and cache ratios.
+
+Counters are per process (API worker or Celery worker) and reset on restart;
+they are meant for quick ratios exposed on stats endpoints and in logs, not as
+a replacement for a metrics backend.
+"""
+from collections import Counter
+from typing import Dict, Iterable, Optional
+import threading
+
+
+class CounterSet:
+    """Named counters of one subsystem (thread-safe)"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._counts: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def increment(self, key: str, amount: int = 1) -> None:
+        """Add `amount` to a counter."""
+        with self._lock:
+            self._counts[key] += amount
+
+    def get(self, key: str) -> int:
+        """Current value of a counter."""
+        with self._lock:
+            return self._counts[key]
+
+    def snapshot(self) -> Dict[str, int]:
+        """Copy of every counter."""
+        with self._lock:
+            return dict(self._counts)
+
+    def ratio(self, key: str, total_key: str) -> float:
+        """`key` over `total_key` (0.0 when nothing was counted)."""
+        with self._lock:
+            total = self._counts[total_key]
+            return self._counts[key] / total if total else 0.0
+
+    def rates(self, keys: Iterable[str], total_key: str) -> Dict[str, float]:
+        """Ratio of each key over `total_key`."""
+        return {key: round(self.ratio(key, total_key), 4) for key in keys}
+
+    def reset(self) -> None:
+        """Clear every counter."""
+        with self._lock:
+            self._counts.clear()
+
+
+_registry: Dict[str, CounterSet] = {}
+_registry_lock = threading.Lock()
+
+
+def get_counters(name: str) -> CounterSet:
+    """Get (or create) the counter set of a subsystem."""
+    with _registry_lock:
+        counters = _registry.get(name)
+        if counters is None:
+            counters = _registry[name] = CounterSet(name)
+        return counters
+
+
+def snapshot_all(prefix: Optional[str] = None) -> Dict[str, Dict[str, int]]:
+    """Snapshot of every counter set, optionally filtered by name prefix."""
+    with _registry_lock:
+        sets = list(_registry.values())
+    return {
+        counters.name: counters.snapshot()
+        for counters in sets
+        if prefix is None or counters.name.startswith(prefix)
+    }
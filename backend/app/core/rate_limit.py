@@ -0,0 +1,55 @@
+"""
+Asyncio rate limiting helpers for outbound API clients.
+"""
+import asyncio
+import time
+
+
+class TokenBucket:
+    """
+    Token bucket for one event loop.
+
+    Refills `rate` tokens per second up to `capacity`; `acquire` waits until
+    enough tokens are available. A rate of 0 disables limiting.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = max(capacity, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, tokens: float = 1.0) -> float:
+        """
+        Take `tokens` from the bucket, waiting for the refill if needed.
+
+        Returns:
+            Seconds spent waiting
+        """
+        if self.rate <= 0:
+            return 0.0
+
+        waited = 0.0
+        # The lock keeps waiters in FIFO order instead of racing on each refill
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+                delay = (tokens - self._tokens) / self.rate
+                await asyncio.sleep(delay)
+                waited += delay
+
+    def penalize(self, seconds: float) -> None:
+        """Empty the bucket for `seconds` (e.g. after an HTTP 429 Retry-After)."""
+        if self.rate <= 0:
+            return
+        self._refill()
+        self._tokens = min(self._tokens, 0.0) - seconds * self.rate
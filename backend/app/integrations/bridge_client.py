@@ -1,11 +1,15 @@
 """Bridge API client for bank data synchronization"""
 import httpx
-from typing import List, Dict, Optional
+from typing import AsyncIterator, List, Dict, Optional
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from tenacity import retry, stop_after_attempt, wait_exponential
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential
+import asyncio
 import logging
+import weakref
 
 from app.config import settings
+from app.core.config import settings as app_settings
 
 logger = logging.getLogger(__name__)
 
@@ -15,6 +19,52 @@ class BridgeAPIError(Exception):
     pass
 
 
+# httpx pools are bound to the loop that first uses them: one per loop
+_loop_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _default_headers() -> Dict:
+    return {
+        "Bridge-Version": "2021-06-01",
+        "Client-Id": settings.BRIDGE_CLIENT_ID,
+        "Client-Secret": settings.BRIDGE_CLIENT_SECRET,
+    }
+
+
+def get_shared_http_client() -> httpx.AsyncClient:
+    """Pooled Bridge HTTP client of the running event loop (created on first use)."""
+    loop = asyncio.get_running_loop()
+    client = _loop_clients.get(loop)
+    if client is None or client.is_closed:
+        client = _loop_clients[loop] = httpx.AsyncClient(
+            timeout=30.0,
+            headers=_default_headers(),
+            limits=httpx.Limits(
+                max_connections=settings.BRIDGE_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.BRIDGE_MAX_CONNECTIONS
+            )
+        )
+    return client
+
+
+async def close_shared_clients() -> None:
+    """Close the pooled HTTP client of the running event loop (shutdown hook)."""
+    client = _loop_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+@dataclass
+class TransactionPage:
+    """One page of Bridge transactions"""
+    transactions: List[Dict]
+    next_uri: Optional[str]
+    etag: Optional[str] = None
+    not_modified: bool = False
+
+
 class BridgeClient:
     """
     Client for Bridge API (banking aggregation)
@@ -22,26 +72,44 @@ class BridgeClient:
     Doc: https://docs.bridgeapi.io/
     """
     
-    BASE_URL = "https://api.bridgeapi.io/v2"
+    API_ORIGIN = "https://api.bridgeapi.io"
+    BASE_URL = f"{API_ORIGIN}/v2"
     
     def __init__(self, api_key: str = None, client_id: str = None, client_secret: str = None):
-        """Initialize Bridge client"""
+        """
+        Initialize Bridge client.
+        
+        With the default credentials inside an event loop, the client reuses
+        the loop's pooled connections (one pool per worker process); custom
+        credentials get a dedicated HTTP client.
+        """
         self.api_key = api_key or settings.BRIDGE_API_KEY
         self.client_id = client_id or settings.BRIDGE_CLIENT_ID
         self.client_secret = client_secret or settings.BRIDGE_CLIENT_SECRET
         
-        self.client = httpx.AsyncClient(
-            timeout=30.0,
-            headers={
-                "Bridge-Version": "2021-06-01",
-                "Client-Id": self.client_id,
-                "Client-Secret": self.client_secret,
-            }
-        )
+        self._owns_client = True
+        if client_id is None and client_secret is None:
+            try:
+                self.client = get_shared_http_client()
+                self._owns_client = False
+            except RuntimeError:
+                # Built outside an event loop
+                pass
+        
+        if self._owns_client:
+            self.client = httpx.AsyncClient(
+                timeout=30.0,
+                headers={
+                    "Bridge-Version": "2021-06-01",
+                    "Client-Id": self.client_id,
+                    "Client-Secret": self.client_secret,
+                }
+            )
     
     async def close(self):
-        """Close HTTP client"""
-        await self.client.aclose()
+        """Close HTTP client (the shared pool stays open)"""
+        if self._owns_client:
+            await self.client.aclose()
     
     @retry(
         stop=stop_after_attempt(3),
@@ -107,61 +175,151 @@ class BridgeClient:
             logger.error(f"Bridge request error: {e}")
             raise BridgeAPIError(f"Bridge request error: {e}")
     
+    def transactions_uri(self, account_id: int) -> str:
+        """First-page URL of an account's transactions."""
+        return f"{self.BASE_URL}/accounts/{account_id}/transactions"
+    
     @retry(
         stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=2, max=10)
+        wait=wait_exponential(multiplier=1, min=2, max=10),
+        retry=retry_if_exception_type(BridgeAPIError)
     )
+    async def _get_page(
+        self,
+        url: str,
+        params: Optional[Dict] = None,
+        etag: Optional[str] = None
+    ) -> httpx.Response:
+        """Fetch one page of a paginated Bridge resource (304 if `etag` matches)."""
+        try:
+            headers = {"If-None-Match": etag} if etag else None
+            response = await self.client.get(url, params=params, headers=headers)
+            if response.status_code != 304:
+                response.raise_for_status()
+            return response
+            
+        except httpx.HTTPStatusError as e:
+            logger.error(f"Bridge get page failed: {e.response.text}")
+            raise BridgeAPIError(f"Failed to get transactions: {e}")
+        except httpx.RequestError as e:
+            logger.error(f"Bridge request error: {e}")
+            raise BridgeAPIError(f"Bridge request error: {e}")
+    
+    async def iter_transaction_pages(
+        self,
+        account_id: int,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        max_transactions: Optional[int] = None,
+        resume_uri: Optional[str] = None,
+        etag: Optional[str] = None
+    ) -> AsyncIterator[TransactionPage]:
+        """
+        Stream an account's transactions page by page, following Bridge's
+        pagination cursor.
+        
+        The next page is requested before the current one is yielded, so the
+        caller processes page N while page N+1 downloads. `max_transactions`
+        is a budget checked between pages: pages are never cut, and once the
+        budget is reached the last page's `next_uri` lets a later call resume.
+        
+        Args:
+            account_id: Bridge account ID
+            since: Start date (default: 90 days ago)
+            until: End date (default: today)
+            max_transactions: Budget (default: max_transactions_per_sync)
+            resume_uri: `next_uri` of a previous page to continue from
+            etag: ETag of a previous first page; if Bridge answers 304, a
+                single empty page with `not_modified` is yielded
+            
+        Yields:
+            TransactionPage (the first one carries the response ETag)
+        """
+        budget = max_transactions or app_settings.max_transactions_per_sync
+        
+        if resume_uri:
+            url = self._absolute_uri(resume_uri)
+            if not url.startswith(self.transactions_uri(account_id)):
+                raise BridgeAPIError(f"Resume URI does not belong to account {account_id}")
+            params = None
+        else:
+            if since is None:
+                since = datetime.utcnow() - timedelta(days=90)
+            if until is None:
+                until = datetime.utcnow()
+            url = self.transactions_uri(account_id)
+            params = {
+                "since": since.strftime("%Y-%m-%d"),
+                "until": until.strftime("%Y-%m-%d"),
+                "limit": min(settings.BRIDGE_PAGE_SIZE, budget)
+            }
+        
+        pending = asyncio.ensure_future(self._get_page(url, params, etag))
+        fetched = 0
+        first = True
+        try:
+            while pending is not None:
+                response = await pending
+                pending = None
+                
+                if response.status_code == 304:
+                    yield TransactionPage(transactions=[], next_uri=None, etag=etag, not_modified=True)
+                    return
+                
+                data = response.json()
+                page_etag = response.headers.get("ETag") if first else None
+                first = False
+                transactions = data.get("resources", [])
+                next_uri = (data.get("pagination") or {}).get("next_uri")
+                fetched += len(transactions)
+                
+                if next_uri and fetched < budget:
+                    pending = asyncio.ensure_future(
+                        self._get_page(self._absolute_uri(next_uri))
+                    )
+                elif next_uri:
+                    logger.info(
+                        f"Transaction budget of {budget} reached for account {account_id}, "
+                        f"remaining pages left for the next sync"
+                    )
+                
+                yield TransactionPage(transactions=transactions, next_uri=next_uri, etag=page_etag)
+        finally:
+            if pending is not None:
+                pending.cancel()
+    
     async def get_transactions(
         self,
         account_id: int,
         since: Optional[datetime] = None,
         until: Optional[datetime] = None,
-        limit: int = 500
+        limit: Optional[int] = None
     ) -> List[Dict]:
         """
-        Get transactions for a bank account.
+        Get transactions for a bank account (every page, up to the budget).
+        
+        Prefer `iter_transaction_pages` for large syncs: this holds every
+        page in memory.
         
         Args:
             account_id: Bridge account ID
             since: Start date (default: 90 days ago)
             until: End date (default: today)
-            limit: Max number of transactions (default: 500)
+            limit: Budget (default: max_transactions_per_sync)
             
         Returns:
             List of transactions
         """
-        if since is None:
-            since = datetime.utcnow() - timedelta(days=90)
-        
-        if until is None:
-            until = datetime.utcnow()
+        transactions = []
+        async for page in self.iter_transaction_pages(account_id, since, until, limit):
+            transactions.extend(page.transactions)
         
-        try:
-            response = await self.client.get(
-                f"{self.BASE_URL}/accounts/{account_id}/transactions",
-                params={
-                    "since": since.strftime("%Y-%m-%d"),
-                    "until": until.strftime("%Y-%m-%d"),
-                    "limit": limit
-                }
-            )
-            response.raise_for_status()
-            
-            data = response.json()
-            transactions = data.get("resources", [])
-            
-            logger.info(
-                f"Fetched {len(transactions)} transactions for account {account_id} "
-                f"from {since.date()} to {until.date()}"
-            )
-            return transactions
-            
-        except httpx.HTTPStatusError as e:
-            logger.error(f"Bridge get transactions failed: {e.response.text}")
-            raise BridgeAPIError(f"Failed to get transactions: {e}")
-        except httpx.RequestError as e:
-            logger.error(f"Bridge request error: {e}")
-            raise BridgeAPIError(f"Bridge request error: {e}")
+        logger.info(f"Fetched {len(transactions)} transactions for account {account_id}")
+        return transactions
+    
+    def _absolute_uri(self, uri: str) -> str:
+        # Bridge returns next_uri relative to the API origin ("/v2/...")
+        return uri if uri.startswith("http") else f"{self.API_ORIGIN}{uri}"
     
     @retry(
         stop=stop_after_attempt(3),
@@ -199,30 +357,34 @@ class BridgeClient:
             logger.error(f"Bridge request error: {e}")
             raise BridgeAPIError(f"Bridge request error: {e}")
     
-    async def sync_account_transactions(
+    def sync_account_transactions(
         self,
         account_id: int,
-        last_sync: Optional[datetime] = None
-    ) -> List[Dict]:
+        last_sync: Optional[datetime] = None,
+        resume_uri: Optional[str] = None,
+        etag: Optional[str] = None
+    ) -> AsyncIterator[TransactionPage]:
         """
-        Sync transactions since last sync.
+        Stream transaction pages since last sync.
         
         Args:
             account_id: Bridge account ID
             last_sync: Last sync datetime (default: 30 days ago)
+            resume_uri: Continue a sync that stopped at the budget
+            etag: ETag of the previous sync's first page
             
         Returns:
-            List of new transactions
+            Async iterator of TransactionPage
         """
         if last_sync is None:
             last_sync = datetime.utcnow() - timedelta(days=30)
         
-        transactions = await self.get_transactions(
+        return self.iter_transaction_pages(
             account_id=account_id,
-            since=last_sync
+            since=last_sync,
+            resume_uri=resume_uri,
+            etag=etag
         )
-        
-        return transactions
     
     def format_transaction(self, raw_transaction: Dict) -> Dict:
         """
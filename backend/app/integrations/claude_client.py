@@ -1,20 +1,85 @@
 """Claude AI client for transaction categorization and reconciliation"""
 import anthropic
+import httpx
 from typing import List, Dict, Optional, Tuple
 from decimal import Decimal
+import asyncio
 import json
 import logging
+import weakref
 
 from app.config import settings
+from app.core.rate_limit import TokenBucket
 
 logger = logging.getLogger(__name__)
 
+# Transaction categories accepted from the model
+CATEGORIES = (
+    "salaire_employe",
+    "loyer_bureau",
+    "fournitures_bureau",
+    "services_professionnels",
+    "publicite_marketing",
+    "frais_bancaires",
+    "assurance",
+    "impots_taxes",
+    "achat_materiel",
+    "frais_deplacement",
+    "telecommunications",
+    "electricite_eau",
+    "vente_client",
+    "remboursement",
+    "autre",
+)
+
+CATEGORIES_TEXT = "\n".join(f"- {category}" for category in CATEGORIES)
+
 
 class ClaudeAIError(Exception):
     """Claude AI error"""
     pass
 
 
+class _LoopResources:
+    """Connection pool and limiters shared by every ClaudeClient of one event loop"""
+    
+    def __init__(self):
+        self.http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.CLAUDE_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.CLAUDE_MAX_CONNECTIONS
+            ),
+            timeout=settings.CLAUDE_TIMEOUT_SECONDS
+        )
+        self.semaphore = asyncio.Semaphore(settings.CLAUDE_MAX_CONCURRENCY)
+        self.rate_limiter = TokenBucket(
+            rate=settings.CLAUDE_REQUESTS_PER_MINUTE / 60,
+            capacity=settings.CLAUDE_MAX_CONCURRENCY
+        )
+
+
+# httpx pools and asyncio primitives are bound to the loop that first uses them
+_loop_resources: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _LoopResources]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_loop_resources() -> _LoopResources:
+    """Shared Claude resources of the running event loop (created on first use)."""
+    loop = asyncio.get_running_loop()
+    resources = _loop_resources.get(loop)
+    if resources is None:
+        resources = _loop_resources[loop] = _LoopResources()
+    return resources
+
+
+async def close_shared_clients() -> None:
+    """Close the pooled HTTP client of the running event loop (shutdown hook)."""
+    resources = _loop_resources.pop(asyncio.get_running_loop(), None)
+    if resources is not None:
+        await resources.http_client.aclose()
+
+
 class ClaudeClient:
     """
     Client for Claude AI (Anthropic)
@@ -26,11 +91,33 @@ class ClaudeClient:
     """
     
     def __init__(self, api_key: str = None):
-        """Initialize Claude client"""
+        """
+        Initialize Claude client.
+        
+        Inside an event loop the client reuses the loop's shared connection
+        pool; every call goes through the loop's concurrency semaphore
+        (CLAUDE_MAX_CONCURRENCY) and token bucket (CLAUDE_REQUESTS_PER_MINUTE).
+        """
         self.api_key = api_key or settings.CLAUDE_API_KEY
-        self.client = anthropic.Anthropic(api_key=self.api_key)
+        try:
+            http_client = get_loop_resources().http_client
+        except RuntimeError:
+            # Built outside an event loop: the SDK manages its own pool
+            http_client = None
+        self.client = anthropic.AsyncAnthropic(
+            api_key=self.api_key,
+            http_client=http_client,
+            timeout=settings.CLAUDE_TIMEOUT_SECONDS
+        )
         self.model = "claude-3-5-sonnet-20241022"
     
+    async def _create_message(self, **kwargs):
+        """Call the Messages API within the loop's concurrency and rate limits."""
+        resources = get_loop_resources()
+        async with resources.semaphore:
+            await resources.rate_limiter.acquire()
+            return await self.client.messages.create(model=self.model, **kwargs)
+    
     async def categorize_transaction(
         self,
         description: str,
@@ -51,21 +138,7 @@ class ClaudeClient:
         prompt = f"""You are a financial transaction categorization expert for French SMEs.
 
 Categorize this transaction into ONE of these categories:
-- salaire_employe
-- loyer_bureau
-- fournitures_bureau
-- services_professionnels
-- publicite_marketing
-- frais_bancaires
-- assurance
-- impots_taxes
-- achat_materiel
-- frais_deplacement
-- telecommunications
-- electricite_eau
-- vente_client
-- remboursement
-- autre
+{CATEGORIES_TEXT}
 
 Transaction:
 - Description: {description}
@@ -80,8 +153,7 @@ Respond ONLY with valid JSON (no markdown, no explanation):
 }}"""
         
         try:
-            response = self.client.messages.create(
-                model=self.model,
+            response = await self._create_message(
                 max_tokens=500,
                 temperature=0.3,
                 messages=[
@@ -166,8 +238,7 @@ Respond ONLY with valid JSON (no markdown):
 }}"""
         
         try:
-            response = self.client.messages.create(
-                model=self.model,
+            response = await self._create_message(
                 max_tokens=700,
                 temperature=0.2,
                 messages=[
@@ -263,8 +334,7 @@ Requirements:
 """
         
         try:
-            response = self.client.messages.create(
-                model=self.model,
+            response = await self._create_message(
                 max_tokens=1500,
                 temperature=0.7,
                 messages=[
@@ -296,30 +366,238 @@ Requirements:
             logger.error(f"Claude email generation error: {e}")
             raise ClaudeAIError(f"Email generation failed: {e}")
     
+    async def generate_reminder_template(
+        self,
+        reminder_type: str,
+        language: str = "fr"
+    ) -> Dict[str, str]:
+        """
+        Generate a reusable reminder email template using Claude.
+        
+        The template holds Jinja placeholders instead of invoice details, so
+        one generation serves every reminder of this type and language.
+        
+        Args:
+            reminder_type: first, second, final
+            language: Email language (fr, en, es, de, it, nl)
+            
+        Returns:
+            Dict with subject and body (HTML) Jinja templates
+        """
+        tone_map = {
+            "first": "professional and courteous",
+            "second": "firmer but still polite",
+            "final": "formal and urgent"
+        }
+        
+        tone = tone_map.get(reminder_type, "professional")
+        
+        prompt = f"""You are an expert in writing professional payment reminder emails for French SMEs.
+
+Write a {tone} payment reminder email template in {language.upper()}.
+This is the {reminder_type} reminder.
+
+Use these Jinja placeholders instead of actual values, and no others:
+- {{{{ invoice_number }}}}
+- {{{{ client_name }}}}
+- {{{{ total_amount }}}} {{{{ currency }}}}
+- {{{{ due_date }}}}
+- {{{{ days_overdue }}}}
+
+Respond with valid JSON (no markdown):
+{{
+  "subject": "Email subject template",
+  "body_html": "<html>Email body template with proper HTML formatting</html>"
+}}
+
+Requirements:
+- Professional tone
+- Clear call to action
+- Payment instructions
+- Proper HTML structure
+"""
+        
+        try:
+            response = await self._create_message(
+                max_tokens=1500,
+                temperature=0.7,
+                messages=[
+                    {"role": "user", "content": prompt}
+                ]
+            )
+            
+            content = response.content[0].text.strip()
+            # Tolerate a markdown fence around the object
+            if content.startswith("```"):
+                content = content.strip("`")
+                content = content[content.find("{"):]
+            result = json.loads(content)
+            
+            logger.info(f"Reminder template generated ({reminder_type}, {language})")
+            
+            return {
+                "subject": result.get("subject", ""),
+                "body": result.get("body_html", "")
+            }
+            
+        except json.JSONDecodeError:
+            logger.error(f"Failed to parse Claude response: {content}")
+            return {"subject": "", "body": ""}
+        except Exception as e:
+            logger.error(f"Claude template generation error: {e}")
+            raise ClaudeAIError(f"Template generation failed: {e}")
+    
     async def categorize_transactions_batch(
         self,
-        transactions: List[Dict]
+        transactions: List[Dict],
+        batch_size: int = None
     ) -> List[Tuple[str, Decimal]]:
         """
-        Categorize multiple transactions in one call (more efficient).
+        Categorize multiple transactions with one prompt per chunk.
+        
+        Each chunk of `batch_size` transactions is sent as a numbered list and
+        answered with a JSON array; chunks are sent concurrently. Items missing
+        from the answer, or with an unknown category, are retried one by one
+        with categorize_transaction.
         
         Args:
-            transactions: List of transactions
+            transactions: List of transactions (description, amount, transaction_type)
+            batch_size: Transactions per prompt (default CLAUDE_CATEGORIZATION_BATCH_SIZE)
             
         Returns:
-            List of (category, confidence) tuples
+            List of (category, confidence) tuples, in input order
         """
-        # For simplicity, call individual categorization
-        # In production, could batch in single prompt
-        results = []
-        for tx in transactions:
-            category, confidence = await self.categorize_transaction(
-                tx["description"],
-                Decimal(str(tx["amount"])),
-                tx.get("transaction_type", "debit")
+        batch_size = batch_size or settings.CLAUDE_CATEGORIZATION_BATCH_SIZE
+        chunks = [
+            transactions[start:start + batch_size]
+            for start in range(0, len(transactions), batch_size)
+        ]
+        
+        # Chunks run concurrently, bounded by the loop's semaphore
+        parsed_chunks = await asyncio.gather(
+            *(self._categorize_chunk(chunk) for chunk in chunks)
+        )
+        
+        results: List[Optional[Tuple[str, Decimal]]] = []
+        missing: List[int] = []
+        for chunk, parsed in zip(chunks, parsed_chunks):
+            for position in range(len(chunk)):
+                if position not in parsed:
+                    missing.append(len(results))
+                results.append(parsed.get(position))
+        
+        # Fallback for the entries the batch answers did not cover
+        fallbacks = await asyncio.gather(*(
+            self.categorize_transaction(
+                transactions[i]["description"],
+                Decimal(str(transactions[i]["amount"])),
+                transactions[i].get("transaction_type", "debit")
             )
-            results.append((category, confidence))
+            for i in missing
+        ))
+        for i, result in zip(missing, fallbacks):
+            results[i] = result
         
         return results
+    
+    async def _categorize_chunk(
+        self,
+        transactions: List[Dict]
+    ) -> Dict[int, Tuple[str, Decimal]]:
+        """
+        Categorize one chunk of transactions in a single API call.
+        
+        Returns:
+            Dict of position in chunk → (category, confidence) for valid items only
+        """
+        transactions_text = "\n".join([
+            f"{position}. {tx['description']} | "
+            f"{tx['amount']} EUR | "
+            f"{tx.get('transaction_type', 'debit')}"
+            for position, tx in enumerate(transactions)
+        ])
+        
+        prompt = f"""You are a financial transaction categorization expert for French SMEs.
+
+Categorize each of these {len(transactions)} transactions into ONE of these categories:
+{CATEGORIES_TEXT}
 
+Transactions (index. description | amount | type):
+{transactions_text}
 
+Respond ONLY with a valid JSON array (no markdown, no explanation), one object per transaction:
+[
+  {{"index": 0, "category": "category_name", "confidence": 0.95}}
+]"""
+        
+        try:
+            response = await self._create_message(
+                max_tokens=100 + 40 * len(transactions),
+                temperature=0.3,
+                messages=[
+                    {"role": "user", "content": prompt}
+                ]
+            )
+            
+            content = response.content[0].text.strip()
+            
+        except Exception as e:
+            logger.error(f"Claude batch categorization error: {e}")
+            raise ClaudeAIError(f"Batch categorization failed: {e}")
+        
+        parsed = self._parse_categorization_batch(content, len(transactions))
+        
+        logger.info(
+            f"Batch categorized {len(parsed)}/{len(transactions)} transactions in one call"
+        )
+        
+        return parsed
+    
+    @staticmethod
+    def _parse_categorization_batch(
+        content: str,
+        size: int
+    ) -> Dict[int, Tuple[str, Decimal]]:
+        """
+        Parse and validate a batch categorization answer.
+        
+        Invalid items (bad index, unknown category, bad confidence, duplicates)
+        are dropped so the caller can retry them individually.
+        """
+        # Tolerate a markdown fence around the array
+        if content.startswith("```"):
+            content = content.strip("`")
+            content = content[content.find("["):]
+        
+        try:
+            items = json.loads(content)
+        except json.JSONDecodeError:
+            logger.error(f"Failed to parse Claude batch response: {content[:200]}")
+            return {}
+        
+        if not isinstance(items, list):
+            logger.error("Claude batch response is not a JSON array")
+            return {}
+        
+        parsed: Dict[int, Tuple[str, Decimal]] = {}
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            
+            position = item.get("index")
+            category = item.get("category")
+            if not isinstance(position, int) or not 0 <= position < size or position in parsed:
+                continue
+            if category not in CATEGORIES:
+                continue
+            
+            try:
+                confidence = Decimal(str(item.get("confidence", 0.5)))
+            except ArithmeticError:
+                continue
+            if not Decimal("0") <= confidence <= Decimal("1"):
+                continue
+            
+            parsed[position] = (category, confidence)
+        
+        return parsed
@@ -1,19 +1,146 @@
-"""SendGrid client for email sending"""
-from typing import List, Dict, Optional
+"""
+SendGrid client for email sending
+
+Emails sharing a body are sent together: one v3 /mail/send call carries up
+to SENDGRID_MAX_PERSONALIZATIONS recipients, each with its own subject,
+custom args and substitutions (see SendQueue). Every call of an event loop
+goes through the loop's pooled HTTP client, concurrency cap and token
+bucket; an HTTP 429 pauses the whole loop for its Retry-After.
+"""
+from typing import List, Dict, Optional, Set, Tuple
+from dataclasses import dataclass
 import httpx
+import asyncio
 import logging
 import base64
+import time
+import weakref
 
 from app.config import settings
+from app.core.metrics import get_counters
+from app.core.rate_limit import TokenBucket
 
 logger = logging.getLogger(__name__)
 
+sendgrid_counters = get_counters("sendgrid")
+
+
+# httpx pools are bound to the loop that first uses them: one per loop
+_loop_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _default_headers(api_key: Optional[str]) -> Dict:
+    return {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json"
+    }
+
+
+def get_shared_http_client() -> httpx.AsyncClient:
+    """Pooled SendGrid HTTP client of the running event loop (created on first use)."""
+    loop = asyncio.get_running_loop()
+    client = _loop_clients.get(loop)
+    if client is None or client.is_closed:
+        client = _loop_clients[loop] = httpx.AsyncClient(
+            timeout=30.0,
+            headers=_default_headers(settings.SENDGRID_API_KEY)
+        )
+    return client
+
+
+async def close_shared_clients() -> None:
+    """Close the pooled HTTP client of the running event loop (shutdown hook)."""
+    client = _loop_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+class _SendLimits:
+    """Concurrency cap and rate limiter shared by every SendGridClient of one event loop"""
+    
+    def __init__(self):
+        self.semaphore = asyncio.Semaphore(settings.SENDGRID_MAX_CONCURRENCY)
+        self.rate_limiter = TokenBucket(
+            rate=settings.SENDGRID_REQUESTS_PER_SECOND,
+            capacity=settings.SENDGRID_MAX_CONCURRENCY
+        )
+
+
+_loop_limits: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _SendLimits]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_send_limits() -> _SendLimits:
+    """SendGrid limits of the running event loop (created on first use)."""
+    loop = asyncio.get_running_loop()
+    limits = _loop_limits.get(loop)
+    if limits is None:
+        limits = _loop_limits[loop] = _SendLimits()
+    return limits
+
+
+def _retry_delay(response: httpx.Response, attempt: int) -> float:
+    """Seconds to wait after a 429: Retry-After, X-RateLimit-Reset or exponential backoff"""
+    delay = None
+    retry_after = response.headers.get("Retry-After")
+    reset = response.headers.get("X-RateLimit-Reset")
+    try:
+        if retry_after is not None:
+            delay = float(retry_after)
+        elif reset is not None:
+            delay = float(reset) - time.time()
+    except ValueError:
+        pass
+    if delay is None:
+        delay = settings.SENDGRID_BACKOFF_SECONDS * (2 ** attempt)
+    return min(max(delay, 0.0), settings.SENDGRID_MAX_BACKOFF_SECONDS)
+
 
 class SendGridError(Exception):
     """SendGrid error"""
     pass
 
 
+@dataclass
+class EmailMessage:
+    """
+    One email of a batch.
+    
+    `html_content` may contain substitution tags (keys of `substitutions`)
+    replaced per recipient by SendGrid: messages with the same sender and
+    content are sent in one /mail/send call.
+    """
+    to_email: str
+    subject: str
+    html_content: str
+    to_name: str = ""
+    custom_args: Optional[Dict[str, str]] = None
+    substitutions: Optional[Dict[str, str]] = None
+    from_email: str = "noreply@financeai.com"
+    from_name: str = "FinanceAI"
+    reply_to: Optional[str] = None
+    
+    @property
+    def batch_key(self) -> Tuple:
+        """Messages with the same key can share one /mail/send call"""
+        return (self.from_email, self.from_name, self.reply_to, self.html_content)
+    
+    def personalization(self) -> Dict:
+        """The per-recipient part of the request"""
+        personalization = {
+            "to": [{"email": self.to_email, "name": self.to_name}],
+            "subject": self.subject,
+        }
+        if self.custom_args:
+            personalization["custom_args"] = self.custom_args
+        if self.substitutions:
+            personalization["substitutions"] = self.substitutions
+        return personalization
+
+
 class SendGridClient:
     """
     Client for SendGrid (email delivery)
@@ -21,23 +148,74 @@ class SendGridClient:
     Doc: https://docs.sendgrid.com/api-reference
     """
     
-    BASE_URL = "https://api.sendgrid.com/v3"
-    
     def __init__(self, api_key: str = None):
-        """Initialize SendGrid client"""
+        """
+        Initialize SendGrid client.
+        
+        With the default API key inside an event loop, the client reuses the
+        loop's pooled connections; a custom key gets a dedicated HTTP client.
+        """
         self.api_key = api_key or settings.SENDGRID_API_KEY
+        self.base_url = settings.SENDGRID_BASE_URL
         
-        self.client = httpx.AsyncClient(
-            timeout=30.0,
-            headers={
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json"
-            }
-        )
+        self._owns_client = True
+        if api_key is None:
+            try:
+                self.client = get_shared_http_client()
+                self._owns_client = False
+            except RuntimeError:
+                # Built outside an event loop
+                pass
+        
+        if self._owns_client:
+            self.client = httpx.AsyncClient(
+                timeout=30.0,
+                headers=_default_headers(self.api_key)
+            )
     
     async def close(self):
-        """Close HTTP client"""
-        await self.client.aclose()
+        """Close HTTP client (the shared pool stays open)"""
+        if self._owns_client:
+            await self.client.aclose()
+    
+    async def _post_mail(self, payload: Dict) -> httpx.Response:
+        """
+        POST to /mail/send within the loop's concurrency and rate limits.
+        
+        A 429 pauses every sender of the loop (the token bucket is emptied
+        for the Retry-After delay) and the request is retried up to
+        SENDGRID_MAX_RETRIES times.
+        
+        Raises:
+            httpx.HTTPStatusError: Other error status
+            httpx.RequestError: Network error
+            SendGridError: Still rate limited after the retries
+        """
+        limits = get_send_limits()
+        for attempt in range(settings.SENDGRID_MAX_RETRIES + 1):
+            async with limits.semaphore:
+                await limits.rate_limiter.acquire()
+                response = await self.client.post(
+                    f"{self.base_url}/mail/send",
+                    json=payload
+                )
+                sendgrid_counters.increment("requests")
+            
+            if response.status_code != 429:
+                response.raise_for_status()
+                return response
+            
+            sendgrid_counters.increment("throttled")
+            if attempt == settings.SENDGRID_MAX_RETRIES:
+                break
+            delay = _retry_delay(response, attempt)
+            logger.warning(f"SendGrid rate limited, retrying in {delay:.1f}s")
+            limits.rate_limiter.penalize(delay)
+            await asyncio.sleep(delay)
+        
+        raise SendGridError(
+            f"SendGrid rate limit: gave up after {settings.SENDGRID_MAX_RETRIES + 1} attempts"
+        )
     
     async def send_email(
         self,
@@ -93,11 +271,7 @@ class SendGridClient:
             payload["custom_args"] = custom_args
         
         try:
-            response = await self.client.post(
-                f"{self.BASE_URL}/mail/send",
-                json=payload
-            )
-            response.raise_for_status()
+            response = await self._post_mail(payload)
             
             # SendGrid returns message ID in X-Message-Id header
             message_id = response.headers.get("X-Message-Id", "unknown")
@@ -167,7 +341,7 @@ class SendGridClient:
         """
         try:
             response = await self.client.get(
-                f"{self.BASE_URL}/messages/{message_id}"
+                f"{self.base_url}/messages/{message_id}"
             )
             response.raise_for_status()
             
@@ -187,6 +361,74 @@ class SendGridClient:
             logger.error(f"SendGrid request error: {e}")
             return {"status": "unknown", "opens": 0, "clicks": 0}
     
+    async def send_batch(
+        self,
+        messages: List[EmailMessage]
+    ) -> List[Optional[str]]:
+        """
+        Send emails, grouping those sharing a body into one request.
+        
+        Each group is split into requests of at most
+        SENDGRID_MAX_PERSONALIZATIONS recipients, sent concurrently (within
+        the loop's limits). A failed request fails only its own recipients.
+        
+        Args:
+            messages: Emails to send
+            
+        Returns:
+            Message ID of the request that carried each email (None if it failed)
+        """
+        groups: Dict[Tuple, List[int]] = {}
+        for index, message in enumerate(messages):
+            groups.setdefault(message.batch_key, []).append(index)
+        
+        size = settings.SENDGRID_MAX_PERSONALIZATIONS
+        chunks = [
+            indices[start:start + size]
+            for indices in groups.values()
+            for start in range(0, len(indices), size)
+        ]
+        message_ids: List[Optional[str]] = [None] * len(messages)
+        
+        async def send_chunk(indices: List[int]) -> None:
+            first = messages[indices[0]]
+            payload = {
+                "personalizations": [messages[i].personalization() for i in indices],
+                "from": {"email": first.from_email, "name": first.from_name},
+                "content": [
+                    {
+                        "type": "text/html",
+                        "value": first.html_content
+                    }
+                ],
+                "tracking_settings": {
+                    "click_tracking": {"enable": True},
+                    "open_tracking": {"enable": True}
+                }
+            }
+            if first.reply_to:
+                payload["reply_to"] = {"email": first.reply_to}
+            
+            try:
+                response = await self._post_mail(payload)
+            except httpx.HTTPStatusError as e:
+                logger.error(f"SendGrid batch of {len(indices)} failed: {e.response.text}")
+                sendgrid_counters.increment("failed", len(indices))
+                return
+            except (httpx.RequestError, SendGridError) as e:
+                logger.error(f"SendGrid batch of {len(indices)} failed: {e}")
+                sendgrid_counters.increment("failed", len(indices))
+                return
+            
+            message_id = response.headers.get("X-Message-Id", "unknown")
+            for i in indices:
+                message_ids[i] = message_id
+            sendgrid_counters.increment("sent", len(indices))
+            logger.info(f"Batch of {len(indices)} emails sent (message_id: {message_id})")
+        
+        await asyncio.gather(*(send_chunk(indices) for indices in chunks))
+        return message_ids
+    
     async def send_bulk_emails(
         self,
         emails: List[Dict]
@@ -196,27 +438,22 @@ class SendGridClient:
         
         Args:
             emails: List of email dicts with to_email, subject, html_content
+                (optional to_name, custom_args, substitutions)
             
         Returns:
-            List of message IDs
+            List of message IDs (None for the emails that failed)
         """
-        message_ids = []
-        
-        for email in emails:
-            try:
-                message_id = await self.send_email(
-                    to_email=email["to_email"],
-                    to_name=email.get("to_name", ""),
-                    subject=email["subject"],
-                    html_content=email["html_content"],
-                    custom_args=email.get("custom_args")
-                )
-                message_ids.append(message_id)
-            except SendGridError as e:
-                logger.error(f"Failed to send email to {email['to_email']}: {e}")
-                message_ids.append(None)
-        
-        return message_ids
+        return await self.send_batch([
+            EmailMessage(
+                to_email=email["to_email"],
+                to_name=email.get("to_name", ""),
+                subject=email["subject"],
+                html_content=email["html_content"],
+                custom_args=email.get("custom_args"),
+                substitutions=email.get("substitutions")
+            )
+            for email in emails
+        ])
     
     async def send_email_with_attachment(
         self,
@@ -273,11 +510,7 @@ class SendGridClient:
         }
         
         try:
-            response = await self.client.post(
-                f"{self.BASE_URL}/mail/send",
-                json=payload
-            )
-            response.raise_for_status()
+            response = await self._post_mail(payload)
             
             message_id = response.headers.get("X-Message-Id", "unknown")
             
@@ -296,3 +529,61 @@ class SendGridClient:
             raise SendGridError(f"SendGrid request error: {e}")
 
 
+class SendQueue:
+    """
+    Collects emails and sends those sharing a body together.
+    
+    `add` returns a future resolved with the email's message ID (None if
+    its request failed). A group is sent as soon as it holds
+    SENDGRID_MAX_PERSONALIZATIONS emails, the rest on `flush`.
+    
+    Usage:
+        async with SendQueue(client) as queue:
+            sent = queue.add(EmailMessage(...))
+        message_id = sent.result()
+    """
+    
+    def __init__(self, client: Optional[SendGridClient] = None):
+        self.client = client or SendGridClient()
+        self._groups: Dict[Tuple, List[Tuple[EmailMessage, asyncio.Future]]] = {}
+        self._tasks: Set[asyncio.Task] = set()
+    
+    def add(self, message: EmailMessage) -> asyncio.Future:
+        """Queue an email; its group is sent once full."""
+        future = asyncio.get_running_loop().create_future()
+        group = self._groups.setdefault(message.batch_key, [])
+        group.append((message, future))
+        if len(group) >= settings.SENDGRID_MAX_PERSONALIZATIONS:
+            self._dispatch(self._groups.pop(message.batch_key))
+        return future
+    
+    def _dispatch(self, items: List[Tuple[EmailMessage, asyncio.Future]]) -> None:
+        task = asyncio.create_task(self._send(items))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+    
+    async def _send(self, items: List[Tuple[EmailMessage, asyncio.Future]]) -> None:
+        try:
+            message_ids = await self.client.send_batch([message for message, _ in items])
+        except Exception as e:
+            logger.error(f"SendGrid batch of {len(items)} failed: {e}")
+            for _, future in items:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), message_id in zip(items, message_ids):
+            if not future.done():
+                future.set_result(message_id)
+    
+    async def flush(self) -> None:
+        """Send every queued email and wait for all the requests in flight."""
+        for key in list(self._groups):
+            self._dispatch(self._groups.pop(key))
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks))
+    
+    async def __aenter__(self) -> "SendQueue":
+        return self
+    
+    async def __aexit__(self, *exc_info) -> None:
+        await self.flush()
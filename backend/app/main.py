@@ -4,7 +4,7 @@ from fastapi.middleware.cors import CORSMiddleware
 from app.config import settings
 
 # Import routers
-from app.api.v1 import auth, banks, transactions, invoices, reconciliations, categorization, reminders
+from app.api.v1 import auth, banks, transactions, invoices, reconciliations, categorization, reminders, webhooks
 
 app = FastAPI(
     title=settings.APP_NAME,
@@ -52,6 +52,7 @@ app.include_router(invoices.router, prefix=API_V1_PREFIX, tags=["Invoices"])
 app.include_router(reconciliations.router, prefix=API_V1_PREFIX, tags=["Reconciliations"])
 app.include_router(categorization.router, prefix=API_V1_PREFIX, tags=["Categorization"])
 app.include_router(reminders.router, prefix=API_V1_PREFIX, tags=["Reminders"])
+app.include_router(webhooks.router, prefix=API_V1_PREFIX, tags=["Webhooks"])
 
 
 @app.on_event("startup")
@@ -60,9 +61,26 @@ async def startup_event():
     print("🚀 FinanceAI API starting...")
     print(f"📚 API Documentation: http://localhost:8000/docs")
     print(f"🔧 Environment: {settings.APP_ENV}")
+    
+    if settings.PDF_POOL_WARM_ON_STARTUP:
+        from app.services.pdf_render_pool import pdf_render_pool
+        
+        try:
+            await pdf_render_pool.warm()
+        except Exception as e:
+            print(f"⚠️ PDF render pool warm-up failed: {e}")
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Run on application shutdown"""
+    from app.core import locks
+    from app.integrations import bridge_client, claude_client, sendgrid_client
+    from app.services.pdf_render_pool import pdf_render_pool
+    
+    await claude_client.close_shared_clients()
+    await bridge_client.close_shared_clients()
+    await sendgrid_client.close_shared_clients()
+    await locks.close_shared_clients()
+    await pdf_render_pool.close()
     print("👋 FinanceAI API shutting down...")
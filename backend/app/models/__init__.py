@@ -7,6 +7,10 @@ from app.models.invoice import Invoice
 from app.models.reconciliation import Reconciliation
 from app.models.reminder import Reminder
 from app.models.audit_log import AuditLog
+from app.models.category_memo import CategoryMemo
+from app.models.bank_sync_cursor import BankSyncCursor
+from app.models.outbox_event import OutboxEvent
+from app.models.reminder_template import ReminderTemplate
 
 __all__ = [
     "User",
@@ -17,4 +21,8 @@ __all__ = [
     "Reconciliation",
     "Reminder",
     "AuditLog",
+    "CategoryMemo",
+    "BankSyncCursor",
+    "OutboxEvent",
+    "ReminderTemplate",
 ]
@@ -24,6 +24,7 @@ class BankAccount(Base):
     currency = Column(String(3), nullable=False, default="EUR")
     is_active = Column(Boolean, default=True)
     last_sync_at = Column(DateTime(timezone=True), nullable=True)
+    sync_requested_at = Column(DateTime(timezone=True), nullable=True)  # Sync queued by a Bridge webhook
     created_at = Column(DateTime(timezone=True), default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime(timezone=True), default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
     deleted_at = Column(DateTime(timezone=True), nullable=True)
@@ -0,0 +1,24 @@
+"""Bank sync cursor model: incremental Bridge sync watermark per account"""
+from sqlalchemy import Column, String, DateTime, Text, ForeignKey
+from sqlalchemy.dialects.postgresql import UUID
+from app.core.database import Base
+import uuid
+from datetime import datetime
+
+
+class BankSyncCursor(Base):
+    """Where the last Bridge sync of a bank account stopped"""
+    __tablename__ = "bank_sync_cursors"
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    bank_account_id = Column(UUID(as_uuid=True), ForeignKey("bank_accounts.id", ondelete="CASCADE"), unique=True, nullable=False, index=True)
+    last_transaction_id = Column(String(255), nullable=True)  # Bridge id of the newest synced transaction
+    last_transaction_date = Column(DateTime(timezone=True), nullable=True)
+    etag = Column(String(255), nullable=True)
+    resume_uri = Column(Text, nullable=True)  # Next Bridge page when the sync budget was reached
+    last_synced_at = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime(timezone=True), default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    
+    def __repr__(self):
+        return f"<BankSyncCursor {self.bank_account_id} @ {self.last_transaction_date}>"
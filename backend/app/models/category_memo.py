@@ -0,0 +1,30 @@
+"""Category memo model: remembered category per normalized description"""
+from sqlalchemy import Column, String, DateTime, Numeric, Integer, ForeignKey, UniqueConstraint
+from sqlalchemy.dialects.postgresql import UUID
+from app.core.database import Base
+import uuid
+from datetime import datetime
+
+
+class CategoryMemo(Base):
+    """Category remembered for a transaction description fingerprint"""
+    __tablename__ = "category_memos"
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    fingerprint = Column(String(255), nullable=False)
+    category = Column(String(100), nullable=False)
+    confidence = Column(Numeric(3, 2), nullable=False)
+    source = Column(String(20), nullable=False, default="ai")  # ai, manual
+    hit_count = Column(Integer, nullable=False, default=0)
+    last_used_at = Column(DateTime(timezone=True), default=datetime.utcnow, nullable=False, index=True)
+    created_at = Column(DateTime(timezone=True), default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime(timezone=True), default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    
+    # Constraints
+    __table_args__ = (
+        UniqueConstraint('user_id', 'fingerprint', name='uq_category_memos_user_fingerprint'),
+    )
+    
+    def __repr__(self):
+        return f"<CategoryMemo '{self.fingerprint}' → {self.category} ({self.source})>"
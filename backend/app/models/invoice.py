@@ -33,7 +33,7 @@ class Invoice(Base):
     deleted_at = Column(DateTime(timezone=True), nullable=True)
     
     # Relationships
-    reconciliation = relationship("Reconciliation", back_populates="invoice", uselist=False)
+    reconciliations = relationship("Reconciliation", back_populates="invoice")
     reminders = relationship("Reminder", back_populates="invoice", cascade="all, delete-orphan")
     
     # Constraints
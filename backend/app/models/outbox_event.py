@@ -0,0 +1,33 @@
+"""Outbox event model: follow-up work recorded with the change that causes it"""
+from sqlalchemy import Column, String, DateTime, Integer, Text, JSON, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import UUID
+from app.core.database import Base
+import uuid
+from datetime import datetime
+
+
+class OutboxEvent(Base):
+    """Domain event waiting to be published to Celery by the outbox relay"""
+    __tablename__ = "outbox_events"
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    event_type = Column(String(100), nullable=False)  # transactions.created, ...
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=True, index=True)
+    payload = Column(JSON, nullable=False)
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), default=datetime.utcnow, nullable=False)
+    published_at = Column(DateTime(timezone=True), nullable=True, index=True)
+    
+    # Constraints
+    __table_args__ = (
+        # The relay only ever scans unpublished rows, oldest first
+        Index(
+            'ix_outbox_events_pending',
+            'created_at',
+            postgresql_where=published_at.is_(None)
+        ),
+    )
+    
+    def __repr__(self):
+        return f"<OutboxEvent {self.event_type} {'published' if self.published_at else 'pending'}>"
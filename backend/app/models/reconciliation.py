@@ -12,7 +12,7 @@ class Reconciliation(Base):
     __tablename__ = "reconciliations"
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    transaction_id = Column(UUID(as_uuid=True), ForeignKey("transactions.id", ondelete="CASCADE"), nullable=False, unique=True, index=True)
+    transaction_id = Column(UUID(as_uuid=True), ForeignKey("transactions.id", ondelete="CASCADE"), nullable=False, index=True)
     invoice_id = Column(UUID(as_uuid=True), ForeignKey("invoices.id", ondelete="CASCADE"), nullable=False, index=True)
     confidence_score = Column(Numeric(5, 2), nullable=False)
     match_type = Column(String(50), nullable=False)
@@ -20,12 +20,15 @@ class Reconciliation(Base):
     validated_by = Column(UUID(as_uuid=True), nullable=True)
     validated_at = Column(DateTime(timezone=True), nullable=True)
     ai_reasoning = Column(Text, nullable=True)
+    # Split/partial payments: rows of one grouping share a group_id
+    group_id = Column(UUID(as_uuid=True), nullable=True, index=True)
+    allocated_amount = Column(Numeric(15, 2), nullable=True)
     created_at = Column(DateTime(timezone=True), default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime(timezone=True), default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
     
     # Relationships
-    transaction = relationship("Transaction", back_populates="reconciliation")
-    invoice = relationship("Invoice", back_populates="reconciliation")
+    transaction = relationship("Transaction", back_populates="reconciliations")
+    invoice = relationship("Invoice", back_populates="reconciliations")
     
     def __repr__(self):
         return f"<Reconciliation Transaction {self.transaction_id} <-> Invoice {self.invoice_id} ({self.confidence_score}%)>"
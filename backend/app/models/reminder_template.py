@@ -0,0 +1,30 @@
+"""Reminder template model: reminder email templates per tenant, language and type"""
+from sqlalchemy import Column, String, DateTime, Integer, Text, ForeignKey, UniqueConstraint
+from sqlalchemy.dialects.postgresql import UUID
+from app.core.database import Base
+import uuid
+from datetime import datetime
+
+
+class ReminderTemplate(Base):
+    """Jinja subject/body of a reminder, generated once by AI or edited by the tenant"""
+    __tablename__ = "reminder_templates"
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    language = Column(String(10), nullable=False)
+    reminder_type = Column(String(50), nullable=False)  # first, second, final
+    subject_template = Column(Text, nullable=False)
+    body_template = Column(Text, nullable=False)
+    source = Column(String(20), nullable=False, default="ai")  # ai, custom, fallback
+    version = Column(Integer, nullable=False, default=1)  # Bumped on every edit (cache invalidation)
+    created_at = Column(DateTime(timezone=True), default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime(timezone=True), default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    
+    # Constraints
+    __table_args__ = (
+        UniqueConstraint('user_id', 'language', 'reminder_type', name='uq_reminder_templates_user_language_type'),
+    )
+    
+    def __repr__(self):
+        return f"<ReminderTemplate {self.reminder_type}/{self.language} v{self.version} ({self.source})>"
@@ -19,6 +19,8 @@ class Transaction(Base):
     currency = Column(String(3), nullable=False, default="EUR")
     date = Column(DateTime(timezone=True), nullable=False, index=True)
     category = Column(String(100), nullable=True, index=True)
+    category_confidence = Column(Numeric(3, 2), nullable=True)
+    category_source = Column(String(20), nullable=True)  # ai, manual, memo, model
     is_recurring = Column(Boolean, default=False)
     is_reconciled = Column(Boolean, default=False, index=True)
     reconciled_invoice_id = Column(UUID(as_uuid=True), nullable=True, index=True)
@@ -29,7 +31,7 @@ class Transaction(Base):
     
     # Relationships
     bank_account = relationship("BankAccount", back_populates="transactions")
-    reconciliation = relationship("Reconciliation", back_populates="transaction", uselist=False)
+    reconciliations = relationship("Reconciliation", back_populates="transaction")
     
     # Constraints
     __table_args__ = (
@@ -3,7 +3,7 @@ from pydantic import BaseModel, Field, ConfigDict
 from uuid import UUID
 from datetime import datetime
 from decimal import Decimal
-from typing import Optional, TYPE_CHECKING
+from typing import List, Optional, TYPE_CHECKING
 
 if TYPE_CHECKING:
     from app.schemas.transaction import TransactionRead
@@ -15,7 +15,7 @@ class ReconciliationCreate(BaseModel):
     transaction_id: UUID
     invoice_id: UUID
     match_score: Decimal = Field(..., ge=0, le=1)
-    match_method: str = Field(..., pattern="^(exact|reference|fuzzy_ai|manual)$")
+    match_method: str = Field(..., pattern="^(exact|reference|split|partial|fuzzy|fuzzy_ai|manual)$")
     ai_reasoning: Optional[str] = Field(None, max_length=1000)
     validated_by: str = Field(..., pattern="^(ai|user)$")
     notes: Optional[str] = Field(None, max_length=500)
@@ -73,6 +73,9 @@ class ReconciliationSuggestion(BaseModel):
     transaction_amount: Decimal
     invoice_number: str
     invoice_amount: Decimal
+    # Split/partial payments: every transaction and invoice of the grouping
+    group_transaction_ids: List[UUID] = []
+    group_invoice_ids: List[UUID] = []
     
     model_config = ConfigDict(
         json_schema_extra={
@@ -96,3 +99,37 @@ class ReconciliationList(BaseModel):
     reconciliations: list[ReconciliationRead]
     total: int
 
+
+class ReconciliationBatchRequest(BaseModel):
+    """Schema for reconciling a batch of transactions in one pass"""
+    transaction_ids: Optional[List[UUID]] = None
+    since: Optional[datetime] = None
+    limit: Optional[int] = Field(None, ge=1)
+    cursor: Optional[str] = None
+
+
+class ReconciliationBatchResult(BaseModel):
+    """Schema for batch reconciliation stats"""
+    transactions: int
+    candidates: int
+    reconciled: int
+    conflicts: int
+    pairs: list[dict]
+    next_cursor: Optional[str] = None
+
+
+class ReconciliationGroupCreate(BaseModel):
+    """Schema for reconciling a split or partial payment"""
+    transaction_ids: List[UUID] = Field(..., min_length=1)
+    invoice_ids: List[UUID] = Field(..., min_length=1)
+    match_score: Decimal = Field(..., ge=0, le=1)
+    match_method: str = Field(..., pattern="^(split|partial|manual)$")
+    ai_reasoning: Optional[str] = Field(None, max_length=1000)
+
+
+class ReconciliationGroupResult(BaseModel):
+    """Schema for a reconciled split or partial payment"""
+    group_id: UUID
+    transaction_ids: List[UUID]
+    invoice_ids: List[UUID]
+    reconciliations: int
@@ -48,3 +48,32 @@ class ReminderList(BaseModel):
     total: int
 
 
+
+
+class ReminderTemplateUpdate(BaseModel):
+    """Schema for a tenant's own reminder template (Jinja)"""
+    subject: str = Field(..., min_length=1, max_length=255)
+    body: str = Field(..., min_length=1)
+    
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "subject": "Rappel : facture {{ invoice_number }}",
+                "body": "<p>Bonjour {{ client_name }},</p><p>La facture {{ invoice_number }} de {{ total_amount }} {{ currency }} est échue depuis le {{ due_date }}.</p>"
+            }
+        }
+    )
+
+
+class ReminderTemplateRead(BaseModel):
+    """Schema for reading a reminder template (response)"""
+    model_config = ConfigDict(from_attributes=True)
+    
+    id: UUID
+    language: str
+    reminder_type: str
+    subject_template: str
+    body_template: str
+    source: str
+    version: int
+    updated_at: datetime
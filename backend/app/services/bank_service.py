@@ -1,19 +1,30 @@
 """Bank Account service - Business logic"""
-from typing import Optional, List, Dict
+from typing import Callable, Optional, List, Dict
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_
-from uuid import UUID
-from datetime import datetime
+from sqlalchemy import select, and_, insert, update
+from uuid import UUID, uuid4
+from datetime import datetime, timedelta
+from decimal import Decimal
+import asyncio
+import json
 import logging
 
 from app.models.bank_account import BankAccount
+from app.models.bank_sync_cursor import BankSyncCursor
 from app.models.user import User
 from app.models.transaction import Transaction
 from app.schemas.bank import BankAccountCreate, BankAccountUpdate
 from app.integrations.bridge_client import BridgeClient, BridgeAPIError
+from app.services.bank_webhook_service import BankWebhookService
+from app.services.outbox_service import OutboxService
+from app.config import settings
+from app.core.locks import LockBusy, entity_locks
 
 logger = logging.getLogger(__name__)
 
+# Lock kind of a bank account being synced (see app.core.locks)
+SYNC_LOCK = "bank_account_sync"
+
 
 class BankService:
     """Bank account service"""
@@ -217,102 +228,382 @@ class BankService:
         logger.info(f"Bridge account created: {account.id} (Bridge ID: {bridge_account_id})")
         return account
     
+    @staticmethod
+    async def upsert_transactions(
+        db: AsyncSession,
+        account: BankAccount,
+        formatted_transactions: List[Dict]
+    ) -> Dict:
+        """
+        Insert new and update changed Bridge transactions in bulk.
+        
+        Existing Bridge ids are prefetched with one IN query per chunk of
+        SYNC_UPSERT_CHUNK_SIZE rows; new rows go in one multi-row INSERT
+        (ON CONFLICT DO NOTHING on PostgreSQL, so a concurrent sync of the same
+        account cannot fail the batch) and changed rows in one executemany
+        UPDATE. Only rows whose description or amount actually changed count
+        as updated.
+        
+        Args:
+            db: Database session
+            account: Bank account the transactions belong to
+            formatted_transactions: Output of BridgeClient.format_transaction
+            
+        Returns:
+            Dict with new_count, updated_count, unchanged_count and new_ids
+        """
+        # Last occurrence wins when Bridge repeats a transaction in a page
+        by_bridge_id = {
+            tx["bridge_transaction_id"]: tx for tx in formatted_transactions
+        }
+        items = list(by_bridge_id.values())
+        
+        new_ids: List[UUID] = []
+        updated_count = 0
+        unchanged_count = 0
+        chunk_size = settings.SYNC_UPSERT_CHUNK_SIZE
+        
+        for start in range(0, len(items), chunk_size):
+            chunk = items[start:start + chunk_size]
+            
+            result = await db.execute(
+                select(
+                    Transaction.id,
+                    Transaction.bank_account_id,
+                    Transaction.bridge_transaction_id,
+                    Transaction.description,
+                    Transaction.amount
+                ).where(
+                    Transaction.bridge_transaction_id.in_(
+                        [tx["bridge_transaction_id"] for tx in chunk]
+                    )
+                )
+            )
+            existing = {row.bridge_transaction_id: row for row in result}
+            
+            new_rows = []
+            changed_rows = []
+            for tx in chunk:
+                amount = Decimal(str(tx["amount"]))
+                row = existing.get(tx["bridge_transaction_id"])
+                if row is None:
+                    new_rows.append({
+                        "id": uuid4(),
+                        "bank_account_id": account.id,
+                        "bridge_transaction_id": tx["bridge_transaction_id"],
+                        "description": tx["description"],
+                        "amount": amount,
+                        "currency": tx["currency"],
+                        "date": tx["date"],
+                        "raw_data": json.dumps(tx["raw_data"], default=str),
+                    })
+                elif row.bank_account_id != account.id:
+                    logger.warning(
+                        f"Bridge transaction {tx['bridge_transaction_id']} already "
+                        f"belongs to account {row.bank_account_id}, skipped"
+                    )
+                elif row.description != tx["description"] or row.amount != amount:
+                    # Bridge corrections (cleaned description, final amount)
+                    changed_rows.append({
+                        "id": row.id,
+                        "description": tx["description"],
+                        "amount": amount,
+                    })
+                else:
+                    unchanged_count += 1
+            
+            if new_rows:
+                new_ids.extend(await BankService._insert_new_transactions(db, new_rows))
+            
+            if changed_rows:
+                await db.execute(update(Transaction), changed_rows)
+                updated_count += len(changed_rows)
+        
+        return {
+            "new_count": len(new_ids),
+            "updated_count": updated_count,
+            "unchanged_count": unchanged_count,
+            "new_ids": new_ids,
+        }
+    
+    @staticmethod
+    async def _insert_new_transactions(db: AsyncSession, rows: List[Dict]) -> List[UUID]:
+        """Multi-row INSERT returning the ids actually inserted."""
+        if db.get_bind().dialect.name == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as pg_insert
+            
+            stmt = (
+                pg_insert(Transaction)
+                .on_conflict_do_nothing(index_elements=["bridge_transaction_id"])
+                .returning(Transaction.id)
+            )
+            result = await db.execute(stmt, rows)
+            return list(result.scalars().all())
+        
+        await db.execute(insert(Transaction), rows)
+        return [row["id"] for row in rows]
+    
+    @staticmethod
+    async def get_sync_cursor(db: AsyncSession, account: BankAccount) -> BankSyncCursor:
+        """
+        Get the sync cursor of a bank account.
+        
+        A missing cursor is returned unsaved: the caller adds it to the session
+        once the sync succeeds, so no row is written while Bridge is queried.
+        """
+        result = await db.execute(
+            select(BankSyncCursor).where(BankSyncCursor.bank_account_id == account.id)
+        )
+        return result.scalar_one_or_none() or BankSyncCursor(bank_account_id=account.id)
+    
     @staticmethod
     async def sync_transactions(
         db: AsyncSession,
         account: BankAccount,
-        bridge_client: BridgeClient
+        bridge_client: BridgeClient,
+        resume_uri: Optional[str] = None
     ) -> Dict:
         """
-        Sync transactions from Bridge API for a bank account.
+        Incrementally sync transactions from Bridge API for a bank account.
+        
+        Shared by the sync endpoint and the Celery sync tasks. Only the delta
+        since the account's cursor (newest synced transaction date) is
+        requested, minus BRIDGE_SYNC_OVERLAP_DAYS to catch late-booked rows;
+        overlap rows already stored unchanged are dropped in memory before the
+        upsert. Pages are upserted as they arrive while the next one downloads.
+        
+        When the max_transactions_per_sync budget stops the sync early, the
+        next page is kept on the cursor and the next sync resumes from it; the
+        watermark only moves once a sync completes.
         
         Args:
             db: Database session
             account: Bank account to sync
             bridge_client: Bridge API client
+            resume_uri: Bridge page to continue from (default: the cursor's)
             
         Returns:
-            Dict with sync stats (new_count, updated_count)
+            Dict with sync stats (new_count, updated_count, new_ids, has_more)
         """
         if not account.bridge_account_id:
             raise ValueError("Account is not connected to Bridge API")
         
-        # Get transactions since last sync (or last 90 days)
-        last_sync = account.last_sync_at or (datetime.utcnow() - timedelta(days=90))
+        started_at = datetime.utcnow()
+        cursor = await BankService.get_sync_cursor(db, account)
+        resume_uri = resume_uri or cursor.resume_uri
+        
+        if cursor.last_transaction_date is not None:
+            since = cursor.last_transaction_date - timedelta(days=settings.BRIDGE_SYNC_OVERLAP_DAYS)
+        else:
+            since = started_at - timedelta(days=settings.BRIDGE_INITIAL_SYNC_DAYS)
+        
+        # Rows of the overlap window already stored, to skip them without a round trip
+        known = await BankService._known_transactions(db, account.id, since)
+        seen = set()
+        
+        stats = {"new_count": 0, "updated_count": 0, "unchanged_count": 0, "new_ids": []}
+        total = 0
+        next_uri = None
+        etag = None
+        not_modified = False
+        
+        # Balance downloads alongside the transaction pages
+        balance_task = asyncio.ensure_future(
+            bridge_client.get_account_balance(int(account.bridge_account_id))
+        )
         
         try:
-            # Fetch transactions from Bridge
-            raw_transactions = await bridge_client.sync_account_transactions(
+            # Stream pages from Bridge
+            pages = bridge_client.sync_account_transactions(
                 account_id=int(account.bridge_account_id),
-                last_sync=last_sync
+                last_sync=since,
+                resume_uri=resume_uri,
+                etag=None if resume_uri else cursor.etag
             )
-            
-            new_count = 0
-            updated_count = 0
-            
-            for raw_tx in raw_transactions:
-                # Format transaction
-                formatted_tx = bridge_client.format_transaction(raw_tx)
-                bridge_tx_id = formatted_tx["bridge_transaction_id"]
+            async for page in pages:
+                not_modified = page.not_modified
+                etag = etag or page.etag
+                total += len(page.transactions)
+                next_uri = page.next_uri
                 
-                # Check if transaction already exists
-                result = await db.execute(
-                    select(Transaction).where(
-                        and_(
-                            Transaction.bank_account_id == account.id,
-                            Transaction.bridge_transaction_id == bridge_tx_id
-                        )
-                    )
-                )
-                existing_tx = result.scalar_one_or_none()
+                fresh = []
+                for raw_tx in page.transactions:
+                    formatted = bridge_client.format_transaction(raw_tx)
+                    bridge_id = formatted["bridge_transaction_id"]
+                    if bridge_id in seen:
+                        continue
+                    seen.add(bridge_id)
+                    if known.get(bridge_id) == (
+                        formatted["description"], Decimal(str(formatted["amount"]))
+                    ):
+                        stats["unchanged_count"] += 1
+                        continue
+                    fresh.append(formatted)
                 
-                if existing_tx:
-                    # Update existing transaction (in case of correction)
-                    existing_tx.description = formatted_tx["description"]
-                    existing_tx.amount = formatted_tx["amount"]
-                    updated_count += 1
-                else:
-                    # Create new transaction
-                    transaction = Transaction(
-                        user_id=account.user_id,
-                        bank_account_id=account.id,
-                        bridge_transaction_id=bridge_tx_id,
-                        description=formatted_tx["description"],
-                        amount=formatted_tx["amount"],
-                        currency=formatted_tx["currency"],
-                        date=formatted_tx["date"],
-                        transaction_type=formatted_tx["transaction_type"],
-                        raw_data=formatted_tx["raw_data"],
-                    )
-                    db.add(transaction)
-                    new_count += 1
+                page_stats = await BankService.upsert_transactions(db, account, fresh)
+                for key in ("new_count", "updated_count", "unchanged_count", "new_ids"):
+                    stats[key] += page_stats[key]
             
-            # Update last sync timestamp
-            account.last_sync_at = datetime.utcnow()
+            db.add(cursor)
+            cursor.resume_uri = next_uri
+            if next_uri is None:
+                # Complete sync: move the watermark to the newest stored transaction
+                newest = (await db.execute(
+                    select(Transaction.bridge_transaction_id, Transaction.date)
+                    .where(Transaction.bank_account_id == account.id)
+                    .order_by(Transaction.date.desc())
+                    .limit(1)
+                )).first()
+                if newest is not None:
+                    cursor.last_transaction_id = newest.bridge_transaction_id
+                    cursor.last_transaction_date = newest.date
+                if not not_modified:
+                    cursor.etag = etag
+                cursor.last_synced_at = started_at
+                account.last_sync_at = started_at
+            
+            # Reconciliation and categorization of the new rows, committed with them
+            OutboxService.record_new_transactions(db, account.user_id, stats["new_ids"])
             
             # Update account balance
-            balance_info = await bridge_client.get_account_balance(
-                int(account.bridge_account_id)
-            )
+            balance_info = await balance_task
             account.balance = float(balance_info.get("balance", account.balance))
             
             await db.flush()
             
             logger.info(
-                f"Synced {new_count} new and {updated_count} updated transactions "
-                f"for account {account.id}"
+                f"Synced {stats['new_count']} new and {stats['updated_count']} updated "
+                f"transactions for account {account.id} ({total} fetched since {since.date()})"
+                f"{' (budget reached)' if next_uri else ''}"
             )
             
             return {
-                "new_count": new_count,
-                "updated_count": updated_count,
-                "last_sync": account.last_sync_at.isoformat(),
+                **stats,
+                "total": total,
+                "not_modified": not_modified,
+                "has_more": next_uri is not None,
+                "resume_uri": next_uri,
+                "last_sync": account.last_sync_at.isoformat() if account.last_sync_at else None,
                 "balance": account.balance,
             }
             
         except BridgeAPIError as e:
             logger.error(f"Bridge sync failed for account {account.id}: {e}")
             raise ValueError(f"Failed to sync transactions: {e}")
-
-from datetime import timedelta
-
+        
+        finally:
+            if not balance_task.done():
+                balance_task.cancel()
+            elif not balance_task.cancelled():
+                balance_task.exception()  # retrieved: no "never retrieved" warning
+    
+    @staticmethod
+    async def _known_transactions(
+        db: AsyncSession,
+        account_id: UUID,
+        since: datetime
+    ) -> Dict[str, tuple]:
+        """Bridge id → (description, amount) of the account's rows dated on/after `since`."""
+        result = await db.execute(
+            select(
+                Transaction.bridge_transaction_id,
+                Transaction.description,
+                Transaction.amount
+            ).where(
+                and_(
+                    Transaction.bank_account_id == account_id,
+                    Transaction.date >= since
+                )
+            )
+        )
+        return {
+            row.bridge_transaction_id: (row.description, Decimal(str(row.amount)))
+            for row in result
+        }
+    
+    @staticmethod
+    async def sync_account_group(
+        session_factory: Callable[[], AsyncSession],
+        account_ids: List[UUID],
+        bridge_client: Optional[BridgeClient] = None
+    ) -> Dict:
+        """
+        Sync several accounts (e.g. every account of a Bridge item) concurrently.
+        
+        Each account gets its own session and is committed on its own, so one
+        failing account neither blocks nor rolls back the others. At most
+        BRIDGE_SYNC_CONCURRENCY accounts sync at once, all through the same
+        pooled HTTP client: a full resync takes about as long as the slowest
+        account. An account already being synced elsewhere (sync lock held)
+        is skipped and reported as locked.
+        
+        Args:
+            session_factory: Session maker (AsyncSessionLocal, worker SessionLocal)
+            account_ids: Bank account IDs
+            bridge_client: Bridge API client (default: shared pooled client)
+            
+        Returns:
+            Dict with totals, new transaction ids per user and per-account results
+        """
+        owns_client = bridge_client is None
+        if owns_client:
+            bridge_client = BridgeClient()
+        
+        semaphore = asyncio.Semaphore(settings.BRIDGE_SYNC_CONCURRENCY)
+        
+        async def sync_one(account_id: UUID) -> Dict:
+            async with semaphore:
+                try:
+                    async with entity_locks.hold(SYNC_LOCK, account_id):
+                        return await sync_locked(account_id)
+                except LockBusy:
+                    # Another sync of this account is running: the caller retries later
+                    return {"locked": True}
+        
+        async def sync_locked(account_id: UUID) -> Dict:
+            async with session_factory() as db:
+                # Events from now on need a new sync: release the webhook flag first
+                await BankWebhookService.claim_sync_requests(db, [account_id])
+                await db.commit()
+                account = await db.get(BankAccount, account_id)
+                if account is None or account.deleted_at is not None:
+                    return {"error": "Bank account not found"}
+                user_id = account.user_id
+                try:
+                    stats = await BankService.sync_transactions(db, account, bridge_client)
+                    await db.commit()
+                    return {**stats, "user_id": user_id}
+                except Exception as e:
+                    await db.rollback()
+                    logger.error(f"Sync failed for account {account_id}: {e}")
+                    return {"error": str(e), "user_id": user_id}
+        
+        try:
+            results = await asyncio.gather(*(sync_one(account_id) for account_id in account_ids))
+        finally:
+            if owns_client:
+                await bridge_client.close()
+        
+        new_ids_by_user: Dict[UUID, List[UUID]] = {}
+        for stats in results:
+            if stats.get("new_ids"):
+                new_ids_by_user.setdefault(stats["user_id"], []).extend(stats["new_ids"])
+        
+        failed = sum("error" in stats for stats in results)
+        locked = sum(bool(stats.get("locked")) for stats in results)
+        summary = {
+            "accounts": len(account_ids),
+            "synced": len(account_ids) - failed - locked,
+            "failed": failed,
+            "locked": locked,
+            "new_count": sum(stats.get("new_count", 0) for stats in results),
+            "updated_count": sum(stats.get("updated_count", 0) for stats in results),
+            "new_ids_by_user": new_ids_by_user,
+            "results": dict(zip(account_ids, results)),
+        }
+        
+        logger.info(
+            f"Group sync of {summary['accounts']} accounts: {summary['synced']} synced, "
+            f"{summary['failed']} failed, {summary['new_count']} new transactions"
+        )
+        return summary
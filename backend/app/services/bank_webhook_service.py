@@ -0,0 +1,204 @@
+"""Bridge webhook ingestion: signature check and coalesced sync requests"""
+from typing import Iterable, List, Optional
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from uuid import UUID
+import hashlib
+import hmac
+import logging
+
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.core.metrics import get_counters
+from app.models.bank_account import BankAccount
+
+logger = logging.getLogger(__name__)
+
+webhook_counters = get_counters("bank.webhooks")
+
+# Events after which Bridge holds new data for an account or a whole item
+ACCOUNT_EVENTS = frozenset({"item.account.updated"})
+ITEM_EVENTS = frozenset({"item.refreshed"})
+
+
+def compute_signature(body: bytes, secret: str) -> str:
+    """HMAC-SHA256 of a webhook body, as Bridge signs it (uppercase hex)."""
+    return hmac.new(secret.encode("utf-8"), body, hashlib.sha256).hexdigest().upper()
+
+
+def verify_signature(body: bytes, header: Optional[str], secret: str) -> bool:
+    """
+    Check the BridgeApi-Signature header of a webhook.
+
+    The header lists one or more `v1=<hex>` signatures (several while the
+    secret is rotated); the body is accepted if any of them matches.
+
+    Args:
+        body: Raw request body, exactly as received
+        header: BridgeApi-Signature header value
+        secret: Webhook secret of the Bridge application
+
+    Returns:
+        True if a signature matches
+    """
+    if not header or not secret:
+        return False
+    expected = compute_signature(body, secret)
+    for part in header.split(","):
+        scheme, _, signature = part.strip().partition("=")
+        if scheme == "v1" and hmac.compare_digest(signature.upper(), expected):
+            return True
+    return False
+
+
+@dataclass(frozen=True)
+class BridgeWebhookEvent:
+    """A Bridge webhook event reduced to what decides a sync"""
+    type: str
+    item_id: Optional[str] = None
+    account_id: Optional[str] = None
+    nb_new_transactions: Optional[int] = None
+    nb_updated_transactions: Optional[int] = None
+
+    @classmethod
+    def from_payload(cls, payload: dict) -> "BridgeWebhookEvent":
+        content = payload.get("content") or {}
+
+        def as_str(value):
+            return str(value) if value is not None else None
+
+        return cls(
+            type=str(payload.get("type", "")),
+            item_id=as_str(content.get("item_id")),
+            account_id=as_str(content.get("account_id")),
+            nb_new_transactions=content.get("nb_new_transactions"),
+            nb_updated_transactions=content.get("nb_updated_transactions"),
+        )
+
+    @property
+    def has_changes(self) -> bool:
+        """Whether the event may bring transactions we do not have yet."""
+        if self.type in ACCOUNT_EVENTS:
+            if self.nb_new_transactions == 0 and self.nb_updated_transactions == 0:
+                return False
+            return self.account_id is not None
+        if self.type in ITEM_EVENTS:
+            return self.item_id is not None
+        return False
+
+
+class BankWebhookService:
+    """Turns Bridge webhook events into at most one queued sync per account"""
+
+    @staticmethod
+    async def request_syncs(
+        db: AsyncSession,
+        events: Iterable[BridgeWebhookEvent]
+    ) -> List[UUID]:
+        """
+        Flag the accounts affected by webhook events as waiting for a sync.
+
+        Only accounts not already waiting are flagged (one conditional UPDATE,
+        so concurrent webhook requests cannot both win an account): the caller
+        queues a sync for the returned accounts only, and every event arriving
+        until that sync starts is absorbed by it. A flag older than
+        BRIDGE_WEBHOOK_PENDING_TTL_SECONDS is treated as lost and taken over.
+
+        Args:
+            db: Database session
+            events: Parsed webhook events
+
+        Returns:
+            IDs of the accounts a sync must be queued for
+        """
+        account_ids, item_ids = set(), set()
+        for event in events:
+            webhook_counters.increment("events")
+            if not event.has_changes:
+                webhook_counters.increment("ignored")
+                continue
+            if event.type in ITEM_EVENTS:
+                item_ids.add(event.item_id)
+            else:
+                account_ids.add(event.account_id)
+
+        if not account_ids and not item_ids:
+            return []
+
+        now = datetime.utcnow()
+        stale_before = now - timedelta(seconds=settings.BRIDGE_WEBHOOK_PENDING_TTL_SECONDS)
+        result = await db.execute(
+            update(BankAccount)
+            .where(
+                and_(
+                    or_(
+                        BankAccount.bridge_account_id.in_(account_ids),
+                        BankAccount.bridge_item_id.in_(item_ids)
+                    ),
+                    BankAccount.is_active == True,
+                    BankAccount.deleted_at.is_(None),
+                    or_(
+                        BankAccount.sync_requested_at.is_(None),
+                        BankAccount.sync_requested_at < stale_before
+                    )
+                )
+            )
+            .values(sync_requested_at=now)
+            .returning(BankAccount.id)
+            .execution_options(synchronize_session=False)
+        )
+        flagged = list(result.scalars().all())
+
+        webhook_counters.increment("syncs_requested", len(flagged))
+        logger.info(
+            f"Bridge webhook: {len(flagged)} accounts to sync "
+            f"({len(account_ids)} accounts and {len(item_ids)} items notified)"
+        )
+        return flagged
+
+    @staticmethod
+    async def claim_sync_requests(db: AsyncSession, account_ids: List[UUID]) -> None:
+        """
+        Clear the waiting flag of accounts about to be synced.
+
+        Called (and committed) before Bridge is queried, so an event arriving
+        during the sync queues a new one instead of being absorbed by a sync
+        that may already have read past it.
+        """
+        if not account_ids:
+            return
+        await db.execute(
+            update(BankAccount)
+            .where(BankAccount.id.in_(account_ids))
+            .values(sync_requested_at=None)
+            .execution_options(synchronize_session=False)
+        )
+
+    @staticmethod
+    async def get_stale_account_groups(db: AsyncSession) -> List[List[UUID]]:
+        """
+        Accounts the safety-net poll must sync, grouped by Bridge item.
+
+        Accounts synced within BRIDGE_POLL_STALE_HOURS (by a webhook or the
+        sync endpoint) are skipped.
+        """
+        stale_before = datetime.utcnow() - timedelta(hours=settings.BRIDGE_POLL_STALE_HOURS)
+        result = await db.execute(
+            select(BankAccount.id, BankAccount.user_id, BankAccount.bridge_item_id).where(
+                and_(
+                    BankAccount.is_active == True,
+                    BankAccount.bridge_account_id.is_not(None),
+                    BankAccount.deleted_at.is_(None),
+                    or_(
+                        BankAccount.last_sync_at.is_(None),
+                        BankAccount.last_sync_at < stale_before
+                    )
+                )
+            )
+        )
+        groups = {}
+        for account_id, user_id, item_id in result.all():
+            groups.setdefault((user_id, item_id), []).append(account_id)
+        return list(groups.values())
@@ -0,0 +1,344 @@
+"""Local transaction categorizer: hashed n-gram features and a linear softmax model"""
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal
+from pathlib import Path
+from uuid import UUID
+import json
+import math
+import os
+import random
+import time
+import logging
+import zlib
+
+from app.config import settings
+from app.services.reconciliation_index import compact, tokenize
+
+logger = logging.getLogger(__name__)
+
+# Scope name of the model trained on every tenant
+GLOBAL_SCOPE = "global"
+
+# Bumped when features change: models of another format are ignored
+FEATURE_VERSION = 1
+
+
+def _bucket(feature: str, dim: int) -> int:
+    # crc32 rather than hash(): str hashes are salted per process
+    return zlib.crc32(feature.encode("utf-8")) % dim
+
+
+def extract_features(description: Optional[str], amount, dim: int) -> List[int]:
+    """
+    Hashed features of a transaction.
+
+    - word unigrams and bigrams (digits collapsed, so "0423" and "0523" match)
+    - character trigrams of each word (robust to typos and truncation)
+    - direction and order of magnitude of the amount
+
+    Args:
+        description: Bank description
+        amount: Signed amount
+        dim: Number of hash buckets
+
+    Returns:
+        Distinct bucket indexes
+    """
+    words = [
+        "#" if token.isdigit() else token
+        for token in tokenize(description)
+    ]
+    features = [f"w:{word}" for word in words]
+    features += [f"b:{left} {right}" for left, right in zip(words, words[1:])]
+    for word in words:
+        if word == "#":
+            continue
+        padded = f"<{compact(word)}>"
+        features += [f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2)]
+
+    value = Decimal(str(amount))
+    magnitude = int(math.log10(abs(value))) if value else 0
+    features.append(f"d:{'+' if value > 0 else '-'}")
+    features.append(f"m:{'+' if value > 0 else '-'}{magnitude}")
+
+    return sorted({_bucket(feature, dim) for feature in features})
+
+
+@dataclass(frozen=True)
+class TrainingExample:
+    """A labelled transaction"""
+    description: str
+    amount: Decimal
+    category: str
+    weight: float = 1.0
+
+
+class HashedLinearModel:
+    """
+    Multinomial logistic regression over hashed binary features.
+
+    Weights are stored sparsely (bucket → one weight per class), so a model
+    only holds the buckets seen in training and a prediction costs one vector
+    addition per feature.
+    """
+
+    def __init__(self, classes: Sequence[str], dim: int):
+        self.classes = list(classes)
+        self.dim = dim
+        self.weights: Dict[int, List[float]] = {}
+        self.bias = [0.0] * len(self.classes)
+        self.metadata: dict = {}
+
+    def _scores(self, features: Iterable[int]) -> List[float]:
+        scores = list(self.bias)
+        for feature in features:
+            row = self.weights.get(feature)
+            if row is not None:
+                for k, weight in enumerate(row):
+                    scores[k] += weight
+        return scores
+
+    @staticmethod
+    def _softmax(scores: List[float]) -> List[float]:
+        top = max(scores)
+        exps = [math.exp(score - top) for score in scores]
+        total = sum(exps)
+        return [value / total for value in exps]
+
+    def predict_features(self, features: Iterable[int]) -> Tuple[str, float]:
+        """Most likely class and its probability for extracted features."""
+        probabilities = self._softmax(self._scores(features))
+        best = max(range(len(probabilities)), key=probabilities.__getitem__)
+        return self.classes[best], probabilities[best]
+
+    def predict(self, description: Optional[str], amount) -> Tuple[str, float]:
+        """Most likely category of a transaction and its probability."""
+        return self.predict_features(extract_features(description, amount, self.dim))
+
+    def fit(
+        self,
+        examples: Sequence[TrainingExample],
+        epochs: int = 10,
+        learning_rate: float = 0.5,
+        seed: int = 0
+    ) -> "HashedLinearModel":
+        """
+        Train with stochastic gradient descent on the cross-entropy.
+
+        Only classes whose gradient is not negligible are updated, so once the
+        model fits an example its update touches one or two classes instead of
+        all of them.
+        """
+        index = {category: k for k, category in enumerate(self.classes)}
+        rows = [
+            (extract_features(e.description, e.amount, self.dim), index[e.category], e.weight)
+            for e in examples
+        ]
+        rng = random.Random(seed)
+        n_classes = len(self.classes)
+
+        for epoch in range(epochs):
+            rng.shuffle(rows)
+            rate = learning_rate / (1 + epoch)
+            for features, label, weight in rows:
+                probabilities = self._softmax(self._scores(features))
+                for k in range(n_classes):
+                    gradient = probabilities[k] - (1.0 if k == label else 0.0)
+                    if abs(gradient) < 1e-3:
+                        continue
+                    step = rate * weight * gradient
+                    self.bias[k] -= step * 0.1
+                    for feature in features:
+                        row = self.weights.get(feature)
+                        if row is None:
+                            row = self.weights[feature] = [0.0] * n_classes
+                        row[k] -= step
+        return self
+
+    def to_dict(self) -> dict:
+        return {
+            "feature_version": FEATURE_VERSION,
+            "classes": self.classes,
+            "dim": self.dim,
+            "bias": [round(value, 5) for value in self.bias],
+            "weights": {
+                str(feature): [round(value, 5) for value in row]
+                for feature, row in self.weights.items()
+            },
+            "metadata": self.metadata,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "HashedLinearModel":
+        model = cls(data["classes"], data["dim"])
+        model.bias = list(data["bias"])
+        model.weights = {int(feature): row for feature, row in data["weights"].items()}
+        model.metadata = data.get("metadata", {})
+        return model
+
+
+def in_holdout(example: TrainingExample, share: float = 0.1) -> bool:
+    """Whether an example belongs to the evaluation split (stable across runs)."""
+    return zlib.crc32(example.description.encode("utf-8")) % 1000 < share * 1000
+
+
+def train_model(
+    examples: Sequence[TrainingExample],
+    holdout_share: float = 0.1,
+    dim: Optional[int] = None
+) -> HashedLinearModel:
+    """
+    Train a model and measure its accuracy on a holdout split.
+
+    The split is deterministic (by description) so retraining on the same data
+    reports the same accuracy.
+
+    Returns:
+        Trained model, with samples, accuracy and training time in metadata
+    """
+    dim = dim or settings.CATEGORY_MODEL_HASH_DIM
+    train, holdout = [], []
+    for example in examples:
+        (holdout if in_holdout(example, holdout_share) else train).append(example)
+    if not train:
+        train, holdout = list(examples), []
+
+    started = time.perf_counter()
+    classes = sorted({example.category for example in train})
+    model = HashedLinearModel(classes, dim).fit(train)
+    elapsed = time.perf_counter() - started
+
+    correct = sum(
+        model.predict(example.description, example.amount)[0] == example.category
+        for example in holdout
+    )
+    model.metadata = {
+        "trained_at": datetime.utcnow().isoformat(),
+        "samples": len(train),
+        "holdout": len(holdout),
+        "accuracy": round(correct / len(holdout), 4) if holdout else None,
+        "training_seconds": round(elapsed, 3),
+    }
+    return model
+
+
+class ModelStore:
+    """
+    Versioned models on disk: `<root>/<scope>/<version>.json`.
+
+    Versions are increasing integers; saving writes a new version atomically
+    and prunes the oldest beyond `keep` so a bad retraining can be rolled back
+    by deleting the newest file.
+    """
+
+    def __init__(self, root: str, keep: int = 3):
+        self.root = Path(root)
+        self.keep = keep
+
+    def _scope_dir(self, scope: str) -> Path:
+        return self.root / scope
+
+    def versions(self, scope: str) -> List[int]:
+        """Stored versions of a scope, oldest first."""
+        directory = self._scope_dir(scope)
+        if not directory.is_dir():
+            return []
+        return sorted(int(path.stem) for path in directory.glob("*.json") if path.stem.isdigit())
+
+    def save(self, scope: str, model: HashedLinearModel) -> int:
+        """Store a model as the next version of its scope."""
+        directory = self._scope_dir(scope)
+        directory.mkdir(parents=True, exist_ok=True)
+        versions = self.versions(scope)
+        version = versions[-1] + 1 if versions else 1
+        model.metadata["version"] = version
+
+        path = directory / f"{version:06d}.json"
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(model.to_dict()), encoding="utf-8")
+        os.replace(tmp_path, path)
+
+        for old in (versions + [version])[:-self.keep]:
+            (directory / f"{old:06d}.json").unlink(missing_ok=True)
+        return version
+
+    def load(self, scope: str, version: Optional[int] = None) -> Optional[HashedLinearModel]:
+        """Load a version (the latest by default) or None if there is none."""
+        versions = self.versions(scope)
+        if version is None and versions:
+            version = versions[-1]
+        if version not in versions:
+            return None
+
+        data = json.loads((self._scope_dir(scope) / f"{version:06d}.json").read_text(encoding="utf-8"))
+        if data.get("feature_version") != FEATURE_VERSION:
+            logger.warning(f"Ignoring categorization model {scope} v{version}: old feature format")
+            return None
+        return HashedLinearModel.from_dict(data)
+
+
+class LocalCategorizer:
+    """
+    Per-process cache of the tenant and global models.
+
+    Models are reloaded from the store after `ttl_seconds` to pick up
+    retrainings made by another process.
+    """
+
+    def __init__(self, store: ModelStore, ttl_seconds: int):
+        self.store = store
+        self.ttl_seconds = ttl_seconds
+        self._models: Dict[str, Tuple[float, Optional[HashedLinearModel]]] = {}
+
+    def get_model(self, scope: str) -> Optional[HashedLinearModel]:
+        """Latest model of a scope (cached), or None."""
+        cached = self._models.get(scope)
+        if cached is not None and time.monotonic() - cached[0] < self.ttl_seconds:
+            return cached[1]
+        model = self.store.load(scope)
+        self._models[scope] = (time.monotonic(), model)
+        return model
+
+    def invalidate(self, scope: Optional[str] = None) -> None:
+        """Forget cached models (all scopes by default)."""
+        if scope is None:
+            self._models.clear()
+        else:
+            self._models.pop(scope, None)
+
+    def predict(
+        self,
+        user_id: UUID,
+        description: Optional[str],
+        amount
+    ) -> Optional[Tuple[str, Decimal]]:
+        """
+        Categorize with the tenant model, falling back to the global model.
+
+        Returns:
+            (category, confidence) at or above CATEGORY_MODEL_MIN_CONFIDENCE,
+            or None when no model is confident enough
+        """
+        min_confidence = settings.CATEGORY_MODEL_MIN_CONFIDENCE
+        features_by_dim: Dict[int, List[int]] = {}
+        for scope in (str(user_id), GLOBAL_SCOPE):
+            model = self.get_model(scope)
+            if model is None:
+                continue
+            features = features_by_dim.get(model.dim)
+            if features is None:
+                features = features_by_dim[model.dim] = extract_features(
+                    description, amount, model.dim
+                )
+            category, probability = model.predict_features(features)
+            if probability >= min_confidence:
+                return category, Decimal(str(round(probability, 2)))
+        return None
+
+
+local_categorizer = LocalCategorizer(
+    ModelStore(settings.CATEGORY_MODEL_DIR, keep=settings.CATEGORY_MODEL_KEEP_VERSIONS),
+    ttl_seconds=settings.CATEGORY_MODEL_RELOAD_SECONDS
+)
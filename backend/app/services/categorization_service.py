@@ -1,16 +1,33 @@
 """Transaction categorization service using AI"""
-from typing import List
+from typing import Dict, List, Optional, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
 from uuid import UUID
 from decimal import Decimal
+import asyncio
 import logging
 
 from app.models.transaction import Transaction
 from app.integrations.claude_client import ClaudeClient
+from app.core.metrics import get_counters
+from app.services.categorization_model import (
+    GLOBAL_SCOPE,
+    TrainingExample,
+    local_categorizer,
+    train_model,
+)
+from app.services.category_memo_service import CategoryMemoService, fingerprint
 from app.services.transaction_service import TransactionService
+from app.config import settings
 
 logger = logging.getLogger(__name__)
 
+local_counters = get_counters("categorization.local")
+
+
+def transaction_type(transaction: Transaction) -> str:
+    """Credit for incoming money, debit otherwise (from the amount sign)."""
+    return "credit" if transaction.amount > 0 else "debit"
+
 
 class CategorizationService:
     """Service for AI-powered transaction categorization"""
@@ -19,19 +36,46 @@ class CategorizationService:
     async def categorize_transaction(
         db: AsyncSession,
         transaction: Transaction,
-        ai_client: ClaudeClient = None
+        ai_client: ClaudeClient = None,
+        user_id: Optional[UUID] = None
     ) -> Transaction:
         """
-        Categorize a single transaction using AI.
+        Categorize a single transaction: memo, then local model, then AI.
         
         Args:
             db: Database session
             transaction: Transaction to categorize
             ai_client: Claude AI client (optional)
+            user_id: Owner of the transaction (enables the category memo)
             
         Returns:
             Updated transaction with category
         """
+        key = fingerprint(transaction.description, transaction.amount)
+        if user_id is not None and key:
+            remembered = await CategoryMemoService.lookup_many(db, user_id, [key])
+            if key in remembered:
+                transaction.category, transaction.category_confidence = remembered[key]
+                transaction.category_source = "memo"
+                await db.flush()
+                logger.info(
+                    f"Transaction {transaction.id} categorized as "
+                    f"'{transaction.category}' from memo"
+                )
+                return transaction
+        
+        if user_id is not None:
+            predicted = CategorizationService.predict_locally(user_id, [transaction])[0]
+            if predicted is not None:
+                transaction.category, transaction.category_confidence = predicted
+                transaction.category_source = "model"
+                await db.flush()
+                logger.info(
+                    f"Transaction {transaction.id} categorized as "
+                    f"'{transaction.category}' by local model"
+                )
+                return transaction
+        
         if ai_client is None:
             ai_client = ClaudeClient()
         
@@ -39,12 +83,15 @@ class CategorizationService:
             category, confidence = await ai_client.categorize_transaction(
                 description=transaction.description,
                 amount=transaction.amount,
-                transaction_type=transaction.transaction_type or "debit"
+                transaction_type=transaction_type(transaction)
             )
             
             # Update transaction
             transaction.category = category
             transaction.category_confidence = confidence
+            transaction.category_source = "ai"
+            if user_id is not None:
+                await CategoryMemoService.remember(db, user_id, key, category, confidence)
             await db.flush()
             
             logger.info(
@@ -58,6 +105,7 @@ class CategorizationService:
             logger.error(f"Failed to categorize transaction {transaction.id}: {e}")
             transaction.category = "autre"
             transaction.category_confidence = Decimal("0.0")
+            transaction.category_source = "ai"
             await db.flush()
             return transaction
     
@@ -66,51 +114,290 @@ class CategorizationService:
         db: AsyncSession,
         user_id: UUID,
         limit: int = 50,
-        ai_client: ClaudeClient = None
+        ai_client: ClaudeClient = None,
+        transaction_ids: Optional[List[UUID]] = None
     ) -> int:
         """
         Categorize all uncategorized transactions for a user.
         
+        Transactions whose merchant is in the category memo, or that the local
+        model categorizes confidently, are categorized without AI. The others
+        are deduplicated by merchant and sent to Claude in batched prompts, so
+        50 transactions cost one or two API calls instead of 50.
+        
         Args:
             db: Database session
             user_id: User ID
             limit: Max number of transactions to categorize
             ai_client: Claude AI client
+            transaction_ids: Only these transactions (e.g. the new rows of a sync)
             
         Returns:
             Number of transactions categorized
         """
-        if ai_client is None:
-            ai_client = ClaudeClient()
-        
         # Get uncategorized transactions
         transactions = await TransactionService.get_uncategorized_transactions(
             db,
             user_id,
-            limit
+            limit,
+            transaction_ids=transaction_ids
         )
         
         if not transactions:
             return 0
         
-        # Categorize each transaction
+        keys = [fingerprint(t.description, t.amount) for t in transactions]
+        results: Dict[str, Tuple[str, Decimal]] = await CategoryMemoService.lookup_many(
+            db, user_id, keys
+        )
+        sources = {key: "memo" for key in results}
+        
+        # One item per unknown merchant; transactions without a fingerprint
+        # are handled on their own
+        pending: Dict[object, Transaction] = {}
+        for transaction, key in zip(transactions, keys):
+            if key is None:
+                pending[transaction.id] = transaction
+            elif key not in results:
+                pending.setdefault(key, transaction)
+        
+        predictions = CategorizationService.predict_locally(user_id, list(pending.values()))
+        for (key, _), predicted in zip(list(pending.items()), predictions):
+            if predicted is not None:
+                results[key] = predicted
+                sources[key] = "model"
+                del pending[key]
+        
+        if pending:
+            if ai_client is None:
+                ai_client = ClaudeClient()
+            
+            # One prompt per CLAUDE_CATEGORIZATION_BATCH_SIZE transactions, sent
+            # concurrently (ClaudeClient bounds concurrency and request rate);
+            # at most CLAUDE_MAX_CONCURRENCY_PER_TENANT at once so one large
+            # tenant cannot hold every slot of the process
+            items = list(pending.items())
+            batch_size = settings.CLAUDE_CATEGORIZATION_BATCH_SIZE
+            chunks = [
+                items[start:start + batch_size]
+                for start in range(0, len(items), batch_size)
+            ]
+            tenant_semaphore = asyncio.Semaphore(settings.CLAUDE_MAX_CONCURRENCY_PER_TENANT)
+            
+            async def categorize_chunk(chunk):
+                async with tenant_semaphore:
+                    return await ai_client.categorize_transactions_batch([
+                        {
+                            "description": transaction.description,
+                            "amount": transaction.amount,
+                            "transaction_type": transaction_type(transaction)
+                        }
+                        for _, transaction in chunk
+                    ])
+            
+            chunk_results = await asyncio.gather(
+                *(categorize_chunk(chunk) for chunk in chunks),
+                return_exceptions=True
+            )
+            
+            learned = {}
+            for chunk, chunk_result in zip(chunks, chunk_results):
+                if isinstance(chunk_result, Exception):
+                    logger.error(f"Failed to categorize transactions for user {user_id}: {chunk_result}")
+                    chunk_result = [("autre", Decimal("0.0"))] * len(chunk)
+                for (key, _), result in zip(chunk, chunk_result):
+                    results[key] = result
+                    sources[key] = "ai"
+                    if isinstance(key, str):
+                        learned[key] = result
+            
+            await CategoryMemoService.remember_many(db, user_id, learned)
+        
         count = 0
-        for transaction in transactions:
-            try:
-                await CategorizationService.categorize_transaction(
-                    db,
-                    transaction,
-                    ai_client
-                )
-                count += 1
-            except Exception as e:
-                logger.error(f"Failed to categorize transaction {transaction.id}: {e}")
+        for transaction, key in zip(transactions, keys):
+            result_key = key if key is not None else transaction.id
+            transaction.category, transaction.category_confidence = results[result_key]
+            transaction.category_source = sources[result_key]
+            count += 1
         
         await db.commit()
         
-        logger.info(f"Categorized {count}/{len(transactions)} transactions for user {user_id}")
+        logger.info(
+            f"Categorized {count}/{len(transactions)} transactions for user {user_id} "
+            f"({len(pending)} sent to AI)"
+        )
         return count
     
+    @staticmethod
+    def predict_locally(
+        user_id: UUID,
+        transactions: List[Transaction]
+    ) -> List[Optional[Tuple[str, Decimal]]]:
+        """
+        Categorize transactions with the local model, without network calls.
+        
+        Args:
+            user_id: User ID (selects the tenant model)
+            transactions: Transactions to categorize
+            
+        Returns:
+            (category, confidence) per transaction, None when not confident
+        """
+        if not transactions:
+            return []
+        
+        try:
+            predictions = [
+                local_categorizer.predict(user_id, transaction.description, transaction.amount)
+                for transaction in transactions
+            ]
+        except Exception as e:
+            # A corrupt model file must not block categorization
+            logger.error(f"Local categorization failed for user {user_id}: {e}")
+            predictions = [None] * len(transactions)
+        
+        accepted = sum(prediction is not None for prediction in predictions)
+        local_counters.increment("predictions", len(predictions))
+        local_counters.increment("accepted", accepted)
+        return predictions
+    
+    @staticmethod
+    def get_local_stats() -> dict:
+        """Share of transactions categorized by the local model in this process."""
+        return {
+            "counters": local_counters.snapshot(),
+            "acceptance_ratio": round(local_counters.ratio("accepted", "predictions"), 4),
+        }
+    
+    @staticmethod
+    async def get_training_examples(
+        db: AsyncSession,
+        user_id: Optional[UUID] = None,
+        limit: Optional[int] = None
+    ) -> List[TrainingExample]:
+        """
+        Labelled transactions for the local model.
+        
+        Only confirmed labels are used: manual categories, and AI categories
+        with at least CATEGORY_MODEL_MIN_LABEL_CONFIDENCE. Categories from the
+        memo or the local model are skipped, or the model would learn from its
+        own predictions. Manual corrections (memo entries with source
+        "manual") override the stored category and weigh double; "autre" is
+        skipped unless it was set manually since it is also the fallback of
+        failed AI calls.
+        
+        Args:
+            db: Database session
+            user_id: User ID (None for every user)
+            limit: Max number of examples (most recent first)
+            
+        Returns:
+            Training examples
+        """
+        from sqlalchemy import and_, or_, select
+        from app.models.bank_account import BankAccount
+        from app.models.category_memo import CategoryMemo
+        
+        limit = limit or settings.CATEGORY_MODEL_MAX_SAMPLES
+        conditions = [
+            Transaction.category.is_not(None),
+            Transaction.deleted_at.is_(None),
+            or_(
+                # Memo rows only count when the memo is a manual correction
+                Transaction.category_source.in_(("manual", "memo")),
+                and_(
+                    Transaction.category_source == "ai",
+                    Transaction.category_confidence >= settings.CATEGORY_MODEL_MIN_LABEL_CONFIDENCE
+                )
+            )
+        ]
+        if user_id is not None:
+            conditions.append(BankAccount.user_id == user_id)
+        
+        result = await db.execute(
+            select(
+                BankAccount.user_id,
+                Transaction.description,
+                Transaction.amount,
+                Transaction.category,
+                Transaction.category_source
+            )
+            .join(BankAccount)
+            .where(and_(*conditions))
+            .order_by(Transaction.date.desc())
+            .limit(limit)
+        )
+        rows = result.all()
+        
+        manual_query = select(
+            CategoryMemo.user_id,
+            CategoryMemo.fingerprint,
+            CategoryMemo.category
+        ).where(CategoryMemo.source == "manual")
+        if user_id is not None:
+            manual_query = manual_query.where(CategoryMemo.user_id == user_id)
+        manual = {
+            (row.user_id, row.fingerprint): row.category
+            for row in (await db.execute(manual_query)).all()
+        }
+        
+        examples = []
+        for row in rows:
+            corrected = manual.get((row.user_id, fingerprint(row.description, row.amount)))
+            if corrected is not None:
+                examples.append(TrainingExample(row.description, row.amount, corrected, 2.0))
+            elif row.category_source == "memo":
+                continue
+            elif row.category != "autre" or row.category_source == "manual":
+                examples.append(TrainingExample(row.description, row.amount, row.category))
+        return examples
+    
+    @staticmethod
+    async def train_local_models(
+        db: AsyncSession,
+        user_ids: Optional[List[UUID]] = None,
+        include_global: bool = True
+    ) -> dict:
+        """
+        Retrain and store the tenant models and the global model.
+        
+        Tenants with fewer than CATEGORY_MODEL_MIN_SAMPLES examples are skipped
+        (the global model covers them).
+        
+        Args:
+            db: Database session
+            user_ids: Tenants to retrain (None for none)
+            include_global: Also retrain the global model
+            
+        Returns:
+            Dict of scope → training metadata (or skip reason)
+        """
+        scopes = [(str(user_id), user_id) for user_id in user_ids or []]
+        if include_global:
+            scopes.append((GLOBAL_SCOPE, None))
+        
+        report = {}
+        for scope, user_id in scopes:
+            examples = await CategorizationService.get_training_examples(db, user_id)
+            categories = {example.category for example in examples}
+            if len(examples) < settings.CATEGORY_MODEL_MIN_SAMPLES or len(categories) < 2:
+                report[scope] = {"skipped": f"{len(examples)} examples, {len(categories)} categories"}
+                continue
+            
+            # CPU-bound: keep the event loop responsive
+            model = await asyncio.to_thread(train_model, examples)
+            version = local_categorizer.store.save(scope, model)
+            local_categorizer.invalidate(scope)
+            report[scope] = model.metadata
+            
+            logger.info(
+                f"Categorization model {scope} v{version} trained on "
+                f"{model.metadata['samples']} examples "
+                f"(holdout accuracy: {model.metadata['accuracy']})"
+            )
+        
+        return report
+    
     @staticmethod
     async def get_category_breakdown(
         db: AsyncSession,
@@ -126,7 +413,7 @@ class CategorizationService:
         Returns:
             Dict of category → total amount
         """
-        from sqlalchemy import func, select
+        from sqlalchemy import and_, func, select
         from app.models.bank_account import BankAccount
         
         result = await db.execute(
@@ -156,22 +443,37 @@ class CategorizationService:
         db: AsyncSession,
         transaction: Transaction,
         new_category: str,
-        confidence: Decimal = Decimal("1.0")
+        confidence: Decimal = Decimal("1.0"),
+        user_id: Optional[UUID] = None
     ) -> Transaction:
         """
         Manually recategorize a transaction.
         
+        The correction is remembered for the merchant and takes precedence
+        over AI results for its future transactions.
+        
         Args:
             db: Database session
             transaction: Transaction
             new_category: New category
             confidence: Confidence score (1.0 for manual)
+            user_id: Owner of the transaction (enables the category memo)
             
         Returns:
             Updated transaction
         """
         transaction.category = new_category
         transaction.category_confidence = confidence
+        transaction.category_source = "manual"
+        if user_id is not None:
+            await CategoryMemoService.remember(
+                db,
+                user_id,
+                fingerprint(transaction.description, transaction.amount),
+                new_category,
+                confidence,
+                source="manual"
+            )
         await db.flush()
         
         logger.info(
@@ -0,0 +1,280 @@
+"""Merchant → category memo: remembered categories checked before the AI"""
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+from datetime import datetime, timedelta
+from decimal import Decimal
+from uuid import UUID
+import logging
+
+from sqlalchemy import and_, delete, func, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.core.metrics import get_counters
+from app.models.category_memo import CategoryMemo
+from app.services.reconciliation_index import tokenize
+
+logger = logging.getLogger(__name__)
+
+memo_counters = get_counters("categorization.memo")
+
+# Payment-rail words that say nothing about the merchant
+NOISE_TOKENS = frozenset({
+    "prlv", "prelevement", "sepa", "vir", "virement", "inst", "cb", "carte",
+    "paiement", "achat", "retrait", "dab", "ref", "de", "du", "le", "la",
+    "les", "des", "en", "sa", "sas", "sarl", "eur", "fr",
+})
+
+# Merchant names rarely need more; the tail of a description is usually noise
+MAX_FINGERPRINT_TOKENS = 6
+
+
+def fingerprint(description: Optional[str], amount) -> Optional[str]:
+    """
+    Stable key of the merchant behind a bank description.
+
+    Card dates, references and amounts change at every payment, so tokens
+    holding digits and payment-rail words are dropped; the amount sign is kept
+    because a refund from a merchant is not categorized like a purchase.
+
+    Examples:
+        "PRLV SEPA EDF 0423 REF 88413" → "-edf"
+        "CB CARREFOUR MARKET 12/03" → "-carrefour market"
+
+    Returns:
+        Fingerprint, or None if nothing identifies the merchant
+    """
+    tokens = [
+        token for token in tokenize(description)
+        if token not in NOISE_TOKENS and not any(char.isdigit() for char in token)
+    ]
+    if not tokens:
+        return None
+    direction = "+" if Decimal(str(amount)) > 0 else "-"
+    return direction + " ".join(tokens[:MAX_FINGERPRINT_TOKENS])
+
+
+class CategoryMemoService:
+    """Persistent per-user category memo with TTL and LRU eviction"""
+
+    @staticmethod
+    async def lookup_many(
+        db: AsyncSession,
+        user_id: UUID,
+        fingerprints: Iterable[str]
+    ) -> Dict[str, Tuple[str, Decimal]]:
+        """
+        Find remembered categories for several fingerprints in one query.
+
+        AI entries older than CATEGORY_MEMO_TTL_DAYS are ignored (manual
+        entries never expire). Hits refresh last_used_at for LRU eviction.
+
+        Args:
+            db: Database session
+            user_id: User ID
+            fingerprints: Fingerprints to look up
+
+        Returns:
+            Dict of fingerprint → (category, confidence) for hits only
+        """
+        keys = {key for key in fingerprints if key}
+        if not keys:
+            return {}
+
+        now = datetime.utcnow()
+        expires_before = now - timedelta(days=settings.CATEGORY_MEMO_TTL_DAYS)
+
+        result = await db.execute(
+            select(CategoryMemo).where(
+                and_(
+                    CategoryMemo.user_id == user_id,
+                    CategoryMemo.fingerprint.in_(keys),
+                    or_(
+                        CategoryMemo.source == "manual",
+                        CategoryMemo.updated_at >= expires_before
+                    )
+                )
+            )
+        )
+        memos = result.scalars().all()
+
+        memo_counters.increment("lookups", len(keys))
+        memo_counters.increment("hits", len(memos))
+        memo_counters.increment("misses", len(keys) - len(memos))
+
+        if memos:
+            await db.execute(
+                update(CategoryMemo)
+                .where(CategoryMemo.id.in_([memo.id for memo in memos]))
+                .values(last_used_at=now, hit_count=CategoryMemo.hit_count + 1)
+                .execution_options(synchronize_session=False)
+            )
+
+        return {
+            memo.fingerprint: (memo.category, Decimal(str(memo.confidence)))
+            for memo in memos
+        }
+
+    @staticmethod
+    async def remember_many(
+        db: AsyncSession,
+        user_id: UUID,
+        entries: Mapping[str, Tuple[str, Decimal]],
+        source: str = "ai"
+    ) -> int:
+        """
+        Store categories for several fingerprints.
+
+        AI results below CATEGORY_MEMO_MIN_CONFIDENCE are not remembered and
+        never overwrite a manual entry; manual entries overwrite everything.
+
+        Args:
+            db: Database session
+            user_id: User ID
+            entries: Dict of fingerprint → (category, confidence)
+            source: "ai" or "manual"
+
+        Returns:
+            Number of entries written
+        """
+        if source == "ai":
+            min_confidence = Decimal(str(settings.CATEGORY_MEMO_MIN_CONFIDENCE))
+            entries = {
+                key: (category, confidence)
+                for key, (category, confidence) in entries.items()
+                if key and Decimal(str(confidence)) >= min_confidence
+            }
+        else:
+            entries = {key: value for key, value in entries.items() if key}
+        if not entries:
+            return 0
+
+        result = await db.execute(
+            select(CategoryMemo).where(
+                and_(
+                    CategoryMemo.user_id == user_id,
+                    CategoryMemo.fingerprint.in_(entries.keys())
+                )
+            )
+        )
+        existing = {memo.fingerprint: memo for memo in result.scalars().all()}
+
+        now = datetime.utcnow()
+        written = 0
+        new_rows: List[dict] = []
+        for key, (category, confidence) in entries.items():
+            memo = existing.get(key)
+            if memo is None:
+                new_rows.append({
+                    "user_id": user_id,
+                    "fingerprint": key,
+                    "category": category,
+                    "confidence": confidence,
+                    "source": source,
+                    "hit_count": 0,
+                    "last_used_at": now,
+                    "created_at": now,
+                    "updated_at": now,
+                })
+                continue
+            if memo.source == "manual" and source != "manual":
+                continue
+            memo.category = category
+            memo.confidence = confidence
+            memo.source = source
+            memo.updated_at = now
+            written += 1
+
+        for row in new_rows:
+            # A concurrent categorization may have inserted the same key:
+            # keep its entry rather than failing the whole batch
+            try:
+                async with db.begin_nested():
+                    db.add(CategoryMemo(**row))
+                written += 1
+            except IntegrityError:
+                logger.debug(f"Category memo '{row['fingerprint']}' already stored")
+
+        await db.flush()
+        return written
+
+    @staticmethod
+    async def remember(
+        db: AsyncSession,
+        user_id: UUID,
+        key: Optional[str],
+        category: str,
+        confidence: Decimal,
+        source: str = "ai"
+    ) -> bool:
+        """Store the category of one fingerprint (see remember_many)."""
+        if not key:
+            return False
+        written = await CategoryMemoService.remember_many(
+            db, user_id, {key: (category, confidence)}, source=source
+        )
+        return written > 0
+
+    @staticmethod
+    async def evict(db: AsyncSession) -> dict:
+        """
+        Drop expired and least recently used AI entries.
+
+        - TTL: AI entries not refreshed for CATEGORY_MEMO_TTL_DAYS
+        - LRU: AI entries past CATEGORY_MEMO_MAX_PER_USER per user, oldest
+          last_used_at first
+
+        Manual entries are user decisions and are never evicted.
+
+        Returns:
+            Dict with expired and evicted counts
+        """
+        expires_before = datetime.utcnow() - timedelta(days=settings.CATEGORY_MEMO_TTL_DAYS)
+        expired = await db.execute(
+            delete(CategoryMemo)
+            .where(
+                and_(
+                    CategoryMemo.source == "ai",
+                    CategoryMemo.updated_at < expires_before
+                )
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+        ranked = (
+            select(
+                CategoryMemo.id,
+                func.row_number().over(
+                    partition_by=CategoryMemo.user_id,
+                    order_by=CategoryMemo.last_used_at.desc()
+                ).label("rank")
+            )
+            .where(CategoryMemo.source == "ai")
+            .subquery()
+        )
+        evicted = await db.execute(
+            delete(CategoryMemo)
+            .where(
+                CategoryMemo.id.in_(
+                    select(ranked.c.id).where(ranked.c.rank > settings.CATEGORY_MEMO_MAX_PER_USER)
+                )
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+        stats = {"expired": expired.rowcount or 0, "evicted": evicted.rowcount or 0}
+        memo_counters.increment("expired", stats["expired"])
+        memo_counters.increment("evicted", stats["evicted"])
+        logger.info(
+            f"Category memo eviction: {stats['expired']} expired, {stats['evicted']} evicted"
+        )
+        return stats
+
+    @staticmethod
+    def get_stats() -> dict:
+        """Hit ratio of the memo in this process."""
+        counters = memo_counters.snapshot()
+        return {
+            "counters": counters,
+            "hit_ratio": round(memo_counters.ratio("hits", "lookups"), 4),
+        }
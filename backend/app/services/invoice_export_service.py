@@ -0,0 +1,282 @@
+"""
+Bulk invoice PDF export as a ZIP archive.
+
+Invoices are selected with an InvoiceFilter and snapshotted up front, so no
+database session is needed while the archive is produced. PDFs come from
+the PDF cache or the PDF process pool, at most INVOICE_EXPORT_CONCURRENCY
+at once, and are added to the archive in order: only that window of PDFs is
+held in memory, and the archive comes out as a stream of chunks for an HTTP
+response or a file.
+
+Background exports are Celery tasks: the owner of each export id is kept
+in Redis from the moment it is enqueued, and only the owner can see it.
+"""
+from typing import AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from uuid import UUID
+import asyncio
+import logging
+import os
+import time
+import zipfile
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.core.locks import get_redis
+from app.core.metrics import get_counters
+from app.models.user import User
+from app.schemas.invoice import InvoiceFilter
+from app.services.invoice_service import InvoiceService
+from app.services.pdf_cache import invoice_snapshot
+from app.services.pdf_render_pool import PDFPoolBusy
+
+logger = logging.getLogger(__name__)
+
+export_counters = get_counters("invoices.export")
+
+# Listed in the archive when some PDFs could not be rendered
+ERRORS_FILENAME = "ERREURS.txt"
+
+EXPORT_OWNER_KEY = "financeai:invoices:export:{export_id}:owner"
+
+RenderFunction = Callable[[Dict], Awaitable[bytes]]
+
+
+@dataclass
+class ExportEntry:
+    """One PDF of the archive"""
+    filename: str
+    snapshot: Dict
+
+
+@dataclass
+class ExportProgress:
+    """PDFs added to the archive (done) or skipped (failed) so far"""
+    total: int
+    done: int = 0
+    failed: int = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return {"total": self.total, "done": self.done, "failed": self.failed}
+
+
+class _ChunkSink:
+    """Write-only file for ZipFile: collects the archive bytes until drained"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _unique_filename(filename: str, used: set) -> str:
+    stem, dot, extension = filename.rpartition(".")
+    candidate, counter = filename, 2
+    while candidate in used:
+        candidate = f"{stem}_{counter}{dot}{extension}"
+        counter += 1
+    used.add(candidate)
+    return candidate
+
+
+async def _default_render(snapshot: Dict) -> bytes:
+    from app.services.pdf_service import PDFService
+
+    return await PDFService.get_snapshot_pdf(snapshot)
+
+
+async def _render_when_pool_free(render: RenderFunction, snapshot: Dict) -> bytes:
+    """Render, waiting while interactive downloads keep the PDF pool full."""
+    for _ in range(settings.INVOICE_EXPORT_BUSY_RETRIES):
+        try:
+            return await render(snapshot)
+        except PDFPoolBusy:
+            await asyncio.sleep(settings.INVOICE_EXPORT_BUSY_RETRY_SECONDS)
+    return await render(snapshot)
+
+
+class InvoiceExportService:
+    """ZIP archives of invoice PDFs, streamed or stored"""
+
+    @staticmethod
+    async def load_entries(
+        db: AsyncSession,
+        user: User,
+        filters: InvoiceFilter,
+        limit: int
+    ) -> List[ExportEntry]:
+        """
+        Snapshots and archive filenames of the invoices matching filters.
+
+        Raises:
+            ValueError: More than `limit` invoices match
+        """
+        from app.services.pdf_service import PDFService
+
+        invoices = await InvoiceService.get_filtered_invoices(db, user.id, filters, limit + 1)
+        if len(invoices) > limit:
+            raise ValueError(
+                f"More than {limit} invoices match, narrow the filters or use a background export"
+            )
+
+        used: set = set()
+        return [
+            ExportEntry(
+                filename=_unique_filename(PDFService.get_invoice_filename(invoice), used),
+                snapshot=invoice_snapshot(invoice, user)
+            )
+            for invoice in invoices
+        ]
+
+    @staticmethod
+    async def iter_zip(
+        entries: List[ExportEntry],
+        render: Optional[RenderFunction] = None,
+        on_progress: Optional[Callable[[ExportProgress], None]] = None
+    ) -> AsyncIterator[bytes]:
+        """
+        The ZIP archive of entries, as chunks.
+
+        PDFs are rendered INVOICE_EXPORT_CONCURRENCY at a time (in the PDF
+        process pool) and stored uncompressed, in entry order. A PDF that
+        fails is left out and listed in ERRORS_FILENAME.
+
+        Args:
+            entries: PDFs of the archive
+            render: Snapshot → PDF (cache, then PDF process pool by default)
+            on_progress: Called after each PDF
+        """
+        render = render or _default_render
+        progress = ExportProgress(total=len(entries))
+        sink = _ChunkSink()
+        remaining = iter(entries)
+        pending: Deque[Tuple[ExportEntry, asyncio.Task]] = deque()
+        failures: List[str] = []
+
+        def fill_window() -> None:
+            while len(pending) < settings.INVOICE_EXPORT_CONCURRENCY:
+                entry = next(remaining, None)
+                if entry is None:
+                    return
+                pending.append((entry, asyncio.create_task(_render_when_pool_free(render, entry.snapshot))))
+
+        try:
+            with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED) as archive:
+                fill_window()
+                while pending:
+                    entry, task = pending.popleft()
+                    try:
+                        pdf_bytes = await task
+                    except Exception as e:
+                        logger.error(f"Export: failed to render {entry.filename}: {e}")
+                        failures.append(f"{entry.filename}: {e}")
+                        progress.failed += 1
+                    else:
+                        archive.writestr(
+                            zipfile.ZipInfo(entry.filename, date_time=time.localtime()[:6]),
+                            pdf_bytes
+                        )
+                        progress.done += 1
+                    fill_window()
+
+                    if on_progress is not None:
+                        on_progress(progress)
+                    chunk = sink.drain()
+                    if chunk:
+                        yield chunk
+
+                if failures:
+                    archive.writestr(ERRORS_FILENAME, "\n".join(failures) + "\n")
+            # Central directory, written when the archive closes
+            yield sink.drain()
+        finally:
+            for _, task in pending:
+                task.cancel()
+            export_counters.increment("pdfs", progress.done)
+            export_counters.increment("failed", progress.failed)
+
+    @staticmethod
+    async def record_owner(export_id: str, user_id: UUID) -> None:
+        """Remember who started a background export (before enqueueing it)."""
+        await get_redis().set(
+            EXPORT_OWNER_KEY.format(export_id=export_id),
+            str(user_id),
+            ex=settings.INVOICE_EXPORT_RETENTION_HOURS * 3600
+        )
+
+    @staticmethod
+    async def is_owner(export_id: str, user_id: UUID) -> bool:
+        """Whether `user_id` started the export (False for unknown or expired ids)."""
+        owner = await get_redis().get(EXPORT_OWNER_KEY.format(export_id=export_id))
+        return owner is not None and owner.decode() == str(user_id)
+
+    @staticmethod
+    def export_path(user_id: UUID, export_id: str) -> Path:
+        """Where the background export `export_id` of a user is stored"""
+        return Path(settings.INVOICE_EXPORT_DIR) / str(user_id) / f"{export_id}.zip"
+
+    @staticmethod
+    async def write_zip(
+        entries: List[ExportEntry],
+        path: Path,
+        render: Optional[RenderFunction] = None,
+        on_progress: Optional[Callable[[ExportProgress], None]] = None
+    ) -> Dict[str, int]:
+        """
+        Write the archive of entries to `path` (atomically).
+
+        Returns:
+            Progress at the end (total, done, failed) and the archive size
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        last = ExportProgress(total=len(entries))
+
+        def track(progress: ExportProgress) -> None:
+            nonlocal last
+            last = progress
+            if on_progress is not None:
+                on_progress(progress)
+
+        try:
+            with open(tmp_path, "wb") as archive_file:
+                async for chunk in InvoiceExportService.iter_zip(entries, render, track):
+                    archive_file.write(chunk)
+            os.replace(tmp_path, path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+        return {**last.as_dict(), "bytes": path.stat().st_size}
+
+    @staticmethod
+    def purge_exports(user_id: UUID) -> int:
+        """Delete a user's stored exports older than INVOICE_EXPORT_RETENTION_HOURS."""
+        directory = Path(settings.INVOICE_EXPORT_DIR) / str(user_id)
+        if not directory.is_dir():
+            return 0
+        cutoff = (datetime.now() - timedelta(hours=settings.INVOICE_EXPORT_RETENTION_HOURS)).timestamp()
+        purged = 0
+        for path in directory.glob("*.zip"):
+            if path.stat().st_mtime < cutoff:
+                path.unlink(missing_ok=True)
+                purged += 1
+        return purged
@@ -8,6 +8,7 @@ import logging
 
 from app.models.invoice import Invoice
 from app.schemas.invoice import InvoiceCreate, InvoiceUpdate, InvoiceFilter
+from app.services.reconciliation_index import OPEN_INVOICE_STATUSES, invoice_index_registry
 
 logger = logging.getLogger(__name__)
 
@@ -70,6 +71,8 @@ class InvoiceService:
         db.add(invoice)
         await db.flush()
         
+        invoice_index_registry.upsert_invoice_on_commit(db, invoice)
+        
         logger.info(f"Invoice created: {invoice.id} ({invoice.invoice_number}) for user {user_id}")
         return invoice
     
@@ -109,11 +112,28 @@ class InvoiceService:
         query = select(Invoice).where(
             and_(
                 Invoice.user_id == user_id,
-                Invoice.deleted_at.is_(None)
+                Invoice.deleted_at.is_(None),
+                *InvoiceService._filter_conditions(filters)
             )
         )
         
-        # Apply filters
+        # Count total
+        count_query = select(func.count()).select_from(query.subquery())
+        total_result = await db.execute(count_query)
+        total = total_result.scalar() or 0
+        
+        # Apply pagination
+        query = query.order_by(Invoice.due_date.desc())
+        query = query.offset((page - 1) * page_size).limit(page_size)
+        
+        result = await db.execute(query)
+        invoices = list(result.scalars().all())
+        
+        return invoices, total
+    
+    @staticmethod
+    def _filter_conditions(filters: InvoiceFilter) -> List:
+        """WHERE conditions of an InvoiceFilter"""
         conditions = []
         
         if filters.status:
@@ -139,22 +159,69 @@ class InvoiceService:
         if filters.max_amount is not None:
             conditions.append(Invoice.total_amount <= filters.max_amount)
         
-        if conditions:
-            query = query.where(and_(*conditions))
-        
-        # Count total
-        count_query = select(func.count()).select_from(query.subquery())
-        total_result = await db.execute(count_query)
-        total = total_result.scalar() or 0
+        return conditions
+    
+    @staticmethod
+    async def get_filtered_invoices(
+        db: AsyncSession,
+        user_id: UUID,
+        filters: InvoiceFilter,
+        limit: Optional[int] = None
+    ) -> List[Invoice]:
+        """
+        Every invoice matching filters (exports), oldest issue date first.
         
-        # Apply pagination
-        query = query.order_by(Invoice.due_date.desc())
-        query = query.offset((page - 1) * page_size).limit(page_size)
+        Args:
+            limit: Maximum number of invoices returned
+        """
+        query = (
+            select(Invoice)
+            .where(
+                and_(
+                    Invoice.user_id == user_id,
+                    Invoice.deleted_at.is_(None),
+                    *InvoiceService._filter_conditions(filters)
+                )
+            )
+            .order_by(Invoice.issue_date, Invoice.invoice_number)
+        )
+        if limit is not None:
+            query = query.limit(limit)
         
         result = await db.execute(query)
-        invoices = list(result.scalars().all())
+        return list(result.scalars().all())
+    
+    @staticmethod
+    async def get_open_invoices(
+        db: AsyncSession,
+        user_id: UUID,
+        invoice_ids: Optional[List[UUID]] = None
+    ) -> List[Invoice]:
+        """
+        Get all invoices that can still be reconciled (no pagination, no count).
         
-        return invoices, total
+        Args:
+            db: Database session
+            user_id: User ID
+            invoice_ids: Restrict to these invoices (optional)
+            
+        Returns:
+            Pending/overdue, unreconciled, non-deleted invoices
+        """
+        conditions = [
+            Invoice.user_id == user_id,
+            Invoice.status.in_(OPEN_INVOICE_STATUSES),
+            Invoice.is_reconciled.is_(False),
+            Invoice.deleted_at.is_(None)
+        ]
+        
+        if invoice_ids is not None:
+            if not invoice_ids:
+                return []
+            conditions.append(Invoice.id.in_(invoice_ids))
+        
+        result = await db.execute(select(Invoice).where(and_(*conditions)))
+        return list(result.scalars().all())
     
     @staticmethod
     async def update_invoice(
@@ -176,6 +243,8 @@ class InvoiceService:
         
         await db.flush()
         
+        invoice_index_registry.upsert_invoice_on_commit(db, invoice)
+        
         logger.info(f"Invoice updated: {invoice.id}")
         return invoice
     
@@ -190,6 +259,8 @@ class InvoiceService:
         invoice.payment_date = payment_date
         await db.flush()
         
+        invoice_index_registry.discard_invoice_on_commit(db, invoice.user_id, invoice.id)
+        
         logger.info(f"Invoice marked as paid: {invoice.id}")
         return invoice
     
@@ -202,6 +273,8 @@ class InvoiceService:
         invoice.deleted_at = datetime.utcnow()
         await db.flush()
         
+        invoice_index_registry.discard_invoice_on_commit(db, invoice.user_id, invoice.id)
+        
         logger.info(f"Invoice deleted: {invoice.id}")
     
     @staticmethod
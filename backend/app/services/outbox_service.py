@@ -0,0 +1,182 @@
+"""
+Transactional outbox: follow-up work recorded with the change that causes it.
+
+A service that changes data also adds an OutboxEvent to the same session, so
+the event is committed (or rolled back) with the change itself: no task runs
+before the rows it needs are visible, and no committed change loses its
+follow-up work because the broker was down. A relay (Celery task, kicked
+after commit and run periodically) publishes pending events in batches.
+
+Delivery is at least once: the downstream tasks are idempotent (they skip
+transactions that are already categorized or reconciled).
+"""
+from typing import Callable, Dict, Iterable, List, Mapping, Optional
+from datetime import datetime, timedelta
+from uuid import UUID
+import logging
+
+from sqlalchemy import and_, delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.core.metrics import get_counters
+from app.models.outbox_event import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+outbox_counters = get_counters("outbox")
+
+# Event types
+TRANSACTIONS_CREATED = "transactions.created"
+
+# Publishes a batch of events of one type (raises to have them retried)
+OutboxHandler = Callable[[List[OutboxEvent]], None]
+
+
+class OutboxService:
+    """Records outbox events and relays them to their handlers"""
+
+    @staticmethod
+    def add(
+        db: AsyncSession,
+        event_type: str,
+        payload: Dict,
+        user_id: Optional[UUID] = None
+    ) -> OutboxEvent:
+        """
+        Record an event in the caller's transaction (not flushed, not committed).
+
+        Args:
+            db: Session holding the domain change
+            event_type: Event type (TRANSACTIONS_CREATED, ...)
+            payload: JSON-serializable event data
+            user_id: Tenant the event belongs to
+
+        Returns:
+            Pending outbox event
+        """
+        event = OutboxEvent(event_type=event_type, payload=payload, user_id=user_id, attempts=0)
+        db.add(event)
+        outbox_counters.increment("recorded")
+        return event
+
+    @staticmethod
+    def record_new_transactions(
+        db: AsyncSession,
+        user_id: UUID,
+        transaction_ids: Iterable[UUID]
+    ) -> Optional[OutboxEvent]:
+        """Record a TRANSACTIONS_CREATED event (None if there are no ids)."""
+        transaction_ids = [str(transaction_id) for transaction_id in transaction_ids]
+        if not transaction_ids:
+            return None
+        return OutboxService.add(
+            db,
+            TRANSACTIONS_CREATED,
+            {"transaction_ids": transaction_ids},
+            user_id=user_id
+        )
+
+    @staticmethod
+    async def claim_pending(db: AsyncSession, limit: Optional[int] = None) -> List[OutboxEvent]:
+        """
+        Lock the oldest unpublished events.
+
+        FOR UPDATE SKIP LOCKED lets several relays run at once without
+        publishing the same event twice; events that failed
+        OUTBOX_MAX_ATTEMPTS times are left aside for inspection.
+        """
+        result = await db.execute(
+            select(OutboxEvent)
+            .where(
+                and_(
+                    OutboxEvent.published_at.is_(None),
+                    OutboxEvent.attempts < settings.OUTBOX_MAX_ATTEMPTS
+                )
+            )
+            .order_by(OutboxEvent.created_at)
+            .limit(limit or settings.OUTBOX_RELAY_BATCH_SIZE)
+            .with_for_update(skip_locked=True)
+        )
+        return list(result.scalars().all())
+
+    @staticmethod
+    async def relay(
+        db: AsyncSession,
+        handlers: Mapping[str, OutboxHandler],
+        limit: Optional[int] = None
+    ) -> Dict[str, int]:
+        """
+        Publish one batch of pending events.
+
+        Events are grouped by type and each group goes to its handler in one
+        call, so a handler can merge many small events into a few tasks. A
+        group whose handler fails stays pending (attempts and last_error are
+        recorded) without holding back the other groups. The caller commits.
+
+        Args:
+            db: Database session
+            handlers: Event type → handler
+            limit: Batch size (default: OUTBOX_RELAY_BATCH_SIZE)
+
+        Returns:
+            Dict with events, published and failed counts
+        """
+        events = await OutboxService.claim_pending(db, limit)
+
+        by_type: Dict[str, List[OutboxEvent]] = {}
+        for event in events:
+            by_type.setdefault(event.event_type, []).append(event)
+
+        now = datetime.utcnow()
+        published = failed = 0
+        for event_type, group in by_type.items():
+            try:
+                handler = handlers.get(event_type)
+                if handler is None:
+                    raise LookupError(f"No outbox handler for {event_type}")
+                handler(group)
+            except Exception as e:
+                logger.error(f"Failed to publish {len(group)} '{event_type}' outbox events: {e}")
+                for event in group:
+                    event.attempts += 1
+                    event.last_error = str(e)[:1000]
+                failed += len(group)
+                continue
+            for event in group:
+                event.attempts += 1
+                event.published_at = now
+            published += len(group)
+
+        await db.flush()
+        outbox_counters.increment("published", published)
+        outbox_counters.increment("failed", failed)
+        return {"events": len(events), "published": published, "failed": failed}
+
+    @staticmethod
+    async def purge_published(db: AsyncSession, older_than: Optional[timedelta] = None) -> int:
+        """Delete events published more than OUTBOX_RETENTION_HOURS ago."""
+        cutoff = datetime.utcnow() - (older_than or timedelta(hours=settings.OUTBOX_RETENTION_HOURS))
+        result = await db.execute(
+            delete(OutboxEvent).where(
+                and_(
+                    OutboxEvent.published_at.is_not(None),
+                    OutboxEvent.published_at < cutoff
+                )
+            )
+        )
+        return result.rowcount or 0
+
+    @staticmethod
+    async def get_backlog(db: AsyncSession) -> Dict[str, int]:
+        """Pending events, and events given up after OUTBOX_MAX_ATTEMPTS."""
+        result = await db.execute(
+            select(
+                (OutboxEvent.attempts >= settings.OUTBOX_MAX_ATTEMPTS).label("dead"),
+                func.count()
+            )
+            .where(OutboxEvent.published_at.is_(None))
+            .group_by("dead")
+        )
+        counts = {bool(dead): count for dead, count in result.all()}
+        return {"pending": counts.get(False, 0), "dead": counts.get(True, 0)}
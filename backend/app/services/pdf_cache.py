@@ -0,0 +1,158 @@
+"""
+Content-addressed cache of rendered invoice PDFs.
+
+The key is a hash of everything an invoice PDF shows (invoice fields and
+items, company details, updated_at) and of the template version: editing an
+invoice, the company or the template makes a new key, so stale PDFs are
+never read again and simply age out of the size-bounded store.
+"""
+from typing import Dict, Iterable, Optional
+from pathlib import Path
+import hashlib
+import json
+import logging
+import os
+
+from app.config import settings
+from app.core.metrics import get_counters
+
+logger = logging.getLogger(__name__)
+
+pdf_counters = get_counters("pdf")
+
+# What the invoice template reads (missing attributes stay undefined)
+INVOICE_FIELDS = (
+    "id", "invoice_number", "status", "client_name", "client_email", "client_address",
+    "issue_date", "due_date", "payment_terms", "payment_instructions", "currency",
+    "subtotal", "tax_rate", "tax_amount", "discount_amount", "total_amount", "notes",
+    "items", "updated_at",
+)
+ITEM_FIELDS = ("description", "details", "quantity", "unit_price")
+USER_FIELDS = ("company_name", "email", "phone", "address")
+
+# Eviction deletes the least recently used PDFs down to this share of the limit
+EVICTION_TARGET = 0.9
+
+
+def _fields(obj, names: Iterable[str]) -> Dict:
+    if isinstance(obj, dict):
+        return {name: obj[name] for name in names if name in obj}
+    return {name: getattr(obj, name) for name in names if hasattr(obj, name)}
+
+
+def invoice_snapshot(invoice, user) -> Dict:
+    """
+    Plain-data copy of what an invoice PDF shows.
+
+    Rendering from the snapshot needs no database session, and the
+    snapshot is the content the cache key is computed from.
+    """
+    invoice_data = _fields(invoice, INVOICE_FIELDS)
+    if "items" in invoice_data:
+        invoice_data["items"] = [_fields(item, ITEM_FIELDS) for item in invoice_data["items"] or []]
+    return {"invoice": invoice_data, "user": _fields(user, USER_FIELDS)}
+
+
+def pdf_cache_key(snapshot: Dict, template_version: str) -> str:
+    """SHA-256 of a snapshot and the template version"""
+    encoded = json.dumps(
+        {"template_version": template_version, **snapshot},
+        sort_keys=True,
+        default=str
+    )
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class PDFCache:
+    """
+    Rendered PDFs on disk: `<root>/<key[:2]>/<key>.pdf`, at most `max_bytes` in total.
+
+    A hit touches the file; when a write takes the cache over `max_bytes`,
+    the least recently used PDFs are deleted. Several processes can share
+    the directory: writes are atomic and eviction rescans it.
+    """
+
+    def __init__(self, root: str, max_bytes: int):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        # Bytes stored, as known by this process (None until first scanned)
+        self._size: Optional[int] = None
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.pdf"
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Cached PDF, or None"""
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+        except FileNotFoundError:
+            pdf_counters.increment("cache_misses")
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        pdf_counters.increment("cache_hits")
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        """Store a PDF, evicting old ones if the cache gets too big."""
+        if len(data) > self.max_bytes:
+            return
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+
+        if self._size is None:
+            self._size = self.size()
+        else:
+            self._size += len(data)
+        if self._size > self.max_bytes:
+            self.evict()
+
+    def size(self) -> int:
+        """Bytes stored (scans the directory)"""
+        return sum(path.stat().st_size for path in self.root.glob("*/*.pdf"))
+
+    def evict(self) -> int:
+        """
+        Delete the least recently used PDFs down to EVICTION_TARGET of max_bytes.
+
+        Returns:
+            Number of PDFs deleted
+        """
+        entries = []
+        for path in self.root.glob("*/*.pdf"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * EVICTION_TARGET
+        evicted = 0
+        for _, size, path in entries:
+            if total <= target:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            evicted += 1
+
+        self._size = total
+        if evicted:
+            pdf_counters.increment("cache_evictions", evicted)
+            logger.info(f"Evicted {evicted} cached PDFs ({total} bytes left)")
+        return evicted
+
+    def clear(self) -> None:
+        for path in self.root.glob("*/*.pdf"):
+            path.unlink(missing_ok=True)
+        self._size = 0
+
+
+pdf_cache = PDFCache(settings.PDF_CACHE_DIR, settings.PDF_CACHE_MAX_BYTES)
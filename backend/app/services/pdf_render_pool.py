@@ -0,0 +1,228 @@
+"""
+Process pool for invoice PDF rendering.
+
+A WeasyPrint layout is CPU-bound and holds the GIL: run inside an async
+route it stalls every other request of the uvicorn worker. Renders run in a
+pool of PDF_POOL_WORKERS processes instead, started with
+PDF_POOL_START_METHOD ("spawn" by default, so workers inherit neither the
+event loop nor database connections). Each worker compiles the template,
+parses the stylesheet and loads fonts once, with a warm-up render, before
+taking work.
+
+At most PDF_POOL_MAX_PENDING renders are queued or running per process;
+beyond that `render` raises PDFPoolBusy (the API answers 503) rather than
+queueing work the client will have given up on.
+"""
+from typing import Callable, Deque, Dict, Optional
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import asyncio
+import logging
+import multiprocessing
+import threading
+import time
+
+from app.config import settings
+from app.core.metrics import get_counters
+
+logger = logging.getLogger(__name__)
+
+pool_counters = get_counters("pdf.pool")
+
+# Render and latency samples kept for the percentiles of `stats`
+TIMING_SAMPLES = 1000
+
+
+class PDFPoolBusy(Exception):
+    """Too many PDF renders queued in this process"""
+    pass
+
+
+def _warm_worker() -> None:
+    """Pool initializer: load the template, stylesheet and fonts of the worker."""
+    from app.services.pdf_service import warm_up_renderer
+
+    warm_up_renderer()
+
+
+def _ping() -> None:
+    pass
+
+
+def _render_in_worker(snapshot: Dict):
+    """Render an invoice snapshot; returns (pdf bytes, render seconds)."""
+    from app.services.pdf_service import PDFService
+
+    started = time.perf_counter()
+    pdf_bytes = PDFService.render_invoice_pdf(snapshot)
+    return pdf_bytes, time.perf_counter() - started
+
+
+def _percentiles(samples) -> Dict[str, float]:
+    values = sorted(samples)
+    if not values:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0}
+    return {
+        name: round(values[min(len(values) - 1, int(len(values) * share))] * 1000, 1)
+        for name, share in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99))
+    }
+
+
+class PDFRenderPool:
+    """Per-process pool of warm PDF rendering workers with bounded pending work"""
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        max_pending: Optional[int] = None,
+        initializer: Optional[Callable[[], None]] = _warm_worker
+    ):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.initializer = initializer
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._render_times: Deque[float] = deque(maxlen=TIMING_SAMPLES)
+        self._latencies: Deque[float] = deque(maxlen=TIMING_SAMPLES)
+
+    def _worker_count(self) -> int:
+        return self.workers or settings.PDF_POOL_WORKERS
+
+    def _max_pending(self) -> int:
+        return self.max_pending or settings.PDF_POOL_MAX_PENDING
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self._worker_count(),
+                    mp_context=multiprocessing.get_context(settings.PDF_POOL_START_METHOD),
+                    initializer=self.initializer
+                )
+            return self._executor
+
+    async def warm(self) -> None:
+        """Start every worker now (startup hook) instead of on the first renders."""
+        executor = self._get_executor()
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        try:
+            await asyncio.gather(*(
+                loop.run_in_executor(executor, _ping)
+                for _ in range(self._worker_count())
+            ))
+        except BrokenProcessPool:
+            # The warm-up failed in the workers: retried on first use
+            await self.close()
+            raise
+        logger.info(
+            f"PDF render pool ready: {self._worker_count()} workers "
+            f"in {time.perf_counter() - started:.1f}s"
+        )
+
+    async def run(self, fn: Callable, *args):
+        """
+        Run `fn(*args)` in a worker process.
+
+        Raises:
+            PDFPoolBusy: PDF_POOL_MAX_PENDING calls already queued or running
+            TimeoutError: No result within PDF_RENDER_TIMEOUT_SECONDS
+        """
+        with self._lock:
+            if self._pending >= self._max_pending():
+                pool_counters.increment("rejected")
+                raise PDFPoolBusy(f"{self._pending} PDF renders pending")
+            self._pending += 1
+
+        started = time.perf_counter()
+        executor = None
+        try:
+            executor = self._get_executor()
+            future = executor.submit(fn, *args)
+        except BaseException as e:
+            self._release()
+            if isinstance(e, BrokenProcessPool):
+                self._reset(executor)
+            raise
+        # The slot is held until the worker is done, not until the caller
+        # gives up: a timed-out render still occupies its worker
+        future.add_done_callback(self._release)
+
+        try:
+            result = await asyncio.wait_for(
+                asyncio.wrap_future(future),
+                timeout=settings.PDF_RENDER_TIMEOUT_SECONDS
+            )
+        except BrokenProcessPool:
+            self._reset(executor)
+            raise
+        except asyncio.TimeoutError:
+            pool_counters.increment("timeouts")
+            raise
+
+        self._latencies.append(time.perf_counter() - started)
+        pool_counters.increment("completed")
+        return result
+
+    def _release(self, _future=None) -> None:
+        with self._lock:
+            self._pending -= 1
+
+    def _reset(self, executor: Optional[ProcessPoolExecutor]) -> None:
+        """A worker died (e.g. killed for memory): start a new pool next time."""
+        logger.error("PDF render pool broken, restarting it")
+        pool_counters.increment("broken")
+        with self._lock:
+            if executor is not None and self._executor is executor:
+                self._executor = None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    async def render(self, snapshot: Dict) -> bytes:
+        """
+        Render an invoice snapshot (see invoice_snapshot) in the pool.
+
+        Raises:
+            PDFPoolBusy: Too many renders pending
+            ValueError: Rendering failed
+        """
+        try:
+            pdf_bytes, render_seconds = await self.run(_render_in_worker, snapshot)
+        except asyncio.TimeoutError:
+            raise ValueError("PDF generation timed out")
+        except BrokenProcessPool as e:
+            raise ValueError(f"PDF generation failed: {e}")
+        self._render_times.append(render_seconds)
+        return pdf_bytes
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def stats(self) -> Dict:
+        """
+        Pool size, pending renders, counters and, over the last renders:
+
+        - render_ms: time spent rendering in the worker
+        - latency_ms: time from submission to result (queueing included)
+        """
+        return {
+            "workers": self._worker_count(),
+            "pending": self._pending,
+            "max_pending": self._max_pending(),
+            **pool_counters.snapshot(),
+            "render_ms": _percentiles(list(self._render_times)),
+            "latency_ms": _percentiles(list(self._latencies)),
+        }
+
+    async def close(self) -> None:
+        """Stop the workers (shutdown hook); the pool restarts on next use."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+pdf_render_pool = PDFRenderPool()
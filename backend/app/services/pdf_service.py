@@ -1,14 +1,29 @@
-"""PDF Generation service for invoices"""
-from typing import Optional
-from io import BytesIO
-from datetime import datetime
+"""
+PDF Generation service for invoices
+
+The template is compiled, and its stylesheet parsed (with the font
+configuration), once per process. Rendered PDFs are kept in the
+content-addressed PDF cache: downloading an unchanged invoice again reads
+the file instead of running a WeasyPrint layout. Async callers render in
+the PDF process pool (see pdf_render_pool) to keep the event loop free.
+"""
+from typing import Dict, Optional, Tuple
+from functools import lru_cache
+from types import SimpleNamespace
+import asyncio
+import hashlib
 import logging
+import time
 
 from weasyprint import HTML, CSS
-from jinja2 import Template
+from weasyprint.text.fonts import FontConfiguration
+from jinja2 import Environment, Template
 
+from app.config import settings
 from app.models.invoice import Invoice
 from app.models.user import User
+from app.services.pdf_cache import invoice_snapshot, pdf_cache, pdf_cache_key, pdf_counters
+from app.services.pdf_render_pool import pdf_render_pool
 
 logger = logging.getLogger(__name__)
 
@@ -16,6 +31,143 @@ logger = logging.getLogger(__name__)
 class PDFService:
     """Service for generating PDF documents"""
     
+    # Stylesheet of the invoice template (parsed once per process)
+    INVOICE_CSS = """
+    @page {
+        size: A4;
+        margin: 2cm;
+    }
+    body {
+        font-family: 'Helvetica', 'Arial', sans-serif;
+        font-size: 11pt;
+        color: #333;
+        line-height: 1.6;
+    }
+    .header {
+        display: flex;
+        justify-content: space-between;
+        margin-bottom: 40px;
+        padding-bottom: 20px;
+        border-bottom: 2px solid #4F46E5;
+    }
+    .company-info {
+        flex: 1;
+    }
+    .company-name {
+        font-size: 24pt;
+        font-weight: bold;
+        color: #4F46E5;
+        margin-bottom: 10px;
+    }
+    .invoice-info {
+        text-align: right;
+    }
+    .invoice-title {
+        font-size: 28pt;
+        font-weight: bold;
+        color: #4F46E5;
+        margin-bottom: 10px;
+    }
+    .invoice-number {
+        font-size: 14pt;
+        color: #666;
+    }
+    .parties {
+        display: flex;
+        justify-content: space-between;
+        margin-bottom: 40px;
+    }
+    .party {
+        flex: 1;
+        padding: 20px;
+        background: #F9FAFB;
+        border-radius: 8px;
+    }
+    .party + .party {
+        margin-left: 20px;
+    }
+    .party-title {
+        font-weight: bold;
+        font-size: 12pt;
+        color: #4F46E5;
+        margin-bottom: 10px;
+    }
+    .party-details {
+        font-size: 10pt;
+        color: #666;
+    }
+    table {
+        width: 100%;
+        border-collapse: collapse;
+        margin-bottom: 30px;
+    }
+    thead {
+        background: #4F46E5;
+        color: white;
+    }
+    th {
+        padding: 12px;
+        text-align: left;
+        font-weight: bold;
+    }
+    td {
+        padding: 12px;
+        border-bottom: 1px solid #E5E7EB;
+    }
+    .text-right {
+        text-align: right;
+    }
+    .totals {
+        margin-left: auto;
+        width: 300px;
+    }
+    .total-row {
+        display: flex;
+        justify-content: space-between;
+        padding: 10px 0;
+    }
+    .total-row.grand-total {
+        border-top: 2px solid #4F46E5;
+        font-size: 14pt;
+        font-weight: bold;
+        color: #4F46E5;
+        margin-top: 10px;
+        padding-top: 15px;
+    }
+    .payment-info {
+        margin-top: 40px;
+        padding: 20px;
+        background: #FEF3C7;
+        border-left: 4px solid #F59E0B;
+        border-radius: 4px;
+    }
+    .payment-title {
+        font-weight: bold;
+        color: #92400E;
+        margin-bottom: 10px;
+    }
+    .footer {
+        margin-top: 60px;
+        padding-top: 20px;
+        border-top: 1px solid #E5E7EB;
+        text-align: center;
+        font-size: 9pt;
+        color: #9CA3AF;
+    }
+    .status-badge {
+        display: inline-block;
+        padding: 6px 12px;
+        border-radius: 4px;
+        font-size: 10pt;
+        font-weight: bold;
+        text-transform: uppercase;
+    }
+    .status-pending { background: #FEF3C7; color: #92400E; }
+    .status-paid { background: #D1FAE5; color: #065F46; }
+    .status-overdue { background: #FEE2E2; color: #991B1B; }
+    .status-cancelled { background: #F3F4F6; color: #374151; }
+    """
+    
     # HTML template for invoice
     INVOICE_TEMPLATE = """
     <!DOCTYPE html>
@@ -23,141 +175,6 @@ class PDFService:
     <head>
         <meta charset="utf-8">
         <title>Facture {{ invoice.invoice_number }}</title>
-        <style>
-            @page {
-                size: A4;
-                margin: 2cm;
-            }
-            body {
-                font-family: 'Helvetica', 'Arial', sans-serif;
-                font-size: 11pt;
-                color: #333;
-                line-height: 1.6;
-            }
-            .header {
-                display: flex;
-                justify-content: space-between;
-                margin-bottom: 40px;
-                padding-bottom: 20px;
-                border-bottom: 2px solid #4F46E5;
-            }
-            .company-info {
-                flex: 1;
-            }
-            .company-name {
-                font-size: 24pt;
-                font-weight: bold;
-                color: #4F46E5;
-                margin-bottom: 10px;
-            }
-            .invoice-info {
-                text-align: right;
-            }
-            .invoice-title {
-                font-size: 28pt;
-                font-weight: bold;
-                color: #4F46E5;
-                margin-bottom: 10px;
-            }
-            .invoice-number {
-                font-size: 14pt;
-                color: #666;
-            }
-            .parties {
-                display: flex;
-                justify-content: space-between;
-                margin-bottom: 40px;
-            }
-            .party {
-                flex: 1;
-                padding: 20px;
-                background: #F9FAFB;
-                border-radius: 8px;
-            }
-            .party + .party {
-                margin-left: 20px;
-            }
-            .party-title {
-                font-weight: bold;
-                font-size: 12pt;
-                color: #4F46E5;
-                margin-bottom: 10px;
-            }
-            .party-details {
-                font-size: 10pt;
-                color: #666;
-            }
-            table {
-                width: 100%;
-                border-collapse: collapse;
-                margin-bottom: 30px;
-            }
-            thead {
-                background: #4F46E5;
-                color: white;
-            }
-            th {
-                padding: 12px;
-                text-align: left;
-                font-weight: bold;
-            }
-            td {
-                padding: 12px;
-                border-bottom: 1px solid #E5E7EB;
-            }
-            .text-right {
-                text-align: right;
-            }
-            .totals {
-                margin-left: auto;
-                width: 300px;
-            }
-            .total-row {
-                display: flex;
-                justify-content: space-between;
-                padding: 10px 0;
-            }
-            .total-row.grand-total {
-                border-top: 2px solid #4F46E5;
-                font-size: 14pt;
-                font-weight: bold;
-                color: #4F46E5;
-                margin-top: 10px;
-                padding-top: 15px;
-            }
-            .payment-info {
-                margin-top: 40px;
-                padding: 20px;
-                background: #FEF3C7;
-                border-left: 4px solid #F59E0B;
-                border-radius: 4px;
-            }
-            .payment-title {
-                font-weight: bold;
-                color: #92400E;
-                margin-bottom: 10px;
-            }
-            .footer {
-                margin-top: 60px;
-                padding-top: 20px;
-                border-top: 1px solid #E5E7EB;
-                text-align: center;
-                font-size: 9pt;
-                color: #9CA3AF;
-            }
-            .status-badge {
-                display: inline-block;
-                padding: 6px 12px;
-                border-radius: 4px;
-                font-size: 10pt;
-                font-weight: bold;
-                text-transform: uppercase;
-            }
-            .status-pending { background: #FEF3C7; color: #92400E; }
-            .status-paid { background: #D1FAE5; color: #065F46; }
-            .status-overdue { background: #FEE2E2; color: #991B1B; }
-            .status-cancelled { background: #F3F4F6; color: #374151; }
-        </style>
     </head>
     <body>
         <!-- Header -->
@@ -273,13 +290,18 @@ class PDFService:
 
         <!-- Footer -->
         <div class="footer">
-            Document généré le {{ now.strftime('%d/%m/%Y à %H:%M') }}<br>
+            {% if invoice.updated_at %}Document mis à jour le {{ invoice.updated_at.strftime('%d/%m/%Y à %H:%M') }}<br>{% endif %}
             {{ user.company_name }} - {{ user.email }}
         </div>
     </body>
     </html>
     """
     
+    # Part of the PDF cache key: changes with the template or the stylesheet
+    TEMPLATE_VERSION = hashlib.sha256(
+        (INVOICE_TEMPLATE + INVOICE_CSS).encode("utf-8")
+    ).hexdigest()[:16]
+    
     @staticmethod
     def generate_invoice_pdf(
         invoice: Invoice,
@@ -288,6 +310,10 @@ class PDFService:
         """
         Generate PDF for an invoice.
         
+        Served from the PDF cache when the invoice, the company details and
+        the template are unchanged since the last render. Renders in the
+        calling thread: async code uses get_invoice_pdf.
+        
         Args:
             invoice: Invoice object
             user: User object (company info)
@@ -295,28 +321,107 @@ class PDFService:
         Returns:
             PDF file as bytes
         """
+        snapshot = invoice_snapshot(invoice, user)
+        key, cached = PDFService._cached_pdf(snapshot)
+        if cached is not None:
+            return cached
+        
+        pdf_bytes = PDFService.render_invoice_pdf(snapshot)
+        PDFService._store_pdf(key, pdf_bytes)
+        return pdf_bytes
+    
+    @staticmethod
+    async def get_invoice_pdf(
+        invoice: Invoice,
+        user: User
+    ) -> bytes:
+        """
+        Generate PDF for an invoice without blocking the event loop.
+        
+        Same cache as generate_invoice_pdf; a miss is rendered in the PDF
+        process pool.
+        
+        Raises:
+            PDFPoolBusy: Too many renders pending in this process
+            ValueError: Rendering failed
+        """
+        return await PDFService.get_snapshot_pdf(invoice_snapshot(invoice, user))
+    
+    @staticmethod
+    async def get_snapshot_pdf(snapshot: Dict) -> bytes:
+        """get_invoice_pdf for an invoice snapshot (see invoice_snapshot)"""
+        # Cache reads and writes are disk I/O: kept off the event loop too
+        key, cached = await asyncio.to_thread(PDFService._cached_pdf, snapshot)
+        if cached is not None:
+            return cached
+        
+        pdf_bytes = await pdf_render_pool.render(snapshot)
+        await asyncio.to_thread(PDFService._store_pdf, key, pdf_bytes)
+        return pdf_bytes
+    
+    @staticmethod
+    def get_stats() -> Dict:
+        """Render pool and cache statistics of the current process"""
+        cache = pdf_counters.snapshot()
+        lookups = cache.get("cache_hits", 0) + cache.get("cache_misses", 0)
+        return {
+            "pool": pdf_render_pool.stats(),
+            "cache": {
+                **cache,
+                "hit_ratio": round(cache.get("cache_hits", 0) / lookups, 4) if lookups else 0.0,
+            },
+        }
+    
+    @staticmethod
+    def _cached_pdf(snapshot: Dict) -> Tuple[Optional[str], Optional[bytes]]:
+        """(cache key, cached PDF or None); no key when the cache is disabled"""
+        if not settings.PDF_CACHE_ENABLED:
+            return None, None
+        key = pdf_cache_key(snapshot, PDFService.TEMPLATE_VERSION)
+        try:
+            return key, pdf_cache.get(key)
+        except OSError as e:
+            logger.warning(f"PDF cache read failed: {e}")
+            return key, None
+    
+    @staticmethod
+    def _store_pdf(key: Optional[str], pdf_bytes: bytes) -> None:
+        if key is None:
+            return
+        try:
+            pdf_cache.put(key, pdf_bytes)
+        except OSError as e:
+            logger.warning(f"PDF cache write failed: {e}")
+    
+    @staticmethod
+    def render_invoice_pdf(snapshot: Dict) -> bytes:
+        """
+        Render the PDF of an invoice snapshot (see invoice_snapshot), uncached.
+        
+        Raises:
+            ValueError: Rendering failed
+        """
+        invoice_id = snapshot["invoice"].get("id")
         try:
-            # Prepare template data
-            template_data = {
-                "invoice": invoice,
-                "user": user,
-                "now": datetime.utcnow(),
-            }
-            
-            # Render HTML from template
-            template = Template(PDFService.INVOICE_TEMPLATE)
-            html_content = template.render(**template_data)
-            
-            # Generate PDF
-            pdf_file = BytesIO()
-            HTML(string=html_content).write_pdf(pdf_file)
-            pdf_bytes = pdf_file.getvalue()
+            started = time.perf_counter()
+            html_content = get_invoice_template().render(
+                invoice=SimpleNamespace(**snapshot["invoice"]),
+                user=SimpleNamespace(**snapshot["user"])
+            )
+            pdf_bytes = HTML(string=html_content).write_pdf(
+                stylesheets=[get_invoice_stylesheet()],
+                font_config=get_font_config()
+            )
+            pdf_counters.increment("rendered")
             
-            logger.info(f"Generated PDF for invoice {invoice.id} ({len(pdf_bytes)} bytes)")
+            logger.info(
+                f"Generated PDF for invoice {invoice_id} ({len(pdf_bytes)} bytes, "
+                f"{(time.perf_counter() - started) * 1000:.0f}ms)"
+            )
             return pdf_bytes
             
         except Exception as e:
-            logger.error(f"Failed to generate PDF for invoice {invoice.id}: {e}")
+            logger.error(f"Failed to generate PDF for invoice {invoice_id}: {e}")
             raise ValueError(f"PDF generation failed: {e}")
     
     @staticmethod
@@ -337,3 +442,29 @@ class PDFService:
         
         return f"Facture_{invoice.invoice_number}_{safe_client_name}.pdf"
 
+
+@lru_cache(maxsize=1)
+def get_invoice_template() -> Template:
+    """The invoice template, compiled once per process"""
+    return Environment().from_string(PDFService.INVOICE_TEMPLATE)
+
+
+@lru_cache(maxsize=1)
+def get_font_config() -> FontConfiguration:
+    """WeasyPrint font configuration (font discovery runs once per process)"""
+    return FontConfiguration()
+
+
+@lru_cache(maxsize=1)
+def get_invoice_stylesheet() -> CSS:
+    """The invoice stylesheet, parsed once per process"""
+    return CSS(string=PDFService.INVOICE_CSS, font_config=get_font_config())
+
+
+def warm_up_renderer() -> None:
+    """Compile the template, parse the stylesheet and load fonts (PDF pool workers)."""
+    get_invoice_template()
+    HTML(string="<p>FACTURE 0123456789 €</p>").write_pdf(
+        stylesheets=[get_invoice_stylesheet()],
+        font_config=get_font_config()
+    )
@@ -0,0 +1,195 @@
+"""Optimal one-to-one assignment of reconciliation candidates"""
+from typing import Dict, Hashable, List, Sequence, Tuple
+from decimal import Decimal
+import heapq
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Scores are compared on this integer grid (0.0001 resolution)
+SCORE_SCALE = 10000
+
+_INF = float("inf")
+
+
+def _find(parent: List[int], node: int) -> int:
+    """Union-find root lookup with path halving."""
+    while parent[node] != node:
+        parent[node] = parent[parent[node]]
+        node = parent[node]
+    return node
+
+
+def _components(
+    n_rows: int,
+    n_cols: int,
+    edges: Dict[Tuple[int, int], int]
+) -> List[List[Tuple[int, int, int]]]:
+    """Split the candidate graph into independent connected components."""
+    parent = list(range(n_rows + n_cols))
+    for row, col in edges:
+        a, b = _find(parent, row), _find(parent, n_rows + col)
+        if a != b:
+            parent[a] = b
+
+    groups: Dict[int, List[Tuple[int, int, int]]] = {}
+    for (row, col), weight in edges.items():
+        groups.setdefault(_find(parent, row), []).append((row, col, weight))
+    return list(groups.values())
+
+
+def _solve_component(component: List[Tuple[int, int, int]]) -> List[Tuple[int, int]]:
+    """
+    Maximum-weight matching of one connected component.
+
+    Trivial shapes (one row or one column) take the best edge. Otherwise the
+    component is solved as a min-cost rectangular assignment (cost = -weight)
+    by successive shortest augmenting paths with column potentials:
+
+    - every row may stay unmatched through a private zero-cost dummy column,
+      so each row always has a free column to reach
+    - each new row runs a Dijkstra over reduced costs that stops at the first
+      free column; the search never goes past "leave this row unmatched",
+      which keeps it local on sparse candidate graphs
+    """
+    rows = sorted({row for row, _, _ in component})
+    cols = sorted({col for _, col, _ in component})
+
+    if len(rows) == 1 or len(cols) == 1:
+        row, col, _ = max(component, key=lambda edge: edge[2])
+        return [(row, col)]
+
+    row_pos = {row: i for i, row in enumerate(rows)}
+    col_pos = {col: j for j, col in enumerate(cols)}
+    n_rows, n_cols = len(rows), len(cols)
+    size = n_cols + n_rows
+
+    # Columns 0..n_cols-1 are real; n_cols + i is the dummy column of row i
+    adjacency: List[List[Tuple[int, int]]] = [[] for _ in range(n_rows)]
+    for row, col, weight in component:
+        adjacency[row_pos[row]].append((col_pos[col], -weight))
+    for i in range(n_rows):
+        adjacency[i].append((n_cols + i, 0))
+
+    potentials = [0] * size
+    owner = [-1] * size
+    row_col = [-1] * n_rows
+    row_cost = [0] * n_rows
+    dist = [_INF] * size
+    pred = [-1] * size
+    scanned = [False] * size
+
+    # Rows with the best edges first: their paths are found with the least rerouting
+    order = sorted(range(n_rows), key=lambda i: min(cost for _, cost in adjacency[i]))
+
+    for start in order:
+        touched: List[int] = []
+        heap: List[Tuple[int, int]] = []
+        for col, cost in adjacency[start]:
+            value = cost - potentials[col]
+            if value < dist[col]:
+                touched.append(col)
+                dist[col] = value
+                pred[col] = start
+                heap.append((value, col))
+        heapq.heapify(heap)
+
+        done: List[int] = []
+        while True:
+            value, col = heapq.heappop(heap)
+            if scanned[col] or value > dist[col]:
+                continue
+            scanned[col] = True
+            done.append(col)
+
+            row = owner[col]
+            if row == -1:
+                free_col = col
+                break
+
+            # Reduced cost of (row, other) relative to the row's current column
+            offset = value - row_cost[row] + potentials[col]
+            for other, cost in adjacency[row]:
+                if scanned[other]:
+                    continue
+                candidate = offset + cost - potentials[other]
+                if candidate < dist[other]:
+                    if dist[other] == _INF:
+                        touched.append(other)
+                    dist[other] = candidate
+                    pred[other] = row
+                    heapq.heappush(heap, (candidate, other))
+
+        # Keep reduced costs non-negative for the next search
+        for col in done:
+            potentials[col] += dist[col] - value
+            scanned[col] = False
+
+        # Flip the augmenting path back to the new row
+        col = free_col
+        while True:
+            row = pred[col]
+            previous = row_col[row]
+            row_col[row] = col
+            owner[col] = row
+            row_cost[row] = next(cost for other, cost in adjacency[row] if other == col)
+            if row == start:
+                break
+            col = previous
+
+        for col in touched:
+            dist[col] = _INF
+
+    return [
+        (rows[i], cols[row_col[i]])
+        for i in range(n_rows)
+        if row_col[i] < n_cols
+    ]
+
+
+def solve_assignment(
+    candidates: Sequence[Tuple[Hashable, Hashable, Decimal]],
+    scale: int = SCORE_SCALE
+) -> List[Tuple[Hashable, Hashable]]:
+    """
+    Pick the one-to-one pairs that maximize the total match score.
+
+    Each row (transaction) and each column (invoice) is used at most once;
+    rows or columns may stay unmatched. The candidate graph is sparse, so it
+    is split into connected components solved independently, each with a
+    shortest-augmenting-path (Hungarian) solver.
+
+    Args:
+        candidates: (row key, column key, score) triples; duplicates keep the best score
+        scale: Scores are rounded to integers after multiplying by this factor
+
+    Returns:
+        List of (row key, column key) pairs
+    """
+    row_ids: Dict[Hashable, int] = {}
+    col_ids: Dict[Hashable, int] = {}
+    row_keys: List[Hashable] = []
+    col_keys: List[Hashable] = []
+    edges: Dict[Tuple[int, int], int] = {}
+
+    for row_key, col_key, score in candidates:
+        weight = int(round(score * scale))
+        if weight <= 0:
+            continue
+        row = row_ids.get(row_key)
+        if row is None:
+            row = row_ids[row_key] = len(row_keys)
+            row_keys.append(row_key)
+        col = col_ids.get(col_key)
+        if col is None:
+            col = col_ids[col_key] = len(col_keys)
+            col_keys.append(col_key)
+        if weight > edges.get((row, col), 0):
+            edges[(row, col)] = weight
+
+    pairs: List[Tuple[Hashable, Hashable]] = []
+    for component in _components(len(row_keys), len(col_keys), edges):
+        pairs.extend(
+            (row_keys[row], col_keys[col]) for row, col in _solve_component(component)
+        )
+    return pairs
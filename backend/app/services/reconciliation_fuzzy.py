@@ -0,0 +1,140 @@
+"""Local fuzzy scoring of reconciliation candidates, ahead of the AI fallback"""
+from typing import FrozenSet, List, Optional
+from dataclasses import dataclass
+from decimal import Decimal
+from functools import lru_cache
+import logging
+
+from app.config import settings
+from app.models.transaction import Transaction
+from app.services.reconciliation_index import (
+    InvoiceCandidate,
+    InvoiceCandidateIndex,
+    compact,
+    to_cents,
+)
+
+logger = logging.getLogger(__name__)
+
+# Weights of the three signals in the final score (sum to 1)
+TEXT_WEIGHT = 0.45
+AMOUNT_WEIGHT = 0.40
+DATE_WEIGHT = 0.15
+
+
+@dataclass(frozen=True)
+class FuzzyMatch:
+    """A candidate scored by the local matcher"""
+    candidate: InvoiceCandidate
+    score: Decimal
+    reasoning: str
+
+
+@lru_cache(maxsize=20000)
+def trigrams(text: str) -> FrozenSet[str]:
+    """Character trigrams of a compacted string ("acme" → {"acm", "cme"})."""
+    if len(text) < 3:
+        return frozenset([text]) if text else frozenset()
+    return frozenset(text[i:i + 3] for i in range(len(text) - 2))
+
+
+def containment(needle: str, haystack: FrozenSet[str]) -> float:
+    """
+    Share of the needle's trigrams found in the haystack trigrams.
+
+    Containment rather than Jaccard: bank descriptions are much longer than the
+    client name or invoice number they contain.
+    """
+    grams = trigrams(needle)
+    if not grams:
+        return 0.0
+    return len(grams & haystack) / len(grams)
+
+
+def score_candidate(
+    transaction: Transaction,
+    candidate: InvoiceCandidate,
+    description_grams: Optional[FrozenSet[str]] = None
+) -> FuzzyMatch:
+    """
+    Score one invoice against a transaction.
+
+    - text: trigram containment of the client name or invoice number in the
+      description (typos and truncations keep most trigrams)
+    - amount: 1 on exact amount, down to 0 at RECONCILIATION_AMOUNT_TOLERANCE
+    - date: 1 on the due date, down to 0 at RECONCILIATION_FUZZY_DATE_WINDOW_DAYS
+
+    Args:
+        transaction: Transaction to match
+        candidate: Indexed invoice
+        description_grams: Precomputed description trigrams (optional)
+
+    Returns:
+        FuzzyMatch with a 0-1 score
+    """
+    if description_grams is None:
+        description_grams = trigrams(compact(transaction.description))
+
+    name_similarity = containment(candidate.client_key, description_grams)
+    reference_similarity = containment(candidate.reference_key, description_grams)
+    text_score = max(name_similarity, reference_similarity)
+
+    difference = abs(to_cents(transaction.amount) - candidate.amount_cents)
+    relative = difference / candidate.amount_cents if candidate.amount_cents else 1.0
+    tolerance = settings.RECONCILIATION_AMOUNT_TOLERANCE
+    if tolerance > 0:
+        amount_score = max(0.0, 1 - relative / tolerance)
+    else:
+        amount_score = 1.0 if difference == 0 else 0.0
+
+    days = abs((transaction.date.date() - candidate.due_date).days)
+    date_score = max(0.0, 1 - days / settings.RECONCILIATION_FUZZY_DATE_WINDOW_DAYS)
+
+    score = TEXT_WEIGHT * text_score + AMOUNT_WEIGHT * amount_score + DATE_WEIGHT * date_score
+
+    matched_on = "référence" if reference_similarity >= name_similarity else "client"
+    return FuzzyMatch(
+        candidate=candidate,
+        score=Decimal(str(round(score, 2))),
+        reasoning=(
+            f"Correspondance locale : {matched_on} à {text_score:.0%}, "
+            f"écart de montant {difference / 100:.2f}, échéance à {days} jours"
+        )
+    )
+
+
+def fuzzy_match(
+    transaction: Transaction,
+    index: InvoiceCandidateIndex,
+    limit: int = 5
+) -> List[FuzzyMatch]:
+    """
+    Score the invoices within the amount tolerance of a transaction.
+
+    Args:
+        transaction: Transaction to match
+        index: Open invoice index of the user
+        limit: Maximum number of matches returned
+
+    Returns:
+        Matches at or above RECONCILIATION_FUZZY_MIN_SCORE, best first
+    """
+    candidates = index.find_within_tolerance(
+        to_cents(transaction.amount),
+        Decimal(str(settings.RECONCILIATION_AMOUNT_TOLERANCE))
+    )
+    if not candidates:
+        return []
+
+    description_grams = trigrams(compact(transaction.description))
+    min_score = Decimal(str(settings.RECONCILIATION_FUZZY_MIN_SCORE))
+
+    matches = [
+        match for match in (
+            score_candidate(transaction, candidate, description_grams)
+            for candidate in candidates
+        )
+        if match.score >= min_score
+    ]
+    matches.sort(key=lambda match: match.score, reverse=True)
+    return matches[:limit]
@@ -0,0 +1,425 @@
+"""In-memory candidate index of open invoices for reconciliation"""
+from typing import Callable, Dict, Iterable, List, Optional, Set
+from dataclasses import dataclass
+from decimal import Decimal, ROUND_HALF_UP
+from datetime import date
+from uuid import UUID
+import bisect
+import re
+import time
+import unicodedata
+import logging
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.invoice import Invoice
+
+logger = logging.getLogger(__name__)
+
+# Invoice statuses that can still be matched against a bank transaction
+OPEN_INVOICE_STATUSES = ("pending", "overdue")
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Session.info key of the index changes waiting for the session to commit
+PENDING_CHANGES_KEY = "invoice_index_pending_changes"
+
+
+def to_cents(amount) -> int:
+    """Convert a monetary amount (Decimal, float, str) to integer cents."""
+    return int(
+        (Decimal(str(amount)) * 100).quantize(Decimal("1"), rounding=ROUND_HALF_UP)
+    )
+
+
+def normalize_text(text: Optional[str]) -> str:
+    """Lowercase and strip accents ("Société Générale" → "societe generale")."""
+    if not text:
+        return ""
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).lower()
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Split text into normalized alphanumeric tokens of 2+ characters."""
+    return [t for t in _TOKEN_RE.findall(normalize_text(text)) if len(t) >= 2]
+
+
+def compact(text: Optional[str]) -> str:
+    """Normalized text with every separator removed ("INV-2026/001" → "inv2026001")."""
+    return "".join(_TOKEN_RE.findall(normalize_text(text)))
+
+
+def is_open_invoice(invoice: Invoice) -> bool:
+    """Whether an invoice can still be matched by reconciliation."""
+    return (
+        invoice.deleted_at is None
+        and not invoice.is_reconciled
+        and invoice.status in OPEN_INVOICE_STATUSES
+    )
+
+
+@dataclass(frozen=True)
+class InvoiceCandidate:
+    """Immutable snapshot of the invoice fields used for matching"""
+    id: UUID
+    invoice_number: str
+    client_name: str
+    total_amount: Decimal
+    amount_cents: int
+    currency: str
+    due_date: date
+    reference_key: str
+    client_key: str
+
+    @classmethod
+    def from_invoice(cls, invoice: Invoice) -> "InvoiceCandidate":
+        """Build a candidate snapshot from an Invoice row."""
+        return cls(
+            id=invoice.id,
+            invoice_number=invoice.invoice_number,
+            client_name=invoice.client_name,
+            total_amount=Decimal(str(invoice.total_amount)),
+            amount_cents=to_cents(invoice.total_amount),
+            currency=invoice.currency,
+            due_date=invoice.due_date,
+            reference_key=compact(invoice.invoice_number),
+            client_key=compact(invoice.client_name),
+        )
+
+    def to_ai_dict(self) -> Dict:
+        """Format candidate the way ClaudeClient.find_matching_invoice expects."""
+        return {
+            "invoice_number": self.invoice_number,
+            "client_name": self.client_name,
+            "total_amount": float(self.total_amount),
+            "currency": self.currency,
+            "due_date": self.due_date.isoformat(),
+        }
+
+
+class InvoiceCandidateIndex:
+    """
+    Open invoices of one user, indexed for reconciliation lookups.
+
+    - Amount buckets: integer cents → invoice IDs, with the distinct amounts
+      kept sorted so exact and tolerance lookups are O(log n) + O(k)
+    - Token postings: normalized invoice-number / client-name token → invoice IDs
+    - Client postings: normalized client name → invoice IDs, and client-name
+      token → client names
+    """
+
+    def __init__(self, user_id: UUID):
+        self.user_id = user_id
+        self.built_at = time.monotonic()
+        self._candidates: Dict[UUID, InvoiceCandidate] = {}
+        self._buckets: Dict[int, Set[UUID]] = {}
+        self._amounts: List[int] = []
+        self._tokens: Dict[str, Set[UUID]] = {}
+        self._clients: Dict[str, Set[UUID]] = {}
+        self._client_tokens: Dict[str, Set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._candidates)
+
+    def __contains__(self, invoice_id: UUID) -> bool:
+        return invoice_id in self._candidates
+
+    def get(self, invoice_id: UUID) -> Optional[InvoiceCandidate]:
+        """Get an indexed candidate by invoice ID."""
+        return self._candidates.get(invoice_id)
+
+    def candidates(self) -> List[InvoiceCandidate]:
+        """All indexed candidates (unordered)."""
+        return list(self._candidates.values())
+
+    @staticmethod
+    def _candidate_tokens(candidate: InvoiceCandidate) -> Set[str]:
+        return set(tokenize(candidate.invoice_number)) | set(tokenize(candidate.client_name))
+
+    def add(self, candidate: InvoiceCandidate) -> None:
+        """Insert or replace a candidate."""
+        if candidate.id in self._candidates:
+            self.discard(candidate.id)
+
+        self._candidates[candidate.id] = candidate
+
+        bucket = self._buckets.get(candidate.amount_cents)
+        if bucket is None:
+            bucket = self._buckets[candidate.amount_cents] = set()
+            bisect.insort(self._amounts, candidate.amount_cents)
+        bucket.add(candidate.id)
+
+        for token in self._candidate_tokens(candidate):
+            self._tokens.setdefault(token, set()).add(candidate.id)
+
+        client_key = candidate.client_key
+        if client_key not in self._clients:
+            self._clients[client_key] = set()
+            for token in tokenize(candidate.client_name):
+                self._client_tokens.setdefault(token, set()).add(client_key)
+        self._clients[client_key].add(candidate.id)
+
+    def discard(self, invoice_id: UUID) -> None:
+        """Remove a candidate if present."""
+        candidate = self._candidates.pop(invoice_id, None)
+        if candidate is None:
+            return
+
+        bucket = self._buckets.get(candidate.amount_cents)
+        if bucket is not None:
+            bucket.discard(invoice_id)
+            if not bucket:
+                del self._buckets[candidate.amount_cents]
+                pos = bisect.bisect_left(self._amounts, candidate.amount_cents)
+                if pos < len(self._amounts) and self._amounts[pos] == candidate.amount_cents:
+                    del self._amounts[pos]
+
+        for token in self._candidate_tokens(candidate):
+            postings = self._tokens.get(token)
+            if postings is not None:
+                postings.discard(invoice_id)
+                if not postings:
+                    del self._tokens[token]
+
+        client_key = candidate.client_key
+        clients = self._clients.get(client_key)
+        if clients is not None:
+            clients.discard(invoice_id)
+            if not clients:
+                del self._clients[client_key]
+                for token in tokenize(candidate.client_name):
+                    postings = self._client_tokens.get(token)
+                    if postings is not None:
+                        postings.discard(client_key)
+                        if not postings:
+                            del self._client_tokens[token]
+
+    def find_exact(self, amount_cents: int) -> List[InvoiceCandidate]:
+        """Candidates whose total is exactly `amount_cents`."""
+        return [self._candidates[i] for i in self._buckets.get(amount_cents, ())]
+
+    def find_in_range(self, low_cents: int, high_cents: int) -> List[InvoiceCandidate]:
+        """Candidates whose total is within [low_cents, high_cents]."""
+        start = bisect.bisect_left(self._amounts, low_cents)
+        end = bisect.bisect_right(self._amounts, high_cents)
+        return [
+            self._candidates[i]
+            for cents in self._amounts[start:end]
+            for i in self._buckets[cents]
+        ]
+
+    def find_within_tolerance(
+        self,
+        amount_cents: int,
+        tolerance: Decimal
+    ) -> List[InvoiceCandidate]:
+        """
+        Candidates whose total is within a relative tolerance of the amount.
+
+        Args:
+            amount_cents: Amount to match, in cents
+            tolerance: Relative tolerance (0.05 = ±5%)
+        """
+        delta = int(abs(amount_cents) * Decimal(str(tolerance)))
+        return self.find_in_range(amount_cents - delta, amount_cents + delta)
+
+    def nearest(self, amount_cents: int, limit: int) -> List[InvoiceCandidate]:
+        """Up to `limit` candidates ordered by distance to the amount."""
+        right = bisect.bisect_left(self._amounts, amount_cents)
+        left = right - 1
+        result: List[InvoiceCandidate] = []
+
+        while len(result) < limit and (left >= 0 or right < len(self._amounts)):
+            take_right = left < 0 or (
+                right < len(self._amounts)
+                and self._amounts[right] - amount_cents <= amount_cents - self._amounts[left]
+            )
+            if take_right:
+                cents = self._amounts[right]
+                right += 1
+            else:
+                cents = self._amounts[left]
+                left -= 1
+            result.extend(self._candidates[i] for i in self._buckets[cents])
+
+        return result[:limit]
+
+    def find_by_client(self, client_name: str) -> List[InvoiceCandidate]:
+        """Candidates of one client, ignoring case, accents and separators."""
+        return [self._candidates[i] for i in self._clients.get(compact(client_name), ())]
+
+    def match_clients(self, text: str) -> List[str]:
+        """
+        Clients named in a free-text description.
+
+        Same pruning as match_tokens, but relative to the number of clients: a
+        client owning most open invoices is still found by its own name.
+
+        Returns:
+            Normalized client keys, usable with find_by_client
+        """
+        max_postings = max(
+            1, int(len(self._clients) * settings.RECONCILIATION_INDEX_MAX_TOKEN_SHARE)
+        )
+        clients: Set[str] = set()
+        for token in set(tokenize(text)):
+            postings = self._client_tokens.get(token)
+            if not postings or (len(postings) > max_postings and len(self._clients) > 1):
+                continue
+            clients.update(postings)
+        return sorted(clients)
+
+    def match_tokens(self, text: str) -> Dict[UUID, int]:
+        """
+        Candidates sharing tokens with a free-text description.
+
+        Tokens present on more than RECONCILIATION_INDEX_MAX_TOKEN_SHARE of the
+        index (e.g. "inv", "2026", "sarl") are skipped: they carry no signal and
+        would turn the lookup back into a full scan.
+
+        Returns:
+            Dict of invoice ID → number of distinct matching tokens
+        """
+        max_postings = max(
+            1, int(len(self._candidates) * settings.RECONCILIATION_INDEX_MAX_TOKEN_SHARE)
+        )
+        hits: Dict[UUID, int] = {}
+        for token in set(tokenize(text)):
+            postings = self._tokens.get(token)
+            if not postings or (len(postings) > max_postings and len(self._candidates) > 1):
+                continue
+            for invoice_id in postings:
+                hits[invoice_id] = hits.get(invoice_id, 0) + 1
+        return hits
+
+    @staticmethod
+    def has_reference(candidate: InvoiceCandidate, text: str) -> bool:
+        """Whether the invoice number appears in the text, ignoring case and separators."""
+        return bool(candidate.reference_key) and candidate.reference_key in compact(text)
+
+
+class InvoiceIndexRegistry:
+    """
+    Per-process registry of InvoiceCandidateIndex, one per user.
+
+    Indexes are built lazily on first use, kept up to date by InvoiceService and
+    ReconciliationService hooks, and rebuilt after `ttl_seconds` to pick up
+    changes made by other processes (API workers, Celery workers). Hooks of a
+    write go through the `*_on_commit` methods: the change is applied when
+    the session commits, and the user's index is dropped if it rolls back.
+    """
+
+    def __init__(self, ttl_seconds: int):
+        self.ttl_seconds = ttl_seconds
+        self._indexes: Dict[UUID, InvoiceCandidateIndex] = {}
+
+    def _is_fresh(self, index: InvoiceCandidateIndex) -> bool:
+        return time.monotonic() - index.built_at < self.ttl_seconds
+
+    async def get_index(self, db: AsyncSession, user_id: UUID) -> InvoiceCandidateIndex:
+        """
+        Get the user's index, building it from the database if missing or stale.
+
+        Args:
+            db: Database session
+            user_id: User ID
+
+        Returns:
+            Up-to-date candidate index
+        """
+        index = self._indexes.get(user_id)
+        if index is not None and self._is_fresh(index):
+            return index
+        return await self.build(db, user_id)
+
+    async def build(self, db: AsyncSession, user_id: UUID) -> InvoiceCandidateIndex:
+        """(Re)build the user's index from all open invoices."""
+        from app.services.invoice_service import InvoiceService
+
+        invoices = await InvoiceService.get_open_invoices(db, user_id)
+        index = self.build_from_invoices(user_id, invoices)
+        self._indexes[user_id] = index
+
+        logger.info(f"Invoice index built for user {user_id}: {len(index)} open invoices")
+        return index
+
+    @staticmethod
+    def build_from_invoices(
+        user_id: UUID,
+        invoices: Iterable[Invoice]
+    ) -> InvoiceCandidateIndex:
+        """Build an index from already loaded invoices."""
+        index = InvoiceCandidateIndex(user_id)
+        for invoice in invoices:
+            if is_open_invoice(invoice):
+                index.add(InvoiceCandidate.from_invoice(invoice))
+        return index
+
+    def upsert_invoice_on_commit(self, db: AsyncSession, invoice: Invoice) -> None:
+        """upsert_invoice once `db` commits, with the invoice as it is now."""
+        user_id, invoice_id = invoice.user_id, invoice.id
+        if is_open_invoice(invoice):
+            candidate = InvoiceCandidate.from_invoice(invoice)
+            self._on_commit(db, user_id, lambda: self._add_candidate(user_id, candidate))
+        else:
+            self._on_commit(db, user_id, lambda: self.discard_invoice(user_id, invoice_id))
+
+    def discard_invoice_on_commit(self, db: AsyncSession, user_id: UUID, invoice_id: UUID) -> None:
+        """discard_invoice once `db` commits."""
+        self._on_commit(db, user_id, lambda: self.discard_invoice(user_id, invoice_id))
+
+    def _on_commit(self, db: AsyncSession, user_id: UUID, change: Callable[[], None]) -> None:
+        # A rollback drops the change and the user's index with it (see below)
+        db.info.setdefault(PENDING_CHANGES_KEY, []).append((self, user_id, change))
+
+    def _add_candidate(self, user_id: UUID, candidate: "InvoiceCandidate") -> None:
+        index = self._indexes.get(user_id)
+        if index is not None:
+            index.add(candidate)
+
+    def upsert_invoice(self, invoice: Invoice) -> None:
+        """Reflect a created/updated invoice in its user's index (if built)."""
+        index = self._indexes.get(invoice.user_id)
+        if index is None:
+            return
+        if is_open_invoice(invoice):
+            index.add(InvoiceCandidate.from_invoice(invoice))
+        else:
+            index.discard(invoice.id)
+
+    def discard_invoice(self, user_id: UUID, invoice_id: UUID) -> None:
+        """Remove a paid, reconciled or deleted invoice from its user's index."""
+        index = self._indexes.get(user_id)
+        if index is not None:
+            index.discard(invoice_id)
+
+    def invalidate(self, user_id: Optional[UUID] = None) -> None:
+        """Drop one user's index (or all indexes) so the next lookup rebuilds it."""
+        if user_id is None:
+            self._indexes.clear()
+        else:
+            self._indexes.pop(user_id, None)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_pending_changes(session: Session) -> None:
+    for _, _, change in session.info.pop(PENDING_CHANGES_KEY, []):
+        change()
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _drop_pending_changes(session: Session, previous_transaction) -> None:
+    # Savepoint rollbacks included: rebuilding is cheaper than working out
+    # which pending changes are still valid
+    for registry, user_id, _ in session.info.pop(PENDING_CHANGES_KEY, []):
+        registry.invalidate(user_id)
+
+
+# Global registry instance
+invoice_index_registry = InvoiceIndexRegistry(
+    ttl_seconds=settings.RECONCILIATION_INDEX_TTL_SECONDS
+)
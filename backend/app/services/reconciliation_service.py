@@ -1,25 +1,70 @@
 """Reconciliation service - AI-powered invoice matching"""
-from typing import List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_
+from sqlalchemy import select, and_, case, insert, literal, update
 from uuid import UUID
 from decimal import Decimal
-from datetime import datetime
+from datetime import datetime, timedelta
 import logging
+import uuid
 
 from app.models.reconciliation import Reconciliation
 from app.models.transaction import Transaction
 from app.models.invoice import Invoice
-from app.schemas.reconciliation import ReconciliationCreate, ReconciliationSuggestion
+from app.schemas.reconciliation import (
+    ReconciliationCreate,
+    ReconciliationGroupCreate,
+    ReconciliationSuggestion,
+)
 from app.integrations.claude_client import ClaudeClient
 from app.services.invoice_service import InvoiceService
+from app.services.transaction_service import TransactionService
+from app.services.reconciliation_assignment import SCORE_SCALE, solve_assignment
+from app.services.reconciliation_fuzzy import fuzzy_match
+from app.services.reconciliation_split import (
+    SplitMatch,
+    match_installments,
+    match_invoice_group,
+)
+from app.services.reconciliation_index import (
+    InvoiceCandidate,
+    InvoiceCandidateIndex,
+    invoice_index_registry,
+    to_cents,
+)
+from app.core.metrics import get_counters
+from app.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Which stage resolved each suggestion request, and how many reached the AI
+matching_counters = get_counters("reconciliation.matching")
+
+MATCHING_STAGES = ("exact", "split", "fuzzy", "ai", "none")
+
+
+def encode_batch_cursor(transaction: Transaction) -> str:
+    """Position after a transaction in a paged batch reconciliation"""
+    return f"{transaction.date.isoformat()}|{transaction.id}"
+
+
+def decode_batch_cursor(cursor: str) -> Tuple[datetime, UUID]:
+    """
+    (date, id) of a batch cursor.
+    
+    Raises:
+        ValueError: Malformed cursor
+    """
+    date_part, _, id_part = cursor.partition("|")
+    return datetime.fromisoformat(date_part), UUID(id_part)
+
 
 class ReconciliationService:
     """Service for bank reconciliation (transaction ↔ invoice matching)"""
     
+    # Matches at or above this score (method "exact") are reconciled without review
+    AUTO_RECONCILE_MIN_SCORE = Decimal("0.95")
+    
     @staticmethod
     async def create_reconciliation(
         db: AsyncSession,
@@ -87,6 +132,8 @@ class ReconciliationService:
         
         await db.flush()
         
+        invoice_index_registry.discard_invoice_on_commit(db, user_id, invoice.id)
+        
         logger.info(
             f"Reconciliation created: Transaction {transaction.id} ↔ "
             f"Invoice {invoice.invoice_number} (method: {reconciliation.match_method})"
@@ -94,6 +141,237 @@ class ReconciliationService:
         
         return reconciliation
     
+    @staticmethod
+    def _build_suggestion(
+        transaction: Transaction,
+        candidate: InvoiceCandidate,
+        match_score: Decimal,
+        match_method: str,
+        reasoning: str
+    ) -> ReconciliationSuggestion:
+        """Build a suggestion from a transaction and an indexed invoice."""
+        return ReconciliationSuggestion(
+            transaction_id=transaction.id,
+            invoice_id=candidate.id,
+            match_score=match_score,
+            match_method=match_method,
+            reasoning=reasoning,
+            transaction_description=transaction.description,
+            transaction_amount=transaction.amount,
+            invoice_number=candidate.invoice_number,
+            invoice_amount=candidate.total_amount
+        )
+    
+    @staticmethod
+    def _build_group_suggestion(
+        transaction: Transaction,
+        match: SplitMatch
+    ) -> ReconciliationSuggestion:
+        """Build a suggestion from a split or partial payment grouping."""
+        return ReconciliationSuggestion(
+            transaction_id=transaction.id,
+            invoice_id=match.invoices[0].id,
+            match_score=match.score,
+            match_method=match.method,
+            reasoning=match.reasoning,
+            transaction_description=transaction.description,
+            transaction_amount=transaction.amount,
+            invoice_number=" + ".join(c.invoice_number for c in match.invoices),
+            invoice_amount=match.total_amount,
+            group_transaction_ids=list(match.transaction_ids),
+            group_invoice_ids=[c.id for c in match.invoices]
+        )
+    
+    @staticmethod
+    async def _find_split_match(
+        db: AsyncSession,
+        user_id: UUID,
+        transaction: Transaction,
+        index: InvoiceCandidateIndex
+    ) -> Optional[SplitMatch]:
+        """
+        Look for a split payment (several invoices) or an installment plan.
+        
+        Other unreconciled transactions are only loaded when the description
+        names a client and no multi-invoice grouping was found. Installments
+        sit within the window of an invoice itself within the window of this
+        transaction, so only transactions up to twice the window away on
+        either side are loaded, the closest ones first on each side.
+        """
+        match = match_invoice_group(transaction, index)
+        if match or not index.match_clients(transaction.description):
+            return match
+        
+        window = timedelta(days=settings.RECONCILIATION_SPLIT_WINDOW_DAYS * 2)
+        per_side = settings.RECONCILIATION_SPLIT_MAX_TRANSACTIONS // 2
+        earlier = await TransactionService.get_unreconciled_transactions(
+            db,
+            user_id,
+            since=transaction.date - window,
+            until=transaction.date,
+            limit=per_side,
+            newest_first=True
+        )
+        later = await TransactionService.get_unreconciled_transactions(
+            db,
+            user_id,
+            since=transaction.date,
+            until=transaction.date + window,
+            limit=per_side
+        )
+        return match_installments(transaction, index, earlier + later)
+    
+    @staticmethod
+    def _ai_candidates(
+        index: InvoiceCandidateIndex,
+        amount_cents: int,
+        description: str
+    ) -> List[InvoiceCandidate]:
+        """
+        Select the invoices worth sending to Claude for a transaction.
+        
+        Invoices sharing a client-name / invoice-number token come first, then
+        the closest amounts, capped at RECONCILIATION_AI_MAX_CANDIDATES.
+        """
+        limit = settings.RECONCILIATION_AI_MAX_CANDIDATES
+        token_hits = index.match_tokens(description)
+        ranked_ids = sorted(token_hits, key=token_hits.get, reverse=True)[:limit]
+        
+        selected = [index.get(invoice_id) for invoice_id in ranked_ids]
+        seen = set(ranked_ids)
+        for candidate in index.nearest(amount_cents, limit):
+            if len(selected) >= limit:
+                break
+            if candidate.id not in seen:
+                selected.append(candidate)
+                seen.add(candidate.id)
+        
+        return selected
+    
+    @staticmethod
+    async def create_group_reconciliation(
+        db: AsyncSession,
+        user_id: UUID,
+        group_data: ReconciliationGroupCreate
+    ) -> dict:
+        """
+        Reconcile a split payment or an installment plan.
+        
+        A group links one transaction to several invoices (split) or several
+        transactions to one invoice (installments); amounts must add up to the
+        cent. One Reconciliation row is written per pair, sharing a group_id,
+        with the amount allocated to the pair.
+        
+        Args:
+            db: Database session
+            user_id: User ID
+            group_data: Transactions and invoices of the group
+            
+        Returns:
+            Dict with the group ID, its transactions, invoices and row count
+        """
+        transaction_ids = list(dict.fromkeys(group_data.transaction_ids))
+        invoice_ids = list(dict.fromkeys(group_data.invoice_ids))
+        
+        if len(transaction_ids) > 1 and len(invoice_ids) > 1:
+            raise ValueError(
+                "A group links one transaction to several invoices "
+                "or several transactions to one invoice"
+            )
+        
+        from app.models.bank_account import BankAccount
+        result = await db.execute(
+            select(Transaction)
+            .join(BankAccount, Transaction.bank_account_id == BankAccount.id)
+            .where(
+                and_(
+                    Transaction.id.in_(transaction_ids),
+                    BankAccount.user_id == user_id,
+                    Transaction.deleted_at.is_(None)
+                )
+            )
+        )
+        transactions = list(result.scalars().all())
+        
+        result = await db.execute(
+            select(Invoice).where(
+                and_(
+                    Invoice.id.in_(invoice_ids),
+                    Invoice.user_id == user_id,
+                    Invoice.deleted_at.is_(None)
+                )
+            )
+        )
+        invoices = list(result.scalars().all())
+        
+        if len(transactions) != len(transaction_ids):
+            raise ValueError("Transaction not found")
+        
+        if len(invoices) != len(invoice_ids):
+            raise ValueError("Invoice not found")
+        
+        if any(transaction.is_reconciled for transaction in transactions):
+            raise ValueError("Transaction already reconciled")
+        
+        if any(invoice.is_reconciled for invoice in invoices):
+            raise ValueError("Invoice already reconciled")
+        
+        paid = sum(Decimal(str(t.amount)) for t in transactions)
+        due = sum(Decimal(str(i.total_amount)) for i in invoices)
+        if abs(paid - due) >= Decimal("0.01"):
+            raise ValueError(f"Group amounts do not match ({paid} paid, {due} due)")
+        
+        group_id = uuid.uuid4()
+        now = datetime.utcnow()
+        
+        # The single side of the group is allocated the amount of each pair
+        rows = [
+            {
+                "transaction_id": transaction.id,
+                "invoice_id": invoice.id,
+                "confidence_score": group_data.match_score,
+                "match_type": group_data.match_method,
+                "is_validated": True,
+                "validated_by": user_id,
+                "validated_at": now,
+                "ai_reasoning": group_data.ai_reasoning,
+                "group_id": group_id,
+                "allocated_amount": (
+                    invoice.total_amount if len(invoices) > 1 else transaction.amount
+                ),
+            }
+            for transaction in transactions
+            for invoice in invoices
+        ]
+        await db.execute(insert(Reconciliation), rows)
+        
+        payment_date = max(transaction.date for transaction in transactions).date()
+        for transaction in transactions:
+            transaction.is_reconciled = True
+            transaction.reconciled_invoice_id = invoices[0].id if len(invoices) == 1 else None
+        
+        for invoice in invoices:
+            invoice.is_reconciled = True
+            invoice.status = "paid"
+            invoice.payment_date = payment_date
+        
+        await db.flush()
+        
+        for invoice in invoices:
+            invoice_index_registry.discard_invoice_on_commit(db, user_id, invoice.id)
+        
+        logger.info(
+            f"Group reconciliation {group_id} created: {len(transactions)} transaction(s) ↔ "
+            f"{len(invoices)} invoice(s) (method: {group_data.match_method})"
+        )
+        
+        return {
+            "group_id": group_id,
+            "transaction_ids": transaction_ids,
+            "invoice_ids": invoice_ids,
+            "reconciliations": len(rows),
+        }
+    
     @staticmethod
     async def suggest_reconciliations(
         db: AsyncSession,
@@ -104,6 +382,10 @@ class ReconciliationService:
         """
         Get AI-powered reconciliation suggestions for a transaction.
         
+        Stages run in order and stop at the first confident match: exact
+        amount, split/partial payment, local fuzzy scoring, then Claude only
+        when every suggestion scores below RECONCILIATION_FUZZY_ACCEPT_SCORE.
+        
         Args:
             db: Database session
             user_id: User ID
@@ -124,53 +406,70 @@ class ReconciliationService:
         if not bank_account or bank_account.user_id != user_id:
             raise ValueError("Transaction does not belong to user")
         
-        # Get pending invoices
-        from app.schemas.invoice import InvoiceFilter
-        invoices, _ = await InvoiceService.get_invoices(
-            db,
-            user_id,
-            InvoiceFilter(status="pending", is_reconciled=False),
-            page=1,
-            page_size=100
-        )
+        # Open invoices, indexed by amount and reference tokens
+        index = await invoice_index_registry.get_index(db, user_id)
         
-        if not invoices:
+        if not len(index):
+            matching_counters.increment("requests")
+            matching_counters.increment("none")
             return []
         
-        # Try exact matches first (amount + reference)
+        amount_cents = to_cents(transaction.amount)
         suggestions = []
         
-        # 1. Exact amount match
-        for invoice in invoices:
-            if abs(transaction.amount - invoice.total_amount) < Decimal("0.01"):
-                # Check if invoice number in description
-                if invoice.invoice_number.lower() in transaction.description.lower():
-                    suggestions.append(ReconciliationSuggestion(
-                        transaction_id=transaction.id,
-                        invoice_id=invoice.id,
-                        match_score=Decimal("1.0"),
-                        match_method="exact",
-                        reasoning=f"Montant exact ({invoice.total_amount}) et référence trouvée",
-                        transaction_description=transaction.description,
-                        transaction_amount=transaction.amount,
-                        invoice_number=invoice.invoice_number,
-                        invoice_amount=invoice.total_amount
-                    ))
-                else:
-                    suggestions.append(ReconciliationSuggestion(
-                        transaction_id=transaction.id,
-                        invoice_id=invoice.id,
-                        match_score=Decimal("0.85"),
-                        match_method="reference",
-                        reasoning=f"Montant exact ({invoice.total_amount})",
-                        transaction_description=transaction.description,
-                        transaction_amount=transaction.amount,
-                        invoice_number=invoice.invoice_number,
-                        invoice_amount=invoice.total_amount
-                    ))
+        # 1. Exact amount match (bucket lookup)
+        for candidate in index.find_exact(amount_cents):
+            # Check if invoice number in description
+            if index.has_reference(candidate, transaction.description):
+                suggestions.append(ReconciliationService._build_suggestion(
+                    transaction,
+                    candidate,
+                    match_score=Decimal("1.0"),
+                    match_method="exact",
+                    reasoning=f"Montant exact ({candidate.total_amount}) et référence trouvée"
+                ))
+            else:
+                suggestions.append(ReconciliationService._build_suggestion(
+                    transaction,
+                    candidate,
+                    match_score=Decimal("0.85"),
+                    match_method="reference",
+                    reasoning=f"Montant exact ({candidate.total_amount})"
+                ))
+        
+        stage = "exact" if suggestions else None
+        
+        # 2. Split or partial payment (bounded subset-sum, no AI call)
+        if not suggestions:
+            split_match = await ReconciliationService._find_split_match(
+                db,
+                user_id,
+                transaction,
+                index
+            )
+            if split_match:
+                suggestions.append(
+                    ReconciliationService._build_group_suggestion(transaction, split_match)
+                )
+                stage = "split"
         
-        # 2. If no exact match, use AI
-        if not suggestions and ai_client:
+        # 3. Local fuzzy scoring (client/reference trigrams, amount, due date)
+        if not suggestions:
+            for match in fuzzy_match(transaction, index):
+                suggestions.append(ReconciliationService._build_suggestion(
+                    transaction,
+                    match.candidate,
+                    match_score=match.score,
+                    match_method="fuzzy",
+                    reasoning=match.reasoning
+                ))
+            if suggestions:
+                stage = "fuzzy"
+        
+        # 4. Below the confidence band, escalate to AI on the closest candidates
+        accept_score = Decimal(str(settings.RECONCILIATION_FUZZY_ACCEPT_SCORE))
+        if ai_client and all(s.match_score < accept_score for s in suggestions):
+            matching_counters.increment("ai_calls")
             try:
                 # Format data for AI
                 transaction_data = {
@@ -180,44 +479,60 @@ class ReconciliationService:
                     "date": transaction.date.isoformat()
                 }
                 
-                invoices_data = [
-                    {
-                        "invoice_number": inv.invoice_number,
-                        "client_name": inv.client_name,
-                        "total_amount": float(inv.total_amount),
-                        "currency": inv.currency,
-                        "due_date": inv.due_date.isoformat()
-                    }
-                    for inv in invoices
-                ]
+                candidates = ReconciliationService._ai_candidates(
+                    index,
+                    amount_cents,
+                    transaction.description
+                )
                 
                 ai_match = await ai_client.find_matching_invoice(
                     transaction_data,
-                    invoices_data
+                    [candidate.to_ai_dict() for candidate in candidates]
                 )
                 
                 if ai_match:
                     matched_invoice = ai_match["invoice"]
-                    invoice = next(
-                        inv for inv in invoices
-                        if inv.invoice_number == matched_invoice["invoice_number"]
+                    candidate = next(
+                        c for c in candidates
+                        if c.invoice_number == matched_invoice["invoice_number"]
                     )
                     
-                    suggestions.append(ReconciliationSuggestion(
-                        transaction_id=transaction.id,
-                        invoice_id=invoice.id,
+                    suggestions = [s for s in suggestions if s.invoice_id != candidate.id]
+                    suggestions.append(ReconciliationService._build_suggestion(
+                        transaction,
+                        candidate,
                         match_score=ai_match["match_score"],
                         match_method=ai_match["match_method"],
-                        reasoning=ai_match["reasoning"],
-                        transaction_description=transaction.description,
-                        transaction_amount=transaction.amount,
-                        invoice_number=invoice.invoice_number,
-                        invoice_amount=invoice.total_amount
+                        reasoning=ai_match["reasoning"]
                     ))
+                    stage = "ai"
                     
             except Exception as e:
                 logger.error(f"AI reconciliation error: {e}")
         
+        matching_counters.increment("requests")
+        matching_counters.increment(stage or "none")
+        
+        # Drop candidates that were closed by another process since the index was built
+        if suggestions:
+            suggested_ids = {
+                invoice_id
+                for s in suggestions
+                for invoice_id in (s.group_invoice_ids or [s.invoice_id])
+            }
+            still_open = await InvoiceService.get_open_invoices(
+                db,
+                user_id,
+                list(suggested_ids)
+            )
+            open_ids = {invoice.id for invoice in still_open}
+            for invoice_id in suggested_ids - open_ids:
+                invoice_index_registry.discard_invoice(user_id, invoice_id)
+            suggestions = [
+                s for s in suggestions
+                if all(i in open_ids for i in (s.group_invoice_ids or [s.invoice_id]))
+            ]
+        
         # Sort by score
         suggestions.sort(key=lambda x: x.match_score, reverse=True)
         
@@ -259,7 +574,10 @@ class ReconciliationService:
         best_match = suggestions[0]
         
         # Auto-reconcile if high confidence
-        if best_match.match_score >= Decimal("0.95") and best_match.match_method == "exact":
+        if (
+            best_match.match_score >= ReconciliationService.AUTO_RECONCILE_MIN_SCORE
+            and best_match.match_method == "exact"
+        ):
             reconciliation_data = ReconciliationCreate(
                 transaction_id=transaction_id,
                 invoice_id=best_match.invoice_id,
@@ -280,6 +598,284 @@ class ReconciliationService:
         
         return None
     
+    @staticmethod
+    def _score_batch(
+        transactions: List[Transaction],
+        index: InvoiceCandidateIndex
+    ) -> List[Tuple[Transaction, InvoiceCandidate, Decimal, str, str]]:
+        """
+        Apply the exact/reference rules to a whole transaction × invoice matrix.
+        
+        Transactions are grouped by amount so each amount bucket of the index is
+        looked up once; only non-empty cells of the matrix are produced.
+        
+        Returns:
+            List of (transaction, candidate, score, method, reasoning)
+        """
+        by_amount: Dict[int, List[Transaction]] = {}
+        for transaction in transactions:
+            by_amount.setdefault(to_cents(transaction.amount), []).append(transaction)
+        
+        scored = []
+        for amount_cents, group in by_amount.items():
+            bucket = index.find_exact(amount_cents)
+            if not bucket:
+                continue
+            for transaction in group:
+                for candidate in bucket:
+                    if index.has_reference(candidate, transaction.description):
+                        scored.append((
+                            transaction,
+                            candidate,
+                            Decimal("1.0"),
+                            "exact",
+                            f"Montant exact ({candidate.total_amount}) et référence trouvée"
+                        ))
+                    else:
+                        scored.append((
+                            transaction,
+                            candidate,
+                            Decimal("0.85"),
+                            "reference",
+                            f"Montant exact ({candidate.total_amount})"
+                        ))
+        return scored
+    
+    @staticmethod
+    def _resolve_conflicts(
+        scored: List[Tuple[Transaction, InvoiceCandidate, Decimal, str, str]]
+    ) -> List[Tuple[Transaction, InvoiceCandidate, Decimal, str, str]]:
+        """
+        Pick at most one invoice per transaction and one transaction per invoice.
+        
+        Solves the global assignment that maximizes the total match score, so a
+        transaction with a single candidate is never starved by a greedy pick.
+        Among assignments with the same total score, transactions dated closest
+        to the invoice due date win.
+        """
+        if not scored:
+            return []
+        
+        # Lexicographic weight: score first, date proximity only breaks ties
+        # (the sum of tie-breakers never reaches one score step)
+        tie_range = 1000
+        step = tie_range * len(scored)
+        weights = {}
+        for position, (transaction, candidate, score, _, _) in enumerate(scored):
+            days_apart = min(
+                abs((transaction.date.date() - candidate.due_date).days),
+                tie_range - 1
+            )
+            weight = int(score * SCORE_SCALE) * step + (tie_range - 1 - days_apart)
+            key = (transaction.id, candidate.id)
+            if weight > weights.get(key, (-1, None))[0]:
+                weights[key] = (weight, position)
+        
+        pairs = solve_assignment(
+            [(tx_id, inv_id, weight) for (tx_id, inv_id), (weight, _) in weights.items()],
+            scale=1
+        )
+        return [scored[weights[pair][1]] for pair in pairs]
+    
+    @staticmethod
+    async def reconcile_batch(
+        db: AsyncSession,
+        user_id: UUID,
+        transaction_ids: Optional[List[UUID]] = None,
+        since: Optional[datetime] = None,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None
+    ) -> dict:
+        """
+        Reconcile a batch of transactions against all open invoices in one pass.
+        
+        Loads the unreconciled transactions and the open invoices once, applies
+        the exact/reference rules over the whole matrix, resolves conflicts
+        globally (an invoice is never claimed twice) and writes every
+        Reconciliation row and reconciled flag with bulk statements.
+        
+        At most `limit` transactions (RECONCILIATION_BATCH_MAX_TRANSACTIONS)
+        are loaded, oldest first; `next_cursor` continues with the next page.
+        Only auto-reconcilable matches (method "exact", score >=
+        AUTO_RECONCILE_MIN_SCORE) are written, and only on rows that are still
+        unreconciled when written; the caller commits.
+        
+        Args:
+            db: Database session
+            user_id: User ID
+            transaction_ids: Transactions to reconcile (optional)
+            since: Reconcile transactions dated on/after this datetime (optional)
+            limit: Max transactions in this page (optional)
+            cursor: next_cursor of the previous page (optional)
+            
+        Returns:
+            Stats dict with counts, the reconciled pairs and next_cursor
+            
+        Raises:
+            ValueError: Malformed cursor
+        """
+        limit = min(
+            limit or settings.RECONCILIATION_BATCH_MAX_TRANSACTIONS,
+            settings.RECONCILIATION_BATCH_MAX_TRANSACTIONS
+        )
+        transactions = await TransactionService.get_unreconciled_transactions(
+            db,
+            user_id,
+            transaction_ids=transaction_ids,
+            since=since,
+            limit=limit + 1,
+            after=decode_batch_cursor(cursor) if cursor else None
+        )
+        has_more = len(transactions) > limit
+        transactions = transactions[:limit]
+        
+        stats = {
+            "transactions": len(transactions),
+            "candidates": 0,
+            "reconciled": 0,
+            "conflicts": 0,
+            "pairs": [],
+            "next_cursor": encode_batch_cursor(transactions[-1]) if has_more else None,
+        }
+        
+        if not transactions:
+            return stats
+        
+        # Always rebuild: writes must not rely on a stale snapshot
+        index = await invoice_index_registry.build(db, user_id)
+        
+        scored = [
+            match for match in ReconciliationService._score_batch(transactions, index)
+            if match[2] >= ReconciliationService.AUTO_RECONCILE_MIN_SCORE
+            and match[3] == "exact"
+        ]
+        selected = ReconciliationService._resolve_conflicts(scored)
+        
+        stats["candidates"] = len(scored)
+        stats["conflicts"] = len({m[0].id for m in scored}) - len(selected)
+        
+        if not selected:
+            return stats
+        
+        # Claim the rows with guarded bulk UPDATEs: a transaction or invoice
+        # reconciled meanwhile (e.g. manually) is left alone, and its pair dropped
+        invoice_of = {transaction.id: candidate.id for transaction, candidate, _, _, _ in selected}
+        claimed_transactions = set((await db.execute(
+            update(Transaction)
+            .where(
+                Transaction.id.in_(list(invoice_of)),
+                Transaction.is_reconciled.is_(False)
+            )
+            .values(
+                is_reconciled=True,
+                reconciled_invoice_id=case(
+                    {
+                        transaction_id: literal(invoice_id, Transaction.reconciled_invoice_id.type)
+                        for transaction_id, invoice_id in invoice_of.items()
+                    },
+                    value=Transaction.id
+                )
+            )
+            .returning(Transaction.id)
+            .execution_options(synchronize_session="fetch")
+        )).scalars())
+        
+        payment_dates = {
+            candidate.id: transaction.date.date()
+            for transaction, candidate, _, _, _ in selected
+            if transaction.id in claimed_transactions
+        }
+        claimed_invoices = set()
+        if payment_dates:
+            claimed_invoices = set((await db.execute(
+                update(Invoice)
+                .where(
+                    Invoice.id.in_(list(payment_dates)),
+                    Invoice.is_reconciled.is_(False)
+                )
+                .values(
+                    is_reconciled=True,
+                    status="paid",
+                    payment_date=case(payment_dates, value=Invoice.id)
+                )
+                .returning(Invoice.id)
+                .execution_options(synchronize_session="fetch")
+            )).scalars())
+        
+        # Transactions whose invoice was taken meanwhile stay open
+        released = [
+            transaction_id for transaction_id in claimed_transactions
+            if invoice_of[transaction_id] not in claimed_invoices
+        ]
+        if released:
+            await db.execute(
+                update(Transaction)
+                .where(Transaction.id.in_(released))
+                .values(is_reconciled=False, reconciled_invoice_id=None)
+                .execution_options(synchronize_session="fetch")
+            )
+        
+        claimed = [
+            match for match in selected
+            if match[0].id in claimed_transactions and match[1].id in claimed_invoices
+        ]
+        stats["conflicts"] += len(selected) - len(claimed)
+        selected = claimed
+        if not selected:
+            return stats
+        
+        now = datetime.utcnow()
+        
+        await db.execute(
+            insert(Reconciliation),
+            [
+                {
+                    "transaction_id": transaction.id,
+                    "invoice_id": candidate.id,
+                    "confidence_score": score,
+                    "match_type": method,
+                    "is_validated": True,
+                    "validated_at": now,
+                    "ai_reasoning": reasoning,
+                }
+                for transaction, candidate, score, method, reasoning in selected
+            ]
+        )
+        
+        for _, candidate, _, _, _ in selected:
+            invoice_index_registry.discard_invoice_on_commit(db, user_id, candidate.id)
+        
+        stats["reconciled"] = len(selected)
+        stats["pairs"] = [
+            {"transaction_id": str(transaction.id), "invoice_id": str(candidate.id)}
+            for transaction, candidate, _, _, _ in selected
+        ]
+        
+        logger.info(
+            f"Batch reconciliation for user {user_id}: {stats['reconciled']} reconciled "
+            f"out of {stats['transactions']} transactions ({stats['conflicts']} conflicts)"
+        )
+        
+        return stats
+    
+    @staticmethod
+    def get_matching_stats() -> dict:
+        """
+        Per-stage hit rates of suggest_reconciliations in this process.
+        
+        Returns:
+            Stats dict with request count, hits and hit rate per stage, and the
+            share of requests that called the AI
+        """
+        counts = matching_counters.snapshot()
+        return {
+            "requests": counts.get("requests", 0),
+            "ai_calls": counts.get("ai_calls", 0),
+            "ai_call_rate": round(matching_counters.ratio("ai_calls", "requests"), 4),
+            "hits": {stage: counts.get(stage, 0) for stage in MATCHING_STAGES},
+            "hit_rates": matching_counters.rates(MATCHING_STAGES, "requests"),
+        }
+    
     @staticmethod
     async def get_reconciliation_stats(
         db: AsyncSession,
@@ -0,0 +1,253 @@
+"""Split and partial payment matching (many invoices ↔ one transaction and back)"""
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+from dataclasses import dataclass
+from decimal import Decimal
+from uuid import UUID
+import logging
+
+from app.config import settings
+from app.models.transaction import Transaction
+from app.services.reconciliation_index import (
+    InvoiceCandidate,
+    InvoiceCandidateIndex,
+    to_cents,
+    tokenize,
+)
+
+logger = logging.getLogger(__name__)
+
+# A single grouping reaches the target: safe to propose as the best match
+UNIQUE_GROUP_SCORE = Decimal("0.9")
+
+# Several groupings reach the target: still worth proposing, but needs review
+AMBIGUOUS_GROUP_SCORE = Decimal("0.7")
+
+
+@dataclass(frozen=True)
+class SplitMatch:
+    """A group of transactions paying a group of invoices for the same total"""
+    transaction_ids: Tuple[UUID, ...]
+    invoices: Tuple[InvoiceCandidate, ...]
+    total_amount: Decimal
+    score: Decimal
+    method: str
+    reasoning: str
+
+
+def find_subset(
+    target_cents: int,
+    items: Sequence[Tuple[Hashable, int]],
+    max_size: int,
+    max_states: Optional[int] = None
+) -> Tuple[Optional[List[Hashable]], bool]:
+    """
+    Bounded subset-sum over integer cents.
+
+    Dynamic programming over reachable sums, keeping the first subset found for
+    each sum. States that can no longer reach the target with the remaining
+    items, subsets larger than `max_size` and sums past the target are pruned;
+    `max_states` caps the table on pathological inputs.
+
+    Args:
+        target_cents: Sum to reach exactly
+        items: (key, amount in cents) pairs; non-positive amounts are ignored
+        max_size: Maximum number of items in the subset
+        max_states: Maximum number of distinct sums tracked
+
+    Returns:
+        (keys of a subset summing to the target or None, whether several
+        subsets reach the target)
+    """
+    max_states = max_states or settings.RECONCILIATION_SPLIT_MAX_STATES
+    items = sorted(
+        ((key, cents) for key, cents in items if 0 < cents <= target_cents),
+        key=lambda item: item[1],
+        reverse=True
+    )
+
+    remaining = [0] * (len(items) + 1)
+    for k in range(len(items) - 1, -1, -1):
+        remaining[k] = remaining[k + 1] + items[k][1]
+
+    reach: Dict[int, Tuple[int, ...]] = {0: ()}
+    ways: Dict[int, int] = {0: 1}
+
+    for k, (_, cents) in enumerate(items):
+        # Sums reached with item k, from the sums reached before it only:
+        # merged after the round so that k is never counted twice
+        new_reach: Dict[int, Tuple[int, ...]] = {}
+        new_ways: Dict[int, int] = {}
+        for total, subset in list(reach.items()):
+            if total + remaining[k] < target_cents:
+                # Even taking every remaining item falls short
+                del reach[total]
+                continue
+            if len(subset) >= max_size or total == target_cents:
+                continue
+
+            new_total = total + cents
+            if new_total > target_cents:
+                continue
+            new_ways[new_total] = ways[total]
+            if new_total not in reach and len(reach) + len(new_reach) < max_states:
+                new_reach[new_total] = subset + (k,)
+
+        for new_total, count in new_ways.items():
+            if new_total in reach:
+                ways[new_total] = min(2, ways[new_total] + count)
+            elif new_total in new_reach:
+                reach[new_total] = new_reach[new_total]
+                ways[new_total] = min(2, count)
+
+        if not reach:
+            break
+
+    subset = reach.get(target_cents)
+    if not subset:
+        return None, False
+    return [items[k][0] for k in subset], ways[target_cents] > 1
+
+
+def _days_apart(transaction: Transaction, candidate: InvoiceCandidate) -> int:
+    return abs((transaction.date.date() - candidate.due_date).days)
+
+
+def _mentions_client(description: str, client_name: str) -> bool:
+    return bool(set(tokenize(description)) & set(tokenize(client_name)))
+
+
+def match_invoice_group(
+    transaction: Transaction,
+    index: InvoiceCandidateIndex
+) -> Optional[SplitMatch]:
+    """
+    Find several open invoices of one client paid by a single transfer.
+
+    Candidates are pruned to the clients named in the transaction description
+    and to invoices due within RECONCILIATION_SPLIT_WINDOW_DAYS of the
+    transaction date.
+
+    Args:
+        transaction: Incoming transaction
+        index: Open invoice index of the user
+
+    Returns:
+        Best grouping (unique before ambiguous, fewer invoices first) or None
+    """
+    amount_cents = to_cents(transaction.amount)
+    if amount_cents <= 0:
+        return None
+
+    best: Optional[SplitMatch] = None
+    for client_key in index.match_clients(transaction.description):
+        candidates = [
+            candidate for candidate in index.find_by_client(client_key)
+            if candidate.amount_cents < amount_cents
+            and _days_apart(transaction, candidate) <= settings.RECONCILIATION_SPLIT_WINDOW_DAYS
+        ]
+        if len(candidates) < 2:
+            continue
+        candidates.sort(key=lambda candidate: _days_apart(transaction, candidate))
+        candidates = candidates[:settings.RECONCILIATION_SPLIT_MAX_CANDIDATES]
+
+        by_id = {candidate.id: candidate for candidate in candidates}
+        subset, ambiguous = find_subset(
+            amount_cents,
+            [(candidate.id, candidate.amount_cents) for candidate in candidates],
+            max_size=settings.RECONCILIATION_SPLIT_MAX_ITEMS
+        )
+        if not subset:
+            continue
+
+        invoices = tuple(by_id[invoice_id] for invoice_id in subset)
+        match = SplitMatch(
+            transaction_ids=(transaction.id,),
+            invoices=invoices,
+            total_amount=Decimal(str(transaction.amount)),
+            score=AMBIGUOUS_GROUP_SCORE if ambiguous else UNIQUE_GROUP_SCORE,
+            method="split",
+            reasoning=(
+                f"Paiement groupé de {len(invoices)} factures {invoices[0].client_name} "
+                f"({', '.join(c.invoice_number for c in invoices)})"
+            )
+        )
+        if best is None or (-match.score, len(match.invoices)) < (-best.score, len(best.invoices)):
+            best = match
+
+    return best
+
+
+def match_installments(
+    transaction: Transaction,
+    index: InvoiceCandidateIndex,
+    other_transactions: Sequence[Transaction]
+) -> Optional[SplitMatch]:
+    """
+    Find an open invoice paid in installments, this transaction being one of them.
+
+    For each larger invoice of a client named in the description, looks for
+    other unreconciled transactions mentioning the same client, dated within
+    RECONCILIATION_SPLIT_WINDOW_DAYS of the due date, that complete the total.
+
+    Args:
+        transaction: Incoming transaction
+        index: Open invoice index of the user
+        other_transactions: Unreconciled transactions of the user
+
+    Returns:
+        Best grouping (unique before ambiguous, fewer transactions first) or None
+    """
+    amount_cents = to_cents(transaction.amount)
+    if amount_cents <= 0:
+        return None
+
+    best: Optional[SplitMatch] = None
+    for client_key in index.match_clients(transaction.description):
+        client_invoices = index.find_by_client(client_key)
+        installments = [
+            other for other in other_transactions
+            if other.id != transaction.id
+            and _mentions_client(other.description, client_invoices[0].client_name)
+        ]
+        if not installments:
+            continue
+
+        for candidate in client_invoices:
+            if candidate.amount_cents <= amount_cents:
+                continue
+            if _days_apart(transaction, candidate) > settings.RECONCILIATION_SPLIT_WINDOW_DAYS:
+                continue
+
+            in_window = sorted(
+                (
+                    other for other in installments
+                    if _days_apart(other, candidate) <= settings.RECONCILIATION_SPLIT_WINDOW_DAYS
+                ),
+                key=lambda other: _days_apart(other, candidate)
+            )[:settings.RECONCILIATION_SPLIT_MAX_CANDIDATES]
+
+            subset, ambiguous = find_subset(
+                candidate.amount_cents - amount_cents,
+                [(other.id, to_cents(other.amount)) for other in in_window],
+                max_size=settings.RECONCILIATION_SPLIT_MAX_ITEMS - 1
+            )
+            if not subset:
+                continue
+
+            match = SplitMatch(
+                transaction_ids=(transaction.id, *subset),
+                invoices=(candidate,),
+                total_amount=candidate.total_amount,
+                score=AMBIGUOUS_GROUP_SCORE if ambiguous else UNIQUE_GROUP_SCORE,
+                method="partial",
+                reasoning=(
+                    f"Facture {candidate.invoice_number} réglée en "
+                    f"{len(subset) + 1} versements"
+                )
+            )
+            if best is None or (-match.score, len(match.transaction_ids)) < (
+                -best.score, len(best.transaction_ids)
+            ):
+                best = match
+
+    return best
@@ -1,18 +1,59 @@
 """Reminder service - Automated invoice payment reminders"""
-from typing import List
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from sqlalchemy import select, and_, insert
 from sqlalchemy.ext.asyncio import AsyncSession
-from uuid import UUID
+from uuid import UUID, uuid4
 from datetime import datetime, date, timedelta
+import asyncio
 import logging
+import time
 
 from app.models.reminder import Reminder
 from app.models.invoice import Invoice
+from app.models.user import User
 from app.integrations.claude_client import ClaudeClient
-from app.integrations.sendgrid_client import SendGridClient
+from app.integrations.sendgrid_client import EmailMessage, SendGridClient, SendQueue
 from app.services.invoice_service import InvoiceService
+from app.services.reminder_template_service import ReminderTemplateService, template_variables
 
 logger = logging.getLogger(__name__)
 
+# A reminder of the same type is not sent again within this window
+RECENT_REMINDER_WINDOW = timedelta(days=3)
+
+
+def reminder_type_for(days_overdue: int) -> str:
+    """first (1-7 days overdue), second (8-14) or final (15+)"""
+    if days_overdue >= 15:
+        return "final"
+    if days_overdue >= 8:
+        return "second"
+    return "first"
+
+
+async def _user_languages(db: AsyncSession, user_ids: Iterable[UUID]) -> Dict[UUID, str]:
+    """Email language of each user (fr when unset)"""
+    result = await db.execute(
+        select(User.id, User.language).where(User.id.in_(set(user_ids)))
+    )
+    return {row.id: row.language or "fr" for row in result}
+
+
+def _reminder_row(invoice: Invoice, reminder_type: str, email_content: Dict, sent_at: datetime) -> Dict:
+    """Column values of the Reminder recording a sent email"""
+    return {
+        "id": uuid4(),
+        "invoice_id": invoice.id,
+        "reminder_type": reminder_type,
+        "scheduled_at": sent_at,
+        "sent_at": sent_at,
+        "status": "sent",
+        "email_subject": email_content["subject"][:255],
+        "email_body": email_content["body"],
+        "created_at": sent_at,
+        "updated_at": sent_at,
+    }
+
 
 class ReminderService:
     """Service for automated invoice payment reminders"""
@@ -32,7 +73,7 @@ class ReminderService:
             db: Database session
             invoice: Invoice to remind about
             reminder_type: first, second, final
-            ai_client: Claude AI client
+            ai_client: Claude AI client (writes the template on first use)
             email_client: SendGrid client
             
         Returns:
@@ -41,31 +82,24 @@ class ReminderService:
         if not invoice.client_email:
             raise ValueError("Invoice has no client email")
         
-        # Initialize clients if not provided
-        if ai_client is None:
-            ai_client = ClaudeClient()
+        # Initialize client if not provided (Claude is only needed for new templates)
         if email_client is None:
             email_client = SendGridClient()
         
-        # Generate email with AI
-        invoice_data = {
-            "invoice_number": invoice.invoice_number,
-            "client_name": invoice.client_name,
-            "total_amount": float(invoice.total_amount),
-            "currency": invoice.currency,
-            "due_date": invoice.due_date.isoformat(),
-            "days_overdue": (date.today() - invoice.due_date).days
-        }
-        
         try:
-            email_content = await ai_client.generate_reminder_email(
-                invoice=invoice_data,
-                reminder_type=reminder_type,
-                language="fr"  # TODO: Use user's language preference
+            # Render the tenant's template (generated by AI on first use)
+            languages = await _user_languages(db, [invoice.user_id])
+            templates = await ReminderTemplateService.get_templates(
+                db,
+                invoice.user_id,
+                languages.get(invoice.user_id, "fr"),
+                [reminder_type],
+                ai_client
             )
+            email_content = templates[reminder_type].render(template_variables(invoice))
             
             # Send email
-            message_id = await email_client.send_reminder_email(
+            await email_client.send_reminder_email(
                 invoice={"id": invoice.id, "invoice_number": invoice.invoice_number},
                 client_email=invoice.client_email,
                 client_name=invoice.client_name,
@@ -76,14 +110,7 @@ class ReminderService:
             
             # Create reminder record
             reminder = Reminder(
-                invoice_id=invoice.id,
-                reminder_type=reminder_type,
-                email_subject=email_content["subject"],
-                email_body=email_content["body"],
-                sent_to=invoice.client_email,
-                sent_at=datetime.utcnow(),
-                status="sent",
-                email_provider_id=message_id
+                **_reminder_row(invoice, reminder_type, email_content, datetime.utcnow())
             )
             
             db.add(reminder)
@@ -100,6 +127,27 @@ class ReminderService:
             logger.error(f"Failed to send reminder for invoice {invoice.id}: {e}")
             raise
     
+    @staticmethod
+    async def get_recent_reminders(
+        db: AsyncSession,
+        invoice_ids: Iterable[UUID],
+        since: datetime
+    ) -> Set[Tuple[UUID, str]]:
+        """(invoice id, reminder type) of the reminders sent since `since`, in one query."""
+        invoice_ids = list(invoice_ids)
+        if not invoice_ids:
+            return set()
+        result = await db.execute(
+            select(Reminder.invoice_id, Reminder.reminder_type)
+            .where(
+                and_(
+                    Reminder.invoice_id.in_(invoice_ids),
+                    Reminder.sent_at >= since
+                )
+            )
+        )
+        return {(row.invoice_id, row.reminder_type) for row in result}
+    
     @staticmethod
     async def process_overdue_invoices(
         db: AsyncSession,
@@ -115,6 +163,14 @@ class ReminderService:
         - 8-14 days overdue: Second reminder
         - 15+ days overdue: Final reminder
         
+        Runs as a pipeline: one query finds the reminders already sent
+        recently, each tenant's templates are loaded once (Claude only writes
+        the ones a tenant does not have yet), emails are rendered locally and
+        queued on a SendQueue, which sends the emails of one template in
+        batched SendGrid calls; the Reminder rows of the sent emails are
+        inserted in one statement at the end. A failing invoice is counted
+        and does not stop the others.
+        
         Args:
             db: Database session
             user_id: User ID (optional, process all users if None)
@@ -122,70 +178,129 @@ class ReminderService:
             email_client: SendGrid client
             
         Returns:
-            Stats dict with counts
+            Stats dict with counts and per-stage timings (seconds since the
+            start)
         """
-        # Get overdue invoices
+        if email_client is None:
+            email_client = SendGridClient()
+        
+        started = time.perf_counter()
+        timings: Dict[str, float] = {}
+        
+        def elapsed() -> float:
+            return round(time.perf_counter() - started, 3)
+        
+        # Stage 1: overdue invoices
         overdue_invoices = await InvoiceService.get_overdue_invoices(
             db,
             user_id
         )
+        timings["load"] = elapsed()
         
         if not overdue_invoices:
-            return {"total": 0, "sent": 0, "failed": 0}
+            return {"total": 0, "sent": 0, "failed": 0, "skipped": 0, "timings": timings}
         
-        stats = {"total": len(overdue_invoices), "sent": 0, "failed": 0}
+        stats = {"total": len(overdue_invoices), "sent": 0, "failed": 0, "skipped": 0}
         
+        # Stage 2: drop invoices reminded recently (one query for all of them)
+        recent = await ReminderService.get_recent_reminders(
+            db,
+            [invoice.id for invoice in overdue_invoices],
+            datetime.utcnow() - RECENT_REMINDER_WINDOW
+        )
+        candidates: List[Tuple[Invoice, str]] = []
         for invoice in overdue_invoices:
-            try:
-                days_overdue = (date.today() - invoice.due_date).days
-                
-                # Determine reminder type
-                if days_overdue >= 15:
-                    reminder_type = "final"
-                elif days_overdue >= 8:
-                    reminder_type = "second"
-                else:
-                    reminder_type = "first"
-                
-                # Check if reminder already sent
-                from sqlalchemy import select, and_
-                existing = await db.execute(
-                    select(Reminder)
-                    .where(
-                        and_(
-                            Reminder.invoice_id == invoice.id,
-                            Reminder.reminder_type == reminder_type,
-                            Reminder.sent_at >= datetime.utcnow() - timedelta(days=3)
-                        )
-                    )
+            reminder_type = reminder_type_for((date.today() - invoice.due_date).days)
+            if (invoice.id, reminder_type) in recent:
+                logger.info(
+                    f"Reminder already sent recently for invoice {invoice.invoice_number}"
                 )
-                
-                if existing.scalar_one_or_none():
-                    logger.info(
-                        f"Reminder already sent recently for invoice {invoice.invoice_number}"
-                    )
-                    continue
-                
-                # Send reminder
-                await ReminderService.send_reminder(
+                stats["skipped"] += 1
+            elif not invoice.client_email:
+                logger.error(f"Failed to process invoice {invoice.id}: Invoice has no client email")
+                stats["failed"] += 1
+            else:
+                candidates.append((invoice, reminder_type))
+        timings["dedupe"] = elapsed()
+        
+        # Stage 3: templates of each tenant, in one query (generated once)
+        types_by_user: Dict[UUID, Set[str]] = {}
+        for invoice, reminder_type in candidates:
+            types_by_user.setdefault(invoice.user_id, set()).add(reminder_type)
+        languages = await _user_languages(db, types_by_user)
+        templates = {}
+        for tenant_id, reminder_types in types_by_user.items():
+            try:
+                tenant_templates = await ReminderTemplateService.get_templates(
                     db,
-                    invoice,
-                    reminder_type,
-                    ai_client,
-                    email_client
+                    tenant_id,
+                    languages.get(tenant_id, "fr"),
+                    reminder_types,
+                    ai_client
                 )
-                
-                stats["sent"] += 1
-                
             except Exception as e:
-                logger.error(f"Failed to process invoice {invoice.id}: {e}")
+                logger.error(f"Failed to load reminder templates for user {tenant_id}: {e}")
+                continue
+            for reminder_type, template in tenant_templates.items():
+                templates[(tenant_id, reminder_type)] = template
+        timings["templates"] = elapsed()
+        
+        # Stage 4: render locally; emails of one template share a SendGrid batch
+        queue = SendQueue(email_client)
+        pending: List[Tuple[Invoice, str, Dict, asyncio.Future]] = []
+        for invoice, reminder_type in candidates:
+            template = templates.get((invoice.user_id, reminder_type))
+            try:
+                if template is None:
+                    raise ValueError("No reminder template")
+                email_content = template.render_for_batch(template_variables(invoice))
+            except Exception as e:
+                logger.error(f"Failed to render reminder for invoice {invoice.id}: {e}")
+                stats["failed"] += 1
+                continue
+            sent = queue.add(
+                EmailMessage(
+                    to_email=invoice.client_email,
+                    to_name=invoice.client_name,
+                    subject=email_content["subject"],
+                    html_content=email_content["shared_body"],
+                    substitutions=email_content["substitutions"],
+                    custom_args={
+                        "invoice_id": str(invoice.id),
+                        "invoice_number": invoice.invoice_number,
+                        "reminder_type": reminder_type
+                    }
+                )
+            )
+            pending.append((invoice, reminder_type, email_content, sent))
+        timings["render"] = elapsed()
+        
+        # Stage 5: send the batches
+        await queue.flush()
+        rows: List[Dict] = []
+        for invoice, reminder_type, email_content, sent in pending:
+            error: Optional[Exception] = sent.exception()
+            if error is None and sent.result() is None:
+                error = RuntimeError("SendGrid request failed")
+            if error is not None:
+                logger.error(f"Failed to send reminder for invoice {invoice.id}: {error}")
                 stats["failed"] += 1
+                continue
+            rows.append(_reminder_row(invoice, reminder_type, email_content, datetime.utcnow()))
+            stats["sent"] += 1
+        timings["send"] = elapsed()
         
+        # Stage 6: Reminder rows of the sent emails, in one INSERT
+        if rows:
+            await db.execute(insert(Reminder), rows)
         await db.commit()
+        timings["persist"] = elapsed()
         
+        stats["timings"] = timings
         logger.info(
             f"Processed {stats['total']} overdue invoices: "
-            f"{stats['sent']} sent, {stats['failed']} failed"
+            f"{stats['sent']} sent, {stats['failed']} failed, {stats['skipped']} skipped "
+            f"in {timings['persist']}s (templates {timings['templates']}s, send {timings['send']}s)"
         )
         
         return stats
@@ -201,7 +316,7 @@ class ReminderService:
         Returns:
             Stats dict
         """
-        from sqlalchemy import select, func, and_
+        from sqlalchemy import func
         
         # Total reminders
         total_result = await db.execute(
@@ -0,0 +1,429 @@
+"""
+Reminder templates: generated once per tenant, language and type, rendered locally.
+
+A reminder only varies by a few invoice fields, so Claude writes a Jinja
+template once per (user, language, reminder_type); each email is then a
+local render. Compiled templates are cached per process under that key,
+tagged with the row id and version: a tenant edit bumps the version, so every
+process recompiles on its next lookup instead of serving the old text.
+
+Templates can be edited by tenants: they run in a sandboxed Jinja environment
+and may only use TEMPLATE_VARIABLES.
+
+An unusable AI answer is replaced by FALLBACK_TEMPLATES, stored with
+source="fallback" so the next run asks Claude again.
+
+A body that only inserts variables is also rendered once with SendGrid
+substitution tags in their place, so every reminder of a template can go out
+in one batched SendGrid call.
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date, datetime
+from functools import cached_property
+from uuid import UUID
+import asyncio
+import logging
+import threading
+
+from jinja2 import TemplateSyntaxError, meta
+from jinja2.sandbox import SandboxedEnvironment
+from markupsafe import escape
+from sqlalchemy import and_, delete, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.core.metrics import get_counters
+from app.integrations.claude_client import ClaudeClient
+from app.models.invoice import Invoice
+from app.models.reminder_template import ReminderTemplate
+
+logger = logging.getLogger(__name__)
+
+template_counters = get_counters("reminders.templates")
+
+REMINDER_TYPES = ("first", "second", "final")
+
+# The only values a reminder template can use
+TEMPLATE_VARIABLES = frozenset({
+    "invoice_number", "client_name", "total_amount", "currency", "due_date", "days_overdue",
+})
+
+# Used when the AI answer is not a valid template
+FALLBACK_TEMPLATES = {
+    "fr": (
+        "Rappel : facture {{ invoice_number }}",
+        "<p>Bonjour {{ client_name }},</p>"
+        "<p>Sauf erreur de notre part, la facture {{ invoice_number }} de "
+        "{{ total_amount }} {{ currency }}, échue le {{ due_date }}, reste impayée.</p>"
+        "<p>Merci de procéder à son règlement dans les meilleurs délais.</p>",
+    ),
+    "en": (
+        "Reminder: invoice {{ invoice_number }}",
+        "<p>Dear {{ client_name }},</p>"
+        "<p>Invoice {{ invoice_number }} of {{ total_amount }} {{ currency }}, "
+        "due on {{ due_date }}, is still unpaid.</p>"
+        "<p>Please arrange payment at your earliest convenience.</p>",
+    ),
+}
+
+# SendGrid substitution tag of each variable in a shared body
+SUBSTITUTION_TAGS = {name: f"-{name}-" for name in TEMPLATE_VARIABLES}
+
+# Subjects are plain text, bodies HTML (invoice fields are escaped)
+_subject_environment = SandboxedEnvironment(autoescape=False)
+_body_environment = SandboxedEnvironment(autoescape=True)
+
+
+def validate_template(subject: str, body: str) -> None:
+    """
+    Check a subject/body pair compiles and only uses TEMPLATE_VARIABLES.
+
+    Raises:
+        ValueError: Empty, invalid or using unknown variables
+    """
+    for name, source, environment in (
+        ("subject", subject, _subject_environment),
+        ("body", body, _body_environment),
+    ):
+        if not source or not source.strip():
+            raise ValueError(f"Template {name} is empty")
+        try:
+            parsed = environment.parse(source)
+        except TemplateSyntaxError as e:
+            raise ValueError(f"Invalid template {name}: {e.message}")
+        unknown = meta.find_undeclared_variables(parsed) - TEMPLATE_VARIABLES
+        if unknown:
+            raise ValueError(
+                f"Unknown variables in template {name}: {', '.join(sorted(unknown))}"
+            )
+
+
+def template_variables(invoice: Invoice) -> Dict:
+    """Values of TEMPLATE_VARIABLES for an invoice"""
+    return {
+        "invoice_number": invoice.invoice_number,
+        "client_name": invoice.client_name,
+        "total_amount": f"{invoice.total_amount:.2f}",
+        "currency": invoice.currency,
+        "due_date": invoice.due_date.strftime("%d/%m/%Y"),
+        "days_overdue": (date.today() - invoice.due_date).days,
+    }
+
+
+@dataclass(frozen=True)
+class CompiledTemplate:
+    """Compiled subject and body of one template row version"""
+    template_id: UUID
+    version: int
+    subject: object
+    body: object
+
+    def render(self, variables: Dict) -> Dict[str, str]:
+        """Email subject and HTML body for these variables"""
+        return {
+            "subject": " ".join(self.subject.render(variables).split()),
+            "body": self.body.render(variables),
+        }
+    
+    @cached_property
+    def tagged_body(self) -> Optional[str]:
+        """Body with the substitution tag of each variable (None if it cannot render them)"""
+        try:
+            return self.body.render(SUBSTITUTION_TAGS)
+        except Exception:
+            return None
+    
+    def render_for_batch(self, variables: Dict) -> Dict:
+        """
+        Rendered email plus the body to send and its SendGrid substitutions.
+        
+        When substituting the variables into `tagged_body` gives exactly the
+        rendered body (no filters or conditions on the values), every email
+        of this template shares `shared_body`; otherwise `shared_body` is the
+        rendered body and there are no substitutions.
+        """
+        email = self.render(variables)
+        tagged = self.tagged_body
+        if tagged is not None:
+            substitutions = {
+                tag: str(escape(variables[name]))
+                for name, tag in SUBSTITUTION_TAGS.items()
+                if tag in tagged
+            }
+            substituted = tagged
+            for tag, value in substitutions.items():
+                substituted = substituted.replace(tag, value)
+            if substituted == email["body"]:
+                return {**email, "shared_body": tagged, "substitutions": substitutions}
+        return {**email, "shared_body": email["body"], "substitutions": {}}
+
+
+TemplateKey = Tuple[UUID, str, str]
+
+
+class CompiledTemplateCache:
+    """Process-wide LRU of compiled templates keyed by (user, language, type)"""
+
+    def __init__(self, max_size: Optional[int] = None):
+        self.max_size = max_size
+        self._entries: "OrderedDict[TemplateKey, CompiledTemplate]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, template: ReminderTemplate) -> CompiledTemplate:
+        """Compiled version of a template row (compiled on a miss or a newer version)."""
+        key = (template.user_id, template.language, template.reminder_type)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry.template_id, entry.version) == (template.id, template.version):
+                self._entries.move_to_end(key)
+                template_counters.increment("cache_hits")
+                return entry
+
+        entry = CompiledTemplate(
+            template_id=template.id,
+            version=template.version,
+            subject=_subject_environment.from_string(template.subject_template),
+            body=_body_environment.from_string(template.body_template),
+        )
+        template_counters.increment("compiled")
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            max_size = self.max_size or settings.REMINDER_TEMPLATE_CACHE_SIZE
+            while len(self._entries) > max_size:
+                self._entries.popitem(last=False)
+        return entry
+
+    def invalidate(self, user_id: UUID, language: Optional[str] = None, reminder_type: Optional[str] = None) -> None:
+        """Forget the compiled templates of a user (optionally one language/type)."""
+        with self._lock:
+            for key in list(self._entries):
+                if key[0] == user_id and language in (None, key[1]) and reminder_type in (None, key[2]):
+                    del self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+compiled_templates = CompiledTemplateCache()
+
+
+class ReminderTemplateService:
+    """Reminder templates per tenant: AI generation, tenant edits, compiled lookup"""
+
+    @staticmethod
+    async def get_templates(
+        db: AsyncSession,
+        user_id: UUID,
+        language: str,
+        reminder_types: Iterable[str],
+        ai_client: Optional[ClaudeClient] = None
+    ) -> Dict[str, CompiledTemplate]:
+        """
+        Compiled templates of a user for some reminder types.
+
+        Stored templates are read in one query; missing ones, and fallback
+        ones, are generated by Claude (concurrently, at most
+        REMINDER_GENERATION_CONCURRENCY at once) and stored, so each is
+        generated once per tenant.
+
+        Args:
+            db: Database session
+            user_id: User ID
+            language: Email language
+            reminder_types: first, second, final
+            ai_client: Claude AI client (only used for missing templates)
+
+        Returns:
+            Dict of reminder type → compiled template
+        """
+        reminder_types = sorted(set(reminder_types))
+        rows = await ReminderTemplateService._load(db, user_id, language, reminder_types)
+
+        missing = [
+            reminder_type for reminder_type in reminder_types
+            if reminder_type not in rows or rows[reminder_type].source == "fallback"
+        ]
+        if missing:
+            if ai_client is None:
+                ai_client = ClaudeClient()
+            generated = await ReminderTemplateService._generate(ai_client, language, missing)
+            await ReminderTemplateService._store(db, user_id, language, generated)
+            rows = await ReminderTemplateService._load(db, user_id, language, reminder_types)
+
+        return {
+            reminder_type: compiled_templates.get(row)
+            for reminder_type, row in rows.items()
+        }
+
+    @staticmethod
+    async def _load(
+        db: AsyncSession,
+        user_id: UUID,
+        language: str,
+        reminder_types: List[str]
+    ) -> Dict[str, ReminderTemplate]:
+        result = await db.execute(
+            select(ReminderTemplate).where(
+                and_(
+                    ReminderTemplate.user_id == user_id,
+                    ReminderTemplate.language == language,
+                    ReminderTemplate.reminder_type.in_(reminder_types)
+                )
+            )
+        )
+        return {row.reminder_type: row for row in result.scalars().all()}
+
+    @staticmethod
+    async def _generate(
+        ai_client: ClaudeClient,
+        language: str,
+        reminder_types: List[str]
+    ) -> Dict[str, Tuple[str, str, str]]:
+        """Reminder type → (subject, body, source) from Claude, or the fallback template."""
+        semaphore = asyncio.Semaphore(settings.REMINDER_GENERATION_CONCURRENCY)
+
+        async def generate_one(reminder_type: str) -> Tuple[str, str, str]:
+            async with semaphore:
+                content = await ai_client.generate_reminder_template(reminder_type, language)
+            template_counters.increment("generated")
+            try:
+                validate_template(content["subject"], content["body"])
+                return content["subject"], content["body"], "ai"
+            except ValueError as e:
+                logger.warning(f"Unusable AI reminder template ({reminder_type}, {language}): {e}")
+                template_counters.increment("fallbacks")
+                return (*FALLBACK_TEMPLATES.get(language, FALLBACK_TEMPLATES["en"]), "fallback")
+
+        templates = await asyncio.gather(*(generate_one(reminder_type) for reminder_type in reminder_types))
+        return dict(zip(reminder_types, templates))
+
+    @staticmethod
+    async def _store(
+        db: AsyncSession,
+        user_id: UUID,
+        language: str,
+        templates: Dict[str, Tuple[str, str, str]]
+    ) -> None:
+        """
+        Insert generated templates in place of fallback ones.
+
+        A template generated meanwhile by another worker wins.
+        """
+        await db.execute(
+            delete(ReminderTemplate).where(
+                and_(
+                    ReminderTemplate.user_id == user_id,
+                    ReminderTemplate.language == language,
+                    ReminderTemplate.reminder_type.in_(list(templates)),
+                    ReminderTemplate.source == "fallback"
+                )
+            )
+        )
+        now = datetime.utcnow()
+        rows = [
+            {
+                "user_id": user_id,
+                "language": language,
+                "reminder_type": reminder_type,
+                "subject_template": subject,
+                "body_template": body,
+                "source": source,
+                "version": 1,
+                "created_at": now,
+                "updated_at": now,
+            }
+            for reminder_type, (subject, body, source) in templates.items()
+        ]
+        if db.get_bind().dialect.name == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+            stmt = pg_insert(ReminderTemplate).on_conflict_do_nothing(
+                index_elements=["user_id", "language", "reminder_type"]
+            )
+            await db.execute(stmt, rows)
+        else:
+            await db.execute(insert(ReminderTemplate), rows)
+        await db.flush()
+
+    @staticmethod
+    async def list_templates(db: AsyncSession, user_id: UUID) -> List[ReminderTemplate]:
+        """Stored templates of a user"""
+        result = await db.execute(
+            select(ReminderTemplate)
+            .where(ReminderTemplate.user_id == user_id)
+            .order_by(ReminderTemplate.language, ReminderTemplate.reminder_type)
+        )
+        return list(result.scalars().all())
+
+    @staticmethod
+    async def save_template(
+        db: AsyncSession,
+        user_id: UUID,
+        language: str,
+        reminder_type: str,
+        subject: str,
+        body: str
+    ) -> ReminderTemplate:
+        """
+        Store a tenant's own template, replacing the AI one.
+
+        The version bump invalidates the compiled copies cached by every process.
+
+        Raises:
+            ValueError: Unknown reminder type or invalid template
+        """
+        if reminder_type not in REMINDER_TYPES:
+            raise ValueError(f"Unknown reminder type: {reminder_type}")
+        validate_template(subject, body)
+
+        rows = await ReminderTemplateService._load(db, user_id, language, [reminder_type])
+        template = rows.get(reminder_type)
+        if template is None:
+            template = ReminderTemplate(
+                user_id=user_id,
+                language=language,
+                reminder_type=reminder_type,
+                version=0
+            )
+            db.add(template)
+        template.subject_template = subject
+        template.body_template = body
+        template.source = "custom"
+        template.version += 1
+        await db.flush()
+
+        compiled_templates.invalidate(user_id, language, reminder_type)
+        logger.info(f"Reminder template {reminder_type}/{language} of user {user_id} saved (v{template.version})")
+        return template
+
+    @staticmethod
+    async def reset_template(
+        db: AsyncSession,
+        user_id: UUID,
+        language: str,
+        reminder_type: str
+    ) -> bool:
+        """
+        Drop a template: the next reminder generates a new AI one.
+
+        Returns:
+            True if a template was deleted
+        """
+        result = await db.execute(
+            delete(ReminderTemplate).where(
+                and_(
+                    ReminderTemplate.user_id == user_id,
+                    ReminderTemplate.language == language,
+                    ReminderTemplate.reminder_type == reminder_type
+                )
+            )
+        )
+        compiled_templates.invalidate(user_id, language, reminder_type)
+        return bool(result.rowcount)
@@ -0,0 +1,126 @@
+"""Tenant fan-out: page through users with pending work for periodic jobs"""
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+from datetime import date
+from uuid import UUID
+import logging
+
+from sqlalchemy import and_, exists, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models.bank_account import BankAccount
+from app.models.invoice import Invoice
+from app.models.transaction import Transaction
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+
+def _has_uncategorized_transactions():
+    return exists().where(
+        and_(
+            BankAccount.user_id == User.id,
+            Transaction.bank_account_id == BankAccount.id,
+            Transaction.category.is_(None),
+            Transaction.deleted_at.is_(None)
+        )
+    )
+
+
+def _has_overdue_invoices():
+    # Same conditions as InvoiceService.get_overdue_invoices
+    return exists().where(
+        and_(
+            Invoice.user_id == User.id,
+            Invoice.status.in_(["pending", "overdue"]),
+            Invoice.due_date < date.today(),
+            Invoice.deleted_at.is_(None)
+        )
+    )
+
+
+# Job name → EXISTS clause telling whether a user has work for the job
+PENDING_WORK: Dict[str, Callable] = {
+    "categorize": _has_uncategorized_transactions,
+    "reminders": _has_overdue_invoices,
+}
+
+
+class TenantScheduler:
+    """Selects tenants with pending work, one page at a time"""
+
+    @staticmethod
+    async def get_tenant_page(
+        db: AsyncSession,
+        job: str,
+        after: Optional[UUID] = None,
+        limit: Optional[int] = None
+    ) -> List[UUID]:
+        """
+        Next page of active users with pending work for a job.
+
+        Users are paged by id (keyset, no OFFSET) and filtered with an EXISTS
+        subquery, so each page costs an index range scan whatever the number
+        of tenants, and users with nothing to do are never dispatched.
+
+        Args:
+            db: Database session
+            job: Key of PENDING_WORK
+            after: Last user id of the previous page
+            limit: Page size (default: TENANT_FANOUT_PAGE_SIZE)
+
+        Returns:
+            User ids in id order
+        """
+        if job not in PENDING_WORK:
+            raise ValueError(f"Unknown tenant job: {job}")
+        limit = limit or settings.TENANT_FANOUT_PAGE_SIZE
+
+        conditions = [
+            User.is_active == True,
+            User.deleted_at.is_(None),
+            PENDING_WORK[job](),
+        ]
+        if after is not None:
+            conditions.append(User.id > after)
+
+        result = await db.execute(
+            select(User.id)
+            .where(and_(*conditions))
+            .order_by(User.id)
+            .limit(limit)
+        )
+        return list(result.scalars().all())
+
+    @staticmethod
+    async def plan_page(
+        db: AsyncSession,
+        job: str,
+        after: Optional[UUID] = None
+    ) -> Tuple[List[List[UUID]], Optional[UUID]]:
+        """
+        Split the next page of tenants into chunks for subtasks.
+
+        Returns:
+            (chunks of user ids, cursor of the next page or None if this
+            page was the last one)
+        """
+        page_size = settings.TENANT_FANOUT_PAGE_SIZE
+        user_ids = await TenantScheduler.get_tenant_page(db, job, after, page_size)
+        chunk_size = settings.TENANT_FANOUT_CHUNK_SIZE
+        chunks = [
+            user_ids[start:start + chunk_size]
+            for start in range(0, len(user_ids), chunk_size)
+        ]
+        next_after = user_ids[-1] if len(user_ids) == page_size else None
+        return chunks, next_after
+
+    @staticmethod
+    def aggregate(results: Iterable[Mapping[str, int]], totals: Optional[Mapping[str, int]] = None) -> Dict[str, int]:
+        """Sum the numeric stats of several chunk results (and running totals)."""
+        aggregated: Dict[str, int] = dict(totals or {})
+        for result in results:
+            for key, value in (result or {}).items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    aggregated[key] = aggregated.get(key, 0) + value
+        return aggregated
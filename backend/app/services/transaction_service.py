@@ -166,6 +166,7 @@ class TransactionService:
         """Set AI category for transaction"""
         transaction.category = category
         transaction.category_confidence = confidence
+        transaction.category_source = "ai"
         await db.flush()
         
         logger.info(f"Transaction categorized: {transaction.id} → {category}")
@@ -175,24 +176,98 @@ class TransactionService:
     async def get_uncategorized_transactions(
         db: AsyncSession,
         user_id: UUID,
-        limit: int = 100
+        limit: int = 100,
+        transaction_ids: Optional[List[UUID]] = None
     ) -> List[Transaction]:
-        """Get transactions without AI category"""
+        """Get transactions without AI category (optionally among `transaction_ids`)"""
         from app.models.bank_account import BankAccount
         
+        conditions = [
+            BankAccount.user_id == user_id,
+            Transaction.category.is_(None),
+            Transaction.deleted_at.is_(None)
+        ]
+        if transaction_ids is not None:
+            if not transaction_ids:
+                return []
+            conditions.append(Transaction.id.in_(transaction_ids))
+        
         result = await db.execute(
             select(Transaction)
             .join(BankAccount)
-            .where(
-                and_(
-                    BankAccount.user_id == user_id,
-                    Transaction.category.is_(None),
-                    Transaction.deleted_at.is_(None)
-                )
-            )
+            .where(and_(*conditions))
             .order_by(Transaction.date.desc())
             .limit(limit)
         )
         return list(result.scalars().all())
-
-
+    
+    @staticmethod
+    async def get_unreconciled_transactions(
+        db: AsyncSession,
+        user_id: UUID,
+        transaction_ids: Optional[List[UUID]] = None,
+        since: Optional[datetime] = None,
+        limit: Optional[int] = None,
+        after: Optional[Tuple[datetime, UUID]] = None,
+        until: Optional[datetime] = None,
+        newest_first: bool = False
+    ) -> List[Transaction]:
+        """
+        Get unreconciled incoming transactions for a user in one query.
+        
+        Args:
+            db: Database session
+            user_id: User ID
+            transaction_ids: Restrict to these transactions (optional)
+            since: Only transactions dated on/after this datetime (optional)
+            limit: Max number of transactions (optional)
+            after: Only transactions after this (date, id) position (optional)
+            until: Only transactions dated before this datetime (optional)
+            newest_first: Return the most recent transactions first
+            
+        Returns:
+            Unreconciled credit transactions, oldest first (by date, then id)
+            unless newest_first is set
+        """
+        from app.models.bank_account import BankAccount
+        
+        conditions = [
+            BankAccount.user_id == user_id,
+            Transaction.is_reconciled.is_(False),
+            Transaction.amount > 0,
+            Transaction.deleted_at.is_(None)
+        ]
+        
+        if transaction_ids is not None:
+            if not transaction_ids:
+                return []
+            conditions.append(Transaction.id.in_(transaction_ids))
+        
+        if since is not None:
+            conditions.append(Transaction.date >= since)
+        
+        if until is not None:
+            conditions.append(Transaction.date < until)
+        
+        if after is not None:
+            after_date, after_id = after
+            conditions.append(or_(
+                Transaction.date > after_date,
+                and_(Transaction.date == after_date, Transaction.id > after_id)
+            ))
+        
+        if newest_first:
+            order = (Transaction.date.desc(), Transaction.id.desc())
+        else:
+            order = (Transaction.date.asc(), Transaction.id.asc())
+        query = (
+            select(Transaction)
+            .join(BankAccount)
+            .where(and_(*conditions))
+            .order_by(*order)
+        )
+        if limit is not None:
+            query = query.limit(limit)
+        
+        result = await db.execute(query)
+        return list(result.scalars().all())
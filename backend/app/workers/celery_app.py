@@ -1,6 +1,8 @@
 """Celery application configuration"""
 from celery import Celery
+from celery.signals import celeryd_init
 from app.config import settings
+from app.workers.queues import INTERACTIVE_QUEUE, PRIORITY_NORMAL, TASK_QUEUES, TASK_ROUTES, worker_limits
 
 # Create Celery app
 celery_app = Celery(
@@ -22,10 +24,35 @@ celery_app.conf.update(
     task_track_started=True,
     task_time_limit=30 * 60,  # 30 minutes
     task_soft_time_limit=25 * 60,  # 25 minutes (warning)
-    worker_prefetch_multiplier=4,
+    worker_prefetch_multiplier=1,  # Per queue, see configure_worker_for_queues
     worker_max_tasks_per_child=1000,
+    # Routing: interactive, sync, bulk_ai and email queues (app.workers.queues)
+    task_queues=TASK_QUEUES,
+    task_routes=TASK_ROUTES,
+    task_default_queue=INTERACTIVE_QUEUE,
+    task_default_priority=PRIORITY_NORMAL,
+    broker_transport_options={
+        # One Redis list per priority step (0 served first)
+        "priority_steps": list(range(10)),
+        "sep": ":",
+        # A worker consuming "-Q interactive,sync" empties interactive first
+        "queue_order_strategy": "priority",
+    },
 )
 
+
+@celeryd_init.connect
+def configure_worker_for_queues(conf=None, options=None, **kwargs):
+    """
+    Size a worker for the queues it consumes (`-Q`).
+
+    Runs before the worker reads its settings, so explicit `--concurrency`
+    and `--prefetch-multiplier` flags still win.
+    """
+    concurrency, prefetch = worker_limits((options or {}).get("queues"))
+    conf.worker_concurrency = concurrency
+    conf.worker_prefetch_multiplier = prefetch
+
 # Beat schedule (periodic tasks)
 celery_app.conf.beat_schedule = {
     # Categorize uncategorized transactions every hour
@@ -33,6 +60,11 @@ celery_app.conf.beat_schedule = {
         "task": "app.workers.tasks.categorize_uncategorized_transactions_task",
         "schedule": 3600.0,  # Every hour
     },
+    # Evict expired / least recently used category memo entries daily
+    "evict-category-memos-daily": {
+        "task": "app.workers.tasks.evict_category_memos_task",
+        "schedule": 86400.0,  # Every day
+    },
     # Process overdue invoices (send reminders) daily at 9am
     "process-overdue-invoices-daily": {
         "task": "app.workers.tasks.process_overdue_invoices_task",
@@ -41,10 +73,15 @@ celery_app.conf.beat_schedule = {
             "minute": 0,
         },
     },
-    # Sync bank transactions every 6 hours
+    # Publish outbox events whose post-commit kick was lost or failed
+    "relay-outbox": {
+        "task": "app.workers.tasks.relay_outbox_task",
+        "schedule": float(settings.OUTBOX_RELAY_INTERVAL_SECONDS),
+    },
+    # Safety net for missed Bridge webhooks: sync accounts not synced lately
     "sync-bank-transactions": {
         "task": "app.workers.tasks.sync_all_bank_accounts_task",
-        "schedule": 21600.0,  # Every 6 hours
+        "schedule": float(settings.BRIDGE_POLL_INTERVAL_SECONDS),  # Daily by default
     },
 }
 
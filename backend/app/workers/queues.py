@@ -0,0 +1,90 @@
+"""
+Celery queues, task routes and priorities.
+
+Work is split by latency needs so a user-facing job never waits behind a
+bulk run:
+
+- interactive: reconciliations a user is waiting for
+- sync: Bridge syncs (webhook-triggered ones go first)
+- bulk_ai: hourly categorization, other tenant-wide AI batches and bulk
+  invoice PDF exports
+- email: reminder runs
+
+Each queue gets its own workers (`celery worker -Q <queue>`) whose
+concurrency and prefetch come from the CELERY_<QUEUE>_* settings.
+"""
+from typing import Dict, Iterable, Tuple, Union
+
+from kombu import Queue
+
+from app.config import settings
+
+INTERACTIVE_QUEUE = "interactive"
+SYNC_QUEUE = "sync"
+BULK_AI_QUEUE = "bulk_ai"
+EMAIL_QUEUE = "email"
+
+QUEUES = (INTERACTIVE_QUEUE, SYNC_QUEUE, BULK_AI_QUEUE, EMAIL_QUEUE)
+
+# Redis emulates priorities with one list per step and serves 0 first (the
+# reverse of AMQP). Within a queue, a user-triggered job overtakes the
+# thousands of chunks a tenant fan-out leaves waiting.
+PRIORITY_URGENT = 0
+PRIORITY_NORMAL = 4
+PRIORITY_BACKGROUND = 9
+
+TASK_QUEUES = tuple(Queue(name, routing_key=name) for name in QUEUES)
+
+# Task → queue and default priority; callers may still pass `priority=`
+TASK_ROUTES = {
+    "app.workers.tasks.auto_reconcile_transaction_task": {"queue": INTERACTIVE_QUEUE, "priority": PRIORITY_URGENT},
+    "app.workers.tasks.reconcile_transactions_batch_task": {"queue": INTERACTIVE_QUEUE, "priority": PRIORITY_NORMAL},
+    "app.workers.tasks.relay_outbox_task": {"queue": INTERACTIVE_QUEUE, "priority": PRIORITY_URGENT},
+    "app.workers.tasks.sync_bank_account_task": {"queue": SYNC_QUEUE, "priority": PRIORITY_NORMAL},
+    "app.workers.tasks.sync_bank_account_group_task": {"queue": SYNC_QUEUE, "priority": PRIORITY_NORMAL},
+    "app.workers.tasks.sync_all_bank_accounts_task": {"queue": SYNC_QUEUE, "priority": PRIORITY_BACKGROUND},
+    "app.workers.tasks.categorize_uncategorized_transactions_task": {"queue": BULK_AI_QUEUE, "priority": PRIORITY_NORMAL},
+    "app.workers.tasks.evict_category_memos_task": {"queue": BULK_AI_QUEUE, "priority": PRIORITY_NORMAL},
+    "app.workers.tasks.fan_out_tenants_task": {"queue": BULK_AI_QUEUE, "priority": PRIORITY_NORMAL},
+    "app.workers.tasks.run_tenant_chunk_task": {"queue": BULK_AI_QUEUE, "priority": PRIORITY_BACKGROUND},
+    "app.workers.tasks.tenant_page_done_task": {"queue": BULK_AI_QUEUE, "priority": PRIORITY_NORMAL},
+    "app.workers.tasks.export_invoices_pdf_task": {"queue": BULK_AI_QUEUE, "priority": PRIORITY_URGENT},
+    "app.workers.tasks.process_overdue_invoices_task": {"queue": EMAIL_QUEUE, "priority": PRIORITY_NORMAL},
+}
+
+
+def _queue_settings() -> Dict[str, Tuple[int, int]]:
+    """Queue → (concurrency, prefetch multiplier) from the settings."""
+    return {
+        INTERACTIVE_QUEUE: (settings.CELERY_INTERACTIVE_CONCURRENCY, settings.CELERY_INTERACTIVE_PREFETCH),
+        SYNC_QUEUE: (settings.CELERY_SYNC_CONCURRENCY, settings.CELERY_SYNC_PREFETCH),
+        BULK_AI_QUEUE: (settings.CELERY_BULK_AI_CONCURRENCY, settings.CELERY_BULK_AI_PREFETCH),
+        EMAIL_QUEUE: (settings.CELERY_EMAIL_CONCURRENCY, settings.CELERY_EMAIL_PREFETCH),
+    }
+
+
+def worker_limits(queues: Union[str, Iterable[str], None]) -> Tuple[int, int]:
+    """
+    Concurrency and prefetch multiplier of a worker consuming `queues`.
+
+    A worker serving several queues takes the most latency-sensitive
+    settings: the highest concurrency and the lowest prefetch (a prefetched
+    bulk task would otherwise sit in front of an interactive one).
+
+    Args:
+        queues: Queue names (`-Q` value, comma-separated or list); all
+            queues when empty
+
+    Returns:
+        (concurrency, prefetch multiplier)
+    """
+    if isinstance(queues, str):
+        queues = [name.strip() for name in queues.split(",")]
+    limits = _queue_settings()
+    selected = [limits[name] for name in (queues or QUEUES) if name in limits]
+    if not selected:
+        selected = list(limits.values())
+    return (
+        max(concurrency for concurrency, _ in selected),
+        min(prefetch for _, prefetch in selected),
+    )
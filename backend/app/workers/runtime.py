@@ -0,0 +1,143 @@
+"""
+Async runtime of a Celery worker process.
+
+Celery runs tasks synchronously; async tasks need an event loop. Rather than
+one `asyncio.run` (a new loop) per task, each worker process keeps one loop
+for its lifetime, started on `worker_process_init`, so the database pool,
+the pooled HTTP clients (Bridge, SendGrid, Claude) and their limiters are
+created once and reused by every task the process runs.
+"""
+from typing import Awaitable, Callable, List, Optional, TypeVar
+import asyncio
+import logging
+import threading
+import weakref
+
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class LoopBoundSessionMaker:
+    """
+    Session maker whose engine belongs to the running event loop.
+
+    asyncpg connections can only be used from the loop that opened them, so
+    each loop gets its own engine (created on first use): the worker loop
+    keeps one pool for the life of the process, a throwaway loop gets a
+    throwaway pool that is disposed with it.
+    """
+
+    def __init__(self, url: str, **engine_kwargs):
+        self.url = url
+        self.engine_kwargs = engine_kwargs
+        self._makers: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, async_sessionmaker]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    def _maker(self) -> async_sessionmaker:
+        loop = asyncio.get_running_loop()
+        maker = self._makers.get(loop)
+        if maker is None:
+            engine = create_async_engine(self.url, **self.engine_kwargs)
+            maker = self._makers[loop] = async_sessionmaker(
+                engine,
+                class_=AsyncSession,
+                expire_on_commit=False,
+            )
+        return maker
+
+    @property
+    def engine(self) -> AsyncEngine:
+        """Engine of the running event loop."""
+        return self._maker().kw["bind"]
+
+    def __call__(self) -> AsyncSession:
+        return self._maker()()
+
+    async def dispose(self) -> None:
+        """Close the pool of the running event loop."""
+        maker = self._makers.pop(asyncio.get_running_loop(), None)
+        if maker is not None:
+            await maker.kw["bind"].dispose()
+
+
+class WorkerRuntime:
+    """
+    One event loop per worker process.
+
+    `run` executes a coroutine on the persistent loop once `start` was
+    called (worker processes), or on a throwaway loop otherwise (solo pool,
+    scripts, tests), in which case the per-loop resources are released at
+    the end of the call instead of leaking with the loop.
+    """
+
+    def __init__(self):
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._owner_thread: Optional[int] = None
+        self._shutdown_hooks: List[Callable[[], Awaitable[None]]] = []
+        self._startup_hooks: List[Callable[[], Awaitable[None]]] = []
+
+    def on_startup(self, hook: Callable[[], Awaitable[None]]) -> None:
+        """Register a coroutine run on the loop when it starts (cache warm-up)."""
+        self._startup_hooks.append(hook)
+
+    def on_shutdown(self, hook: Callable[[], Awaitable[None]]) -> None:
+        """Register a coroutine releasing the resources of the running loop."""
+        self._shutdown_hooks.append(hook)
+
+    @property
+    def started(self) -> bool:
+        return self.loop is not None and not self.loop.is_closed()
+
+    def start(self) -> None:
+        """Create the process loop and run the startup hooks."""
+        if self.started:
+            return
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self._owner_thread = threading.get_ident()
+        self.loop.run_until_complete(self._run_hooks(self._startup_hooks))
+        logger.info("Worker event loop started")
+
+    def stop(self) -> None:
+        """Release the loop's resources and close it."""
+        if not self.started:
+            return
+        loop, self.loop = self.loop, None
+        try:
+            loop.run_until_complete(self._run_hooks(self._shutdown_hooks))
+            loop.run_until_complete(loop.shutdown_asyncgens())
+        finally:
+            asyncio.set_event_loop(None)
+            loop.close()
+        logger.info("Worker event loop stopped")
+
+    def run(self, coro: Awaitable[T]) -> T:
+        """Run a coroutine to completion and return its result."""
+        if (
+            self.started
+            and threading.get_ident() == self._owner_thread
+            and not self.loop.is_running()
+        ):
+            return self.loop.run_until_complete(coro)
+        return asyncio.run(self._run_isolated(coro))
+
+    async def _run_isolated(self, coro: Awaitable[T]) -> T:
+        try:
+            return await coro
+        finally:
+            await self._run_hooks(self._shutdown_hooks)
+
+    @staticmethod
+    async def _run_hooks(hooks: List[Callable[[], Awaitable[None]]]) -> None:
+        for hook in hooks:
+            try:
+                await hook()
+            except Exception as e:
+                logger.warning(f"Worker runtime hook {getattr(hook, '__qualname__', hook)} failed: {e}")
+
+
+worker_runtime = WorkerRuntime()
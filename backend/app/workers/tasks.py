@@ -1,46 +1,96 @@
 """Celery tasks for background processing"""
-from celery import Task
+from celery import Task, chord, group
+from celery.signals import worker_process_init, worker_process_shutdown
 from celery.utils.log import get_task_logger
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+from sqlalchemy import text
 import asyncio
-from typing import Optional
+import time
+from typing import Dict, List, Optional
 
 from app.config import settings
+from app.core import locks
+from app.core.locks import LockBusy, entity_locks
 from app.workers.celery_app import celery_app
-from app.integrations.bridge_client import BridgeClient, BridgeAPIError
+from app.workers.queues import BULK_AI_QUEUE, EMAIL_QUEUE, PRIORITY_BACKGROUND
+from app.workers.runtime import LoopBoundSessionMaker, worker_runtime
+from app.integrations import bridge_client, claude_client, sendgrid_client
+from app.integrations.bridge_client import BridgeClient
 from app.integrations.claude_client import ClaudeClient
 from app.integrations.sendgrid_client import SendGridClient
+from app.services.categorization_model import GLOBAL_SCOPE, local_categorizer
 from app.services.categorization_service import CategorizationService
+from app.services.category_memo_service import CategoryMemoService
 from app.services.reconciliation_service import ReconciliationService
+from app.services.invoice_export_service import ExportProgress, InvoiceExportService
+from app.services.outbox_service import TRANSACTIONS_CREATED
+from app.services.pdf_render_pool import pdf_render_pool
 from app.services.reminder_service import ReminderService
+from app.services.tenant_scheduler import TenantScheduler
 
 logger = get_task_logger(__name__)
 
 
-# Database session for tasks
-engine = create_async_engine(
+# Database sessions for tasks: one pool per worker loop, reused across tasks
+SessionLocal = LoopBoundSessionMaker(
     settings.DATABASE_URL,
     pool_pre_ping=True,
     echo=False,
 )
 
-SessionLocal = async_sessionmaker(
-    engine,
-    class_=AsyncSession,
-    expire_on_commit=False,
-)
+
+async def _warm_caches():
+    """Load what the first task would otherwise pay for."""
+    local_categorizer.get_model(GLOBAL_SCOPE)
+    async with SessionLocal() as db:
+        await db.execute(text("SELECT 1"))
+
+
+worker_runtime.on_startup(_warm_caches)
+worker_runtime.on_shutdown(claude_client.close_shared_clients)
+worker_runtime.on_shutdown(bridge_client.close_shared_clients)
+worker_runtime.on_shutdown(sendgrid_client.close_shared_clients)
+worker_runtime.on_shutdown(locks.close_shared_clients)
+worker_runtime.on_shutdown(pdf_render_pool.close)
+worker_runtime.on_shutdown(SessionLocal.dispose)
+
+
+@worker_process_init.connect
+def start_worker_runtime(**kwargs):
+    """Start the event loop of a worker process (after the fork)."""
+    worker_runtime.start()
+
+
+@worker_process_shutdown.connect
+def stop_worker_runtime(**kwargs):
+    """Close the pools of a worker process."""
+    worker_runtime.stop()
+
+
+# Lock kind of a user's invoice/transaction matching (see app.core.locks)
+RECONCILIATION_LOCK = "reconciliation"
+
+
+def _requeue_when_unlocked(task: Task, error: LockBusy) -> Dict:
+    """Run a task again later, once the job holding the entity lock is done."""
+    logger.info(f"{error}: {task.name} queued again")
+    task.apply_async(
+        args=task.request.args,
+        kwargs=task.request.kwargs,
+        countdown=settings.TASK_LOCK_RETRY_SECONDS
+    )
+    return {"locked": True}
 
 
 class AsyncTask(Task):
     """Base task class for async operations"""
     
     def __call__(self, *args, **kwargs):
-        """Run async task in event loop"""
-        return asyncio.run(self.run_async(*args, **kwargs))
+        """Run async task on the worker's event loop"""
+        return worker_runtime.run(self.run_async(*args, **kwargs))
     
     async def run_async(self, *args, **kwargs):
-        """Override this method in subclasses"""
-        raise NotImplementedError
+        """Task body: the decorated coroutine function (override to wrap it)"""
+        return await self.run(*args, **kwargs)
 
 
 @celery_app.task(
@@ -50,12 +100,17 @@ class AsyncTask(Task):
     time_limit=300,
     soft_time_limit=270
 )
-async def categorize_uncategorized_transactions_task(self, user_id: Optional[str] = None):
+async def categorize_uncategorized_transactions_task(
+    self,
+    user_id: Optional[str] = None,
+    transaction_ids: Optional[List[str]] = None
+):
     """
     Categorize all uncategorized transactions.
     
     Args:
         user_id: Optional user ID (if None, process all users)
+        transaction_ids: Only these transactions of the user (outbox batches)
     """
     try:
         async with SessionLocal() as db:
@@ -67,14 +122,18 @@ async def categorize_uncategorized_transactions_task(self, user_id: Optional[str
                 count = await CategorizationService.categorize_uncategorized_transactions(
                     db,
                     user_uuid,
-                    limit=50,
-                    ai_client=ai_client
+                    limit=len(transaction_ids) if transaction_ids else 50,
+                    ai_client=ai_client,
+                    transaction_ids=(
+                        [UUID(tx_id) for tx_id in transaction_ids]
+                        if transaction_ids is not None else None
+                    )
                 )
                 logger.info(f"Categorized {count} transactions for user {user_id}")
             else:
-                # TODO: Process all users
-                logger.info("Processing all users not yet implemented")
-                count = 0
+                # Every tenant with uncategorized transactions, in chunked subtasks
+                fan_out_tenants_task.delay("categorize")
+                return {"scheduled": True}
             
             return {"categorized": count}
             
@@ -83,6 +142,28 @@ async def categorize_uncategorized_transactions_task(self, user_id: Optional[str
         raise self.retry(exc=e, countdown=60 * (2 ** self.request.retries))
 
 
+@celery_app.task(
+    bind=True,
+    base=AsyncTask,
+    max_retries=3,
+    time_limit=300,
+    soft_time_limit=270
+)
+async def evict_category_memos_task(self):
+    """
+    Drop expired and least recently used AI category memo entries.
+    """
+    try:
+        async with SessionLocal() as db:
+            stats = await CategoryMemoService.evict(db)
+            await db.commit()
+            return stats
+            
+    except Exception as e:
+        logger.error(f"Failed to evict category memos: {e}")
+        raise self.retry(exc=e, countdown=60 * (2 ** self.request.retries))
+
+
 @celery_app.task(
     bind=True,
     base=AsyncTask,
@@ -116,9 +197,9 @@ async def process_overdue_invoices_task(self, user_id: Optional[str] = None):
                     f"{stats['sent']} sent, {stats['failed']} failed"
                 )
             else:
-                # TODO: Process all users
-                logger.info("Processing all users not yet implemented")
-                stats = {"total": 0, "sent": 0, "failed": 0}
+                # Every tenant with overdue invoices, in chunked subtasks
+                fan_out_tenants_task.delay("reminders")
+                return {"scheduled": True}
             
             return stats
             
@@ -127,99 +208,317 @@ async def process_overdue_invoices_task(self, user_id: Optional[str] = None):
         raise self.retry(exc=e, countdown=120 * (2 ** self.request.retries))
 
 
+async def _categorize_tenant(db, user_id) -> Dict:
+    count = await CategorizationService.categorize_uncategorized_transactions(
+        db,
+        user_id,
+        limit=settings.TENANT_CATEGORIZE_LIMIT,
+        ai_client=ClaudeClient()
+    )
+    return {"categorized": count}
+
+
+async def _remind_tenant(db, user_id) -> Dict:
+    return await ReminderService.process_overdue_invoices(
+        db,
+        user_id,
+        ClaudeClient(),
+        SendGridClient()
+    )
+
+
+# Job name (see TenantScheduler) → work done for one tenant
+TENANT_JOBS = {
+    "categorize": _categorize_tenant,
+    "reminders": _remind_tenant,
+}
+
+# Queue of each job's tenant chunks (reminders go to the email workers)
+TENANT_JOB_QUEUES = {
+    "categorize": BULK_AI_QUEUE,
+    "reminders": EMAIL_QUEUE,
+}
+
+
 @celery_app.task(
     bind=True,
     base=AsyncTask,
     max_retries=3,
+    time_limit=300
+)
+async def fan_out_tenants_task(self, job: str, after: Optional[str] = None, totals: Optional[Dict] = None):
+    """
+    Dispatch one page of tenants with pending work for a periodic job.
+    
+    The page (TENANT_FANOUT_PAGE_SIZE users, found with existence queries)
+    is split into chunks run as a chord; its callback adds the chunk stats to
+    the running totals and dispatches the next page, so no task ever loads
+    every tenant and pages do not pile up in the queue.
+    
+    Args:
+        job: Key of TENANT_JOBS
+        after: Last user id of the previous page
+        totals: Stats aggregated over the previous pages
+    """
+    try:
+        from uuid import UUID
+        
+        async with SessionLocal() as db:
+            chunks, next_after = await TenantScheduler.plan_page(
+                db, job, UUID(after) if after else None
+            )
+        
+        if not chunks:
+            logger.info(f"Tenant job '{job}' finished: {totals or {}}")
+            return {"job": job, "finished": True, "totals": totals or {}}
+        
+        chord(
+            group(
+                run_tenant_chunk_task.s(job, [str(user_id) for user_id in chunk]).set(
+                    queue=TENANT_JOB_QUEUES[job],
+                    priority=PRIORITY_BACKGROUND
+                )
+                for chunk in chunks
+            ),
+            tenant_page_done_task.s(job, str(next_after) if next_after else None, totals)
+        ).delay()
+        
+        tenants = sum(len(chunk) for chunk in chunks)
+        logger.info(f"Tenant job '{job}': dispatched {tenants} tenants in {len(chunks)} chunks")
+        return {"job": job, "tenants": tenants, "chunks": len(chunks)}
+    
+    except Exception as e:
+        logger.error(f"Failed to dispatch tenant job '{job}': {e}")
+        raise self.retry(exc=e, countdown=60 * (2 ** self.request.retries))
+
+
+@celery_app.task(
+    bind=True,
+    base=AsyncTask,
     time_limit=1800,  # 30 minutes
     soft_time_limit=1620
 )
-async def sync_bank_account_task(self, bank_account_id: str):
+async def run_tenant_chunk_task(self, job: str, user_ids: List[str]):
+    """
+    Run a periodic job for a chunk of tenants.
+    
+    Tenants run concurrently (TENANT_FANOUT_CHUNK_CONCURRENCY), each in its
+    own session; a failing tenant is counted and does not fail the chunk (a
+    failed chord member would drop the stats of the whole page).
+    
+    Args:
+        job: Key of TENANT_JOBS
+        user_ids: User UUIDs
+    """
+    from uuid import UUID
+    
+    work = TENANT_JOBS[job]
+    semaphore = asyncio.Semaphore(settings.TENANT_FANOUT_CHUNK_CONCURRENCY)
+    
+    async def run_one(user_id: str) -> Dict:
+        async with semaphore:
+            async with SessionLocal() as db:
+                try:
+                    stats = await work(db, UUID(user_id))
+                    await db.commit()
+                    return {**stats, "tenants": 1}
+                except Exception as e:
+                    await db.rollback()
+                    logger.error(f"Tenant job '{job}' failed for user {user_id}: {e}")
+                    return {"tenants": 1, "failed_tenants": 1}
+    
+    results = await asyncio.gather(*(run_one(user_id) for user_id in user_ids))
+    return TenantScheduler.aggregate(results)
+
+
+@celery_app.task(max_retries=3)
+def tenant_page_done_task(results: List[Dict], job: str, next_after: Optional[str], totals: Optional[Dict]):
+    """
+    Chord callback: aggregate a page's chunk stats and dispatch the next page.
+    """
+    totals = TenantScheduler.aggregate(results, totals)
+    logger.info(f"Tenant job '{job}' page done, running totals: {totals}")
+    
+    if next_after is None:
+        logger.info(f"Tenant job '{job}' finished: {totals}")
+        return {"job": job, "finished": True, "totals": totals}
+    
+    fan_out_tenants_task.delay(job, after=next_after, totals=totals)
+    return {"job": job, "finished": False, "totals": totals}
+
+
+@celery_app.task(
+    bind=True,
+    base=AsyncTask,
+    max_retries=3,
+    time_limit=1800,  # 30 minutes
+    soft_time_limit=1620
+)
+async def sync_bank_account_task(self, bank_account_id: str, resume_uri: Optional[str] = None):
     """
     Sync transactions for a bank account from Bridge API.
     
+    Only one sync of an account runs at a time: if the account is locked by
+    another sync, this one is queued again for later instead of racing it.
+    
     Args:
         bank_account_id: Bank account UUID
+        resume_uri: Bridge page to continue from (set by a budget-limited run)
     """
+    from app.services.bank_service import SYNC_LOCK
+    
+    # This run covers every duplicate enqueued until now
+    await entity_locks.clear_enqueue(SYNC_LOCK, bank_account_id)
+    
     try:
-        async with SessionLocal() as db:
-            from uuid import UUID
-            from app.models.bank_account import BankAccount
-            from app.schemas.transaction import TransactionCreate
-            from app.services.transaction_service import TransactionService
-            from datetime import datetime, timedelta
-            
-            account_uuid = UUID(bank_account_id)
-            
-            # Get bank account
-            bank_account = await db.get(BankAccount, account_uuid)
-            if not bank_account:
-                logger.error(f"Bank account {bank_account_id} not found")
-                return {"error": "Bank account not found"}
-            
-            if not bank_account.bridge_account_id:
-                logger.warning(f"Bank account {bank_account_id} has no Bridge ID")
-                return {"error": "No Bridge account ID"}
-            
-            # Fetch transactions from Bridge
-            bridge_client = BridgeClient()
-            
-            last_sync = bank_account.last_sync_at or datetime.utcnow() - timedelta(days=90)
-            
-            try:
-                raw_transactions = await bridge_client.get_transactions(
-                    account_id=int(bank_account.bridge_account_id),
-                    since=last_sync
-                )
-                
-                # Save transactions
-                new_count = 0
-                for raw_tx in raw_transactions:
-                    formatted = bridge_client.format_transaction(raw_tx)
-                    
-                    # Check if already exists
-                    from sqlalchemy import select
-                    existing = await db.execute(
-                        select(Transaction).where(
-                            Transaction.bridge_transaction_id == formatted["bridge_transaction_id"]
-                        )
-                    )
-                    
-                    if existing.scalar_one_or_none():
-                        continue
-                    
-                    # Create transaction
-                    tx_data = TransactionCreate(
-                        bank_account_id=account_uuid,
-                        **formatted
-                    )
-                    await TransactionService.create_transaction(db, tx_data)
-                    new_count += 1
-                
-                # Update sync timestamp
-                bank_account.last_sync_at = datetime.utcnow()
-                bank_account.sync_error = None
-                await db.commit()
-                
-                logger.info(
-                    f"Synced {new_count} new transactions for account {bank_account_id}"
-                )
-                
-                return {"synced": new_count, "total": len(raw_transactions)}
-                
-            except BridgeAPIError as e:
-                bank_account.sync_error = str(e)
-                await db.commit()
-                raise
-            
-            finally:
-                await bridge_client.close()
+        async with entity_locks.hold(SYNC_LOCK, bank_account_id):
+            return await _sync_bank_account(bank_account_id, resume_uri)
     
+    except LockBusy:
+        logger.info(f"Bank account {bank_account_id} is already syncing, sync queued again")
+        await enqueue_account_sync(
+            bank_account_id, resume_uri, countdown=settings.TASK_LOCK_RETRY_SECONDS
+        )
+        return {"locked": True}
     except Exception as e:
         logger.error(f"Failed to sync bank account {bank_account_id}: {e}")
         raise self.retry(exc=e, countdown=180 * (2 ** self.request.retries))
 
 
+async def _sync_bank_account(bank_account_id: str, resume_uri: Optional[str]) -> Dict:
+    async with SessionLocal() as db:
+        from uuid import UUID
+        from app.models.bank_account import BankAccount
+        from app.services.bank_service import BankService
+        from app.services.bank_webhook_service import BankWebhookService
+        
+        account_uuid = UUID(bank_account_id)
+        
+        # Events from now on need a new sync: release the webhook flag first
+        # (as the group sync does), or later webhooks would be dropped
+        await BankWebhookService.claim_sync_requests(db, [account_uuid])
+        await db.commit()
+        
+        # Get bank account
+        bank_account = await db.get(BankAccount, account_uuid)
+        if not bank_account:
+            logger.error(f"Bank account {bank_account_id} not found")
+            return {"error": "Bank account not found"}
+        
+        if not bank_account.bridge_account_id:
+            logger.warning(f"Bank account {bank_account_id} has no Bridge ID")
+            return {"error": "No Bridge account ID"}
+        
+        # Same bulk pipeline as the sync endpoint
+        bridge_client = BridgeClient()
+        try:
+            stats = await BankService.sync_transactions(
+                db,
+                bank_account,
+                bridge_client,
+                resume_uri=resume_uri
+            )
+            await db.commit()
+        finally:
+            await bridge_client.close()
+        
+        logger.info(
+            f"Synced {stats['new_count']} new transactions for account {bank_account_id}"
+        )
+        
+        # Follow-up work of the new rows was committed to the outbox with them
+        if stats["new_ids"]:
+            await enqueue_outbox_relay()
+        
+        # Budget reached: continue with the next pages in a new task
+        if stats["has_more"]:
+            await enqueue_account_sync(bank_account_id, stats["resume_uri"], countdown=5)
+        
+        return {
+            "has_more": stats["has_more"],
+            "synced": stats["new_count"],
+            "updated": stats["updated_count"],
+            "total": stats["total"]
+        }
+
+
+async def enqueue_account_sync(
+    bank_account_id: str,
+    resume_uri: Optional[str] = None,
+    countdown: int = 0
+) -> bool:
+    """
+    Queue a sync of a bank account unless one is already waiting.
+    
+    A dropped duplicate loses nothing: the waiting sync starts from the
+    account's sync cursor, which also holds any pending resume page.
+    
+    Returns:
+        True if a task was queued
+    """
+    from app.services.bank_service import SYNC_LOCK
+    
+    if not await entity_locks.claim_enqueue(SYNC_LOCK, bank_account_id):
+        return False
+    sync_bank_account_task.apply_async(
+        args=[bank_account_id],
+        kwargs={"resume_uri": resume_uri},
+        countdown=countdown
+    )
+    return True
+
+
+@celery_app.task(
+    bind=True,
+    base=AsyncTask,
+    max_retries=3,
+    time_limit=1800,  # 30 minutes
+    soft_time_limit=1620
+)
+async def sync_bank_account_group_task(self, bank_account_ids: List[str]):
+    """
+    Sync several bank accounts (usually one Bridge item) concurrently.
+    
+    Args:
+        bank_account_ids: Bank account UUIDs
+    """
+    try:
+        from uuid import UUID
+        from app.services.bank_service import BankService
+        
+        summary = await BankService.sync_account_group(
+            SessionLocal,
+            [UUID(account_id) for account_id in bank_account_ids]
+        )
+        
+        # Follow-up work of the new rows was committed to the outbox with them
+        if summary["new_count"]:
+            await enqueue_outbox_relay()
+        
+        # Accounts stopped by the sync budget continue on their own, accounts
+        # locked by another sync are retried once it is done
+        for account_id, stats in summary["results"].items():
+            if stats.get("has_more"):
+                await enqueue_account_sync(str(account_id), stats["resume_uri"], countdown=5)
+            elif stats.get("locked"):
+                await enqueue_account_sync(
+                    str(account_id), countdown=settings.TASK_LOCK_RETRY_SECONDS
+                )
+        
+        return {
+            "accounts": summary["accounts"],
+            "synced": summary["synced"],
+            "failed": summary["failed"],
+            "locked": summary["locked"],
+            "new": summary["new_count"],
+            "updated": summary["updated_count"]
+        }
+    
+    except Exception as e:
+        logger.error(f"Failed to sync bank account group {bank_account_ids}: {e}")
+        raise self.retry(exc=e, countdown=180 * (2 ** self.request.retries))
+
+
 @celery_app.task(
     bind=True,
     base=AsyncTask,
@@ -228,31 +527,30 @@ async def sync_bank_account_task(self, bank_account_id: str):
 )
 async def sync_all_bank_accounts_task(self):
     """
-    Sync all active bank accounts.
+    Sync active bank accounts that Bridge webhooks did not keep fresh.
+    
+    Webhooks trigger syncs as soon as Bridge has new data; this periodic
+    task only catches accounts whose events were missed (not synced for
+    BRIDGE_POLL_STALE_HOURS).
     """
     try:
         async with SessionLocal() as db:
-            from sqlalchemy import select
-            from app.models.bank_account import BankAccount
+            from app.services.bank_webhook_service import BankWebhookService
             
-            # Get all active bank accounts with Bridge ID
-            result = await db.execute(
-                select(BankAccount).where(
-                    BankAccount.is_active == True,
-                    BankAccount.bridge_account_id.is_not(None),
-                    BankAccount.deleted_at.is_(None)
-                )
-            )
+            # One task per Bridge item: its accounts sync concurrently
+            groups = await BankWebhookService.get_stale_account_groups(db)
+            accounts = sum(len(account_ids) for account_ids in groups)
             
-            accounts = result.scalars().all()
+            logger.info(f"Syncing {accounts} stale bank accounts in {len(groups)} groups")
             
-            logger.info(f"Syncing {len(accounts)} bank accounts")
-            
-            # Queue sync tasks
-            for account in accounts:
-                sync_bank_account_task.delay(str(account.id))
+            # Behind webhook-triggered syncs on the sync queue
+            for account_ids in groups:
+                sync_bank_account_group_task.apply_async(
+                    args=[[str(account_id) for account_id in account_ids]],
+                    priority=PRIORITY_BACKGROUND
+                )
             
-            return {"queued": len(accounts)}
+            return {"queued": len(groups), "accounts": accounts}
     
     except Exception as e:
         logger.error(f"Failed to queue bank account syncs: {e}")
@@ -291,25 +589,253 @@ async def auto_reconcile_transaction_task(self, transaction_id: str):
             if not bank_account:
                 return {"error": "Bank account not found"}
             
-            # Attempt auto-reconciliation
+            # Attempt auto-reconciliation (one reconciliation job per user at a
+            # time, so two jobs cannot assign the same invoice)
             ai_client = ClaudeClient()
-            reconciliation = await ReconciliationService.auto_reconcile_transaction(
-                db,
-                bank_account.user_id,
-                transaction_uuid,
-                ai_client
-            )
+            async with entity_locks.hold(RECONCILIATION_LOCK, bank_account.user_id):
+                reconciliation = await ReconciliationService.auto_reconcile_transaction(
+                    db,
+                    bank_account.user_id,
+                    transaction_uuid,
+                    ai_client
+                )
+                if reconciliation:
+                    await db.commit()
             
             if reconciliation:
-                await db.commit()
                 logger.info(f"Auto-reconciled transaction {transaction_id}")
                 return {"reconciled": True, "reconciliation_id": str(reconciliation.id)}
             else:
                 logger.info(f"No auto-reconciliation match for transaction {transaction_id}")
                 return {"reconciled": False}
     
+    except LockBusy as e:
+        return _requeue_when_unlocked(self, e)
     except Exception as e:
         logger.error(f"Failed to auto-reconcile transaction {transaction_id}: {e}")
         raise self.retry(exc=e, countdown=60 * (2 ** self.request.retries))
 
 
+@celery_app.task(
+    bind=True,
+    base=AsyncTask,
+    max_retries=3,
+    time_limit=600,
+    soft_time_limit=540
+)
+async def reconcile_transactions_batch_task(
+    self,
+    user_id: str,
+    transaction_ids: Optional[List[str]] = None,
+    since: Optional[str] = None
+):
+    """
+    Auto-reconcile a batch of transactions against all open invoices.
+    
+    Pages of RECONCILIATION_BATCH_MAX_TRANSACTIONS are reconciled and
+    committed one after the other.
+    
+    Args:
+        user_id: User UUID
+        transaction_ids: Transaction UUIDs (optional)
+        since: ISO datetime, reconcile transactions dated on/after it (optional)
+    """
+    try:
+        async with SessionLocal() as db:
+            from uuid import UUID
+            from datetime import datetime
+            
+            totals = {"transactions": 0, "candidates": 0, "reconciled": 0, "conflicts": 0}
+            cursor = None
+            async with entity_locks.hold(RECONCILIATION_LOCK, user_id):
+                while True:
+                    stats = await ReconciliationService.reconcile_batch(
+                        db,
+                        UUID(user_id),
+                        transaction_ids=(
+                            [UUID(tx_id) for tx_id in transaction_ids]
+                            if transaction_ids is not None else None
+                        ),
+                        since=datetime.fromisoformat(since) if since else None,
+                        cursor=cursor
+                    )
+                    await db.commit()
+                    for key in totals:
+                        totals[key] += stats[key]
+                    cursor = stats["next_cursor"]
+                    if cursor is None:
+                        break
+            
+            logger.info(
+                f"Batch reconciled {totals['reconciled']}/{totals['transactions']} "
+                f"transactions for user {user_id}"
+            )
+            return totals
+    
+    except LockBusy as e:
+        return _requeue_when_unlocked(self, e)
+    except Exception as e:
+        logger.error(f"Failed to batch reconcile transactions for user {user_id}: {e}")
+        raise self.retry(exc=e, countdown=60 * (2 ** self.request.retries))
+
+
+# Pending-enqueue marker of the outbox relay (see enqueue_outbox_relay)
+OUTBOX_RELAY = "outbox_relay"
+
+
+def _publish_new_transactions(events: List) -> None:
+    """
+    Outbox handler of TRANSACTIONS_CREATED: one categorization and one batch
+    reconciliation task per user and OUTBOX_MAX_IDS_PER_TASK new transactions.
+    """
+    ids_by_user: Dict[str, List[str]] = {}
+    for event in events:
+        ids_by_user.setdefault(str(event.user_id), []).extend(event.payload["transaction_ids"])
+    
+    batch_size = settings.OUTBOX_MAX_IDS_PER_TASK
+    for user_id, transaction_ids in ids_by_user.items():
+        transaction_ids = list(dict.fromkeys(transaction_ids))
+        for start in range(0, len(transaction_ids), batch_size):
+            batch = transaction_ids[start:start + batch_size]
+            categorize_uncategorized_transactions_task.delay(user_id, transaction_ids=batch)
+            reconcile_transactions_batch_task.delay(user_id, transaction_ids=batch)
+
+
+# Outbox event type → handler publishing its follow-up tasks
+OUTBOX_HANDLERS = {
+    TRANSACTIONS_CREATED: _publish_new_transactions,
+}
+
+
+async def enqueue_outbox_relay() -> bool:
+    """
+    Run the outbox relay soon, after a commit that recorded events.
+    
+    Kicks are deduplicated while a relay waits in the queue. A kick that
+    cannot reach the broker is not an error: the events are committed and
+    the periodic relay publishes them.
+    
+    Returns:
+        True if a relay was queued
+    """
+    try:
+        if not await entity_locks.claim_enqueue(OUTBOX_RELAY, "all"):
+            return False
+        relay_outbox_task.delay()
+        return True
+    except Exception as e:
+        logger.warning(f"Outbox relay not queued, the periodic relay will publish: {e}")
+        return False
+
+
+@celery_app.task(
+    bind=True,
+    base=AsyncTask,
+    max_retries=3,
+    time_limit=300
+)
+async def relay_outbox_task(self):
+    """
+    Publish pending outbox events to their follow-up tasks.
+    
+    Kicked after commits that record events, and run every
+    OUTBOX_RELAY_INTERVAL_SECONDS for events whose kick was lost or whose
+    handler failed. Each batch is committed on its own.
+    """
+    from app.services.outbox_service import OutboxService
+    
+    # This run covers every kick received until now
+    await entity_locks.clear_enqueue(OUTBOX_RELAY, "all")
+    
+    try:
+        totals = {"events": 0, "published": 0, "failed": 0}
+        for _ in range(settings.OUTBOX_RELAY_MAX_BATCHES):
+            async with SessionLocal() as db:
+                stats = await OutboxService.relay(db, OUTBOX_HANDLERS)
+                await db.commit()
+            totals = TenantScheduler.aggregate([stats], totals)
+            if stats["events"] < settings.OUTBOX_RELAY_BATCH_SIZE:
+                break
+        else:
+            # Backlog larger than one run: continue right away
+            await enqueue_outbox_relay()
+        
+        async with SessionLocal() as db:
+            totals["purged"] = await OutboxService.purge_published(db)
+            await db.commit()
+        
+        if totals["events"]:
+            logger.info(
+                f"Outbox relay: {totals['published']} events published, {totals['failed']} failed"
+            )
+        return totals
+    
+    except Exception as e:
+        logger.error(f"Outbox relay failed: {e}")
+        raise self.retry(exc=e, countdown=30 * (2 ** self.request.retries))
+
+
+@celery_app.task(
+    bind=True,
+    base=AsyncTask,
+    max_retries=2,
+    time_limit=3600,
+    soft_time_limit=3540
+)
+async def export_invoices_pdf_task(self, user_id: str, filters: Dict):
+    """
+    Write the PDFs of a user's invoices matching filters to a ZIP archive.
+    
+    The archive is stored as InvoiceExportService.export_path(user, task id);
+    progress (total, done, failed) is published as the PROGRESS state at most
+    every INVOICE_EXPORT_PROGRESS_SECONDS.
+    
+    Args:
+        user_id: User ID
+        filters: InvoiceFilter fields (JSON)
+    """
+    from uuid import UUID
+    from app.models.user import User
+    from app.schemas.invoice import InvoiceFilter
+    
+    user_uuid = UUID(user_id)
+    last_update = 0.0
+    
+    def report(progress: ExportProgress, force: bool = False) -> None:
+        nonlocal last_update
+        now = time.monotonic()
+        if force or now - last_update >= settings.INVOICE_EXPORT_PROGRESS_SECONDS:
+            last_update = now
+            self.update_state(state="PROGRESS", meta={"user_id": user_id, **progress.as_dict()})
+    
+    try:
+        InvoiceExportService.purge_exports(user_uuid)
+        async with SessionLocal() as db:
+            user = await db.get(User, user_uuid)
+            if user is None:
+                return {"user_id": user_id, "error": "User not found"}
+            entries = await InvoiceExportService.load_entries(
+                db,
+                user,
+                InvoiceFilter(**filters),
+                settings.INVOICE_EXPORT_MAX_INVOICES
+            )
+        
+        report(ExportProgress(total=len(entries)), force=True)
+        stats = await InvoiceExportService.write_zip(
+            entries,
+            InvoiceExportService.export_path(user_uuid, self.request.id),
+            on_progress=report
+        )
+        logger.info(
+            f"Exported {stats['done']} invoice PDFs for user {user_id} "
+            f"({stats['failed']} failed, {stats['bytes']} bytes)"
+        )
+        return {"user_id": user_id, **stats}
+    
+    except ValueError as e:
+        # Too many invoices: retrying would not help
+        return {"user_id": user_id, "error": str(e)}
+    except Exception as e:
+        logger.error(f"Invoice export failed for user {user_id}: {e}")
+        raise self.retry(exc=e, countdown=60 * (2 ** self.request.retries))
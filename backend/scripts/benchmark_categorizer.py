@@ -0,0 +1,101 @@
+"""
+Benchmark the local categorization model against the Claude path.
+
+Uses the model holdout split (same deterministic split as training) of the
+labelled transactions and reports accuracy, coverage (share of predictions
+above CATEGORY_MODEL_MIN_CONFIDENCE) and latency of each path.
+
+Usage:
+    python scripts/benchmark_categorizer.py [--user <uuid>] [--claude-sample 50]
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+from uuid import UUID
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.config import settings
+from app.core.database import AsyncSessionLocal, engine
+from app.integrations.claude_client import ClaudeClient
+from app.services.categorization_model import GLOBAL_SCOPE, in_holdout, local_categorizer
+from app.services.categorization_service import CategorizationService
+
+
+def percentile(values, share):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))] if values else 0.0
+
+
+async def benchmark(user_id, claude_sample: int):
+    async with AsyncSessionLocal() as db:
+        examples = await CategorizationService.get_training_examples(db, user_id)
+    await engine.dispose()
+    
+    holdout = [example for example in examples if in_holdout(example)]
+    if not holdout:
+        print("No labelled transactions to benchmark")
+        return
+    
+    model = local_categorizer.get_model(str(user_id) if user_id else GLOBAL_SCOPE)
+    if model is None:
+        print("No trained model: run scripts/train_categorizer.py first")
+        return
+    
+    latencies, correct, covered, covered_correct = [], 0, 0, 0
+    for example in holdout:
+        started = time.perf_counter()
+        category, probability = model.predict(example.description, example.amount)
+        latencies.append(time.perf_counter() - started)
+        correct += category == example.category
+        if probability >= settings.CATEGORY_MODEL_MIN_CONFIDENCE:
+            covered += 1
+            covered_correct += category == example.category
+    
+    print(f"📊 Local model v{model.metadata.get('version')} on {len(holdout)} holdout transactions")
+    print(f"   Accuracy:           {correct / len(holdout):.1%}")
+    print(f"   Coverage (≥{settings.CATEGORY_MODEL_MIN_CONFIDENCE}): {covered / len(holdout):.1%}"
+          f" at {covered_correct / covered if covered else 0:.1%} accuracy")
+    print(f"   Latency p50/p95:    {percentile(latencies, 0.5) * 1000:.3f} / "
+          f"{percentile(latencies, 0.95) * 1000:.3f} ms")
+    
+    if claude_sample <= 0:
+        return
+    
+    sample = holdout[:claude_sample]
+    ai_client = ClaudeClient()
+    started = time.perf_counter()
+    results = await ai_client.categorize_transactions_batch([
+        {
+            "description": example.description,
+            "amount": example.amount,
+            "transaction_type": "credit" if example.amount > 0 else "debit"
+        }
+        for example in sample
+    ])
+    elapsed = time.perf_counter() - started
+    ai_correct = sum(
+        category == example.category
+        for example, (category, _) in zip(sample, results)
+    )
+    
+    print(f"🤖 Claude on {len(sample)} transactions")
+    print(f"   Accuracy:           {ai_correct / len(sample):.1%}")
+    print(f"   Latency:            {elapsed:.2f} s total, "
+          f"{elapsed / len(sample) * 1000:.1f} ms per transaction (batched)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark local vs Claude categorization")
+    parser.add_argument("--user", type=UUID, default=None, help="Tenant (global model by default)")
+    parser.add_argument("--claude-sample", type=int, default=0, help="Holdout transactions also sent to Claude")
+    args = parser.parse_args()
+    
+    asyncio.run(benchmark(args.user, args.claude_sample))
+
+
+if __name__ == "__main__":
+    main()
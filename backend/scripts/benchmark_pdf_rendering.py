@@ -0,0 +1,154 @@
+"""
+Load-test API latency while invoice PDFs render.
+
+Serves a minimal ASGI app on one event loop, like one uvicorn worker:
+- GET /ping: a cheap endpoint, standing in for the rest of the API
+- GET /pdf: renders a sample invoice (cache bypassed), either inline in the
+  route (before) or in the PDF process pool (after)
+
+Pings are sent at a steady rate while `--concurrency` clients download PDFs
+in a loop; the ping latency percentiles show whether renders stall the loop.
+
+Usage:
+    python scripts/benchmark_pdf_rendering.py [--seconds 10] [--concurrency 4] [--items 40]
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import httpx
+from fastapi import FastAPI
+from fastapi.responses import Response
+
+from app.config import settings
+from app.services.pdf_render_pool import pdf_render_pool
+from app.services.pdf_service import PDFService
+
+
+def percentile(values, share):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))] if values else 0.0
+
+
+def sample_snapshot(items: int):
+    """An invoice with `items` lines, as PDFService renders it"""
+    return {
+        "invoice": {
+            "id": "benchmark",
+            "invoice_number": "INV-2024-001",
+            "status": "pending",
+            "client_name": "Client Benchmark SAS",
+            "client_email": "client@example.com",
+            "client_address": "456 Avenue Client, 69000 Lyon",
+            "issue_date": date.today(),
+            "due_date": date.today() + timedelta(days=30),
+            "payment_terms": "Paiement à 30 jours",
+            "currency": "EUR",
+            "subtotal": Decimal(100 * items),
+            "tax_rate": Decimal("20.00"),
+            "tax_amount": Decimal(20 * items),
+            "discount_amount": Decimal("0"),
+            "total_amount": Decimal(120 * items),
+            "notes": "Merci pour votre confiance",
+            "items": [
+                {"description": f"Prestation {i}", "details": "Détail", "quantity": 1, "unit_price": Decimal(100)}
+                for i in range(items)
+            ],
+            "updated_at": datetime.utcnow(),
+        },
+        "user": {"company_name": "Benchmark SARL", "email": "bench@example.com", "phone": None, "address": None},
+    }
+
+
+def make_app(mode: str, snapshot) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    @app.get("/pdf")
+    async def pdf():
+        if mode == "inline":
+            pdf_bytes = PDFService.render_invoice_pdf(snapshot)
+        else:
+            pdf_bytes = await pdf_render_pool.render(snapshot)
+        return Response(content=pdf_bytes, media_type="application/pdf")
+
+    return app
+
+
+async def run(mode: str, seconds: float, concurrency: int, snapshot):
+    transport = httpx.ASGITransport(app=make_app(mode, snapshot))
+    ping_latencies, pdf_latencies = [], []
+    deadline = time.perf_counter() + seconds
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        async def pinger():
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                await client.get("/ping")
+                ping_latencies.append(time.perf_counter() - started)
+                await asyncio.sleep(0.01)
+
+        async def downloader():
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                response = await client.get("/pdf")
+                response.raise_for_status()
+                pdf_latencies.append(time.perf_counter() - started)
+
+        workers = [downloader() for _ in range(concurrency)] if concurrency else []
+        await asyncio.gather(pinger(), *workers)
+
+    return ping_latencies, pdf_latencies
+
+
+def report(label, ping_latencies, pdf_latencies, seconds):
+    print(
+        f"{label:<22} ping p50 {percentile(ping_latencies, 0.5) * 1000:7.1f} ms   "
+        f"p99 {percentile(ping_latencies, 0.99) * 1000:7.1f} ms   "
+        f"max {max(ping_latencies) * 1000:7.1f} ms   "
+        f"| {len(pdf_latencies) / seconds:5.1f} PDF/s"
+        + (f", mean {statistics.mean(pdf_latencies) * 1000:6.0f} ms" if pdf_latencies else "")
+    )
+
+
+async def main_async(args):
+    snapshot = sample_snapshot(args.items)
+    await pdf_render_pool.warm()
+    # Warm the inline path too, so both sides have fonts and stylesheet loaded
+    PDFService.render_invoice_pdf(snapshot)
+    try:
+        report("idle", *await run("pool", args.seconds, 0, snapshot), args.seconds)
+        report("before (inline)", *await run("inline", args.seconds, args.concurrency, snapshot), args.seconds)
+        report("after (process pool)", *await run("pool", args.seconds, args.concurrency, snapshot), args.seconds)
+        print(f"pool: {pdf_render_pool.stats()}")
+    finally:
+        await pdf_render_pool.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--items", type=int, default=40, help="invoice lines per PDF")
+    args = parser.parse_args()
+
+    print(
+        f"{args.concurrency} concurrent PDF downloads ({args.items} lines), "
+        f"{settings.PDF_POOL_WORKERS} pool workers, {args.seconds:.0f}s per run"
+    )
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
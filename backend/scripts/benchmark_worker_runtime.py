@@ -0,0 +1,96 @@
+"""
+Benchmark the per-task overhead of async Celery tasks.
+
+Runs the same minimal task body (open a session, SELECT 1, build the Bridge,
+SendGrid and Claude clients) many times:
+
+- before: a new event loop per task (`asyncio.run`), so the database pool
+  and HTTP pools are rebuilt and torn down by every task
+- after: the worker's persistent loop, started once per process
+
+Usage:
+    python scripts/benchmark_worker_runtime.py [--tasks 200] [--database-url URL]
+"""
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import text
+
+from app.config import settings
+from app.integrations import bridge_client, claude_client, sendgrid_client
+from app.integrations.bridge_client import BridgeClient
+from app.integrations.claude_client import ClaudeClient
+from app.integrations.sendgrid_client import SendGridClient
+from app.workers.runtime import LoopBoundSessionMaker, WorkerRuntime
+
+
+def percentile(values, share):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))] if values else 0.0
+
+
+def make_runtime(database_url: str):
+    session_maker = LoopBoundSessionMaker(database_url, pool_pre_ping=True)
+    runtime = WorkerRuntime()
+    runtime.on_shutdown(claude_client.close_shared_clients)
+    runtime.on_shutdown(bridge_client.close_shared_clients)
+    runtime.on_shutdown(sendgrid_client.close_shared_clients)
+    runtime.on_shutdown(session_maker.dispose)
+    return runtime, session_maker
+
+
+async def task_body(session_maker):
+    async with session_maker() as db:
+        await db.execute(text("SELECT 1"))
+    BridgeClient()
+    SendGridClient()
+    ClaudeClient()
+
+
+def measure(runtime, session_maker, tasks: int):
+    timings = []
+    for _ in range(tasks):
+        started = time.perf_counter()
+        runtime.run(task_body(session_maker))
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def report(label, timings):
+    print(
+        f"{label:<28} mean {statistics.mean(timings) * 1000:7.2f} ms   "
+        f"p50 {percentile(timings, 0.5) * 1000:7.2f} ms   "
+        f"p95 {percentile(timings, 0.95) * 1000:7.2f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--tasks", type=int, default=200)
+    parser.add_argument("--database-url", default=settings.DATABASE_URL)
+    args = parser.parse_args()
+
+    runtime, session_maker = make_runtime(args.database_url)
+    before = measure(runtime, session_maker, args.tasks)
+
+    runtime, session_maker = make_runtime(args.database_url)
+    runtime.start()
+    try:
+        after = measure(runtime, session_maker, args.tasks)
+    finally:
+        runtime.stop()
+
+    print(f"{args.tasks} tasks against {args.database_url.split('@')[-1]}")
+    report("before (asyncio.run/task)", before)
+    report("after (worker loop)", after)
+    print(f"speedup (mean)               x{statistics.mean(before) / statistics.mean(after):.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Retrain the local categorization models.
+
+Usage:
+    python scripts/train_categorizer.py                 # global + every tenant
+    python scripts/train_categorizer.py --user <uuid>   # one tenant (+ global)
+    python scripts/train_categorizer.py --global-only
+"""
+import argparse
+import asyncio
+import json
+import sys
+from pathlib import Path
+from uuid import UUID
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import select
+
+from app.core.database import AsyncSessionLocal, engine
+from app.models.bank_account import BankAccount
+from app.models.transaction import Transaction
+from app.services.categorization_service import CategorizationService
+
+
+async def train(user_ids, global_only: bool, skip_global: bool):
+    """Train the requested scopes and print the report"""
+    async with AsyncSessionLocal() as db:
+        if global_only:
+            user_ids = []
+        elif not user_ids:
+            # Every tenant with categorized transactions
+            result = await db.execute(
+                select(BankAccount.user_id)
+                .join(Transaction)
+                .where(Transaction.category.is_not(None))
+                .distinct()
+            )
+            user_ids = list(result.scalars().all())
+        
+        print(f"🧠 Training {len(user_ids)} tenant model(s)"
+              f"{'' if skip_global else ' + global model'}...")
+        report = await CategorizationService.train_local_models(
+            db,
+            user_ids=user_ids,
+            include_global=not skip_global
+        )
+    
+    await engine.dispose()
+    print(json.dumps(report, indent=2, default=str))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Retrain the local categorization models")
+    parser.add_argument("--user", action="append", type=UUID, default=[], help="Tenant to retrain (repeatable)")
+    parser.add_argument("--global-only", action="store_true", help="Only retrain the global model")
+    parser.add_argument("--skip-global", action="store_true", help="Do not retrain the global model")
+    args = parser.parse_args()
+    
+    asyncio.run(train(args.user, args.global_only, args.skip_global))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,20 @@
+"""
+Fixtures shared by the service tests.
+"""
+import pytest
+
+from app.models.bank_account import BankAccount
+
+
+@pytest.fixture
+async def bank_account(db_session, test_user):
+    """Create a bank account for testing."""
+    account = BankAccount(
+        user_id=test_user.id,
+        bank_name="Test Bank",
+        currency="EUR",
+        is_active=True,
+    )
+    db_session.add(account)
+    await db_session.commit()
+    return account
@@ -0,0 +1,61 @@
+"""Row factories shared by the service tests"""
+from datetime import date, datetime
+from decimal import Decimal
+from uuid import uuid4
+
+from app.models.invoice import Invoice
+from app.models.transaction import Transaction
+
+
+def make_invoice(user_id, number, client, total, status="pending", due=date(2026, 2, 1), **kwargs):
+    """Build an unsaved Invoice row, open unless told otherwise"""
+    kwargs.setdefault("is_reconciled", False)
+    return Invoice(
+        id=uuid4(),
+        user_id=user_id,
+        invoice_number=number,
+        client_name=client,
+        amount=Decimal(total),
+        tax_amount=Decimal("0.00"),
+        total_amount=Decimal(total),
+        currency="EUR",
+        issue_date=date(2026, 1, 1),
+        due_date=due,
+        status=status,
+        **kwargs
+    )
+
+
+def make_transaction(description, amount, day=date(2026, 2, 3), **kwargs):
+    """Build an unsaved, unreconciled Transaction row"""
+    kwargs.setdefault("bank_account_id", uuid4())
+    return Transaction(
+        id=uuid4(),
+        description=description,
+        amount=Decimal(amount),
+        currency="EUR",
+        date=datetime(day.year, day.month, day.day),
+        is_reconciled=False,
+        **kwargs
+    )
+
+
+async def create_invoice(db_session, user, number, total, status="pending"):
+    """Add an ACME Corp invoice to the session and flush it"""
+    invoice = make_invoice(user.id, number, "ACME Corp", total, status=status)
+    db_session.add(invoice)
+    await db_session.flush()
+    return invoice
+
+
+async def create_transaction(db_session, account, bridge_id, description, amount):
+    """Add a transaction of `account` to the session and flush it"""
+    transaction = make_transaction(
+        description,
+        amount,
+        bank_account_id=account.id,
+        bridge_transaction_id=bridge_id,
+    )
+    db_session.add(transaction)
+    await db_session.flush()
+    return transaction
@@ -7,9 +7,21 @@ from unittest.mock import AsyncMock, MagicMock, patch
 
 from app.services.bank_service import BankService
 from app.models.bank_account import BankAccount
+from app.models.outbox_event import OutboxEvent
 from app.models.transaction import Transaction
 from app.schemas.bank import BankAccountCreate, BankAccountUpdate
-from app.integrations.bridge_client import BridgeClient, BridgeAPIError
+from app.integrations.bridge_client import BridgeClient, BridgeAPIError, TransactionPage
+from app.services.outbox_service import TRANSACTIONS_CREATED
+
+
+async def bridge_pages(*pages, next_uri=None):
+    """Async iterator of TransactionPage, like BridgeClient.sync_account_transactions"""
+    for i, transactions in enumerate(pages):
+        is_last = i == len(pages) - 1
+        yield TransactionPage(
+            transactions=transactions,
+            next_uri=next_uri if is_last else f"/v2/accounts/123456/transactions?after={i}"
+        )
 
 
 @pytest.fixture
@@ -352,7 +364,7 @@ async def test_sync_transactions_success(db_session, test_user, sample_bridge_tr
     
     # Mock Bridge client
     mock_bridge_client = AsyncMock(spec=BridgeClient)
-    mock_bridge_client.sync_account_transactions.return_value = sample_bridge_transactions
+    mock_bridge_client.sync_account_transactions.return_value = bridge_pages(sample_bridge_transactions)
     mock_bridge_client.get_account_balance.return_value = {
         "balance": 2914.50,
         "currency": "EUR"
@@ -382,6 +394,14 @@ async def test_sync_transactions_success(db_session, test_user, sample_bridge_tr
     # Verify transactions were created
     assert mock_bridge_client.sync_account_transactions.called
     assert mock_bridge_client.get_account_balance.called
+    
+    # Follow-up work recorded in the same transaction as the new rows
+    from sqlalchemy import select
+    events = (await db_session.execute(select(OutboxEvent))).scalars().all()
+    assert len(events) == 1
+    assert events[0].event_type == TRANSACTIONS_CREATED
+    assert events[0].user_id == test_user.id
+    assert sorted(events[0].payload["transaction_ids"]) == sorted(str(i) for i in result["new_ids"])
 
 
 @pytest.mark.asyncio
@@ -459,21 +479,19 @@ async def test_sync_transactions_updates_existing(db_session, test_user, sample_
     
     # Create existing transaction
     existing_tx = Transaction(
-        user_id=test_user.id,
         bank_account_id=account.id,
         bridge_transaction_id="1001",
         description="Old Description",
         amount=Decimal("2500.00"),  # Different amount
         currency="EUR",
-        date=datetime.utcnow(),
-        transaction_type="credit"
+        date=datetime.utcnow()
     )
     db_session.add(existing_tx)
     await db_session.commit()
     
     # Mock Bridge client
     mock_bridge_client = AsyncMock(spec=BridgeClient)
-    mock_bridge_client.sync_account_transactions.return_value = sample_bridge_transactions
+    mock_bridge_client.sync_account_transactions.return_value = bridge_pages(sample_bridge_transactions)
     mock_bridge_client.get_account_balance.return_value = {
         "balance": 2914.50,
         "currency": "EUR"
@@ -499,3 +517,397 @@ async def test_sync_transactions_updates_existing(db_session, test_user, sample_
     assert result["new_count"] == 1
     assert result["updated_count"] == 1
 
+
+def format_bridge_transaction(tx):
+    """Same output as BridgeClient.format_transaction"""
+    return {
+        "bridge_transaction_id": str(tx["id"]),
+        "description": tx["clean_description"],
+        "amount": tx["amount"],
+        "currency": tx["currency_code"],
+        "date": datetime.fromisoformat(tx["date"].replace("Z", "+00:00")),
+        "transaction_type": "credit" if tx["amount"] > 0 else "debit",
+        "raw_data": tx
+    }
+
+
+@pytest.mark.asyncio
+async def test_upsert_transactions_in_bulk(db_session, test_user):
+    """Test new/updated/unchanged counts and a constant number of queries"""
+    from sqlalchemy import event, func, select
+    
+    account = await BankService.create_bank_account(
+        db=db_session,
+        user_id=test_user.id,
+        account_data=BankAccountCreate(
+            bank_name="Test Bank",
+            account_type="checking",
+            balance=Decimal("1000.00"),
+            currency="EUR"
+        )
+    )
+    await db_session.commit()
+    
+    raw = [
+        {
+            "id": 5000 + i,
+            "clean_description": f"CB MERCHANT {i}",
+            "amount": -10.0 - i,
+            "currency_code": "EUR",
+            "date": "2024-01-15T00:00:00Z",
+        }
+        for i in range(300)
+    ]
+    
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    engine = db_session.bind.sync_engine
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        stats = await BankService.upsert_transactions(
+            db_session,
+            account,
+            [format_bridge_transaction(tx) for tx in raw + raw[:5]]
+        )
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    await db_session.commit()
+    
+    assert stats["new_count"] == 300
+    assert len(stats["new_ids"]) == 300
+    assert len(statements) <= 4  # prefetch + insert, not one round trip per row
+    
+    raw[0] = {**raw[0], "clean_description": "CB MERCHANT 0 CORRIGE"}
+    stats = await BankService.upsert_transactions(
+        db_session,
+        account,
+        [format_bridge_transaction(tx) for tx in raw]
+    )
+    await db_session.commit()
+    
+    assert stats["new_count"] == 0
+    assert stats["updated_count"] == 1
+    assert stats["unchanged_count"] == 299
+    count = await db_session.scalar(select(func.count()).select_from(Transaction))
+    assert count == 300
+
+
+@pytest.mark.asyncio
+async def test_sync_transactions_stops_at_budget(db_session, test_user, sample_bridge_transactions):
+    """Test a budget-limited sync keeps last_sync_at and returns the resume cursor"""
+    account = await BankService.create_bank_account(
+        db=db_session,
+        user_id=test_user.id,
+        account_data=BankAccountCreate(
+            bank_name="Test Bank",
+            account_type="checking",
+            balance=Decimal("1000.00"),
+            currency="EUR"
+        )
+    )
+    account.bridge_account_id = "123456"
+    await db_session.commit()
+    
+    mock_bridge_client = AsyncMock(spec=BridgeClient)
+    mock_bridge_client.sync_account_transactions.return_value = bridge_pages(
+        sample_bridge_transactions[:1],
+        sample_bridge_transactions[1:],
+        next_uri="/v2/accounts/123456/transactions?after=xyz"
+    )
+    mock_bridge_client.get_account_balance.return_value = {"balance": 10.0}
+    mock_bridge_client.format_transaction.side_effect = format_bridge_transaction
+    
+    result = await BankService.sync_transactions(
+        db=db_session,
+        account=account,
+        bridge_client=mock_bridge_client
+    )
+    
+    assert result["new_count"] == 2
+    assert result["has_more"] is True
+    assert result["resume_uri"].endswith("after=xyz")
+    assert account.last_sync_at is None
+
+
+class SlowBridgeClient:
+    """Fake Bridge client answering every account after a fixed delay"""
+    
+    def __init__(self, delay, failing_account=None):
+        self.delay = delay
+        self.failing_account = failing_account
+        self.in_flight = 0
+        self.max_in_flight = 0
+    
+    async def _pages(self, account_id):
+        import asyncio
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+            if account_id == self.failing_account:
+                raise BridgeAPIError("API Error")
+            yield TransactionPage(
+                transactions=[{
+                    "id": account_id * 10 + i,
+                    "clean_description": f"CB MERCHANT {i}",
+                    "amount": -5.0,
+                    "currency_code": "EUR",
+                    "date": "2024-01-15T00:00:00Z",
+                } for i in range(3)],
+                next_uri=None
+            )
+        finally:
+            self.in_flight -= 1
+    
+    def sync_account_transactions(self, account_id, last_sync=None, resume_uri=None, etag=None):
+        return self._pages(account_id)
+    
+    async def get_account_balance(self, account_id):
+        import asyncio
+        await asyncio.sleep(self.delay)
+        return {"balance": 100.0}
+    
+    def format_transaction(self, tx):
+        return format_bridge_transaction(tx)
+    
+    async def close(self):
+        pass
+
+
+@pytest.fixture
+async def file_session_factory(tmp_path):
+    """Session maker with one connection per session, like a PostgreSQL pool."""
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+    from sqlalchemy.pool import NullPool
+    from app.core.database import Base
+    
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'sync.db'}",
+        poolclass=NullPool,
+        connect_args={"timeout": 30}
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield async_sessionmaker(engine, expire_on_commit=False)
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_sync_account_group_runs_accounts_concurrently(file_session_factory, monkeypatch):
+    """Test 8 accounts take about one account's time and failures stay isolated"""
+    import time
+    from sqlalchemy import func, select
+    from app.config import settings
+    from app.models.user import User
+    
+    monkeypatch.setattr(settings, "BRIDGE_SYNC_CONCURRENCY", 8)
+    session_factory = file_session_factory
+    db_session = session_factory()
+    test_user = User(email="sync@example.com", hashed_password="x", is_active=True, is_verified=True)
+    db_session.add(test_user)
+    await db_session.flush()
+    accounts = []
+    for i in range(8):
+        account = await BankService.create_bank_account(
+            db=db_session,
+            user_id=test_user.id,
+            account_data=BankAccountCreate(
+                bank_name=f"Bank {i}",
+                account_type="checking",
+                balance=Decimal("0.00"),
+                currency="EUR"
+            )
+        )
+        account.bridge_account_id = str(100 + i)
+        accounts.append(account)
+    await db_session.commit()
+    
+    bridge_client = SlowBridgeClient(delay=0.2, failing_account=107)
+    
+    started = time.perf_counter()
+    summary = await BankService.sync_account_group(
+        session_factory,
+        [account.id for account in accounts],
+        bridge_client
+    )
+    elapsed = time.perf_counter() - started
+    
+    assert elapsed < 0.2 * 3
+    assert bridge_client.max_in_flight == 8
+    assert summary["synced"] == 7
+    assert summary["failed"] == 1
+    assert summary["new_count"] == 21
+    assert len(summary["new_ids_by_user"][test_user.id]) == 21
+    count = await db_session.scalar(select(func.count()).select_from(Transaction))
+    assert count == 21
+    await db_session.close()
+
+
+@pytest.mark.asyncio
+async def test_sync_account_group_skips_accounts_being_synced(db_session, test_user, monkeypatch):
+    """Test an account locked by another sync is reported, not synced twice"""
+    from app.core.locks import entity_locks
+    from app.services.bank_service import SYNC_LOCK
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+    from tests.unit.utils.test_locks import FakeRedis
+    
+    redis = FakeRedis()
+    monkeypatch.setattr(entity_locks, "client_factory", lambda: redis)
+    accounts = []
+    for i in range(2):
+        account = BankAccount(
+            user_id=test_user.id,
+            bank_name=f"Bank {i}",
+            bridge_account_id=str(200 + i),
+            currency="EUR",
+            is_active=True
+        )
+        db_session.add(account)
+        accounts.append(account)
+    await db_session.commit()
+    
+    async with entity_locks.hold(SYNC_LOCK, accounts[0].id):
+        summary = await BankService.sync_account_group(
+            async_sessionmaker(db_session.bind, expire_on_commit=False),
+            [account.id for account in accounts],
+            SlowBridgeClient(delay=0)
+        )
+    
+    assert summary["locked"] == 1
+    assert summary["synced"] == 1
+    assert summary["results"][accounts[0].id] == {"locked": True}
+    assert summary["results"][accounts[1].id]["new_count"] == 3
+
+
+class RecordingBridgeClient:
+    """Fake Bridge client serving fixed pages and recording sync requests"""
+    
+    def __init__(self, pages, etag="W/\"v1\"", not_modified=False):
+        self.pages = pages
+        self.etag = etag
+        self.not_modified = not_modified
+        self.requests = []
+    
+    async def _pages(self):
+        if self.not_modified:
+            yield TransactionPage(transactions=[], next_uri=None, etag=self.etag, not_modified=True)
+            return
+        for i, transactions in enumerate(self.pages):
+            yield TransactionPage(
+                transactions=transactions,
+                next_uri=None,
+                etag=self.etag if i == 0 else None
+            )
+    
+    def sync_account_transactions(self, account_id, last_sync=None, resume_uri=None, etag=None):
+        self.requests.append({"since": last_sync, "resume_uri": resume_uri, "etag": etag})
+        return self._pages()
+    
+    async def get_account_balance(self, account_id):
+        return {"balance": 100.0}
+    
+    def format_transaction(self, tx):
+        return format_bridge_transaction(tx)
+
+
+def bridge_row(bridge_id, date, description="CB MERCHANT", amount=-5.0):
+    return {
+        "id": bridge_id,
+        "clean_description": description,
+        "amount": amount,
+        "currency_code": "EUR",
+        "date": date,
+    }
+
+
+@pytest.mark.asyncio
+async def test_sync_transactions_is_incremental(db_session, test_user):
+    """Test the cursor watermark, overlap window, in-memory dedupe and ETag"""
+    from app.config import settings
+    
+    account = await BankService.create_bank_account(
+        db=db_session,
+        user_id=test_user.id,
+        account_data=BankAccountCreate(
+            bank_name="Test Bank",
+            account_type="checking",
+            balance=Decimal("0.00"),
+            currency="EUR"
+        )
+    )
+    account.bridge_account_id = "123456"
+    await db_session.commit()
+    
+    first = RecordingBridgeClient([[
+        bridge_row(1, "2026-03-01T00:00:00"),
+        bridge_row(2, "2026-03-10T00:00:00"),
+    ]])
+    result = await BankService.sync_transactions(db_session, account, first)
+    await db_session.commit()
+    assert result["new_count"] == 2
+    
+    cursor = await BankService.get_sync_cursor(db_session, account)
+    assert cursor.last_transaction_id == "2"
+    assert cursor.etag == 'W/"v1"'
+    
+    # Overlap row 2 comes back unchanged, row 3 is new, row 2 is repeated
+    second = RecordingBridgeClient([
+        [bridge_row(2, "2026-03-10T00:00:00"), bridge_row(3, "2026-03-11T00:00:00")],
+        [bridge_row(3, "2026-03-11T00:00:00")],
+    ], etag='W/"v2"')
+    result = await BankService.sync_transactions(db_session, account, second)
+    await db_session.commit()
+    
+    request = second.requests[0]
+    assert request["etag"] == 'W/"v1"'
+    expected_since = datetime(2026, 3, 10) - timedelta(days=settings.BRIDGE_SYNC_OVERLAP_DAYS)
+    assert request["since"].replace(tzinfo=None) == expected_since
+    assert result["new_count"] == 1
+    assert result["unchanged_count"] == 1
+    assert result["updated_count"] == 0
+    assert cursor.etag == 'W/"v2"'
+    
+    third = RecordingBridgeClient([], etag='W/"v2"', not_modified=True)
+    result = await BankService.sync_transactions(db_session, account, third)
+    assert result["not_modified"] is True
+    assert result["new_count"] == 0
+    assert cursor.etag == 'W/"v2"'
+
+
+@pytest.mark.asyncio
+async def test_budget_cursor_is_resumed_by_next_sync(db_session, test_user, sample_bridge_transactions):
+    """Test the resume page is stored on the cursor and used by the next sync"""
+    account = await BankService.create_bank_account(
+        db=db_session,
+        user_id=test_user.id,
+        account_data=BankAccountCreate(
+            bank_name="Test Bank",
+            account_type="checking",
+            balance=Decimal("0.00"),
+            currency="EUR"
+        )
+    )
+    account.bridge_account_id = "123456"
+    await db_session.commit()
+    
+    mock_bridge_client = AsyncMock(spec=BridgeClient)
+    mock_bridge_client.sync_account_transactions.return_value = bridge_pages(
+        sample_bridge_transactions,
+        next_uri="/v2/accounts/123456/transactions?after=xyz"
+    )
+    mock_bridge_client.get_account_balance.return_value = {"balance": 10.0}
+    mock_bridge_client.format_transaction.side_effect = format_bridge_transaction
+    await BankService.sync_transactions(db_session, account, mock_bridge_client)
+    
+    cursor = await BankService.get_sync_cursor(db_session, account)
+    assert cursor.resume_uri.endswith("after=xyz")
+    assert cursor.last_transaction_date is None
+    
+    mock_bridge_client.sync_account_transactions.return_value = bridge_pages([])
+    await BankService.sync_transactions(db_session, account, mock_bridge_client)
+    
+    kwargs = mock_bridge_client.sync_account_transactions.call_args.kwargs
+    assert kwargs["resume_uri"].endswith("after=xyz")
+    assert kwargs["etag"] is None
+    assert cursor.resume_uri is None
+    assert cursor.last_transaction_id == "1001"
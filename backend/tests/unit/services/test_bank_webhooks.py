@@ -0,0 +1,265 @@
+"""Tests for Bridge webhook ingestion against a fake Bridge server"""
+import json
+import pytest
+import httpx
+from datetime import datetime, timedelta
+from fastapi import FastAPI
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.api.v1 import webhooks
+from app.config import settings
+from app.core.database import get_db
+from app.integrations.bridge_client import BridgeClient
+from app.models.bank_account import BankAccount
+from app.models.transaction import Transaction
+from app.services.bank_service import BankService
+from app.services.bank_webhook_service import (
+    BankWebhookService,
+    compute_signature,
+    verify_signature,
+    webhook_counters,
+)
+from app.workers.queues import PRIORITY_URGENT
+
+SECRET = "whsec_test"
+
+
+class FakeBridge:
+    """
+    Local stand-in for Bridge: serves the accounts API and emits signed
+    webhook events to our receiver, like Bridge does after a refresh.
+    """
+
+    def __init__(self, app):
+        self.accounts = {}
+        self.api_calls = []
+        self.webhooks = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://test"
+        )
+
+    def add_account(self, account_id, item_id):
+        self.accounts[account_id] = {"item_id": item_id, "transactions": []}
+
+    def add_transactions(self, account_id, count):
+        rows = self.accounts[account_id]["transactions"]
+        for _ in range(count):
+            rows.append({
+                "id": f"{account_id}-{len(rows)}",
+                "clean_description": "CB MERCHANT",
+                "amount": -10.0,
+                "currency_code": "EUR",
+                "date": datetime.utcnow().date().isoformat(),
+            })
+
+    def client(self):
+        """BridgeClient talking to this fake instead of api.bridgeapi.io"""
+        client = BridgeClient(api_key="k", client_id="id", client_secret="secret")
+        client.client = httpx.AsyncClient(transport=httpx.MockTransport(self.handle))
+        return client
+
+    def handle(self, request):
+        self.api_calls.append(request.url.path)
+        parts = request.url.path.strip("/").split("/")
+        account = self.accounts.get(parts[2])
+        if account is None:
+            return httpx.Response(404)
+        if parts[-1] == "transactions":
+            return httpx.Response(200, json={
+                "resources": account["transactions"], "pagination": {"next_uri": None}
+            })
+        return httpx.Response(200, json={"balance": -10.0 * len(account["transactions"])})
+
+    async def emit(self, event_type, secret=SECRET, **content):
+        body = json.dumps({
+            "type": event_type, "content": content, "timestamp": 1760000000
+        }).encode()
+        return await self.webhooks.post(
+            "/webhooks/bridge",
+            content=body,
+            headers={
+                "Content-Type": "application/json",
+                "BridgeApi-Signature": f"v1={compute_signature(body, secret)}",
+            },
+        )
+
+
+class QueueRecorder:
+    """Captures sync_bank_account_group_task.apply_async calls"""
+
+    def __init__(self):
+        self.calls = []
+        self.priorities = []
+
+    def apply_async(self, args, countdown=None, priority=None):
+        self.calls.append((args[0], countdown))
+        self.priorities.append(priority)
+
+
+@pytest.fixture
+def session_factory(db_session):
+    return async_sessionmaker(db_session.bind, expire_on_commit=False)
+
+
+@pytest.fixture
+def queue(monkeypatch):
+    recorder = QueueRecorder()
+    monkeypatch.setattr(webhooks, "sync_bank_account_group_task", recorder)
+    return recorder
+
+
+@pytest.fixture
+def bridge(session_factory, queue, monkeypatch):
+    monkeypatch.setattr(settings, "BRIDGE_WEBHOOK_SECRET", SECRET)
+    app = FastAPI()
+    app.include_router(webhooks.router)
+
+    async def override_get_db():
+        async with session_factory() as session:
+            yield session
+
+    app.dependency_overrides[get_db] = override_get_db
+    return FakeBridge(app)
+
+
+async def create_accounts(db_session, user, item_id, bridge_ids):
+    accounts = []
+    for bridge_id in bridge_ids:
+        account = BankAccount(
+            user_id=user.id,
+            bank_name="Test Bank",
+            bridge_account_id=bridge_id,
+            bridge_item_id=item_id,
+            currency="EUR",
+            is_active=True,
+        )
+        db_session.add(account)
+        accounts.append(account)
+    await db_session.commit()
+    return accounts
+
+
+def test_signature_verification():
+    """Test v1 signatures, secret rotation and tampered bodies"""
+    body = b'{"type": "item.refreshed"}'
+    signature = compute_signature(body, SECRET)
+
+    assert verify_signature(body, f"v1={signature}", SECRET)
+    assert verify_signature(body, f"v1={signature.lower()}", SECRET)
+    assert verify_signature(body, f"v1={compute_signature(body, 'old')}, v1={signature}", SECRET)
+    assert not verify_signature(body + b" ", f"v1={signature}", SECRET)
+    assert not verify_signature(body, None, SECRET)
+
+
+@pytest.mark.asyncio
+async def test_rejects_unsigned_events(bridge, queue, db_session, test_user):
+    """Test a wrong signature is refused and queues nothing"""
+    await create_accounts(db_session, test_user, "item-1", ["1001"])
+
+    response = await bridge.emit("item.account.updated", secret="wrong", account_id="1001")
+
+    assert response.status_code == 401
+    assert queue.calls == []
+
+
+@pytest.mark.asyncio
+async def test_burst_of_events_queues_one_sync_per_account(
+    bridge, queue, db_session, session_factory, test_user
+):
+    """Test a refresh burst ends in one sync per account, then syncs resume"""
+    webhook_counters.reset()
+    accounts = await create_accounts(db_session, test_user, "item-1", ["1001", "1002"])
+    bridge.add_account("1001", "item-1")
+    bridge.add_account("1002", "item-1")
+    bridge.add_transactions("1001", 3)
+    bridge.add_transactions("1002", 2)
+
+    for _ in range(3):
+        await bridge.emit("item.account.updated", account_id="1001", item_id="item-1", nb_new_transactions=1)
+    await bridge.emit("item.account.updated", account_id="1002", item_id="item-1", nb_new_transactions=2)
+    await bridge.emit("item.account.updated", account_id="1002", item_id="item-1",
+                      nb_new_transactions=0, nb_updated_transactions=0)
+    await bridge.emit("item.account.updated", account_id="9999", item_id="item-9")
+    response = await bridge.emit("item.refreshed", item_id="item-1")
+
+    assert response.json() == {"event": "item.refreshed", "queued": 0}
+    assert sorted(ids[0] for ids, _ in queue.calls) == sorted(str(a.id) for a in accounts)
+    assert {countdown for _, countdown in queue.calls} == {settings.BRIDGE_WEBHOOK_COALESCE_SECONDS}
+    assert set(queue.priorities) == {PRIORITY_URGENT}
+    assert webhook_counters.get("events") == 7
+    assert webhook_counters.get("syncs_requested") == 2
+
+    # The worker runs the queued syncs against the fake Bridge
+    client = bridge.client()
+    for account_ids, _ in queue.calls:
+        summary = await BankService.sync_account_group(
+            session_factory, [a.id for a in accounts if str(a.id) in account_ids], client
+        )
+        assert summary["failed"] == 0
+    transactions = (await db_session.execute(select(Transaction))).scalars().all()
+    assert len(transactions) == 5
+    assert not any("/accounts/9999" in path for path in bridge.api_calls)
+
+    # Flags were released when the syncs started: new events queue again
+    queue.calls.clear()
+    bridge.add_transactions("1001", 1)
+    await bridge.emit("item.refreshed", item_id="item-1")
+    assert len(queue.calls) == 1
+    assert len(queue.calls[0][0]) == 2
+
+
+@pytest.mark.asyncio
+async def test_lost_sync_request_is_taken_over(bridge, queue, db_session, test_user):
+    """Test a flag older than the pending TTL does not block webhooks forever"""
+    account, = await create_accounts(db_session, test_user, "item-1", ["1001"])
+    account.sync_requested_at = datetime.utcnow() - timedelta(
+        seconds=settings.BRIDGE_WEBHOOK_PENDING_TTL_SECONDS + 60
+    )
+    await db_session.commit()
+
+    await bridge.emit("item.account.updated", account_id="1001")
+
+    assert [ids for ids, _ in queue.calls] == [[str(account.id)]]
+
+
+@pytest.mark.asyncio
+async def test_poll_only_syncs_stale_accounts(db_session, test_user):
+    """Test the safety-net poll skips accounts kept fresh by webhooks"""
+    fresh, stale, never = await create_accounts(
+        db_session, test_user, "item-1", ["1001", "1002", "1003"]
+    )
+    fresh.last_sync_at = datetime.utcnow() - timedelta(hours=1)
+    stale.last_sync_at = datetime.utcnow() - timedelta(hours=settings.BRIDGE_POLL_STALE_HOURS + 1)
+    await db_session.commit()
+
+    groups = await BankWebhookService.get_stale_account_groups(db_session)
+
+    assert [sorted(group) for group in groups] == [sorted([stale.id, never.id])]
+
+
+@pytest.mark.asyncio
+async def test_single_account_sync_releases_the_flag(
+    bridge, queue, db_session, session_factory, test_user, monkeypatch
+):
+    """Test a sync re-queued after a locked group sync still lets new events queue"""
+    from app.workers import tasks
+
+    async def no_relay():
+        pass
+
+    monkeypatch.setattr(tasks, "SessionLocal", session_factory)
+    monkeypatch.setattr(tasks, "BridgeClient", bridge.client)
+    monkeypatch.setattr(tasks, "enqueue_outbox_relay", no_relay)
+    account, = await create_accounts(db_session, test_user, "item-1", ["1001"])
+    bridge.add_account("1001", "item-1")
+    bridge.add_transactions("1001", 2)
+
+    await bridge.emit("item.account.updated", account_id="1001")
+    assert len(queue.calls) == 1
+
+    result = await tasks._sync_bank_account(str(account.id), None)
+    assert result["synced"] == 2
+
+    queue.calls.clear()
+    await bridge.emit("item.account.updated", account_id="1001")
+    assert [ids for ids, _ in queue.calls] == [[str(account.id)]]
@@ -0,0 +1,119 @@
+"""Tests for the local hashed n-gram categorization model"""
+import pytest
+import random
+import time
+from decimal import Decimal
+from uuid import uuid4
+
+from app.services.categorization_model import (
+    GLOBAL_SCOPE,
+    HashedLinearModel,
+    LocalCategorizer,
+    ModelStore,
+    TrainingExample,
+    extract_features,
+    in_holdout,
+    train_model,
+)
+
+MERCHANTS = {
+    "electricite_eau": ["PRLV SEPA EDF", "PRLV SEPA ENGIE", "PRLV VEOLIA EAU"],
+    "telecommunications": ["PRLV SEPA ORANGE", "PRLV FREE MOBILE", "PRLV SEPA BOUYGUES TELECOM"],
+    "fournitures_bureau": ["CB BURO DEPOT", "CB LYRECO", "CB OFFICE DEPOT"],
+    "frais_deplacement": ["CB SNCF CONNECT", "CB AIR FRANCE", "CB UBER TRIP", "CB TOTAL ENERGIES STATION"],
+    "vente_client": ["VIR ACME CORP", "VIR BOULANGERIE LEMOINE", "VIR CABINET ROUSSEAU"],
+}
+
+
+def synthetic_examples(count, seed=0):
+    """Labelled transactions with varying references, dates and amounts"""
+    rng = random.Random(seed)
+    examples = []
+    for _ in range(count):
+        category = rng.choice(list(MERCHANTS))
+        merchant = rng.choice(MERCHANTS[category])
+        description = f"{merchant} {rng.randint(1, 28):02d}/{rng.randint(1, 12):02d} REF{rng.randint(1000, 99999)}"
+        sign = 1 if category == "vente_client" else -1
+        amount = Decimal(rng.randint(500, 200000)) / 100 * sign
+        examples.append(TrainingExample(description, amount, category))
+    return examples
+
+
+def test_features_ignore_digit_changes():
+    """Test references and dates map to the same features"""
+    first = extract_features("PRLV SEPA EDF 0423", "-42.10", 1024)
+    second = extract_features("PRLV SEPA EDF 0523", "-48.30", 1024)
+    refund = extract_features("PRLV SEPA EDF 0523", "48.30", 1024)
+    assert first == second
+    assert refund != second
+
+
+def test_trained_model_generalizes_to_holdout():
+    """Test holdout accuracy on unseen references of known merchants"""
+    model = train_model(synthetic_examples(600), dim=2 ** 16)
+
+    assert model.metadata["accuracy"] >= 0.95
+    category, probability = model.predict("PRLV SEPA ORANGE 1203 REF55555", "-39.99")
+    assert category == "telecommunications"
+    assert probability > 0.8
+
+
+def test_model_store_versions_and_prunes(tmp_path):
+    """Test each save is a new version and only the newest are kept"""
+    store = ModelStore(str(tmp_path), keep=2)
+    model = HashedLinearModel(["a", "b"], 64).fit([
+        TrainingExample("CB BURO DEPOT", Decimal("-10"), "a"),
+        TrainingExample("VIR ACME", Decimal("10"), "b"),
+    ])
+
+    assert [store.save("global", model) for _ in range(3)] == [1, 2, 3]
+    assert store.versions("global") == [2, 3]
+
+    loaded = store.load("global")
+    assert loaded.metadata["version"] == 3
+    assert loaded.predict("CB BURO DEPOT", "-12")[0] == "a"
+    assert store.load("global", version=1) is None
+    assert store.load("unknown") is None
+
+
+def test_local_categorizer_falls_back_to_global_model(tmp_path):
+    """Test tenant model first, global model for what it does not know"""
+    store = ModelStore(str(tmp_path))
+    user_id = uuid4()
+    store.save(GLOBAL_SCOPE, train_model(synthetic_examples(400), dim=2 ** 16))
+    store.save(str(user_id), train_model([
+        TrainingExample(f"VIR SCI DES LILAS {month:02d}", Decimal("-900"), "loyer_bureau")
+        for month in range(1, 13)
+    ] + [
+        TrainingExample(f"CB RESTAURANT LE ZINC {day:02d}", Decimal("-35"), "frais_deplacement")
+        for day in range(1, 13)
+    ], holdout_share=0, dim=2 ** 16))
+    categorizer = LocalCategorizer(store, ttl_seconds=300)
+
+    assert categorizer.predict(user_id, "VIR SCI DES LILAS 13", "-900")[0] == "loyer_bureau"
+    assert categorizer.predict(user_id, "PRLV SEPA ENGIE 0412", "-80")[0] == "electricite_eau"
+    assert categorizer.predict(uuid4(), "XYZZY", "-1") is None
+
+
+@pytest.mark.slow
+def test_benchmark_accuracy_and_latency():
+    """Test 20k-example training stays fast and predictions sub-millisecond"""
+    examples = synthetic_examples(20000, seed=1)
+
+    started = time.perf_counter()
+    model = train_model(examples, dim=2 ** 18)
+    training_seconds = time.perf_counter() - started
+
+    holdout = [example for example in examples if in_holdout(example)]
+    started = time.perf_counter()
+    for example in holdout:
+        model.predict(example.description, example.amount)
+    per_prediction = (time.perf_counter() - started) / len(holdout)
+
+    print(
+        f"\ntrained in {training_seconds:.1f}s, holdout accuracy "
+        f"{model.metadata['accuracy']:.1%}, {per_prediction * 1e6:.0f}µs per prediction"
+    )
+    assert model.metadata["accuracy"] >= 0.95
+    assert per_prediction < 0.001
+    assert training_seconds < 60
@@ -0,0 +1,248 @@
+"""Tests for CategorizationService and the merchant → category memo"""
+import pytest
+from datetime import datetime, timedelta
+from decimal import Decimal
+from sqlalchemy import select
+
+from app.models.category_memo import CategoryMemo
+from app.models.transaction import Transaction
+from app.services.categorization_model import GLOBAL_SCOPE, ModelStore, local_categorizer
+from app.services.categorization_service import CategorizationService, local_counters
+from app.services.category_memo_service import (
+    CategoryMemoService,
+    fingerprint,
+    memo_counters,
+)
+from tests.unit.services.factories import create_transaction
+
+
+@pytest.fixture(autouse=True)
+def model_store(tmp_path, monkeypatch):
+    """Keep local models of each test in a temporary directory."""
+    store = ModelStore(str(tmp_path))
+    monkeypatch.setattr(local_categorizer, "store", store)
+    local_categorizer.invalidate()
+    yield store
+    local_categorizer.invalidate()
+
+
+class RecordingAIClient:
+    """Stand-in for ClaudeClient that records the descriptions it categorizes"""
+
+    def __init__(self, category="fournitures", confidence=Decimal("0.9")):
+        self.result = (category, confidence)
+        self.descriptions = []
+
+    async def categorize_transaction(self, description, amount, transaction_type):
+        self.descriptions.append(description)
+        return self.result
+
+    async def categorize_transactions_batch(self, transactions, batch_size=None):
+        self.descriptions.extend(t["description"] for t in transactions)
+        return [self.result] * len(transactions)
+
+
+def test_fingerprint_ignores_references_and_payment_words():
+    """Test recurring payments of one merchant share a fingerprint"""
+    assert fingerprint("PRLV SEPA EDF 0423 REF 88413", "-42.10") == "-edf"
+    assert fingerprint("PRLV SEPA EDF 0523 REF 90211", "-55.00") == "-edf"
+    assert fingerprint("CB CARREFOUR MARKET 12/03", "-18.40") == "-carrefour market"
+    assert fingerprint("VIR EDF REMBOURSEMENT", "30.00").startswith("+")
+    assert fingerprint("CB 12/03 4411", "-5.00") is None
+
+
+@pytest.mark.asyncio
+async def test_uncategorized_batch_sends_each_merchant_once(db_session, test_user, bank_account):
+    """Test the batch dedupes merchants and the next run is served by the memo"""
+    memo_counters.reset()
+    await create_transaction(db_session, bank_account, "b1", "PRLV SEPA EDF 0423", "-42.10")
+    await create_transaction(db_session, bank_account, "b2", "PRLV SEPA EDF 0523", "-55.00")
+    await create_transaction(db_session, bank_account, "b3", "CB BURO DEPOT 12/03", "-18.40")
+    await db_session.commit()
+    ai_client = RecordingAIClient()
+
+    count = await CategorizationService.categorize_uncategorized_transactions(
+        db_session, test_user.id, ai_client=ai_client
+    )
+    assert count == 3
+    assert len(ai_client.descriptions) == 2
+
+    await create_transaction(db_session, bank_account, "b4", "PRLV SEPA EDF 0623", "-48.00")
+    await db_session.commit()
+    ai_client.descriptions.clear()
+
+    count = await CategorizationService.categorize_uncategorized_transactions(
+        db_session, test_user.id, ai_client=ai_client
+    )
+    assert count == 1
+    assert ai_client.descriptions == []
+    sources = (await db_session.execute(select(Transaction.bridge_transaction_id, Transaction.category_source))).all()
+    assert dict(sources) == {"b1": "ai", "b2": "ai", "b3": "ai", "b4": "memo"}
+    assert memo_counters.get("hits") == 1
+    assert CategoryMemoService.get_stats()["hit_ratio"] > 0
+
+
+@pytest.mark.asyncio
+async def test_manual_recategorization_wins_over_ai(db_session, test_user, bank_account):
+    """Test a manual correction is reused and never overwritten by the AI"""
+    tx_1 = await create_transaction(db_session, bank_account, "b1", "CB AMAZON MKTP 1203", "-25.00")
+    await CategorizationService.recategorize_transaction(
+        db_session, tx_1, "logiciels", user_id=test_user.id
+    )
+    await CategoryMemoService.remember(
+        db_session, test_user.id, fingerprint(tx_1.description, tx_1.amount),
+        "fournitures", Decimal("0.95")
+    )
+    tx_2 = await create_transaction(db_session, bank_account, "b2", "CB AMAZON MKTP 1503", "-12.00")
+    ai_client = RecordingAIClient()
+
+    await CategorizationService.categorize_transaction(
+        db_session, tx_2, ai_client, user_id=test_user.id
+    )
+
+    assert tx_2.category == "logiciels"
+    assert tx_2.category_confidence == Decimal("1.00")
+    assert (tx_1.category_source, tx_2.category_source) == ("manual", "memo")
+    assert ai_client.descriptions == []
+
+
+@pytest.mark.asyncio
+async def test_low_confidence_results_are_not_remembered(db_session, test_user, bank_account):
+    """Test guesses below CATEGORY_MEMO_MIN_CONFIDENCE stay out of the memo"""
+    tx = await create_transaction(db_session, bank_account, "b1", "VIR SCI DES LILAS", "-900.00")
+    ai_client = RecordingAIClient(confidence=Decimal("0.4"))
+
+    await CategorizationService.categorize_transaction(
+        db_session, tx, ai_client, user_id=test_user.id
+    )
+
+    memos = (await db_session.execute(select(CategoryMemo))).scalars().all()
+    assert memos == []
+
+
+@pytest.mark.asyncio
+async def test_evict_applies_ttl_and_lru_to_ai_entries(db_session, test_user, monkeypatch):
+    """Test eviction drops expired and least recently used AI entries only"""
+    from app.config import settings
+    monkeypatch.setattr(settings, "CATEGORY_MEMO_MAX_PER_USER", 2)
+
+    now = datetime.utcnow()
+    for i, (source, age_days) in enumerate([
+        ("ai", 0), ("ai", 1), ("ai", 2), ("ai", 400), ("manual", 400),
+    ]):
+        db_session.add(CategoryMemo(
+            user_id=test_user.id,
+            fingerprint=f"-merchant {chr(97 + i)}",
+            category="autre",
+            confidence=Decimal("0.9"),
+            source=source,
+            hit_count=0,
+            last_used_at=now - timedelta(days=age_days),
+            created_at=now - timedelta(days=age_days),
+            updated_at=now - timedelta(days=age_days),
+        ))
+    await db_session.commit()
+
+    stats = await CategoryMemoService.evict(db_session)
+    await db_session.commit()
+
+    assert stats == {"expired": 1, "evicted": 1}
+    remaining = (await db_session.execute(
+        select(CategoryMemo.fingerprint).order_by(CategoryMemo.fingerprint)
+    )).scalars().all()
+    assert remaining == ["-merchant a", "-merchant b", "-merchant e"]
+
+
+@pytest.mark.asyncio
+async def test_local_model_answers_before_ai(db_session, test_user, bank_account, model_store):
+    """Test training from categorized rows and skipping the AI on confident predictions"""
+    local_counters.reset()
+    merchants = [
+        ("PRLV SEPA ORANGE", "telecommunications"),
+        ("CB BURO DEPOT", "fournitures_bureau"),
+        ("PRLV SEPA EDF", "electricite_eau"),
+    ]
+    for i in range(60):
+        description, category = merchants[i % 3]
+        tx = await create_transaction(
+            db_session, bank_account, f"h{i}", f"{description} {i:04d}", f"-{10 + i}.00"
+        )
+        tx.category, tx.category_confidence, tx.category_source = category, Decimal("0.95"), "ai"
+    await db_session.commit()
+
+    report = await CategorizationService.train_local_models(db_session, [test_user.id])
+    assert report[str(test_user.id)]["samples"] > 0
+    assert model_store.versions(GLOBAL_SCOPE) == [1]
+
+    tx = await create_transaction(db_session, bank_account, "n1", "PRLV SEPA ORANGE 9999", "-45.00")
+    ai_client = RecordingAIClient()
+    await CategorizationService.categorize_transaction(
+        db_session, tx, ai_client, user_id=test_user.id
+    )
+
+    assert tx.category == "telecommunications"
+    assert ai_client.descriptions == []
+    assert local_counters.get("accepted") == 1
+
+
+@pytest.mark.asyncio
+async def test_training_uses_confirmed_labels_only(db_session, test_user, bank_account):
+    """Test the model trains on manual and confident AI labels, not on its own predictions"""
+    labels = [
+        ("CB BURO DEPOT", "fournitures_bureau", "0.95", "ai"),
+        ("PRLV SEPA ORANGE", "telecommunications", "1.0", "manual"),
+        ("PRLV SEPA EDF", "electricite_eau", "0.60", "ai"),
+        ("CB MONOPRIX", "repas", "0.90", "model"),
+        ("CB AMAZON", "fournitures_bureau", "0.95", "memo"),
+        ("VIR INCONNU", "autre", "0.95", "ai"),
+        ("FRAIS DIVERS", "autre", "1.0", "manual"),
+    ]
+    for i, (description, category, confidence, source) in enumerate(labels):
+        tx = await create_transaction(db_session, bank_account, f"l{i}", description, "-10.00")
+        tx.category, tx.category_confidence, tx.category_source = category, Decimal(confidence), source
+    await db_session.commit()
+
+    examples = await CategorizationService.get_training_examples(db_session, test_user.id)
+
+    assert sorted(example.description for example in examples) == [
+        "CB BURO DEPOT", "FRAIS DIVERS", "PRLV SEPA ORANGE"
+    ]
+
+    # A memo row whose merchant was corrected manually is a confirmed label
+    await CategoryMemoService.remember(
+        db_session, test_user.id, fingerprint("CB AMAZON", Decimal("-10.00")),
+        "logiciels", Decimal("1.0"), source="manual"
+    )
+    await db_session.commit()
+    examples = await CategorizationService.get_training_examples(db_session, test_user.id)
+    assert ("CB AMAZON", "logiciels", 2.0) in [(e.description, e.category, e.weight) for e in examples]
+
+
+@pytest.mark.asyncio
+async def test_ai_batches_respect_per_tenant_concurrency(db_session, test_user, bank_account, monkeypatch):
+    """Test one tenant never has more than CLAUDE_MAX_CONCURRENCY_PER_TENANT prompts in flight"""
+    import asyncio
+    from app.config import settings
+    monkeypatch.setattr(settings, "CLAUDE_CATEGORIZATION_BATCH_SIZE", 1)
+    monkeypatch.setattr(settings, "CLAUDE_MAX_CONCURRENCY_PER_TENANT", 2)
+
+    class SlowAIClient(RecordingAIClient):
+        in_flight = peak = 0
+
+        async def categorize_transactions_batch(self, transactions, batch_size=None):
+            SlowAIClient.in_flight += 1
+            SlowAIClient.peak = max(SlowAIClient.peak, SlowAIClient.in_flight)
+            await asyncio.sleep(0.01)
+            SlowAIClient.in_flight -= 1
+            return await super().categorize_transactions_batch(transactions)
+
+    for i, merchant in enumerate(["ALPHA", "BRAVO", "CHARLIE", "DELTA", "ECHO", "FOXTROT"]):
+        await create_transaction(db_session, bank_account, f"c{i}", f"CB {merchant} SHOP", "-10.00")
+    await db_session.commit()
+
+    count = await CategorizationService.categorize_uncategorized_transactions(
+        db_session, test_user.id, ai_client=SlowAIClient()
+    )
+
+    assert count == 6
+    assert SlowAIClient.peak == 2
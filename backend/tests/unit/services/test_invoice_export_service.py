@@ -0,0 +1,179 @@
+"""Tests for the bulk invoice PDF export"""
+import asyncio
+import io
+import os
+import time
+import zipfile
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pytest
+
+from app.config import settings
+from app.models.invoice import Invoice
+from app.schemas.invoice import InvoiceFilter
+from app.services.invoice_export_service import (
+    ERRORS_FILENAME,
+    ExportEntry,
+    InvoiceExportService,
+)
+from app.services.invoice_service import InvoiceService
+from app.services.pdf_render_pool import PDFPoolBusy
+
+
+class FakeRenderer:
+    """Snapshot → fake PDF with latency, tracking concurrent renders"""
+
+    def __init__(self, delay=0.01, fail_for=(), busy_times=0):
+        self.delay = delay
+        self.fail_for = set(fail_for)
+        self.busy_times = busy_times
+        self.active = 0
+        self.max_active = 0
+
+    async def __call__(self, snapshot):
+        number = snapshot["invoice"]["invoice_number"]
+        if self.busy_times:
+            self.busy_times -= 1
+            raise PDFPoolBusy("full")
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+            if number in self.fail_for:
+                raise ValueError("PDF generation failed")
+            return f"%PDF {number}".encode()
+        finally:
+            self.active -= 1
+
+
+def entries(count):
+    return [
+        ExportEntry(filename=f"Facture_INV-{i}.pdf", snapshot={"invoice": {"invoice_number": f"INV-{i}"}, "user": {}})
+        for i in range(count)
+    ]
+
+
+async def collect(chunks):
+    return [chunk async for chunk in chunks]
+
+
+@pytest.mark.asyncio
+async def test_archive_is_streamed_in_order_with_bounded_parallel_renders(monkeypatch):
+    """Test PDFs are rendered in parallel, within the window, and streamed as they complete"""
+    monkeypatch.setattr(settings, "INVOICE_EXPORT_CONCURRENCY", 3)
+    renderer = FakeRenderer()
+    progress = []
+
+    chunks = await collect(
+        InvoiceExportService.iter_zip(entries(10), renderer, lambda p: progress.append(p.as_dict()))
+    )
+
+    assert renderer.max_active == 3
+    # One chunk per PDF, then the central directory
+    assert len([chunk for chunk in chunks if chunk]) == 11
+    archive = zipfile.ZipFile(io.BytesIO(b"".join(chunks)))
+    assert archive.namelist() == [f"Facture_INV-{i}.pdf" for i in range(10)]
+    assert archive.read("Facture_INV-7.pdf") == b"%PDF INV-7"
+    assert progress[0] == {"total": 10, "done": 1, "failed": 0}
+    assert progress[-1] == {"total": 10, "done": 10, "failed": 0}
+
+
+@pytest.mark.asyncio
+async def test_failed_pdfs_are_listed_not_fatal():
+    """Test a failing render is left out and listed in the error file"""
+    chunks = await collect(InvoiceExportService.iter_zip(entries(3), FakeRenderer(0, fail_for={"INV-1"})))
+
+    archive = zipfile.ZipFile(io.BytesIO(b"".join(chunks)))
+    assert archive.namelist() == ["Facture_INV-0.pdf", "Facture_INV-2.pdf", ERRORS_FILENAME]
+    assert b"Facture_INV-1.pdf: PDF generation failed" in archive.read(ERRORS_FILENAME)
+
+
+@pytest.mark.asyncio
+async def test_busy_pdf_pool_is_waited_for(monkeypatch):
+    """Test an export waits for room in the PDF pool instead of failing"""
+    monkeypatch.setattr(settings, "INVOICE_EXPORT_BUSY_RETRY_SECONDS", 0.01)
+    chunks = await collect(InvoiceExportService.iter_zip(entries(2), FakeRenderer(0, busy_times=3)))
+
+    assert len(zipfile.ZipFile(io.BytesIO(b"".join(chunks))).namelist()) == 2
+
+
+@pytest.mark.asyncio
+async def test_stored_export_is_written_atomically(tmp_path, monkeypatch):
+    """Test the background export file and its stats"""
+    monkeypatch.setattr(settings, "INVOICE_EXPORT_DIR", str(tmp_path))
+    path = InvoiceExportService.export_path("user-1", "export-1")
+
+    stats = await InvoiceExportService.write_zip(entries(4), path, FakeRenderer(0, fail_for={"INV-0"}))
+
+    assert stats == {"total": 4, "done": 3, "failed": 1, "bytes": path.stat().st_size}
+    assert zipfile.ZipFile(path).testzip() is None
+    assert [p.name for p in path.parent.iterdir()] == ["export-1.zip"]
+
+
+def test_old_exports_are_purged(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "INVOICE_EXPORT_DIR", str(tmp_path))
+    old = InvoiceExportService.export_path("user-1", "old")
+    new = InvoiceExportService.export_path("user-1", "new")
+    old.parent.mkdir(parents=True)
+    old.write_bytes(b"zip")
+    new.write_bytes(b"zip")
+    stale = time.time() - (settings.INVOICE_EXPORT_RETENTION_HOURS + 1) * 3600
+    os.utime(old, (stale, stale))
+
+    assert InvoiceExportService.purge_exports("user-1") == 1
+    assert not old.exists() and new.exists()
+
+
+@pytest.mark.asyncio
+async def test_filtered_invoices_are_selected_for_export(db_session, test_user):
+    """Test the export selection applies InvoiceFilter, oldest first"""
+    user_id = test_user.id
+    for i, (status, days) in enumerate([("paid", 10), ("pending", 40), ("paid", 70), ("paid", 100)]):
+        db_session.add(Invoice(
+            user_id=user_id,
+            invoice_number=f"INV-{i}",
+            client_name="Client",
+            amount=Decimal("100"),
+            tax_amount=Decimal("0"),
+            total_amount=Decimal("100"),
+            currency="EUR",
+            issue_date=date.today() - timedelta(days=days),
+            due_date=date.today() - timedelta(days=days - 30),
+            status=status,
+            is_reconciled=False,
+        ))
+    await db_session.commit()
+
+    invoices = await InvoiceService.get_filtered_invoices(
+        db_session,
+        user_id,
+        InvoiceFilter(status="paid", start_date=date.today() - timedelta(days=60))
+    )
+    assert [invoice.invoice_number for invoice in invoices] == ["INV-2", "INV-0"]
+
+    limited = await InvoiceService.get_filtered_invoices(db_session, user_id, InvoiceFilter(), limit=2)
+    assert [invoice.invoice_number for invoice in limited] == ["INV-3", "INV-2"]
+
+
+@pytest.mark.asyncio
+async def test_only_the_owner_sees_an_export(monkeypatch):
+    """Test export ids are checked against the owner recorded at enqueue"""
+    class FakeRedis:
+        def __init__(self):
+            self.data = {}
+
+        async def set(self, key, value, ex=None):
+            self.data[key] = value.encode()
+
+        async def get(self, key):
+            return self.data.get(key)
+
+    redis = FakeRedis()
+    monkeypatch.setattr("app.services.invoice_export_service.get_redis", lambda: redis)
+
+    await InvoiceExportService.record_owner("export-1", "user-1")
+
+    assert await InvoiceExportService.is_owner("export-1", "user-1")
+    assert not await InvoiceExportService.is_owner("export-1", "user-2")
+    assert not await InvoiceExportService.is_owner("unknown", "user-1")
@@ -0,0 +1,130 @@
+"""Tests for the transactional outbox and its relay"""
+import pytest
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+from sqlalchemy import select
+
+from app.config import settings
+from app.models.outbox_event import OutboxEvent
+from app.services.outbox_service import OutboxService, TRANSACTIONS_CREATED
+from app.workers import tasks
+
+
+class DelayRecorder:
+    """Captures `.delay` calls of a Celery task"""
+
+    def __init__(self):
+        self.calls = []
+
+    def delay(self, *args, **kwargs):
+        self.calls.append((args, kwargs))
+
+
+async def pending_events(db_session):
+    result = await db_session.execute(
+        select(OutboxEvent).where(OutboxEvent.published_at.is_(None))
+    )
+    return list(result.scalars().all())
+
+
+@pytest.mark.asyncio
+async def test_event_is_committed_or_rolled_back_with_the_change(db_session, test_user):
+    """Test an event only exists if the transaction that recorded it commits"""
+    user_id = test_user.id
+    OutboxService.record_new_transactions(db_session, user_id, [uuid4()])
+    await db_session.rollback()
+    assert await pending_events(db_session) == []
+
+    OutboxService.record_new_transactions(db_session, user_id, [uuid4()])
+    await db_session.commit()
+    assert len(await pending_events(db_session)) == 1
+
+    assert OutboxService.record_new_transactions(db_session, user_id, []) is None
+
+
+@pytest.mark.asyncio
+async def test_relay_publishes_each_type_in_one_batch(db_session, test_user):
+    """Test the relay hands all pending events of a type to one handler call"""
+    for _ in range(3):
+        OutboxService.record_new_transactions(db_session, test_user.id, [uuid4()])
+    await db_session.commit()
+
+    batches = []
+    stats = await OutboxService.relay(db_session, {TRANSACTIONS_CREATED: batches.append})
+    await db_session.commit()
+
+    assert stats == {"events": 3, "published": 3, "failed": 0}
+    assert len(batches) == 1 and len(batches[0]) == 3
+    assert await pending_events(db_session) == []
+
+    # Nothing left: the next run publishes nothing
+    stats = await OutboxService.relay(db_session, {TRANSACTIONS_CREATED: batches.append})
+    assert stats["events"] == 0
+    assert len(batches) == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_handler_keeps_events_pending(db_session, test_user, monkeypatch):
+    """Test a failing type is retried later and gives up after max attempts"""
+    monkeypatch.setattr(settings, "OUTBOX_MAX_ATTEMPTS", 2)
+    OutboxService.record_new_transactions(db_session, test_user.id, [uuid4()])
+    OutboxService.add(db_session, "invoices.paid", {"invoice_id": "x"}, user_id=test_user.id)
+    await db_session.commit()
+
+    def broker_down(events):
+        raise ConnectionError("broker down")
+
+    stats = await OutboxService.relay(db_session, {TRANSACTIONS_CREATED: broker_down})
+    await db_session.commit()
+    assert stats == {"events": 2, "published": 0, "failed": 2}
+
+    events = await pending_events(db_session)
+    assert {event.attempts for event in events} == {1}
+    assert any("broker down" in event.last_error for event in events)
+    assert any("No outbox handler" in event.last_error for event in events)
+
+    await OutboxService.relay(db_session, {TRANSACTIONS_CREATED: broker_down})
+    await db_session.commit()
+    assert await OutboxService.get_backlog(db_session) == {"pending": 0, "dead": 2}
+    assert (await OutboxService.relay(db_session, {}))["events"] == 0
+
+
+@pytest.mark.asyncio
+async def test_purge_only_removes_old_published_events(db_session, test_user):
+    """Test published events are kept for the retention period"""
+    old = OutboxService.record_new_transactions(db_session, test_user.id, [uuid4()])
+    recent = OutboxService.record_new_transactions(db_session, test_user.id, [uuid4()])
+    OutboxService.record_new_transactions(db_session, test_user.id, [uuid4()])
+    old.published_at = datetime.utcnow() - timedelta(hours=settings.OUTBOX_RETENTION_HOURS + 1)
+    recent.published_at = datetime.utcnow()
+    await db_session.commit()
+
+    assert await OutboxService.purge_published(db_session) == 1
+    await db_session.commit()
+    remaining = (await db_session.execute(select(OutboxEvent))).scalars().all()
+    assert len(remaining) == 2
+
+
+def test_new_transactions_are_batched_per_user(monkeypatch):
+    """Test many small events become one task pair per user and id batch"""
+    monkeypatch.setattr(settings, "OUTBOX_MAX_IDS_PER_TASK", 3)
+    categorize = DelayRecorder()
+    reconcile = DelayRecorder()
+    monkeypatch.setattr(tasks, "categorize_uncategorized_transactions_task", categorize)
+    monkeypatch.setattr(tasks, "reconcile_transactions_batch_task", reconcile)
+
+    alice, bob = uuid4(), uuid4()
+    events = [
+        OutboxEvent(event_type=TRANSACTIONS_CREATED, user_id=alice, payload={"transaction_ids": ["a1", "a2"]}),
+        OutboxEvent(event_type=TRANSACTIONS_CREATED, user_id=alice, payload={"transaction_ids": ["a2", "a3", "a4"]}),
+        OutboxEvent(event_type=TRANSACTIONS_CREATED, user_id=bob, payload={"transaction_ids": ["b1"]}),
+    ]
+    tasks.OUTBOX_HANDLERS[TRANSACTIONS_CREATED](events)
+
+    assert reconcile.calls == [
+        ((str(alice),), {"transaction_ids": ["a1", "a2", "a3"]}),
+        ((str(alice),), {"transaction_ids": ["a4"]}),
+        ((str(bob),), {"transaction_ids": ["b1"]}),
+    ]
+    assert categorize.calls == reconcile.calls
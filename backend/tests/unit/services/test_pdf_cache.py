@@ -0,0 +1,88 @@
+"""Tests for the content-addressed invoice PDF cache"""
+import os
+from datetime import date, datetime
+from decimal import Decimal
+from types import SimpleNamespace
+
+from app.services.pdf_cache import PDFCache, invoice_snapshot, pdf_cache_key, pdf_counters
+
+
+def make_invoice(**overrides):
+    fields = dict(
+        id="invoice-1",
+        invoice_number="INV-001",
+        status="pending",
+        client_name="Client",
+        issue_date=date(2024, 1, 15),
+        due_date=date(2024, 2, 15),
+        currency="EUR",
+        total_amount=Decimal("1200.00"),
+        items=[SimpleNamespace(description="Service", details=None, quantity=2, unit_price=Decimal("600"))],
+        updated_at=datetime(2024, 1, 15, 10, 0),
+    )
+    fields.update(overrides)
+    return SimpleNamespace(**fields)
+
+
+USER = SimpleNamespace(company_name="ACME", email="acme@example.com", phone=None, address=None, hashed_password="x")
+
+
+def test_snapshot_keeps_only_rendered_fields():
+    """Test the snapshot is plain data with the fields the template reads"""
+    snapshot = invoice_snapshot(make_invoice(), USER)
+
+    assert snapshot["invoice"]["items"] == [
+        {"description": "Service", "details": None, "quantity": 2, "unit_price": Decimal("600")}
+    ]
+    assert "payment_terms" not in snapshot["invoice"]
+    assert "hashed_password" not in snapshot["user"]
+
+
+def test_key_changes_with_content_and_template_version():
+    """Test any rendered change, an update or a new template gives a new key"""
+    key = pdf_cache_key(invoice_snapshot(make_invoice(), USER), "v1")
+
+    assert pdf_cache_key(invoice_snapshot(make_invoice(), USER), "v1") == key
+    assert pdf_cache_key(invoice_snapshot(make_invoice(), USER), "v2") != key
+    assert pdf_cache_key(invoice_snapshot(make_invoice(status="paid"), USER), "v1") != key
+    assert pdf_cache_key(
+        invoice_snapshot(make_invoice(updated_at=datetime(2024, 1, 16)), USER), "v1"
+    ) != key
+    other_user = SimpleNamespace(**{**vars(USER), "company_name": "ACME SAS"})
+    assert pdf_cache_key(invoice_snapshot(make_invoice(), other_user), "v1") != key
+
+
+def test_get_put_round_trip(tmp_path):
+    """Test a stored PDF is served back and counted as a hit"""
+    pdf_counters.reset()
+    cache = PDFCache(str(tmp_path), max_bytes=1000)
+
+    assert cache.get("ab" * 32) is None
+    cache.put("ab" * 32, b"%PDF-1")
+
+    assert cache.get("ab" * 32) == b"%PDF-1"
+    assert (pdf_counters.get("cache_hits"), pdf_counters.get("cache_misses")) == (1, 1)
+    assert not list(tmp_path.glob("*/*.tmp"))
+
+
+def test_least_recently_used_pdfs_are_evicted(tmp_path):
+    """Test the cache stays under its size by deleting the oldest reads"""
+    cache = PDFCache(str(tmp_path), max_bytes=1000)
+    keys = [f"{i:02d}" * 32 for i in range(4)]
+    for i, key in enumerate(keys[:3]):
+        cache.put(key, b"x" * 300)
+        os.utime(cache._path(key), (1000 + i, 1000 + i))
+    # Reading the oldest makes it the most recently used
+    cache.get(keys[0])
+
+    cache.put(keys[3], b"x" * 300)
+
+    assert cache.size() <= 900
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) is not None and cache.get(keys[3]) is not None
+
+
+def test_oversized_pdf_is_not_cached(tmp_path):
+    cache = PDFCache(str(tmp_path), max_bytes=100)
+    cache.put("cd" * 32, b"x" * 101)
+    assert cache.get("cd" * 32) is None
@@ -0,0 +1,81 @@
+"""Tests for the PDF render process pool (generic calls, no WeasyPrint needed)"""
+import asyncio
+import time
+
+import pytest
+
+from app.config import settings
+from app.services.pdf_render_pool import PDFPoolBusy, PDFRenderPool, pool_counters
+
+
+@pytest.fixture
+async def pool():
+    pool_counters.reset()
+    pool = PDFRenderPool(workers=2, max_pending=2, initializer=None)
+    await pool.warm()
+    yield pool
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_calls_run_in_worker_processes(pool):
+    """Test results come back from the workers and latencies are recorded"""
+    assert await pool.run(sum, range(10)) == 45
+    assert await pool.run(pow, 2, 10) == 1024
+
+    stats = pool.stats()
+    assert (stats["workers"], stats["pending"], stats["completed"]) == (2, 0, 2)
+    assert stats["latency_ms"]["p99"] > 0
+
+
+@pytest.mark.asyncio
+async def test_full_queue_is_rejected(pool):
+    """Test a call beyond max_pending fails fast instead of queueing"""
+    running = [asyncio.create_task(pool.run(time.sleep, 0.3)) for _ in range(2)]
+    await asyncio.sleep(0)
+
+    started = time.perf_counter()
+    with pytest.raises(PDFPoolBusy):
+        await pool.run(time.sleep, 0.3)
+    assert time.perf_counter() - started < 0.05
+    assert pool_counters.get("rejected") == 1
+
+    await asyncio.gather(*running)
+    assert pool.pending == 0
+    await pool.run(time.sleep, 0)
+
+
+@pytest.mark.asyncio
+async def test_event_loop_stays_responsive_during_cpu_work(pool):
+    """Test CPU-bound calls in the pool do not stall other coroutines"""
+    gaps = []
+
+    async def ticker():
+        last = time.perf_counter()
+        while True:
+            await asyncio.sleep(0.005)
+            now = time.perf_counter()
+            gaps.append(now - last)
+            last = now
+
+    task = asyncio.create_task(ticker())
+    try:
+        await asyncio.gather(*(pool.run(sum, range(3_000_000)) for _ in range(2)))
+    finally:
+        task.cancel()
+
+    assert gaps and max(gaps) < 0.05
+
+
+@pytest.mark.asyncio
+async def test_timed_out_call_keeps_its_slot_until_the_worker_is_done(pool, monkeypatch):
+    """Test a timeout does not free the slot of a render still running in a worker"""
+    monkeypatch.setattr(settings, "PDF_RENDER_TIMEOUT_SECONDS", 0.1)
+
+    with pytest.raises(asyncio.TimeoutError):
+        await pool.run(time.sleep, 0.5)
+    assert pool.pending == 1
+    assert pool_counters.get("timeouts") == 1
+
+    await asyncio.sleep(0.6)
+    assert pool.pending == 0
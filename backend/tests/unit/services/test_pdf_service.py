@@ -2,24 +2,35 @@
 import pytest
 from datetime import datetime, date, timedelta
 from decimal import Decimal
-from unittest.mock import MagicMock, patch
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
 
-from app.services.pdf_service import PDFService
+from app.services.pdf_cache import invoice_snapshot, pdf_cache
+from app.services.pdf_render_pool import PDFPoolBusy
+from app.services.pdf_service import PDFService, get_invoice_template
 from app.models.invoice import Invoice
 from app.models.user import User
 
 
+@pytest.fixture(autouse=True)
+def isolated_pdf_cache(tmp_path, monkeypatch):
+    """Cache rendered PDFs in a temporary directory"""
+    monkeypatch.setattr(pdf_cache, "root", tmp_path)
+    monkeypatch.setattr(pdf_cache, "_size", None)
+
+
 @pytest.fixture
 def sample_user():
     """Sample user for testing"""
     user = User(
         email="test@company.com",
         company_name="Test Company SARL",
-        phone="+33 1 23 45 67 89",
-        address="123 Rue de Test, 75001 Paris",
         hashed_password="hashed"
     )
     user.id = "user-123"
+    # Not User columns, but shown by the template when present
+    user.phone = "+33 1 23 45 67 89"
+    user.address = "123 Rue de Test, 75001 Paris"
     return user
 
 
@@ -36,16 +47,18 @@ def sample_invoice(sample_user):
         due_date=date(2024, 2, 15),
         currency="EUR",
         status="pending",
-        subtotal=Decimal("1000.00"),
-        tax_rate=Decimal("20.00"),
+        amount=Decimal("1000.00"),
         tax_amount=Decimal("200.00"),
-        discount_amount=Decimal("0.00"),
         total_amount=Decimal("1200.00"),
-        payment_terms="Paiement à 30 jours",
-        notes="Merci pour votre confiance",
-        items=[]
+        notes="Merci pour votre confiance"
     )
     invoice.id = "invoice-123"
+    # Not Invoice columns, but read by the template
+    invoice.subtotal = Decimal("1000.00")
+    invoice.tax_rate = Decimal("20.00")
+    invoice.discount_amount = Decimal("0.00")
+    invoice.payment_terms = "Paiement à 30 jours"
+    invoice.items = []
     return invoice
 
 
@@ -149,14 +162,15 @@ def test_generate_invoice_pdf_minimal_invoice_info(sample_user):
         due_date=date.today() + timedelta(days=30),
         currency="EUR",
         status="pending",
-        subtotal=Decimal("500.00"),
-        tax_rate=Decimal("0.00"),
+        amount=Decimal("500.00"),
         tax_amount=Decimal("0.00"),
-        discount_amount=Decimal("0.00"),
-        total_amount=Decimal("500.00"),
-        items=[]
+        total_amount=Decimal("500.00")
     )
     minimal_invoice.id = "invoice-min"
+    minimal_invoice.subtotal = Decimal("500.00")
+    minimal_invoice.tax_rate = Decimal("0.00")
+    minimal_invoice.discount_amount = Decimal("0.00")
+    minimal_invoice.items = []
     
     pdf_bytes = PDFService.generate_invoice_pdf(
         invoice=minimal_invoice,
@@ -294,10 +308,9 @@ def test_invoice_template_contains_required_elements():
     assert "user.company_name" in template
     assert "user.email" in template
     
-    # Check for styling
-    assert "<style>" in template
-    assert "</style>" in template
-    assert "font-family" in template
+    # Check for styling (a separate stylesheet, parsed once)
+    assert "<style>" not in template
+    assert "font-family" in PDFService.INVOICE_CSS
     
     # Check for structure
     assert "<table>" in template
@@ -331,10 +344,61 @@ def test_invoice_template_loops_items():
 
 def test_invoice_template_status_badges():
     """Test that template includes status badge styling"""
-    template = PDFService.INVOICE_TEMPLATE
+    css = PDFService.INVOICE_CSS
+    
+    assert "status-pending" in css
+    assert "status-paid" in css
+    assert "status-overdue" in css
+    assert "status-cancelled" in css
+    assert "status-{{ invoice.status }}" in PDFService.INVOICE_TEMPLATE
+
+
+def test_compiled_template_renders_invoice(sample_invoice, sample_user):
+    """Test the compiled template renders the invoice, dated by its last update"""
+    sample_invoice.updated_at = datetime(2024, 1, 20, 9, 30)
+    html = get_invoice_template().render(
+        invoice=SimpleNamespace(**invoice_snapshot(sample_invoice, sample_user)["invoice"]),
+        user=sample_user
+    )
     
-    assert "status-pending" in template
-    assert "status-paid" in template
-    assert "status-overdue" in template
-    assert "status-cancelled" in template
+    assert "INV-2024-001" in html
+    assert 'class="status-badge status-pending"' in html
+    assert "+33 1 23 45 67 89" in html
+    assert "20/01/2024 à 09:30" in html
+    assert get_invoice_template() is get_invoice_template()
 
+
+def test_unchanged_invoice_is_served_from_cache(sample_invoice, sample_user):
+    """Test a second download of an unchanged invoice does not render again"""
+    first = PDFService.generate_invoice_pdf(invoice=sample_invoice, user=sample_user)
+    
+    with patch("app.services.pdf_service.HTML") as html:
+        second = PDFService.generate_invoice_pdf(invoice=sample_invoice, user=sample_user)
+        assert not html.called
+    assert second == first
+    
+    # An edit changes the cache key
+    sample_invoice.status = "paid"
+    with patch("app.services.pdf_service.HTML") as html:
+        html.return_value.write_pdf.return_value = b"%PDF-paid"
+        assert PDFService.generate_invoice_pdf(invoice=sample_invoice, user=sample_user) == b"%PDF-paid"
+
+
+@pytest.mark.asyncio
+async def test_get_invoice_pdf_renders_misses_in_pool(sample_invoice, sample_user):
+    """Test the async path renders in the process pool and caches the result"""
+    with patch("app.services.pdf_service.pdf_render_pool.render", new=AsyncMock(return_value=b"%PDF-pool")) as render:
+        assert await PDFService.get_invoice_pdf(sample_invoice, sample_user) == b"%PDF-pool"
+        assert await PDFService.get_invoice_pdf(sample_invoice, sample_user) == b"%PDF-pool"
+    
+    assert render.await_count == 1
+    snapshot = render.await_args.args[0]
+    assert snapshot["invoice"]["invoice_number"] == "INV-2024-001"
+    
+    # A full pool is reported to the caller (503), not rendered inline
+    sample_invoice.status = "paid"
+    with patch("app.services.pdf_service.pdf_render_pool.render", new=AsyncMock(side_effect=PDFPoolBusy("full"))), \
+            patch("app.services.pdf_service.HTML") as html:
+        with pytest.raises(PDFPoolBusy):
+            await PDFService.get_invoice_pdf(sample_invoice, sample_user)
+        assert not html.called
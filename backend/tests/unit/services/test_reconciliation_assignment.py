@@ -0,0 +1,118 @@
+"""Tests for the reconciliation assignment solver"""
+import pytest
+import random
+import time
+from decimal import Decimal
+from functools import lru_cache
+
+from app.services.reconciliation_assignment import SCORE_SCALE, solve_assignment
+
+
+def brute_force_best(candidates):
+    """Best total weight by exhaustive search (small instances only)"""
+    rows = sorted({row for row, _, _ in candidates})
+    cols = sorted({col for _, col, _ in candidates})
+    col_bit = {col: 1 << i for i, col in enumerate(cols)}
+    edges = {row: [] for row in rows}
+    for row, col, score in candidates:
+        edges[row].append((col_bit[col], round(score * SCORE_SCALE)))
+
+    @lru_cache(maxsize=None)
+    def best(k, used):
+        if k == len(rows):
+            return 0
+        value = best(k + 1, used)
+        for bit, weight in edges[rows[k]]:
+            if not used & bit:
+                value = max(value, weight + best(k + 1, used | bit))
+        return value
+
+    return best(0, 0)
+
+
+def total_weight(candidates, pairs):
+    weights = {(row, col): round(score * SCORE_SCALE) for row, col, score in candidates}
+    return sum(weights[pair] for pair in pairs)
+
+
+def assert_one_to_one(pairs):
+    assert len({row for row, _ in pairs}) == len(pairs)
+    assert len({col for _, col in pairs}) == len(pairs)
+
+
+def test_prefers_total_score_over_greedy():
+    """Test a row with a single candidate is not starved by a greedy best pick"""
+    candidates = [
+        ("tx-1", "inv-1", Decimal("1.0")),
+        ("tx-1", "inv-2", Decimal("0.95")),
+        ("tx-2", "inv-1", Decimal("0.96")),
+    ]
+
+    pairs = solve_assignment(candidates)
+
+    assert sorted(pairs) == [("tx-1", "inv-2"), ("tx-2", "inv-1")]
+
+
+def test_rows_and_columns_may_stay_unmatched():
+    """Test unbalanced components and non-positive scores"""
+    candidates = [
+        ("tx-1", "inv-1", Decimal("1.0")),
+        ("tx-2", "inv-1", Decimal("0.85")),
+        ("tx-3", "inv-1", Decimal("0.5")),
+        ("tx-4", "inv-2", Decimal("0")),
+    ]
+
+    assert solve_assignment(candidates) == [("tx-1", "inv-1")]
+    assert solve_assignment([]) == []
+
+
+def test_matches_brute_force_on_random_instances():
+    """Test optimality against exhaustive search"""
+    rng = random.Random(42)
+    for _ in range(200):
+        n_rows, n_cols = rng.randint(1, 6), rng.randint(1, 6)
+        candidates = [
+            (f"tx-{r}", f"inv-{c}", rng.choice([1.0, 0.85, 0.85, 0.5, round(rng.random(), 2)]))
+            for r in range(n_rows)
+            for c in range(n_cols)
+            if rng.random() < 0.5
+        ]
+
+        pairs = solve_assignment(candidates)
+
+        assert_one_to_one(pairs)
+        assert total_weight(candidates, pairs) == brute_force_best(candidates)
+
+
+@pytest.mark.slow
+def test_benchmark_10k_sparse_candidates():
+    """Test 10k transactions × 10k invoices stay sub-second"""
+    rng = random.Random(0)
+    size = 10000
+
+    # Candidate structure produced by the amount buckets: transactions compete
+    # for the invoices sharing their amount
+    amounts = [rng.randint(1, 3000) for _ in range(size)]
+    buckets = {}
+    for invoice, amount in enumerate(amounts):
+        buckets.setdefault(amount, []).append(invoice)
+    clustered = [
+        (tx, invoice, rng.choice([1.0, 0.85, 0.85]))
+        for tx in range(size)
+        for invoice in buckets[rng.choice(amounts)]
+    ]
+
+    # Unstructured sparse graph: two random candidates per transaction
+    scattered = [
+        (tx, invoice, rng.choice([1.0, 0.85, round(rng.uniform(0.5, 0.95), 2)]))
+        for tx in range(size)
+        for invoice in rng.sample(range(size), 2)
+    ]
+
+    for candidates in (clustered, scattered):
+        started = time.perf_counter()
+        pairs = solve_assignment(candidates)
+        elapsed = time.perf_counter() - started
+
+        assert_one_to_one(pairs)
+        assert elapsed < 1.0
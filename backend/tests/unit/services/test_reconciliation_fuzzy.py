@@ -0,0 +1,54 @@
+"""Tests for the local fuzzy reconciliation matcher"""
+import pytest
+from decimal import Decimal
+from uuid import uuid4
+
+from app.services.reconciliation_index import InvoiceIndexRegistry, compact
+from app.services.reconciliation_fuzzy import (
+    containment,
+    fuzzy_match,
+    score_candidate,
+    trigrams,
+)
+from tests.unit.services.factories import make_invoice, make_transaction
+
+
+@pytest.fixture
+def index():
+    user_id = uuid4()
+    return InvoiceIndexRegistry.build_from_invoices(user_id, [
+        make_invoice(user_id, "F-2026-017", "Boulangerie Lemoine", "480.00"),
+        make_invoice(user_id, "F-2026-018", "Garage Petitjean", "475.00"),
+        make_invoice(user_id, "F-2026-019", "Cabinet Rousseau", "2000.00"),
+    ])
+
+
+def test_containment_tolerates_typos():
+    """Test trigram containment of a client name in a longer description"""
+    description = trigrams(compact("PRLV SEPA BOULANGRIE LEMOINE REF 8841"))
+    assert containment(compact("Boulangerie Lemoine"), description) > 0.7
+    assert containment(compact("Garage Petitjean"), description) < 0.2
+    assert containment("", description) == 0.0
+
+
+def test_score_candidate_combines_text_amount_and_date(index):
+    """Test bank fees and typos still score high, unrelated invoices low"""
+    transaction = make_transaction("VIR BOULANGRIE LEMOINE", "478.50")
+    by_client = {c.client_name: c for c in index.candidates()}
+
+    good = score_candidate(transaction, by_client["Boulangerie Lemoine"])
+    other = score_candidate(transaction, by_client["Garage Petitjean"])
+
+    assert good.score >= Decimal("0.75")
+    assert other.score < Decimal("0.6")
+    assert "client" in good.reasoning
+
+
+def test_fuzzy_match_only_within_amount_tolerance(index):
+    """Test candidates outside the amount tolerance are never scored"""
+    matches = fuzzy_match(make_transaction("VIR CABINET ROUSSEAU", "478.50"), index)
+    assert all(m.candidate.client_name != "Cabinet Rousseau" for m in matches)
+
+    matches = fuzzy_match(make_transaction("VIR GARAGE PETITJEAN", "476.00"), index)
+    assert matches[0].candidate.invoice_number == "F-2026-018"
+    assert matches == sorted(matches, key=lambda m: m.score, reverse=True)
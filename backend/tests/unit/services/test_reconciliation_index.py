@@ -0,0 +1,181 @@
+"""Tests for the reconciliation invoice candidate index"""
+import pytest
+from decimal import Decimal
+from uuid import uuid4
+
+from app.services.reconciliation_index import (
+    InvoiceCandidate,
+    InvoiceIndexRegistry,
+    compact,
+    to_cents,
+    tokenize,
+)
+from tests.unit.services.factories import make_invoice
+
+
+@pytest.fixture
+def user_id():
+    return uuid4()
+
+
+@pytest.fixture
+def invoices(user_id):
+    return [
+        make_invoice(user_id, "INV-2026-001", "ACME Corp", "1200.00"),
+        make_invoice(user_id, "INV-2026-002", "Société Générale", "1200.00"),
+        make_invoice(user_id, "INV-2026-003", "Dupont SARL", "450.50", status="overdue"),
+        make_invoice(user_id, "INV-2026-004", "Martin & Fils", "3000.00"),
+        make_invoice(user_id, "INV-2026-005", "Paid Client", "99.00", status="paid"),
+        make_invoice(user_id, "INV-2026-006", "Done Client", "75.00", is_reconciled=True),
+    ]
+
+
+@pytest.fixture
+def index(user_id, invoices):
+    return InvoiceIndexRegistry.build_from_invoices(user_id, invoices)
+
+
+def test_normalization_helpers():
+    """Test cents conversion and text normalization"""
+    assert to_cents(Decimal("1200.00")) == 120000
+    assert to_cents(12.345) == 1235
+    assert to_cents("-85.5") == -8550
+    assert tokenize("VIR Société Générale / INV-2026-001") == [
+        "vir", "societe", "generale", "inv", "2026", "001"
+    ]
+    assert compact("Inv 2026/001") == "inv2026001"
+
+
+def test_build_skips_closed_invoices(index):
+    """Test only open (pending/overdue, unreconciled) invoices are indexed"""
+    assert len(index) == 4
+    numbers = {c.invoice_number for c in index.candidates()}
+    assert "INV-2026-005" not in numbers
+    assert "INV-2026-006" not in numbers
+
+
+def test_find_exact_returns_whole_bucket(index):
+    """Test exact amount lookup returns every invoice with that total"""
+    matches = index.find_exact(to_cents("1200.00"))
+    assert {c.invoice_number for c in matches} == {"INV-2026-001", "INV-2026-002"}
+    assert index.find_exact(to_cents("1199.99")) == []
+
+
+def test_find_within_tolerance(index):
+    """Test tolerance lookup over sorted amount buckets"""
+    matches = index.find_within_tolerance(to_cents("1150.00"), Decimal("0.05"))
+    assert {c.invoice_number for c in matches} == {"INV-2026-001", "INV-2026-002"}
+
+    matches = index.find_within_tolerance(to_cents("1150.00"), Decimal("0.01"))
+    assert matches == []
+
+
+def test_nearest_orders_by_distance(index):
+    """Test nearest candidates are returned closest amount first"""
+    nearest = index.nearest(to_cents("500.00"), limit=3)
+    assert nearest[0].invoice_number == "INV-2026-003"
+    assert len(nearest) == 3
+    assert {c.amount_cents for c in nearest[1:]} == {120000}
+
+
+def test_match_tokens_uses_client_and_number(index):
+    """Test token lookup on client names, skipping tokens shared by most invoices"""
+    hits = index.match_tokens("VIR SEPA SOCIETE GENERALE")
+    candidate = next(c for c in index.candidates() if c.invoice_number == "INV-2026-002")
+    assert hits == {candidate.id: 2}
+
+    # "inv" and "2026" appear on every invoice and carry no signal
+    assert index.match_tokens("INV 2026") == {}
+
+
+def test_has_reference_ignores_separators(index):
+    """Test invoice number detection in a bank description"""
+    candidate = next(c for c in index.candidates() if c.invoice_number == "INV-2026-001")
+    assert index.has_reference(candidate, "VIR ACME INV2026001 JANVIER")
+    assert index.has_reference(candidate, "vir acme inv 2026/001")
+    assert not index.has_reference(candidate, "VIR ACME INV-2026-002")
+
+
+def test_incremental_updates(user_id, index):
+    """Test add, replace and discard keep buckets and tokens consistent"""
+    new_invoice = make_invoice(user_id, "INV-2026-010", "Nouveau Client", "1200.00")
+    index.add(InvoiceCandidate.from_invoice(new_invoice))
+    assert len(index.find_exact(120000)) == 3
+
+    # Amount change moves the invoice to another bucket
+    new_invoice.total_amount = Decimal("80.00")
+    index.add(InvoiceCandidate.from_invoice(new_invoice))
+    assert len(index.find_exact(120000)) == 2
+    assert [c.id for c in index.find_exact(8000)] == [new_invoice.id]
+
+    index.discard(new_invoice.id)
+    assert index.find_exact(8000) == []
+    assert index.find_in_range(0, 10000) == []
+    assert index.match_tokens("NOUVEAU") == {}
+    assert new_invoice.id not in index
+
+
+def test_registry_hooks(user_id, invoices, index):
+    """Test registry upsert/discard hooks only touch built indexes"""
+    registry = InvoiceIndexRegistry(ttl_seconds=300)
+    registry._indexes[user_id] = index
+
+    invoice = invoices[0]
+    invoice.status = "paid"
+    registry.upsert_invoice(invoice)
+    assert invoice.id not in index
+
+    invoice.status = "pending"
+    registry.upsert_invoice(invoice)
+    assert invoice.id in index
+
+    registry.discard_invoice(user_id, invoice.id)
+    assert invoice.id not in index
+
+    # Unknown user: no index is created eagerly
+    other = make_invoice(uuid4(), "X-1", "Other", "10.00")
+    registry.upsert_invoice(other)
+    assert other.user_id not in registry._indexes
+
+    registry.invalidate(user_id)
+    assert user_id not in registry._indexes
+
+
+def test_client_lookup(user_id, index):
+    """Test client postings survive token pruning and follow discards"""
+    index.add(InvoiceCandidate.from_invoice(
+        make_invoice(user_id, "INV-2026-011", "ACME Corp", "10.00")
+    ))
+    acme = index.find_by_client("acme corp")
+    assert {c.invoice_number for c in acme} == {"INV-2026-001", "INV-2026-011"}
+    assert index.match_clients("VIR SEPA ACME") == ["acmecorp"]
+    assert index.match_clients("VIR SEPA") == []
+
+    for candidate in acme:
+        index.discard(candidate.id)
+    assert index.find_by_client("ACME Corp") == []
+    assert index.match_clients("VIR SEPA ACME") == []
+
+
+@pytest.mark.asyncio
+async def test_registry_hooks_wait_for_commit(db_session, test_user):
+    """Test on-commit hooks apply after commit and rollbacks drop the index"""
+    user_id = test_user.id
+    registry = InvoiceIndexRegistry(ttl_seconds=300)
+    index = await registry.build(db_session, user_id)
+
+    invoice = make_invoice(user_id, "INV-2026-020", "ACME Corp", "500.00")
+    db_session.add(invoice)
+    registry.upsert_invoice_on_commit(db_session, invoice)
+    assert invoice.id not in index
+
+    await db_session.commit()
+    assert invoice.id in index
+
+    invoice.status = "paid"
+    await db_session.flush()
+    registry.discard_invoice_on_commit(db_session, user_id, invoice.id)
+    invoice_id = invoice.id
+    await db_session.rollback()
+    assert invoice_id in index
+    assert user_id not in registry._indexes
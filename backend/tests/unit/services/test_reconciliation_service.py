@@ -0,0 +1,278 @@
+"""Tests for ReconciliationService batch and group reconciliation"""
+import pytest
+from datetime import date, datetime
+from decimal import Decimal
+from sqlalchemy import select, update
+
+from app.config import settings
+from app.services.reconciliation_index import invoice_index_registry
+from app.services.reconciliation_split import match_installments
+from app.services.reconciliation_service import ReconciliationService, matching_counters
+from app.models.invoice import Invoice
+from app.models.reconciliation import Reconciliation
+from app.schemas.reconciliation import ReconciliationGroupCreate
+from tests.unit.services.factories import create_invoice, create_transaction
+
+
+@pytest.mark.asyncio
+async def test_reconcile_batch_matches_exact_references(db_session, test_user, bank_account):
+    """Test batch reconciliation writes rows and flags for exact matches"""
+    inv_1 = await create_invoice(db_session, test_user, "INV-2026-001", "100.00")
+    inv_2 = await create_invoice(db_session, test_user, "INV-2026-002", "250.00")
+    tx_1 = await create_transaction(db_session, bank_account, "b1", "VIR ACME INV-2026-001", "100.00")
+    tx_2 = await create_transaction(db_session, bank_account, "b2", "VIR ACME INV 2026 002", "250.00")
+    tx_3 = await create_transaction(db_session, bank_account, "b3", "VIR INCONNU", "42.00")
+    await db_session.commit()
+
+    stats = await ReconciliationService.reconcile_batch(db_session, test_user.id)
+    await db_session.commit()
+
+    assert stats["transactions"] == 3
+    assert stats["reconciled"] == 2
+    assert stats["conflicts"] == 0
+
+    rows = (await db_session.execute(select(Reconciliation))).scalars().all()
+    assert {(r.transaction_id, r.invoice_id) for r in rows} == {
+        (tx_1.id, inv_1.id),
+        (tx_2.id, inv_2.id),
+    }
+
+    for row in (tx_1, tx_3, inv_1):
+        await db_session.refresh(row)
+    assert tx_1.is_reconciled is True
+    assert tx_3.is_reconciled is False
+    assert inv_1.is_reconciled is True
+    assert inv_1.status == "paid"
+    assert inv_1.payment_date == date(2026, 2, 3)
+
+
+@pytest.mark.asyncio
+async def test_reconcile_batch_never_claims_invoice_twice(db_session, test_user, bank_account):
+    """Test two transactions referencing the same invoice produce one reconciliation"""
+    await create_invoice(db_session, test_user, "INV-2026-001", "100.00")
+    await create_transaction(db_session, bank_account, "b1", "VIR INV-2026-001", "100.00")
+    await create_transaction(db_session, bank_account, "b2", "VIR INV-2026-001 BIS", "100.00")
+    await db_session.commit()
+
+    stats = await ReconciliationService.reconcile_batch(db_session, test_user.id)
+    await db_session.commit()
+
+    assert stats["reconciled"] == 1
+    assert stats["conflicts"] == 1
+    rows = (await db_session.execute(select(Reconciliation))).scalars().all()
+    assert len(rows) == 1
+
+
+@pytest.mark.asyncio
+async def test_reconcile_batch_restricted_to_transaction_ids(db_session, test_user, bank_account):
+    """Test batch reconciliation only considers the given transactions"""
+    await create_invoice(db_session, test_user, "INV-2026-001", "100.00")
+    tx_1 = await create_transaction(db_session, bank_account, "b1", "VIR INV-2026-001", "100.00")
+    tx_2 = await create_transaction(db_session, bank_account, "b2", "VIR AUTRE", "30.00")
+    await db_session.commit()
+
+    stats = await ReconciliationService.reconcile_batch(
+        db_session,
+        test_user.id,
+        transaction_ids=[tx_2.id]
+    )
+
+    assert stats["transactions"] == 1
+    assert stats["reconciled"] == 0
+    await db_session.refresh(tx_1)
+    assert tx_1.is_reconciled is False
+
+
+@pytest.mark.asyncio
+async def test_reconcile_batch_skips_rows_reconciled_meanwhile(db_session, test_user, bank_account, monkeypatch):
+    """Test the bulk writes never overwrite an invoice reconciled after the batch read it"""
+    invoice = await create_invoice(db_session, test_user, "INV-2026-001", "100.00")
+    tx = await create_transaction(db_session, bank_account, "b1", "VIR INV-2026-001", "100.00")
+    await db_session.commit()
+    build = invoice_index_registry.build
+
+    async def build_then_reconcile_manually(db, user_id):
+        index = await build(db, user_id)
+        # A manual reconciliation lands between the read and the write
+        await db.execute(update(Invoice).where(Invoice.id == invoice.id).values(is_reconciled=True))
+        return index
+
+    monkeypatch.setattr(invoice_index_registry, "build", build_then_reconcile_manually)
+
+    stats = await ReconciliationService.reconcile_batch(db_session, test_user.id)
+    await db_session.commit()
+
+    assert stats["reconciled"] == 0
+    assert stats["conflicts"] == 1
+    assert (await db_session.execute(select(Reconciliation))).scalars().all() == []
+    await db_session.refresh(tx)
+    assert tx.is_reconciled is False
+    assert tx.reconciled_invoice_id is None
+
+
+@pytest.mark.asyncio
+async def test_reconcile_batch_pages_through_transactions(db_session, test_user, bank_account):
+    """Test a bounded batch returns a cursor and the next page continues after it"""
+    await create_invoice(db_session, test_user, "INV-2026-001", "100.00")
+    await create_invoice(db_session, test_user, "INV-2026-002", "250.00")
+    await create_transaction(db_session, bank_account, "b1", "VIR INV-2026-001", "100.00")
+    await create_transaction(db_session, bank_account, "b2", "VIR INV-2026-002", "250.00")
+    await db_session.commit()
+
+    first = await ReconciliationService.reconcile_batch(db_session, test_user.id, limit=1)
+    second = await ReconciliationService.reconcile_batch(
+        db_session, test_user.id, limit=1, cursor=first["next_cursor"]
+    )
+
+    assert (first["transactions"], first["reconciled"]) == (1, 1)
+    assert first["next_cursor"] is not None
+    assert (second["transactions"], second["reconciled"]) == (1, 1)
+    assert second["next_cursor"] is None
+    assert first["pairs"] != second["pairs"]
+
+
+@pytest.mark.asyncio
+async def test_create_group_reconciliation_split_payment(db_session, test_user, bank_account):
+    """Test one transfer paying two invoices writes one grouped row per invoice"""
+    inv_1 = await create_invoice(db_session, test_user, "INV-2026-001", "100.00")
+    inv_2 = await create_invoice(db_session, test_user, "INV-2026-002", "250.00")
+    tx = await create_transaction(db_session, bank_account, "b1", "VIR ACME CORP", "350.00")
+    await db_session.commit()
+
+    suggestions = await ReconciliationService.suggest_reconciliations(
+        db_session,
+        test_user.id,
+        tx.id
+    )
+    assert len(suggestions) == 1
+    assert suggestions[0].match_method == "split"
+    assert set(suggestions[0].group_invoice_ids) == {inv_1.id, inv_2.id}
+
+    result = await ReconciliationService.create_group_reconciliation(
+        db_session,
+        test_user.id,
+        ReconciliationGroupCreate(
+            transaction_ids=[tx.id],
+            invoice_ids=suggestions[0].group_invoice_ids,
+            match_score=suggestions[0].match_score,
+            match_method="split",
+        )
+    )
+    await db_session.commit()
+
+    assert result["reconciliations"] == 2
+    rows = (await db_session.execute(select(Reconciliation))).scalars().all()
+    assert {r.group_id for r in rows} == {result["group_id"]}
+    assert {(r.invoice_id, r.allocated_amount) for r in rows} == {
+        (inv_1.id, Decimal("100.00")),
+        (inv_2.id, Decimal("250.00")),
+    }
+
+    for row in (tx, inv_1, inv_2):
+        await db_session.refresh(row)
+    assert tx.is_reconciled is True
+    assert inv_1.status == "paid" and inv_2.status == "paid"
+
+
+@pytest.mark.asyncio
+async def test_installment_lookup_is_bounded_to_the_window(
+    db_session, test_user, bank_account, monkeypatch
+):
+    """Test installments are looked up on both sides of the transaction, within the window"""
+    monkeypatch.setattr(settings, "RECONCILIATION_SPLIT_MAX_TRANSACTIONS", 4)
+    inv = await create_invoice(db_session, test_user, "INV-2026-001", "300.00")
+    tx = await create_transaction(db_session, bank_account, "b1", "VIR ACME CORP 2/3", "100.00")
+    first = await create_transaction(db_session, bank_account, "b2", "VIR ACME CORP 1/3", "100.00")
+    last = await create_transaction(db_session, bank_account, "b3", "VIR ACME CORP 3/3", "100.00")
+    old = await create_transaction(db_session, bank_account, "b4", "VIR ACME CORP", "100.00")
+    older = await create_transaction(db_session, bank_account, "b5", "VIR ACME CORP", "100.00")
+    late = await create_transaction(db_session, bank_account, "b6", "VIR ACME CORP", "100.00")
+    first.date = datetime(2026, 1, 20)
+    last.date = datetime(2026, 2, 20)
+    old.date = datetime(2026, 1, 10)
+    older.date = datetime(2026, 1, 5)
+    late.date = datetime(2027, 1, 1)
+    await db_session.commit()
+
+    loaded = []
+
+    def spy(transaction, index, others):
+        loaded.extend(others)
+        return match_installments(transaction, index, others)
+
+    monkeypatch.setattr("app.services.reconciliation_service.match_installments", spy)
+    suggestions = await ReconciliationService.suggest_reconciliations(db_session, test_user.id, tx.id)
+
+    # Two per side: the closest earlier ones, and nothing past the window
+    assert {t.id for t in loaded} == {tx.id, first.id, old.id, last.id}
+    assert suggestions[0].match_method == "partial"
+    assert suggestions[0].group_invoice_ids == [inv.id]
+
+
+@pytest.mark.asyncio
+async def test_create_group_reconciliation_rejects_amount_mismatch(db_session, test_user, bank_account):
+    """Test a group whose amounts do not add up is refused"""
+    inv = await create_invoice(db_session, test_user, "INV-2026-001", "100.00")
+    tx_1 = await create_transaction(db_session, bank_account, "b1", "VIR ACME 1/2", "50.00")
+    tx_2 = await create_transaction(db_session, bank_account, "b2", "VIR ACME 2/2", "40.00")
+    await db_session.commit()
+
+    with pytest.raises(ValueError, match="do not match"):
+        await ReconciliationService.create_group_reconciliation(
+            db_session,
+            test_user.id,
+            ReconciliationGroupCreate(
+                transaction_ids=[tx_1.id, tx_2.id],
+                invoice_ids=[inv.id],
+                match_score=Decimal("0.9"),
+                match_method="partial",
+            )
+        )
+
+
+class RecordingAIClient:
+    """Stand-in for ClaudeClient that records calls and never matches"""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def find_matching_invoice(self, transaction, invoices):
+        self.calls += 1
+        return None
+
+
+@pytest.mark.asyncio
+async def test_suggestions_escalate_to_ai_only_below_band(db_session, test_user, bank_account):
+    """Test confident fuzzy matches skip the AI and stage counters record it"""
+    matching_counters.reset()
+    inv = await create_invoice(db_session, test_user, "INV-2026-001", "480.00")
+    inv.client_name = "Boulangerie Lemoine"
+    tx_fuzzy = await create_transaction(db_session, bank_account, "b1", "VIR BOULANGRIE LEMOINE", "478.50")
+    tx_unknown = await create_transaction(db_session, bank_account, "b2", "CB STATION 4411", "61.20")
+    await db_session.commit()
+    ai_client = RecordingAIClient()
+
+    suggestions = await ReconciliationService.suggest_reconciliations(
+        db_session,
+        test_user.id,
+        tx_fuzzy.id,
+        ai_client
+    )
+    assert suggestions[0].invoice_id == inv.id
+    assert suggestions[0].match_method == "fuzzy"
+    assert ai_client.calls == 0
+
+    suggestions = await ReconciliationService.suggest_reconciliations(
+        db_session,
+        test_user.id,
+        tx_unknown.id,
+        ai_client
+    )
+    assert suggestions == []
+    assert ai_client.calls == 1
+
+    stats = ReconciliationService.get_matching_stats()
+    assert stats["requests"] == 2
+    assert stats["hits"]["fuzzy"] == 1
+    assert stats["hits"]["none"] == 1
+    assert stats["ai_call_rate"] == 0.5
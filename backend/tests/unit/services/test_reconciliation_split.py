@@ -0,0 +1,122 @@
+"""Tests for split and partial payment matching"""
+import pytest
+import random
+from datetime import date
+from itertools import combinations
+from uuid import uuid4
+
+from app.services.reconciliation_index import InvoiceIndexRegistry
+from app.services.reconciliation_split import (
+    AMBIGUOUS_GROUP_SCORE,
+    UNIQUE_GROUP_SCORE,
+    find_subset,
+    match_installments,
+    match_invoice_group,
+)
+from tests.unit.services.factories import make_invoice, make_transaction
+
+
+@pytest.fixture
+def index():
+    user_id = uuid4()
+    return InvoiceIndexRegistry.build_from_invoices(user_id, [
+        make_invoice(user_id, "F-101", "Dupont SARL", "120.00"),
+        make_invoice(user_id, "F-102", "Dupont SARL", "80.50"),
+        make_invoice(user_id, "F-103", "Dupont SARL", "300.00"),
+        make_invoice(user_id, "F-104", "Dupont SARL", "45.00", due=date(2025, 6, 1)),
+        make_invoice(user_id, "F-201", "Martin & Fils", "200.50"),
+        make_invoice(user_id, "F-202", "Martin & Fils", "1000.00"),
+        make_invoice(user_id, "F-301", "Bernard", "50.00"),
+        make_invoice(user_id, "F-302", "Petit", "60.00"),
+    ])
+
+
+def test_find_subset_exact_and_unique():
+    """Test subset-sum finds the grouping and flags ambiguity"""
+    subset, ambiguous = find_subset(50050, [("a", 12000), ("b", 8050), ("c", 30000)], max_size=5)
+    assert sorted(subset) == ["a", "b", "c"]
+    assert ambiguous is False
+
+    subset, ambiguous = find_subset(300, [("a", 100), ("b", 200), ("c", 300)], max_size=5)
+    assert subset is not None
+    assert ambiguous is True
+
+    assert find_subset(999, [("a", 100), ("b", 200)], max_size=5) == (None, False)
+
+
+def test_find_subset_respects_max_size():
+    """Test groupings larger than max_size are not proposed"""
+    items = [(i, 100) for i in range(6)]
+    assert find_subset(600, items, max_size=5) == (None, False)
+    subset, _ = find_subset(500, items, max_size=5)
+    assert len(subset) == 5
+
+
+def test_find_subset_matches_brute_force():
+    """Test found subsets and ambiguity flags against every combination"""
+    rng = random.Random(42)
+    for _ in range(2000):
+        items = [(k, rng.randint(1, 9)) for k in range(rng.randint(1, 7))]
+        target = rng.randint(1, 30)
+        solutions = [
+            combo
+            for size in range(1, len(items) + 1)
+            for combo in combinations(items, size)
+            if sum(cents for _, cents in combo) == target
+        ]
+
+        subset, ambiguous = find_subset(target, items, max_size=len(items))
+
+        if not solutions:
+            assert (subset, ambiguous) == (None, False)
+            continue
+        cents = dict(items)
+        assert sum(cents[key] for key in subset) == target
+        assert len(set(subset)) == len(subset)
+        assert ambiguous is (len(solutions) > 1), (target, items)
+
+    subset, ambiguous = find_subset(21, [(0, 5), (1, 1), (2, 5), (3, 7), (4, 7), (5, 7)], 6)
+    assert (sorted(subset), ambiguous) == ([3, 4, 5], False)
+
+
+def test_match_invoice_group_one_transfer_for_many_invoices(index):
+    """Test one transfer paying several invoices of the named client"""
+    transaction = make_transaction("VIR DUPONT SARL FACTURES JANVIER", "200.50")
+
+    match = match_invoice_group(transaction, index)
+
+    assert match.method == "split"
+    assert match.score == UNIQUE_GROUP_SCORE
+    assert {c.invoice_number for c in match.invoices} == {"F-101", "F-102"}
+    assert match.transaction_ids == (transaction.id,)
+
+
+def test_match_invoice_group_prunes_by_client_and_date(index):
+    """Test other clients and invoices outside the date window are ignored"""
+    # 50 + 60 only adds up across two different clients
+    assert match_invoice_group(make_transaction("VIR BERNARD", "110.00"), index) is None
+
+    # 120 + 45 needs F-104, due months before the transfer
+    assert match_invoice_group(make_transaction("VIR DUPONT", "165.00"), index) is None
+
+    # No client named: no grouping attempted
+    assert match_invoice_group(make_transaction("VIR SEPA", "200.50"), index) is None
+
+
+def test_match_installments_completes_invoice(index):
+    """Test installments of one invoice found among other transactions"""
+    first = make_transaction("VIR MARTIN FILS ACOMPTE", "400.00", day=date(2026, 1, 20))
+    others = [
+        first,
+        make_transaction("VIR MARTIN FILS SOLDE", "350.00", day=date(2026, 2, 10)),
+        make_transaction("VIR MARTIN FILS", "250.00", day=date(2026, 2, 25)),
+        make_transaction("VIR AUTRE CLIENT", "600.00", day=date(2026, 2, 1)),
+    ]
+
+    match = match_installments(first, index, others)
+
+    assert match.method == "partial"
+    assert match.score in (UNIQUE_GROUP_SCORE, AMBIGUOUS_GROUP_SCORE)
+    assert [c.invoice_number for c in match.invoices] == ["F-202"]
+    assert set(match.transaction_ids) == {others[0].id, others[1].id, others[2].id}
+    assert match.transaction_ids[0] == first.id
@@ -0,0 +1,207 @@
+"""Tests for the overdue invoice reminder pipeline"""
+import asyncio
+import pytest
+from datetime import date, timedelta
+from decimal import Decimal
+
+from sqlalchemy import select
+
+from app.config import settings
+from app.models.invoice import Invoice
+from app.models.reminder import Reminder
+from app.services.reminder_service import ReminderService, reminder_type_for
+from app.services.reminder_template_service import compiled_templates
+
+
+class FakeClaude:
+    """Reminder template generation with latency, counting calls"""
+
+    def __init__(self, delay=0.02, fail=False):
+        self.delay = delay
+        self.fail = fail
+        self.calls = []
+
+    async def generate_reminder_template(self, reminder_type, language="fr"):
+        self.calls.append((reminder_type, language))
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("overloaded")
+        return {
+            "subject": f"Rappel {reminder_type} {{{{ invoice_number }}}}",
+            "body": "<p>{{ client_name }} : {{ total_amount }} {{ currency }}</p>",
+        }
+
+
+class FakeSendGrid:
+    """Batched email sending with latency, recording each batch"""
+
+    def __init__(self, delay=0.02, fail_for=()):
+        self.delay = delay
+        self.fail_for = set(fail_for)
+        self.batches = []
+        self.sent = []
+
+    async def send_batch(self, messages):
+        self.batches.append(messages)
+        await asyncio.sleep(self.delay)
+        message_ids = []
+        for message in messages:
+            invoice_number = message.custom_args["invoice_number"]
+            if invoice_number in self.fail_for:
+                message_ids.append(None)
+            else:
+                self.sent.append(invoice_number)
+                message_ids.append("msg-id")
+        return message_ids
+
+
+async def create_overdue_invoices(db_session, user, count, days_overdue=3, client_email="client@example.com"):
+    invoices = []
+    for i in range(count):
+        invoice = Invoice(
+            user_id=user.id,
+            invoice_number=f"INV-{days_overdue}-{i}",
+            client_name="Client",
+            client_email=client_email,
+            amount=Decimal("100"),
+            tax_amount=Decimal("0"),
+            total_amount=Decimal("100"),
+            currency="EUR",
+            issue_date=date.today() - timedelta(days=60),
+            due_date=date.today() - timedelta(days=days_overdue),
+            status="pending",
+            is_reconciled=False,
+        )
+        db_session.add(invoice)
+        invoices.append(invoice)
+    await db_session.commit()
+    return invoices
+
+
+@pytest.fixture(autouse=True)
+def clear_compiled_templates():
+    compiled_templates.clear()
+    yield
+    compiled_templates.clear()
+
+
+def test_reminder_type_by_days_overdue():
+    assert reminder_type_for(1) == "first"
+    assert reminder_type_for(8) == "second"
+    assert reminder_type_for(15) == "final"
+
+
+@pytest.mark.asyncio
+async def test_reminders_of_one_template_are_sent_in_batches(db_session, test_user, monkeypatch):
+    """Test emails are rendered from one template and sent as batched personalizations"""
+    monkeypatch.setattr(settings, "SENDGRID_MAX_PERSONALIZATIONS", 8)
+    user_id = test_user.id
+    await create_overdue_invoices(db_session, test_user, 20)
+    claude, sendgrid = FakeClaude(), FakeSendGrid()
+
+    stats = await ReminderService.process_overdue_invoices(db_session, user_id, claude, sendgrid)
+
+    assert stats["total"] == 20 and stats["sent"] == 20 and stats["failed"] == 0
+    # One template for the run, every email rendered from it
+    assert claude.calls == [("first", "fr")]
+    assert sorted(len(batch) for batch in sendgrid.batches) == [4, 8, 8]
+    # 3 batches sent concurrently, not 20 serial sends
+    assert stats["timings"]["send"] - stats["timings"]["render"] < 0.05
+    assert set(stats["timings"]) == {"load", "dedupe", "templates", "render", "send", "persist"}
+
+    # The batch shares one body, the invoice fields are substitutions
+    message = sendgrid.batches[0][0]
+    assert message.html_content == "<p>-client_name- : -total_amount- -currency-</p>"
+    assert message.substitutions == {
+        "-client_name-": "Client", "-total_amount-": "100.00", "-currency-": "EUR",
+    }
+    assert message.subject.startswith("Rappel first INV-")
+
+    reminders = (await db_session.execute(select(Reminder))).scalars().all()
+    assert len(reminders) == 20
+    assert {r.status for r in reminders} == {"sent"}
+    assert all(r.sent_at is not None and r.email_subject.startswith("Rappel first INV-") for r in reminders)
+    assert all(r.email_body == "<p>Client : 100.00 EUR</p>" for r in reminders)
+
+
+@pytest.mark.asyncio
+async def test_templates_using_values_in_logic_are_sent_rendered(db_session, test_user):
+    """Test a body that cannot use substitutions is sent fully rendered"""
+    class LogicClaude(FakeClaude):
+        async def generate_reminder_template(self, reminder_type, language="fr"):
+            return {
+                "subject": "Rappel {{ invoice_number }}",
+                "body": "<p>{{ client_name|upper }}{% if days_overdue > 30 %} (urgent){% endif %}</p>",
+            }
+
+    user_id = test_user.id
+    await create_overdue_invoices(db_session, test_user, 2)
+    sendgrid = FakeSendGrid(0)
+
+    stats = await ReminderService.process_overdue_invoices(db_session, user_id, LogicClaude(0), sendgrid)
+
+    assert stats["sent"] == 2
+    messages = [message for batch in sendgrid.batches for message in batch]
+    assert [message.html_content for message in messages] == ["<p>CLIENT</p>", "<p>CLIENT</p>"]
+    assert all(not message.substitutions for message in messages)
+
+
+@pytest.mark.asyncio
+async def test_templates_are_generated_once_per_tenant(db_session, test_user):
+    """Test later runs render the stored templates without calling Claude"""
+    user_id = test_user.id
+    await create_overdue_invoices(db_session, test_user, 2, days_overdue=3)
+    await create_overdue_invoices(db_session, test_user, 2, days_overdue=20)
+    claude = FakeClaude(0)
+    await ReminderService.process_overdue_invoices(db_session, user_id, claude, FakeSendGrid(0))
+    assert sorted(claude.calls) == [("final", "fr"), ("first", "fr")]
+
+    await create_overdue_invoices(db_session, test_user, 2, days_overdue=10)
+    await create_overdue_invoices(db_session, test_user, 1, days_overdue=4)
+    stats = await ReminderService.process_overdue_invoices(db_session, user_id, claude, FakeSendGrid(0))
+
+    assert stats["sent"] == 3
+    assert sorted(claude.calls) == [("final", "fr"), ("first", "fr"), ("second", "fr")]
+
+
+@pytest.mark.asyncio
+async def test_recent_reminders_are_skipped(db_session, test_user):
+    """Test a reminder of the same type sent recently is not sent again"""
+    user_id = test_user.id
+    await create_overdue_invoices(db_session, test_user, 3)
+    await ReminderService.process_overdue_invoices(db_session, user_id, FakeClaude(0), FakeSendGrid(0))
+
+    sendgrid = FakeSendGrid(0)
+    stats = await ReminderService.process_overdue_invoices(db_session, user_id, FakeClaude(0), sendgrid)
+
+    assert stats == {**stats, "total": 3, "sent": 0, "skipped": 3}
+    assert sendgrid.sent == []
+
+
+@pytest.mark.asyncio
+async def test_failures_do_not_stop_other_invoices(db_session, test_user):
+    """Test sending errors and missing emails fail only their invoice"""
+    user_id = test_user.id
+    await create_overdue_invoices(db_session, test_user, 4)
+    await create_overdue_invoices(db_session, test_user, 1, days_overdue=20, client_email=None)
+    sendgrid = FakeSendGrid(0, fail_for={"INV-3-1"})
+
+    stats = await ReminderService.process_overdue_invoices(db_session, user_id, FakeClaude(0), sendgrid)
+
+    assert (stats["total"], stats["sent"], stats["failed"]) == (5, 3, 2)
+    assert sorted(sendgrid.sent) == ["INV-3-0", "INV-3-2", "INV-3-3"]
+    reminders = (await db_session.execute(select(Reminder))).scalars().all()
+    assert len(reminders) == 3
+
+
+@pytest.mark.asyncio
+async def test_template_generation_failure_fails_the_tenant_invoices(db_session, test_user):
+    """Test invoices without a template are counted as failed, nothing is sent"""
+    user_id = test_user.id
+    await create_overdue_invoices(db_session, test_user, 2)
+    sendgrid = FakeSendGrid(0)
+
+    stats = await ReminderService.process_overdue_invoices(db_session, user_id, FakeClaude(0, fail=True), sendgrid)
+
+    assert (stats["sent"], stats["failed"]) == (0, 2)
+    assert sendgrid.sent == []
@@ -0,0 +1,155 @@
+"""Tests for cached reminder templates"""
+import pytest
+from datetime import date, timedelta
+from decimal import Decimal
+
+from app.models.invoice import Invoice
+from app.services.reminder_template_service import (
+    FALLBACK_TEMPLATES,
+    ReminderTemplateService,
+    compiled_templates,
+    template_counters,
+    template_variables,
+    validate_template,
+)
+
+
+class FakeClaude:
+    """Returns a fixed template, counting calls"""
+
+    def __init__(self, subject="Rappel {{ invoice_number }}", body="<p>{{ client_name }}</p>"):
+        self.subject = subject
+        self.body = body
+        self.calls = 0
+
+    async def generate_reminder_template(self, reminder_type, language="fr"):
+        self.calls += 1
+        return {"subject": self.subject, "body": self.body}
+
+
+@pytest.fixture(autouse=True)
+def clear_compiled_templates():
+    compiled_templates.clear()
+    template_counters.reset()
+    yield
+    compiled_templates.clear()
+
+
+def make_invoice(user_id, client_name="Client"):
+    return Invoice(
+        user_id=user_id,
+        invoice_number="INV-001",
+        client_name=client_name,
+        total_amount=Decimal("1200.5"),
+        currency="EUR",
+        due_date=date.today() - timedelta(days=5),
+    )
+
+
+def test_validate_template():
+    validate_template("Rappel {{ invoice_number }}", "<p>{{ total_amount }} {{ currency }}</p>")
+    with pytest.raises(ValueError, match="Unknown variables"):
+        validate_template("Rappel {{ invoice.user.hashed_password }}", "<p></p>")
+    with pytest.raises(ValueError, match="Invalid template"):
+        validate_template("Rappel {{ invoice_number", "<p></p>")
+    with pytest.raises(ValueError, match="empty"):
+        validate_template("Rappel", " ")
+
+
+@pytest.mark.asyncio
+async def test_template_is_generated_once_and_compiled_once(db_session, test_user):
+    """Test later lookups reuse the stored row and the compiled template"""
+    user_id = test_user.id
+    claude = FakeClaude()
+
+    first = await ReminderTemplateService.get_templates(db_session, user_id, "fr", ["first"], claude)
+    second = await ReminderTemplateService.get_templates(db_session, user_id, "fr", ["first"], claude)
+
+    assert claude.calls == 1
+    assert second["first"] is first["first"]
+    assert template_counters.get("compiled") == 1
+    assert template_counters.get("cache_hits") == 1
+
+    email = first["first"].render(template_variables(make_invoice(user_id)))
+    assert email == {"subject": "Rappel INV-001", "body": "<p>Client</p>"}
+
+
+@pytest.mark.asyncio
+async def test_tenant_edit_invalidates_compiled_template(db_session, test_user):
+    """Test an edit is rendered at once, and resetting brings an AI template back"""
+    user_id = test_user.id
+    claude = FakeClaude()
+    await ReminderTemplateService.get_templates(db_session, user_id, "fr", ["first"], claude)
+
+    saved = await ReminderTemplateService.save_template(
+        db_session, user_id, "fr", "first",
+        "Facture {{ invoice_number }} impayée", "<p>{{ total_amount }} {{ currency }}</p>"
+    )
+    assert (saved.source, saved.version) == ("custom", 2)
+
+    templates = await ReminderTemplateService.get_templates(db_session, user_id, "fr", ["first"], claude)
+    email = templates["first"].render(template_variables(make_invoice(user_id)))
+    assert email == {"subject": "Facture INV-001 impayée", "body": "<p>1200.50 EUR</p>"}
+    assert claude.calls == 1
+
+    assert await ReminderTemplateService.reset_template(db_session, user_id, "fr", "first")
+    templates = await ReminderTemplateService.get_templates(db_session, user_id, "fr", ["first"], claude)
+    assert templates["first"].render(template_variables(make_invoice(user_id)))["subject"] == "Rappel INV-001"
+    assert claude.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_edit_made_by_another_process_is_picked_up(db_session, test_user):
+    """Test the version check catches edits that did not go through this cache"""
+    user_id = test_user.id
+    templates = await ReminderTemplateService.get_templates(db_session, user_id, "fr", ["first"], FakeClaude())
+    row = (await ReminderTemplateService.list_templates(db_session, user_id))[0]
+    row.subject_template = "Dernier rappel {{ invoice_number }}"
+    row.version += 1
+    await db_session.flush()
+
+    refreshed = await ReminderTemplateService.get_templates(db_session, user_id, "fr", ["first"], FakeClaude())
+
+    assert refreshed["first"] is not templates["first"]
+    assert refreshed["first"].render(template_variables(make_invoice(user_id)))["subject"] == "Dernier rappel INV-001"
+
+
+@pytest.mark.asyncio
+async def test_unusable_ai_template_falls_back(db_session, test_user):
+    """Test an unusable AI answer is used for this run only, then Claude is asked again"""
+    user_id = test_user.id
+    claude = FakeClaude(subject="Rappel {{ invoice.secret }}")
+
+    templates = await ReminderTemplateService.get_templates(db_session, user_id, "en", ["final"], claude)
+
+    assert templates["final"].render(template_variables(make_invoice(user_id)))["subject"] == "Reminder: invoice INV-001"
+    row, = await ReminderTemplateService.list_templates(db_session, user_id)
+    assert (row.subject_template, row.source) == (FALLBACK_TEMPLATES["en"][0], "fallback")
+
+    claude.subject = "Reminder {{ invoice_number }}"
+    templates = await ReminderTemplateService.get_templates(db_session, user_id, "en", ["final"], claude)
+
+    assert claude.calls == 2
+    assert templates["final"].render(template_variables(make_invoice(user_id)))["subject"] == "Reminder INV-001"
+    row, = await ReminderTemplateService.list_templates(db_session, user_id)
+    assert (row.subject_template, row.source) == ("Reminder {{ invoice_number }}", "ai")
+
+
+@pytest.mark.asyncio
+async def test_invoice_fields_are_escaped_in_body(db_session, test_user):
+    """Test client-controlled values cannot inject HTML"""
+    user_id = test_user.id
+    templates = await ReminderTemplateService.get_templates(db_session, user_id, "fr", ["first"], FakeClaude())
+
+    email = templates["first"].render(template_variables(make_invoice(user_id, "<script>x</script>")))
+
+    assert "<script>" not in email["body"]
+    assert "&lt;script&gt;" in email["body"]
+
+
+@pytest.mark.asyncio
+async def test_save_rejects_invalid_templates(db_session, test_user):
+    with pytest.raises(ValueError):
+        await ReminderTemplateService.save_template(db_session, test_user.id, "fr", "first", "{{ nope }}", "<p></p>")
+    with pytest.raises(ValueError):
+        await ReminderTemplateService.save_template(db_session, test_user.id, "fr", "fourth", "Hi", "<p></p>")
@@ -0,0 +1,128 @@
+"""Tests for the tenant fan-out of periodic jobs"""
+import pytest
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from uuid import UUID
+
+from app.config import settings
+from app.models.bank_account import BankAccount
+from app.models.invoice import Invoice
+from app.models.transaction import Transaction
+from app.models.user import User
+from app.services.tenant_scheduler import TenantScheduler
+from app.workers import tasks
+
+
+async def create_users(db_session, count, **kwargs):
+    users = [
+        User(email=f"tenant{i}@example.com", hashed_password="x", is_active=True, is_verified=True, **kwargs)
+        for i in range(count)
+    ]
+    db_session.add_all(users)
+    await db_session.flush()
+    return sorted(users, key=lambda user: user.id)
+
+
+async def add_transaction(db_session, user, category=None):
+    account = BankAccount(user_id=user.id, bank_name="Bank", currency="EUR", is_active=True)
+    db_session.add(account)
+    await db_session.flush()
+    db_session.add(Transaction(
+        bank_account_id=account.id,
+        bridge_transaction_id=f"tx-{account.id}",
+        description="CB MERCHANT",
+        amount=Decimal("-10"),
+        currency="EUR",
+        date=datetime(2026, 3, 1),
+        category=category,
+        is_reconciled=False,
+    ))
+
+
+def add_invoice(db_session, user, due_in_days, status="pending"):
+    db_session.add(Invoice(
+        user_id=user.id,
+        invoice_number=f"INV-{due_in_days}",
+        client_name="Client",
+        amount=Decimal("100"),
+        tax_amount=Decimal("0"),
+        total_amount=Decimal("100"),
+        currency="EUR",
+        issue_date=date.today() - timedelta(days=60),
+        due_date=date.today() + timedelta(days=due_in_days),
+        status=status,
+        is_reconciled=False,
+    ))
+
+
+@pytest.mark.asyncio
+async def test_pages_only_tenants_with_pending_work(db_session):
+    """Test existence filters per job and keyset pages over user ids"""
+    users = await create_users(db_session, 6)
+    for user in users[:4]:
+        await add_transaction(db_session, user)
+    await add_transaction(db_session, users[4], category="autre")
+    users[3].is_active = False
+    add_invoice(db_session, users[5], due_in_days=-10)
+    add_invoice(db_session, users[4], due_in_days=10)
+    add_invoice(db_session, users[0], due_in_days=-10, status="paid")
+    await db_session.commit()
+
+    first = await TenantScheduler.get_tenant_page(db_session, "categorize", limit=2)
+    second = await TenantScheduler.get_tenant_page(db_session, "categorize", after=first[-1], limit=2)
+
+    assert first == [users[0].id, users[1].id]
+    assert second == [users[2].id]
+    assert await TenantScheduler.get_tenant_page(db_session, "reminders") == [users[5].id]
+    with pytest.raises(ValueError):
+        await TenantScheduler.get_tenant_page(db_session, "unknown")
+
+
+@pytest.mark.asyncio
+async def test_plan_page_chunks_and_cursor(db_session, monkeypatch):
+    """Test a full page returns a cursor, the last page does not"""
+    monkeypatch.setattr(settings, "TENANT_FANOUT_PAGE_SIZE", 5)
+    monkeypatch.setattr(settings, "TENANT_FANOUT_CHUNK_SIZE", 2)
+    users = await create_users(db_session, 7)
+    for user in users:
+        await add_transaction(db_session, user)
+    await db_session.commit()
+
+    chunks, next_after = await TenantScheduler.plan_page(db_session, "categorize")
+    assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+    assert next_after == users[4].id
+
+    chunks, next_after = await TenantScheduler.plan_page(db_session, "categorize", next_after)
+    assert chunks == [[users[5].id, users[6].id]]
+    assert next_after is None
+
+
+def test_aggregate_sums_chunk_stats_into_totals():
+    """Test chunk stats are summed into the running totals of the job"""
+    totals = TenantScheduler.aggregate(
+        [{"tenants": 2, "sent": 3}, {"tenants": 1, "failed_tenants": 1}, None],
+        {"tenants": 10, "sent": 7}
+    )
+    assert totals == {"tenants": 13, "sent": 10, "failed_tenants": 1}
+
+
+@pytest.mark.asyncio
+async def test_chunk_task_isolates_failing_tenants(monkeypatch):
+    """Test one failing tenant is counted without failing the chunk"""
+    seen = []
+
+    async def work(db, user_id):
+        seen.append(user_id)
+        if user_id.int == 2:
+            raise RuntimeError("AI down")
+        return {"categorized": 5}
+
+    monkeypatch.setitem(tasks.TENANT_JOBS, "categorize", work)
+    user_ids = [str(UUID(int=i)) for i in (1, 2, 3)]
+
+    # The task body, on the test's loop (calling the task would run it in
+    # asyncio.run, which leaves no current event loop for later tests)
+    result = await tasks.run_tenant_chunk_task.run_async("categorize", user_ids)
+
+    assert sorted(seen) == [UUID(int=i) for i in (1, 2, 3)]
+    assert result == {"tenants": 3, "categorized": 10, "failed_tenants": 1}
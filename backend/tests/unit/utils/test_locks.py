@@ -0,0 +1,112 @@
+"""Tests for per-entity job locks and enqueue deduplication"""
+import pytest
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from app.core.locks import RELEASE_SCRIPT, EntityLocks, LockBusy, lock_counters
+
+
+class FakeRedis:
+    """In-memory stand-in for the Redis commands used by EntityLocks"""
+
+    def __init__(self):
+        self.data = {}
+        self.hashes = {}
+
+    async def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = str(value)
+        return True
+
+    async def eval(self, script, numkeys, key, token):
+        assert script == RELEASE_SCRIPT
+        if self.data.get(key) == token:
+            del self.data[key]
+            return 1
+        return 0
+
+    async def delete(self, key):
+        return int(self.data.pop(key, None) is not None)
+
+    async def hincrby(self, name, field, amount):
+        fields = self.hashes.setdefault(name, {})
+        fields[field] = fields.get(field, 0) + amount
+
+    async def hgetall(self, name):
+        return dict(self.hashes.get(name, {}))
+
+
+class DownRedis:
+    """Redis client whose server is unreachable"""
+
+    def __getattr__(self, name):
+        async def fail(*args, **kwargs):
+            raise RedisConnectionError("Connection refused")
+        return fail
+
+
+@pytest.fixture
+def fake_redis():
+    lock_counters.reset()
+    return FakeRedis()
+
+
+@pytest.mark.asyncio
+async def test_lock_is_exclusive_per_entity(fake_redis):
+    """Test a second holder is refused, other entities are independent"""
+    locks = EntityLocks(lambda: fake_redis)
+
+    async with locks.hold("bank_account_sync", "a1"):
+        with pytest.raises(LockBusy):
+            async with locks.hold("bank_account_sync", "a1"):
+                pass
+        async with locks.hold("bank_account_sync", "a2"):
+            pass
+
+    async with locks.hold("bank_account_sync", "a1"):
+        pass
+
+    stats = await locks.get_stats()
+    assert stats["shared"] == {"bank_account_sync.acquired": 3, "bank_account_sync.contended": 1}
+    assert stats["contention_ratio"] == 0.25
+
+
+@pytest.mark.asyncio
+async def test_expired_lock_is_not_released_by_its_old_holder(fake_redis):
+    """Test release only deletes the lock if it still holds the caller's token"""
+    locks = EntityLocks(lambda: fake_redis)
+    token = await locks.acquire("reconciliation", "u1")
+
+    # TTL expired and another job took the lock
+    del fake_redis.data["financeai:lock:reconciliation:u1"]
+    other = await locks.acquire("reconciliation", "u1")
+    await locks.release("reconciliation", "u1", token)
+
+    assert fake_redis.data["financeai:lock:reconciliation:u1"] == other
+
+
+@pytest.mark.asyncio
+async def test_duplicate_enqueues_are_dropped_until_the_job_starts(fake_redis):
+    """Test only the first enqueue is kept while the job waits in the queue"""
+    locks = EntityLocks(lambda: fake_redis)
+
+    assert await locks.claim_enqueue("bank_account_sync", "a1") is True
+    assert await locks.claim_enqueue("bank_account_sync", "a1") is False
+    await locks.clear_enqueue("bank_account_sync", "a1")
+    assert await locks.claim_enqueue("bank_account_sync", "a1") is True
+
+    assert lock_counters.get("deduplicated") == 1
+
+
+@pytest.mark.asyncio
+async def test_locks_fail_open_without_redis():
+    """Test jobs still run (unlocked) when Redis is unreachable"""
+    lock_counters.reset()
+    locks = EntityLocks(DownRedis)
+
+    async with locks.hold("bank_account_sync", "a1"):
+        async with locks.hold("bank_account_sync", "a1"):
+            pass
+    assert await locks.claim_enqueue("bank_account_sync", "a1") is True
+    assert lock_counters.get("unavailable") == 3
+    assert (await locks.get_stats())["shared"] is None
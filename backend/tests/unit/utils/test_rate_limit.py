@@ -0,0 +1,31 @@
+"""Tests for the asyncio token bucket"""
+import pytest
+import time
+
+from app.core.rate_limit import TokenBucket
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_allows_burst_then_waits():
+    """Test a burst up to capacity is immediate, the next token waits for refill"""
+    bucket = TokenBucket(rate=20, capacity=3)
+
+    started = time.monotonic()
+    for _ in range(3):
+        assert await bucket.acquire() == 0.0
+    waited = await bucket.acquire()
+
+    assert waited > 0
+    assert time.monotonic() - started >= 0.04
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_disabled_and_penalized():
+    """Test rate 0 never waits and penalize delays the next acquire"""
+    unlimited = TokenBucket(rate=0, capacity=1)
+    for _ in range(10):
+        assert await unlimited.acquire() == 0.0
+
+    bucket = TokenBucket(rate=100, capacity=5)
+    bucket.penalize(0.05)
+    assert await bucket.acquire() >= 0.05
@@ -0,0 +1 @@
+"""Workers unit tests."""
@@ -0,0 +1,77 @@
+"""Tests for Celery queue routing and per-queue worker settings"""
+from types import SimpleNamespace
+
+from app.config import settings
+from app.workers import tasks
+from app.workers.celery_app import celery_app, configure_worker_for_queues
+from app.workers.queues import (
+    BULK_AI_QUEUE,
+    EMAIL_QUEUE,
+    INTERACTIVE_QUEUE,
+    PRIORITY_BACKGROUND,
+    PRIORITY_URGENT,
+    QUEUES,
+    SYNC_QUEUE,
+    TASK_ROUTES,
+    worker_limits,
+)
+
+
+def route_of(task_name):
+    return celery_app.amqp.router.route({}, task_name)
+
+
+def test_every_task_has_a_known_queue():
+    names = [name for name in celery_app.tasks if name.startswith("app.workers.tasks.")]
+    assert names
+    for name in names:
+        assert name in TASK_ROUTES, name
+        assert TASK_ROUTES[name]["queue"] in QUEUES
+
+
+def test_interactive_and_bulk_work_are_routed_apart():
+    assert route_of("app.workers.tasks.auto_reconcile_transaction_task")["queue"].name == INTERACTIVE_QUEUE
+    assert route_of("app.workers.tasks.reconcile_transactions_batch_task")["queue"].name == INTERACTIVE_QUEUE
+    assert route_of("app.workers.tasks.sync_bank_account_task")["queue"].name == SYNC_QUEUE
+    assert route_of("app.workers.tasks.run_tenant_chunk_task")["queue"].name == BULK_AI_QUEUE
+    assert route_of("app.workers.tasks.process_overdue_invoices_task")["queue"].name == EMAIL_QUEUE
+
+
+def test_bulk_chunks_yield_to_user_triggered_jobs():
+    assert TASK_ROUTES["app.workers.tasks.run_tenant_chunk_task"]["priority"] == PRIORITY_BACKGROUND
+    assert TASK_ROUTES["app.workers.tasks.auto_reconcile_transaction_task"]["priority"] == PRIORITY_URGENT
+    # Redis serves the lowest step first
+    assert PRIORITY_URGENT < PRIORITY_BACKGROUND
+    assert celery_app.conf.broker_transport_options["priority_steps"] == list(range(10))
+
+
+def test_reminder_chunks_go_to_email_workers():
+    signature = tasks.run_tenant_chunk_task.s("reminders", []).set(
+        queue=tasks.TENANT_JOB_QUEUES["reminders"], priority=PRIORITY_BACKGROUND
+    )
+    assert signature.options["queue"] == EMAIL_QUEUE
+    assert set(tasks.TENANT_JOB_QUEUES) == set(tasks.TENANT_JOBS)
+
+
+def test_worker_limits_per_queue():
+    assert worker_limits([BULK_AI_QUEUE]) == (
+        settings.CELERY_BULK_AI_CONCURRENCY, settings.CELERY_BULK_AI_PREFETCH
+    )
+    assert worker_limits(EMAIL_QUEUE) == (
+        settings.CELERY_EMAIL_CONCURRENCY, settings.CELERY_EMAIL_PREFETCH
+    )
+
+
+def test_worker_on_several_queues_takes_the_lowest_prefetch():
+    concurrency, prefetch = worker_limits("bulk_ai,email")
+    assert concurrency == max(settings.CELERY_BULK_AI_CONCURRENCY, settings.CELERY_EMAIL_CONCURRENCY)
+    assert prefetch == min(settings.CELERY_BULK_AI_PREFETCH, settings.CELERY_EMAIL_PREFETCH)
+    # No -Q: the worker consumes every queue
+    assert worker_limits(None) == worker_limits(list(QUEUES))
+
+
+def test_celeryd_init_sizes_the_worker():
+    conf = SimpleNamespace(worker_concurrency=None, worker_prefetch_multiplier=4)
+    configure_worker_for_queues(conf=conf, options={"queues": [INTERACTIVE_QUEUE]})
+    assert conf.worker_concurrency == settings.CELERY_INTERACTIVE_CONCURRENCY
+    assert conf.worker_prefetch_multiplier == settings.CELERY_INTERACTIVE_PREFETCH
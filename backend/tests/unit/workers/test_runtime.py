@@ -0,0 +1,64 @@
+"""Tests for the worker event loop runtime"""
+import asyncio
+
+from sqlalchemy import text
+
+from app.workers.celery_app import celery_app
+from app.workers.runtime import LoopBoundSessionMaker, WorkerRuntime
+from app.workers.tasks import AsyncTask
+
+
+def make_runtime(tmp_path):
+    session_maker = LoopBoundSessionMaker(f"sqlite+aiosqlite:///{tmp_path / 'runtime.db'}")
+    runtime = WorkerRuntime()
+    released = []
+
+    async def release():
+        released.append(asyncio.get_running_loop())
+        await session_maker.dispose()
+
+    runtime.on_shutdown(release)
+    return runtime, session_maker, released
+
+
+async def loop_and_engine(session_maker):
+    async with session_maker() as db:
+        await db.execute(text("SELECT 1"))
+    return asyncio.get_running_loop(), session_maker.engine
+
+
+def test_started_runtime_reuses_loop_and_pool(tmp_path):
+    """Test tasks share one loop and engine until the worker stops"""
+    runtime, session_maker, released = make_runtime(tmp_path)
+    runtime.start()
+
+    first = runtime.run(loop_and_engine(session_maker))
+    second = runtime.run(loop_and_engine(session_maker))
+    assert first == second
+    assert released == []
+
+    runtime.stop()
+    assert released == [first[0]]
+    assert first[0].is_closed()
+
+
+def test_unstarted_runtime_releases_each_throwaway_loop(tmp_path):
+    """Test without a worker loop each call gets its own loop, cleaned up after"""
+    runtime, session_maker, released = make_runtime(tmp_path)
+
+    first = runtime.run(loop_and_engine(session_maker))
+    second = runtime.run(loop_and_engine(session_maker))
+
+    assert first[0] is not second[0]
+    assert first[1] is not second[1]
+    assert released == [first[0], second[0]]
+
+
+def test_async_task_runs_its_coroutine():
+    """Test calling an AsyncTask runs the decorated coroutine body"""
+    @celery_app.task(bind=True, base=AsyncTask, name="tests.runtime.echo")
+    async def echo_task(self, value):
+        await asyncio.sleep(0)
+        return {"value": value, "task": self.name}
+
+    assert echo_task(3) == {"value": 3, "task": "tests.runtime.echo"}
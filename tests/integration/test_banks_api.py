@@ -194,3 +194,16 @@ class TestBankAPI:
         assert response.status_code == 404
 
 
+    
+    async def test_lock_stats_are_for_superusers_only(
+        self,
+        client,
+        auth_headers
+    ):
+        """Test tenants cannot read the process-wide lock counters"""
+        response = await client.get(
+            "/api/v1/banks/locks/stats",
+            headers=auth_headers
+        )
+        
+        assert response.status_code == 403
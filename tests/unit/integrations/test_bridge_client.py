@@ -0,0 +1,113 @@
+"""Unit tests for Bridge client pagination (with a mock transport)"""
+import asyncio
+import pytest
+import httpx
+
+from app.integrations.bridge_client import BridgeClient, BridgeAPIError
+
+
+def paginated_handler(total, page_size, requests):
+    """Mock Bridge transactions endpoint serving `total` rows by pages"""
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request.url)
+        start = int(request.url.params.get("after", 0))
+        rows = [
+            {"id": i, "amount": -1.0, "date": "2026-01-01"}
+            for i in range(start, min(start + page_size, total))
+        ]
+        end = start + len(rows)
+        next_uri = (
+            f"/v2/accounts/42/transactions?after={end}&limit={page_size}"
+            if end < total else None
+        )
+        return httpx.Response(200, json={"resources": rows, "pagination": {"next_uri": next_uri}})
+    return handler
+
+
+def make_client(handler):
+    client = BridgeClient(api_key="k", client_id="id", client_secret="secret")
+    client.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return client
+
+
+@pytest.mark.asyncio
+class TestBridgeClientPagination:
+    """Test paginated transaction fetch"""
+
+    async def test_follows_every_page(self):
+        """Test rows past the first page are no longer dropped"""
+        requests = []
+        client = make_client(paginated_handler(1200, 500, requests))
+
+        transactions = await client.get_transactions(42, limit=5000)
+
+        assert len(transactions) == 1200
+        assert len(requests) == 3
+        assert requests[1].host == "api.bridgeapi.io"
+
+    async def test_budget_stops_between_pages(self):
+        """Test the budget is checked at page boundaries and exposes the cursor"""
+        requests = []
+        client = make_client(paginated_handler(1200, 500, requests))
+
+        pages = [
+            page async for page in client.iter_transaction_pages(42, max_transactions=600)
+        ]
+
+        assert [len(page.transactions) for page in pages] == [500, 500]
+        assert pages[-1].next_uri.endswith("after=1000&limit=500")
+
+        resumed = [
+            page async for page in client.iter_transaction_pages(
+                42, max_transactions=600, resume_uri=pages[-1].next_uri
+            )
+        ]
+        assert [len(page.transactions) for page in resumed] == [200]
+
+    async def test_next_page_downloads_while_caller_works(self):
+        """Test page N+1 is requested before page N is consumed"""
+        requests = []
+        client = make_client(paginated_handler(1000, 500, requests))
+
+        async for page in client.iter_transaction_pages(42, max_transactions=5000):
+            await asyncio.sleep(0)
+            if len(requests) == 1:
+                continue
+            assert len(requests) == 2
+            break
+        else:
+            pytest.fail("second page was not prefetched")
+
+    async def test_rejects_foreign_resume_uri(self):
+        """Test a resume cursor cannot point at another account or host"""
+        client = make_client(paginated_handler(10, 5, []))
+
+        with pytest.raises(BridgeAPIError):
+            async for _ in client.iter_transaction_pages(
+                42, resume_uri="https://evil.example/v2/accounts/42/transactions"
+            ):
+                pass
+
+    async def test_etag_not_modified(self):
+        """Test the ETag is sent and a 304 yields one empty not-modified page"""
+        seen_headers = []
+
+        def handler(request):
+            seen_headers.append(request.headers.get("If-None-Match"))
+            if request.headers.get("If-None-Match") == '"v1"':
+                return httpx.Response(304)
+            return httpx.Response(
+                200,
+                json={"resources": [{"id": 1}], "pagination": {"next_uri": None}},
+                headers={"ETag": '"v1"'}
+            )
+
+        client = make_client(handler)
+
+        first = [page async for page in client.iter_transaction_pages(42)]
+        second = [page async for page in client.iter_transaction_pages(42, etag=first[0].etag)]
+
+        assert first[0].etag == '"v1"'
+        assert second[0].not_modified is True
+        assert second[0].transactions == []
+        assert seen_headers == [None, '"v1"']
@@ -2,6 +2,8 @@
 import pytest
 from unittest.mock import AsyncMock, patch, MagicMock
 from decimal import Decimal
+import asyncio
+import json
 
 from app.integrations.claude_client import ClaudeClient, ClaudeAIError
 
@@ -10,7 +12,7 @@ from app.integrations.claude_client import ClaudeClient, ClaudeAIError
 class TestClaudeClient:
     """Test Claude AI client"""
     
-    @patch('app.integrations.claude_client.anthropic.Anthropic')
+    @patch('app.integrations.claude_client.anthropic.AsyncAnthropic')
     async def test_categorize_transaction_success(self, mock_anthropic):
         """Test successful transaction categorization"""
         # Mock Claude response
@@ -20,7 +22,7 @@ class TestClaudeClient:
         ]
         
         mock_client = MagicMock()
-        mock_client.messages.create.return_value = mock_response
+        mock_client.messages.create = AsyncMock(return_value=mock_response)
         mock_anthropic.return_value = mock_client
         
         # Test
@@ -35,7 +37,7 @@ class TestClaudeClient:
         assert confidence == Decimal("0.95")
         assert mock_client.messages.create.called
     
-    @patch('app.integrations.claude_client.anthropic.Anthropic')
+    @patch('app.integrations.claude_client.anthropic.AsyncAnthropic')
     async def test_categorize_transaction_invalid_json(self, mock_anthropic):
         """Test handling of invalid JSON response"""
         # Mock invalid response
@@ -43,7 +45,7 @@ class TestClaudeClient:
         mock_response.content = [MagicMock(text='invalid json')]
         
         mock_client = MagicMock()
-        mock_client.messages.create.return_value = mock_response
+        mock_client.messages.create = AsyncMock(return_value=mock_response)
         mock_anthropic.return_value = mock_client
         
         # Test - should fallback to "autre" with 0.0 confidence
@@ -57,7 +59,7 @@ class TestClaudeClient:
         assert category == "autre"
         assert confidence == Decimal("0.0")
     
-    @patch('app.integrations.claude_client.anthropic.Anthropic')
+    @patch('app.integrations.claude_client.anthropic.AsyncAnthropic')
     async def test_find_matching_invoice_success(self, mock_anthropic):
         """Test successful invoice matching"""
         # Mock Claude response
@@ -67,7 +69,7 @@ class TestClaudeClient:
         ]
         
         mock_client = MagicMock()
-        mock_client.messages.create.return_value = mock_response
+        mock_client.messages.create = AsyncMock(return_value=mock_response)
         mock_anthropic.return_value = mock_client
         
         # Test
@@ -97,7 +99,7 @@ class TestClaudeClient:
         assert result["match_score"] == Decimal("0.92")
         assert result["match_method"] == "fuzzy_ai"
     
-    @patch('app.integrations.claude_client.anthropic.Anthropic')
+    @patch('app.integrations.claude_client.anthropic.AsyncAnthropic')
     async def test_find_matching_invoice_no_match(self, mock_anthropic):
         """Test when no invoice matches"""
         # Mock Claude response
@@ -107,7 +109,7 @@ class TestClaudeClient:
         ]
         
         mock_client = MagicMock()
-        mock_client.messages.create.return_value = mock_response
+        mock_client.messages.create = AsyncMock(return_value=mock_response)
         mock_anthropic.return_value = mock_client
         
         # Test
@@ -126,7 +128,7 @@ class TestClaudeClient:
         
         assert result is None
     
-    @patch('app.integrations.claude_client.anthropic.Anthropic')
+    @patch('app.integrations.claude_client.anthropic.AsyncAnthropic')
     async def test_generate_reminder_email(self, mock_anthropic):
         """Test reminder email generation"""
         # Mock Claude response
@@ -136,7 +138,7 @@ class TestClaudeClient:
         ]
         
         mock_client = MagicMock()
-        mock_client.messages.create.return_value = mock_response
+        mock_client.messages.create = AsyncMock(return_value=mock_response)
         mock_anthropic.return_value = mock_client
         
         # Test
@@ -161,5 +163,143 @@ class TestClaudeClient:
         assert "body" in result
         assert "INV-001" in result["subject"]
         assert len(result["body"]) > 0
+    
+    @patch('app.integrations.claude_client.anthropic.AsyncAnthropic')
+    async def test_generate_reminder_template_fenced_json(self, mock_anthropic):
+        """Test a template answer wrapped in a markdown fence is parsed"""
+        mock_response = MagicMock()
+        mock_response.content = [
+            MagicMock(text='```json\n{"subject": "Rappel {{ invoice_number }}", "body_html": "<p>{{ client_name }}</p>"}\n```')
+        ]
+        
+        mock_client = MagicMock()
+        mock_client.messages.create = AsyncMock(return_value=mock_response)
+        mock_anthropic.return_value = mock_client
+        
+        client = ClaudeClient(api_key="test_key")
+        result = await client.generate_reminder_template("first", "fr")
+        
+        assert result == {"subject": "Rappel {{ invoice_number }}", "body": "<p>{{ client_name }}</p>"}
+        prompt = mock_client.messages.create.call_args.kwargs["messages"][0]["content"]
+        assert "Contact information" not in prompt
 
 
+    
+    @patch('app.integrations.claude_client.anthropic.AsyncAnthropic')
+    async def test_categorize_transactions_batch_single_call(self, mock_anthropic):
+        """Test a batch of transactions is categorized with one API call"""
+        mock_response = MagicMock()
+        mock_response.content = [
+            MagicMock(text='[{"index": 0, "category": "loyer_bureau", "confidence": 0.95}, '
+                           '{"index": 1, "category": "frais_bancaires", "confidence": 0.9}, '
+                           '{"index": 2, "category": "telecommunications", "confidence": 0.85}]')
+        ]
+        
+        mock_client = MagicMock()
+        mock_client.messages.create = AsyncMock(return_value=mock_response)
+        mock_anthropic.return_value = mock_client
+        
+        # Test
+        client = ClaudeClient(api_key="test_key")
+        results = await client.categorize_transactions_batch([
+            {"description": "LOYER BUREAU JANVIER", "amount": 1500, "transaction_type": "debit"},
+            {"description": "COMMISSION INTERVENTION", "amount": 8, "transaction_type": "debit"},
+            {"description": "PRLV ORANGE", "amount": 39.99, "transaction_type": "debit"},
+        ])
+        
+        assert results == [
+            ("loyer_bureau", Decimal("0.95")),
+            ("frais_bancaires", Decimal("0.9")),
+            ("telecommunications", Decimal("0.85")),
+        ]
+        assert mock_client.messages.create.call_count == 1
+    
+    @patch('app.integrations.claude_client.anthropic.AsyncAnthropic')
+    async def test_categorize_transactions_batch_falls_back_per_item(self, mock_anthropic):
+        """Test missing or invalid batch items are retried one by one"""
+        batch_response = MagicMock()
+        batch_response.content = [
+            MagicMock(text='```json\n[{"index": 0, "category": "loyer_bureau", "confidence": 0.95}, '
+                           '{"index": 1, "category": "not_a_category", "confidence": 0.9}]\n```')
+        ]
+        single_response = MagicMock()
+        single_response.content = [
+            MagicMock(text='{"category": "frais_bancaires", "confidence": 0.8, "reasoning": "Frais"}')
+        ]
+        
+        mock_client = MagicMock()
+        mock_client.messages.create = AsyncMock(
+            side_effect=[batch_response, single_response, single_response]
+        )
+        mock_anthropic.return_value = mock_client
+        
+        # Test - items 1 (unknown category) and 2 (missing) use per-item calls
+        client = ClaudeClient(api_key="test_key")
+        results = await client.categorize_transactions_batch([
+            {"description": "LOYER BUREAU", "amount": 1500},
+            {"description": "FRAIS TENUE COMPTE", "amount": 5},
+            {"description": "COMMISSION", "amount": 8},
+        ])
+        
+        assert results[0] == ("loyer_bureau", Decimal("0.95"))
+        assert results[1] == ("frais_bancaires", Decimal("0.8"))
+        assert results[2] == ("frais_bancaires", Decimal("0.8"))
+        assert mock_client.messages.create.call_count == 3
+    
+    @patch('app.integrations.claude_client.anthropic.AsyncAnthropic')
+    async def test_categorize_transactions_batch_chunks(self, mock_anthropic):
+        """Test 50 transactions cost two calls with a batch size of 25"""
+        def respond(**kwargs):
+            size = kwargs["messages"][0]["content"].count(" | debit")
+            response = MagicMock()
+            response.content = [MagicMock(text=json.dumps([
+                {"index": i, "category": "autre", "confidence": 0.5} for i in range(size)
+            ]))]
+            return response
+        
+        mock_client = MagicMock()
+        mock_client.messages.create = AsyncMock(side_effect=respond)
+        mock_anthropic.return_value = mock_client
+        
+        client = ClaudeClient(api_key="test_key")
+        results = await client.categorize_transactions_batch(
+            [{"description": f"TX {i}", "amount": i} for i in range(50)],
+            batch_size=25
+        )
+        
+        assert len(results) == 50
+        assert mock_client.messages.create.call_count == 2
+    
+    @patch('app.integrations.claude_client.settings')
+    @patch('app.integrations.claude_client.anthropic.AsyncAnthropic')
+    async def test_concurrent_calls_are_bounded(self, mock_anthropic, mock_settings):
+        """Test concurrent calls never exceed CLAUDE_MAX_CONCURRENCY in flight"""
+        mock_settings.CLAUDE_MAX_CONCURRENCY = 2
+        mock_settings.CLAUDE_MAX_CONNECTIONS = 2
+        mock_settings.CLAUDE_REQUESTS_PER_MINUTE = 0
+        mock_settings.CLAUDE_TIMEOUT_SECONDS = 5
+        in_flight = 0
+        peak = 0
+        
+        async def respond(**kwargs):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            response = MagicMock()
+            response.content = [MagicMock(text='{"category": "autre", "confidence": 0.5}')]
+            return response
+        
+        mock_client = MagicMock()
+        mock_client.messages.create = AsyncMock(side_effect=respond)
+        mock_anthropic.return_value = mock_client
+        
+        client = ClaudeClient(api_key="test_key")
+        results = await asyncio.gather(*(
+            client.categorize_transaction(f"TX {i}", Decimal("10"), "debit")
+            for i in range(6)
+        ))
+        
+        assert len(results) == 6
+        assert peak == 2
@@ -0,0 +1,144 @@
+"""Tests for batched SendGrid delivery against a local fake SendGrid server"""
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.config import settings
+from app.integrations.sendgrid_client import (
+    EmailMessage,
+    SendGridClient,
+    SendQueue,
+    sendgrid_counters,
+)
+
+
+class FakeSendGrid(ThreadingHTTPServer):
+    """Local /v3/mail/send recording payloads; replies with scripted statuses then 202"""
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), FakeSendGridHandler)
+        self.payloads = []
+        self.script = []
+        self.lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_port}/v3"
+
+
+class FakeSendGridHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        server = self.server
+        with server.lock:
+            status, headers = server.script.pop(0) if server.script else (202, {})
+            if status == 202:
+                server.payloads.append(json.loads(body))
+                headers = {"X-Message-Id": f"msg-{len(server.payloads)}"}
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def fake_sendgrid(monkeypatch):
+    server = FakeSendGrid()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(settings, "SENDGRID_BASE_URL", server.base_url)
+    monkeypatch.setattr(settings, "SENDGRID_BACKOFF_SECONDS", 0.01)
+    sendgrid_counters.reset()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+async def client():
+    client = SendGridClient(api_key="test_key")
+    yield client
+    await client.close()
+
+
+def reminder(i, body="<p>Bonjour -client_name-</p>"):
+    return EmailMessage(
+        to_email=f"client{i}@example.com",
+        to_name=f"Client {i}",
+        subject=f"Rappel INV-{i}",
+        html_content=body,
+        substitutions={"-client_name-": f"Client {i}"},
+        custom_args={"invoice_number": f"INV-{i}"},
+    )
+
+
+@pytest.mark.asyncio
+async def test_messages_sharing_a_body_are_sent_as_personalizations(fake_sendgrid, client):
+    """Test one request per 1000 recipients of a body, one per other body"""
+    messages = [reminder(i) for i in range(2500)] + [reminder(0, body="<p>Autre</p>")]
+
+    message_ids = await client.send_batch(messages)
+
+    assert sorted(len(p["personalizations"]) for p in fake_sendgrid.payloads) == [1, 500, 1000, 1000]
+    assert all(message_ids)
+    assert len(set(message_ids)) == 4
+
+    payload = next(p for p in fake_sendgrid.payloads if len(p["personalizations"]) == 1000)
+    assert payload["content"] == [{"type": "text/html", "value": "<p>Bonjour -client_name-</p>"}]
+    personalization = payload["personalizations"][0]
+    assert personalization["subject"].startswith("Rappel INV-")
+    assert personalization["substitutions"]["-client_name-"].startswith("Client ")
+    assert personalization["custom_args"]["invoice_number"].startswith("INV-")
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_is_retried_after_retry_after(fake_sendgrid, client):
+    """Test a 429 waits for Retry-After, then the request goes through"""
+    fake_sendgrid.script = [(429, {"Retry-After": "0.1"})]
+
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    message_ids = await client.send_batch([reminder(1), reminder(2)])
+
+    assert loop.time() - started >= 0.1
+    assert message_ids == ["msg-1", "msg-1"]
+    assert sendgrid_counters.get("throttled") == 1
+    assert sendgrid_counters.get("sent") == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_request_only_fails_its_recipients(fake_sendgrid, client, monkeypatch):
+    """Test a rejected batch and an exhausted retry budget return None for their emails"""
+    monkeypatch.setattr(settings, "SENDGRID_MAX_RETRIES", 2)
+    fake_sendgrid.script = [(429, {})] * 3
+
+    message_ids = await client.send_batch([reminder(1)])
+    assert message_ids == [None]
+    assert sendgrid_counters.get("throttled") == 3
+
+    fake_sendgrid.script = [(400, {})]
+    message_ids = await client.send_batch([reminder(1), reminder(2, body="<p>Autre</p>")])
+    assert message_ids.count(None) == 1
+    assert sendgrid_counters.get("failed") == 2
+
+
+@pytest.mark.asyncio
+async def test_send_queue_sends_full_groups_before_flush(fake_sendgrid, client, monkeypatch):
+    """Test a full group leaves at once and flush sends the rest"""
+    monkeypatch.setattr(settings, "SENDGRID_MAX_PERSONALIZATIONS", 3)
+
+    async with SendQueue(client) as queue:
+        sent = [queue.add(reminder(i)) for i in range(4)]
+        other = queue.add(reminder(9, body="<p>Autre</p>"))
+        await asyncio.sleep(0.2)
+        assert [len(p["personalizations"]) for p in fake_sendgrid.payloads] == [3]
+
+    assert sorted(len(p["personalizations"]) for p in fake_sendgrid.payloads) == [1, 1, 3]
+    assert all(future.result() for future in sent + [other])